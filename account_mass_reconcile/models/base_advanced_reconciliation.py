@@ -5,17 +5,71 @@
 import logging
 from itertools import product
 
-from odoo import api, models, registry
+from odoo import api, fields, models, registry
 from odoo.tools.translate import _
 
 _logger = logging.getLogger(__name__)
 
 
+def _as_tuple(value):
+    if not isinstance(value, (list, tuple)):
+        return (value,)
+    return value
+
+
+class _UnionFind(object):
+    """Disjoint sets of move line ids, used to merge the reconcile groups
+
+    Each matched credit line and its opposites are united in one set;
+    groups sharing a line end up in the same set whatever the order
+    in which they were found.
+    """
+
+    def __init__(self):
+        self.parent = {}
+        self.rank = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent == item:
+            return item
+        root = self.find(parent)
+        self.parent[item] = root
+        return root
+
+    def union(self, items):
+        items = list(items)
+        root = self.find(items[0])
+        for item in items[1:]:
+            other = self.find(item)
+            if other == root:
+                continue
+            if self.rank.get(root, 0) < self.rank.get(other, 0):
+                root, other = other, root
+            self.parent[other] = root
+            if self.rank.get(root, 0) == self.rank.get(other, 0):
+                self.rank[root] = self.rank.get(root, 0) + 1
+        return root
+
+    def groups(self):
+        """Return the sets of ids, ordered by their first insertion"""
+        groups = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), set()).add(item)
+        return list(groups.values())
+
+
 class MassReconcileAdvanced(models.AbstractModel):
     _name = "mass.reconcile.advanced"
     _inherit = "mass.reconcile.base"
     _description = "Mass Reconcile Advanced"
 
+    comparisons_avoided = fields.Integer(
+        readonly=True,
+        help="Number of line comparisons skipped by the indexed matching "
+        "during the last run.",
+    )
+
     def _query_debit(self):
         """Select all move (debit>0) as candidate."""
         select = self._select_query()
@@ -204,6 +258,74 @@ class MassReconcileAdvanced(models.AbstractModel):
             if self._compare_opposite(move_line, op, matchers)
         ]
 
+    def _is_indexable_matcher(self, key):
+        """Whether the opposite lines can be bucketed on a matcher key
+
+        The index relies on a plain equality of the values, as done by
+        `_compare_values`. Can be inherited to return False for keys
+        compared otherwise (a like operator as instance): such keys are
+        then only checked by `_compare_opposite` on the candidates found
+        through the other keys.
+        """
+        return True
+
+    def _build_opposite_index(self, opposite_move_lines):
+        """Bucket the opposite lines once by the values of their matchers
+
+        :param list opposite_move_lines: list of dict of move lines values
+        :return: dict {matcher key: {value: set of positions in
+                 opposite_move_lines}}
+        """
+        index = {}
+        for position, opposite_move_line in enumerate(opposite_move_lines):
+            for key, values in self._opposite_matchers(opposite_move_line):
+                if not self._is_indexable_matcher(key):
+                    continue
+                buckets = index.setdefault(key, {})
+                for value in _as_tuple(values):
+                    # empty values never match, see `_compare_values`
+                    if value:
+                        buckets.setdefault(value, set()).add(position)
+        return index
+
+    def _search_opposites_indexed(self, move_line, opposite_move_lines, index):
+        """Search the opposite move lines for a move line using an index
+
+        Only the opposite lines sharing a value with the move line for
+        every indexed matcher are compared with `_compare_opposite`, so
+        the `_matchers` / `_opposite_matchers` contract still applies.
+
+        :param dict move_line: the move line for which we search opposites
+        :param list opposite_move_lines: list of dict of move lines values
+        :param dict index: index returned by `_build_opposite_index`
+        :return: tuple (list of matching lines, number of comparisons done)
+        """
+        matchers = self._matchers(move_line)
+        candidates = None
+        for key, values in matchers:
+            if not self._is_indexable_matcher(key):
+                continue
+            buckets = index.get(key, {})
+            positions = set()
+            for value in _as_tuple(values):
+                if value:
+                    positions |= buckets.get(value, set())
+            candidates = positions if candidates is None else candidates & positions
+            if not candidates:
+                return [], 0
+        if candidates is None:
+            candidates = range(len(opposite_move_lines))
+        else:
+            candidates = sorted(candidates)
+        opposites = [
+            opposite_move_lines[position]
+            for position in candidates
+            if self._compare_opposite(
+                move_line, opposite_move_lines[position], matchers
+            )
+        ]
+        return opposites, len(candidates)
+
     def _action_rec(self):
         self.env.flush_all()
         credit_lines = self._query_credit()
@@ -269,12 +391,55 @@ class MassReconcileAdvanced(models.AbstractModel):
                 _logger.exception(msg, chunk, e)
         return reconciled_ids
 
+    def _match_groups_indexed(self, credit_lines, debit_lines):
+        """Find the reconcile groups using the opposite lines index
+
+        Groups are merged with an union-find structure instead of
+        scanning the groups already found for each credit line.
+
+        :return: tuple (list of sets of line ids, comparisons avoided)
+        """
+        index = self._build_opposite_index(debit_lines)
+        union_find = _UnionFind()
+        inspected = compared = 0
+        _logger.info("%d credit lines to reconcile (indexed)", len(credit_lines))
+        for idx, credit_line in enumerate(credit_lines, start=1):
+            if idx % 1000 == 0:
+                _logger.info(
+                    "... %d/%d credit lines inspected ...", idx, len(credit_lines)
+                )
+            if self._skip_line(credit_line):
+                continue
+            inspected += 1
+            opposite_lines, comparisons = self._search_opposites_indexed(
+                credit_line, debit_lines, index
+            )
+            compared += comparisons
+            if not opposite_lines:
+                continue
+            line_ids = [opp["id"] for opp in opposite_lines] + [credit_line["id"]]
+            _logger.debug("Lines matched %s", line_ids)
+            union_find.union(line_ids)
+        avoided = inspected * len(debit_lines) - compared
+        _logger.info(
+            "Indexed matching did %d comparisons, %d avoided", compared, avoided
+        )
+        return union_find.groups(), avoided
+
     def _rec_auto_lines_advanced(self, credit_lines, debit_lines):
         """Advanced reconciliation main loop"""
         # pylint: disable=invalid-commit
         reconciled_ids = []
         for rec in self:
-            commit_every = rec.account_id.company_id.reconciliation_commit_every
+            if rec.indexed_matching:
+                reconcile_groups, avoided = rec._match_groups_indexed(
+                    credit_lines, debit_lines
+                )
+                rec.comparisons_avoided = avoided
+                reconciled_ids = rec._rec_groups(
+                    reconcile_groups, credit_lines, debit_lines
+                )
+                continue
             reconcile_groups = []
             _logger.info("%d credit lines to reconcile", len(credit_lines))
             for idx, credit_line in enumerate(credit_lines, start=1):
@@ -301,13 +466,20 @@ class MassReconcileAdvanced(models.AbstractModel):
                 else:
                     _logger.debug("New group of lines matched %s", line_ids)
                     reconcile_groups.append(set(line_ids))
-            lines_by_id = {line["id"]: line for line in credit_lines + debit_lines}
-            _logger.info("Found %d groups to reconcile", len(reconcile_groups))
-            if commit_every:
-                reconciled_ids = self._rec_group_by_chunk(
-                    reconcile_groups, lines_by_id, commit_every
-                )
-            else:
-                reconciled_ids = self._rec_group(reconcile_groups, lines_by_id)
-            _logger.info("Reconciliation is over")
+            reconciled_ids = rec._rec_groups(reconcile_groups, credit_lines, debit_lines)
+        return reconciled_ids
+
+    def _rec_groups(self, reconcile_groups, credit_lines, debit_lines):
+        """Reconcile the groups found, by chunk if configured on the company"""
+        self.ensure_one()
+        commit_every = self.account_id.company_id.reconciliation_commit_every
+        lines_by_id = {line["id"]: line for line in credit_lines + debit_lines}
+        _logger.info("Found %d groups to reconcile", len(reconcile_groups))
+        if commit_every:
+            reconciled_ids = self._rec_group_by_chunk(
+                reconcile_groups, lines_by_id, commit_every
+            )
+        else:
+            reconciled_ids = self._rec_group(reconcile_groups, lines_by_id)
+        _logger.info("Reconciliation is over")
         return reconciled_ids
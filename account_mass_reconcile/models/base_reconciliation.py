@@ -19,6 +19,11 @@ class MassReconcileBase(models.AbstractModel):
     partner_ids = fields.Many2many(
         comodel_name="res.partner", string="Restrict on partners"
     )
+    shard_count = fields.Integer(
+        help="When greater than 1, only the lines of the shard `shard_index` "
+        "out of `shard_count` are reconciled (see `_shard_field`)."
+    )
+    shard_index = fields.Integer()
     # other fields are inherited from mass.reconcile.options
 
     def automatic_reconcile(self):
@@ -58,6 +63,15 @@ class MassReconcileBase(models.AbstractModel):
         )
         return ["account_move_line.{}".format(col) for col in aml_cols]
 
+    def _shard_field(self):
+        """Column of account_move_line used to split the lines in shards
+
+        Lines which can be matched together must share the same value,
+        so they land in the same shard. The advanced methods always
+        match on the partner.
+        """
+        return "partner_id"
+
     def _selection_columns(self):
         return self._base_columns()
 
@@ -82,6 +96,12 @@ class MassReconcileBase(models.AbstractModel):
         if self.partner_ids:
             where += " AND account_move_line.partner_id IN %s"
             params.append(tuple(line.id for line in self.partner_ids))
+        if self.shard_count > 1:
+            where += (
+                " AND mod(hashtext(COALESCE(account_move_line.%s::text, ''))"
+                " & 2147483647, %%s) = %%s" % self._shard_field()
+            )
+            params += [self.shard_count, self.shard_index]
         return where, params
 
     def _get_filter(self):
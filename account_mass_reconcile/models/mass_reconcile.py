@@ -3,16 +3,27 @@
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
 import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from functools import partial
 
 import psycopg2
 from psycopg2.extensions import AsIs
 
-from odoo import _, api, exceptions, fields, models, sql_db
+from odoo import _, api, exceptions, fields, models, registry, sql_db
 from odoo.exceptions import UserError
+from odoo.tools import config
 
 _logger = logging.getLogger(__name__)
 
+# a shard losing a serialization or deadlock conflict to another shard is
+# run again from scratch, at most this number of times in total
+MAX_SHARD_ATTEMPTS = 3
+
 
 class MassReconcileOptions(models.AbstractModel):
     """Options of a reconciliation profile
@@ -45,6 +56,16 @@ class MassReconcileOptions(models.AbstractModel):
         default="newest",
     )
     _filter = fields.Char(string="Filter")
+    indexed_matching = fields.Boolean(
+        help="Advanced methods only: bucket the opposite lines by their "
+        "matchers once instead of comparing every credit line with every "
+        "debit line. Recommended on accounts with many open items.",
+    )
+    streaming = fields.Boolean(
+        help="Simple methods only: read the lines from a server-side cursor "
+        "and match them in a single pass, keeping in memory only the lines "
+        "sharing the same key.",
+    )
 
 
 class AccountMassReconcileMethod(models.Model):
@@ -131,6 +152,12 @@ class AccountMassReconcile(models.Model):
         compute="_compute_last_history",
     )
     company_id = fields.Many2one("res.company", string="Company")
+    shard_count = fields.Integer(
+        string="Parallel shards",
+        help="When greater than 1, the open items of the account are split "
+        "in this number of shards (by partner, or by the key of the simple "
+        "methods), reconciled in parallel on their own database cursors.",
+    )
 
     @staticmethod
     def _prepare_run_transient(rec_method):
@@ -142,6 +169,8 @@ class AccountMassReconcile(models.Model):
             "journal_id": rec_method.journal_id.id,
             "date_base_on": rec_method.date_base_on,
             "_filter": rec_method._filter,
+            "indexed_matching": rec_method.indexed_matching,
+            "streaming": rec_method.streaming,
         }
 
     def _run_reconcile_method(self, reconcile_method):
@@ -149,20 +178,147 @@ class AccountMassReconcile(models.Model):
         auto_rec_id = rec_model.create(self._prepare_run_transient(reconcile_method))
         return auto_rec_id.automatic_reconcile()
 
-    def run_reconcile(self):
-        def find_reconcile_ids(fieldname, move_line_ids, new_env):
-            if not move_line_ids:
-                return []
-            new_env.flush_all()
-            sql = """
-                SELECT DISTINCT %s FROM account_move_line
-                WHERE %s IS NOT NULL AND id in %s
-            """
-            params = [AsIs(fieldname), AsIs(fieldname), tuple(move_line_ids)]
-            new_env.cr.execute(sql, params)
-            res = new_env.cr.fetchall()
-            return [row[0] for row in res]
+    @staticmethod
+    def _find_reconcile_ids(fieldname, move_line_ids, new_env):
+        if not move_line_ids:
+            return []
+        new_env.flush_all()
+        sql = """
+            SELECT DISTINCT %s FROM account_move_line
+            WHERE %s IS NOT NULL AND id in %s
+        """
+        params = [AsIs(fieldname), AsIs(fieldname), tuple(move_line_ids)]
+        new_env.cr.execute(sql, params)
+        res = new_env.cr.fetchall()
+        return [row[0] for row in res]
+
+    @contextmanager
+    def _shard_env(self):
+        """Yield an environment on a new cursor, committed at the end
+
+        Tests cannot see data committed by other cursors, they
+        run the shards one after the other in the current transaction.
+        """
+        if self.env.registry.in_test_mode():
+            with self.env.cr.savepoint():
+                yield self.env
+            return
+        with registry(self.env.cr.dbname).cursor() as new_cr:
+            yield api.Environment(new_cr, self.env.uid, self.env.context)
+
+    def _run_reconcile_shard(self, reconcile_method, shard_count, shard_index):
+        """Run a reconcile method on one shard of the account lines
+
+        Called from worker threads: only reads records through the
+        environment of the shard cursor. The shards write concurrently, a
+        shard rolled back by a serialization failure or a deadlock is retried
+        after a random delay, up to ``MAX_SHARD_ATTEMPTS`` attempts.
+
+        :return: tuple (full reconcile ids, error message or None)
+        """
+        threading.current_thread().dbname = self.env.cr.dbname
+        for attempt in range(1, MAX_SHARD_ATTEMPTS + 1):
+            try:
+                with self._shard_env() as env:
+                    rec_method = reconcile_method.with_env(env)
+                    vals = self._prepare_run_transient(rec_method)
+                    vals.update(
+                        {"shard_count": shard_count, "shard_index": shard_index}
+                    )
+                    auto_rec = env[rec_method.name].create(vals)
+                    ml_rec_ids = auto_rec.automatic_reconcile()
+                    return (
+                        self._find_reconcile_ids("full_reconcile_id", ml_rec_ids, env),
+                        None,
+                    )
+            except psycopg2.extensions.TransactionRollbackError as e:
+                if attempt == MAX_SHARD_ATTEMPTS:
+                    _logger.exception(
+                        "Shard %d/%d of the reconcile task %s failed %d times",
+                        shard_index + 1,
+                        shard_count,
+                        self.id,
+                        attempt,
+                    )
+                    return [], str(e)
+                wait = random.uniform(0.0, 2**attempt)
+                _logger.info(
+                    "Shard %d/%d of the reconcile task %s rolled back (%s), "
+                    "retrying in %.2f seconds",
+                    shard_index + 1,
+                    shard_count,
+                    self.id,
+                    e.pgcode,
+                    wait,
+                )
+                time.sleep(wait)
+            except Exception as e:
+                _logger.exception(
+                    "Shard %d/%d of the reconcile task %s failed",
+                    shard_index + 1,
+                    shard_count,
+                    self.id,
+                )
+                return [], str(e)
+
+    def _run_reconcile_sharded(self):
+        """Run the methods of the profile on shards reconciled in parallel
+
+        The methods still run one after the other as each of them works on
+        the lines left by the previous ones. The reconciliations of every
+        shard are merged in a single history.
+        """
+        self.ensure_one()
+        # every shard holds its own connection, keep some for the workers
+        max_workers = max(1, min(self.shard_count, config["db_maxconn"] // 2))
+        reconcile_ids = []
+        errors = []
+        for method in self.reconcile_method:
+            run_shard = partial(self._run_reconcile_shard, method, self.shard_count)
+            shard_indexes = range(self.shard_count)
+            if self.env.registry.in_test_mode():
+                results = list(map(run_shard, shard_indexes))
+            else:
+                with ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="mass_reconcile"
+                ) as executor:
+                    results = list(executor.map(run_shard, shard_indexes))
+            for shard_reconcile_ids, error in results:
+                reconcile_ids += shard_reconcile_ids
+                if error:
+                    errors.append(error)
+        if errors:
+            self.message_post(
+                body=_("There was an error during reconciliation : %s")
+                % "\n".join(errors)
+            )
+        # the full reconciliations were committed by the shard cursors,
+        # which might not be visible from the current transaction
+        with self._shard_env() as env:
+            env["mass.reconcile.history"].create(
+                {
+                    "mass_reconcile_id": self.id,
+                    "date": fields.Datetime.now(),
+                    "reconcile_ids": [(4, rid) for rid in set(reconcile_ids)],
+                }
+            )
 
+    @staticmethod
+    def _lock_reconcile_run(cr, mass_reconcile_id):
+        """Lock the mass reconcile row for the duration of a run
+
+        FOR NO KEY UPDATE conflicts with the same lock taken by another run,
+        but not with the FOR KEY SHARE lock of the foreign key checks: the
+        shard cursors can still create the history of the locked profile.
+        """
+        cr.execute(
+            "SELECT id FROM account_mass_reconcile"
+            " WHERE id = %s"
+            " FOR NO KEY UPDATE NOWAIT",
+            (mass_reconcile_id,),
+        )
+
+    def run_reconcile(self):
         # we use a new cursor to be able to commit the reconciliation
         # often. We have to create it here and not later to avoid problems
         # where the new cursor sees the lines as reconciles but the old one
@@ -177,15 +333,10 @@ class AccountMassReconcile(models.Model):
             else:
                 new_cr = self.env.cr
                 new_env = self.env
-            # SELECT FOR UPDATE the mass reconcile row ; this is done in order
+            # Lock the mass reconcile row ; this is done in order
             # to avoid 2 processes on the same mass reconcile method.
             try:
-                new_env.cr.execute(
-                    "SELECT id FROM account_mass_reconcile"
-                    " WHERE id = %s"
-                    " FOR UPDATE NOWAIT",
-                    (rec.id,),
-                )
+                self._lock_reconcile_run(new_env.cr, rec.id)
             except psycopg2.OperationalError as e:
                 raise exceptions.UserError(
                     _(
@@ -195,6 +346,10 @@ class AccountMassReconcile(models.Model):
                 ) from e
 
             try:
+                if rec.shard_count > 1:
+                    rec.with_env(new_env)._run_reconcile_sharded()
+                    continue
+
                 all_ml_rec_ids = []
 
                 for method in rec.reconcile_method:
@@ -202,7 +357,7 @@ class AccountMassReconcile(models.Model):
 
                     all_ml_rec_ids += ml_rec_ids
 
-                reconcile_ids = find_reconcile_ids(
+                reconcile_ids = self._find_reconcile_ids(
                     "full_reconcile_id", all_ml_rec_ids, new_env
                 )
                 new_env["mass.reconcile.history"].create(
@@ -3,6 +3,10 @@
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
 import logging
+import uuid
+from contextlib import closing
+from itertools import groupby
+from operator import itemgetter
 
 from odoo import models
 
@@ -44,19 +48,81 @@ class MassReconcileSimple(models.AbstractModel):
                 if reconciled:
                     res += [credit_line["id"], debit_line["id"]]
                     del lines[i]
-                    if (
-                        self.env.context.get("commit_every", 0)
-                        and len(res) % self.env.context["commit_every"] == 0
-                    ):
-                        # new cursor is already open in cron
-                        self.env.cr.commit()  # pylint: disable=invalid-commit
-                        _logger.info(
-                            "Commit the reconciliations after %d groups", len(res)
-                        )
+                    self._commit_every(res)
                     break
             count += 1
         return res
 
+    def _commit_every(self, res):
+        if (
+            self.env.context.get("commit_every", 0)
+            and len(res) % self.env.context["commit_every"] == 0
+        ):
+            # new cursor is already open in cron
+            self.env.cr.commit()  # pylint: disable=invalid-commit
+            _logger.info("Commit the reconciliations after %d groups", len(res))
+
+    def rec_auto_lines_simple_stream(self, lines):
+        """Single pass variant of `rec_auto_lines_simple`
+
+        Consecutive lines sharing the same key are grouped, each line is
+        then paired with the first pending opposite line of its group
+        which can be reconciled with it, or queued until a later line
+        matches it.
+
+        :param lines: iterable of dict of move lines sorted on the key field,
+                      only the lines of the current key are kept in memory
+        :return: list of reconciled ids
+        """
+        if self._key_field is None:
+            raise ValueError("_key_field has to be defined")
+        res = []
+        for dummy, group in groupby(lines, key=itemgetter(self._key_field)):
+            pending = {"credit": [], "debit": []}
+            for line in group:
+                if line["credit"] > 0:
+                    side, opposite_side = "credit", "debit"
+                elif line["debit"] > 0:
+                    side, opposite_side = "debit", "credit"
+                else:
+                    continue
+                opposite_lines = pending[opposite_side]
+                for idx, opposite_line in enumerate(opposite_lines):
+                    if side == "credit":
+                        credit_line, debit_line = line, opposite_line
+                    else:
+                        credit_line, debit_line = opposite_line, line
+                    reconciled, dummy = self._reconcile_lines(
+                        [credit_line, debit_line], allow_partial=False
+                    )
+                    if reconciled:
+                        res += [credit_line["id"], debit_line["id"]]
+                        del opposite_lines[idx]
+                        self._commit_every(res)
+                        break
+                else:
+                    pending[side].append(line)
+        return res
+
+    def _iter_query_lines(self, query, params, itersize=2000):
+        """Yield the rows of a query as dicts, fetched by batches of
+        `itersize` from a server-side cursor
+        """
+        name = "mass_reconcile_%s" % uuid.uuid4().hex
+        # the cursor has to survive the commits done every `commit_every`
+        withhold = bool(self.env.context.get("commit_every", 0))
+        with closing(self.env.cr._cnx.cursor(name, withhold=withhold)) as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            columns = None
+            for row in cursor:
+                if columns is None:
+                    columns = [desc[0] for desc in cursor.description]
+                yield dict(zip(columns, row))
+
+    def _shard_field(self):
+        return self._key_field
+
     def _simple_order(self, *args, **kwargs):
         ret = "ORDER BY account_move_line.%s" % self._key_field
         if self.date_base_on == "oldest":
@@ -77,6 +143,9 @@ class MassReconcileSimple(models.AbstractModel):
             (select, self._from_query(), where, where2, self._simple_order())
         )
         self.env.flush_all()
+        if self.streaming:
+            lines = self._iter_query_lines(query, params + params2)
+            return self.rec_auto_lines_simple_stream(lines)
         self.env.cr.execute(query, params + params2)
         lines = self.env.cr.dictfetchall()
         return self.rec_auto_lines_simple(lines)
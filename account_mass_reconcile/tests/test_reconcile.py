@@ -1,10 +1,16 @@
 # © 2014-2016 Camptocamp SA (Damien Crier)
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+from unittest.mock import patch
+
+import psycopg2
 
 import odoo.tests
 from odoo import exceptions, fields
 
 from odoo.addons.account.tests.common import TestAccountReconciliationCommon
+from odoo.addons.account_mass_reconcile.models.mass_reconcile import (
+    MAX_SHARD_ATTEMPTS,
+)
 
 
 @odoo.tests.tagged("post_install", "-at_install")
@@ -63,3 +69,35 @@ class TestReconcile(TestAccountReconciliationCommon):
     def test_open_full_empty_from_method(self):
         res = self.rec_history.open_reconcile()
         self.assertEqual([("id", "in", [])], res.get("domain", []))
+
+    def _run_shard_failing(self, nb_failures):
+        calls = []
+        method_class = type(self.env["mass.reconcile.simple.name"])
+        automatic_reconcile = method_class.automatic_reconcile
+
+        def fake_reconcile(method):
+            calls.append(method.id)
+            if len(calls) <= nb_failures:
+                raise psycopg2.extensions.TransactionRollbackError("conflict")
+            return automatic_reconcile(method)
+
+        with patch.object(method_class, "automatic_reconcile", fake_reconcile), patch(
+            "odoo.addons.account_mass_reconcile.models.mass_reconcile.time.sleep"
+        ) as sleep:
+            result = self.mass_rec._run_reconcile_shard(self.mass_rec_method, 2, 0)
+        return result, calls, sleep
+
+    def test_shard_retried_on_rollback(self):
+        (reconcile_ids, error), calls, sleep = self._run_shard_failing(1)
+        self.assertIsNone(error)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(sleep.call_count, 1)
+
+    def test_shard_attempts_bounded(self):
+        (reconcile_ids, error), calls, sleep = self._run_shard_failing(
+            MAX_SHARD_ATTEMPTS
+        )
+        self.assertEqual(error, "conflict")
+        self.assertEqual(reconcile_ids, [])
+        self.assertEqual(len(calls), MAX_SHARD_ATTEMPTS)
+        self.assertEqual(sleep.call_count, MAX_SHARD_ATTEMPTS - 1)
@@ -0,0 +1,68 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
+
+import psycopg2
+
+import odoo.tests
+from odoo import sql_db
+from odoo.tests.common import BaseCase, get_db_name
+
+from odoo.addons.account_mass_reconcile.models.mass_reconcile import (
+    AccountMassReconcile,
+)
+
+
+@odoo.tests.tagged("post_install", "-at_install")
+class TestReconcileLock(BaseCase):
+    """The run lock is checked with real concurrent cursors
+
+    The shards of a run write on their own database connections, so the
+    profile row is committed and locked outside of the test transaction.
+    """
+
+    def setUp(self):
+        super().setUp()
+        db = sql_db.db_connect(get_db_name())
+        self.lock_cr = db.cursor()
+        self.shard_cr = db.cursor()
+        self.addCleanup(self.lock_cr.close)
+        self.addCleanup(self.shard_cr.close)
+        self.lock_cr.execute("SELECT id FROM account_account ORDER BY id LIMIT 1")
+        account = self.lock_cr.fetchone()
+        if not account:
+            self.skipTest("No committed account to attach the profile to")
+        self.lock_cr.execute(
+            "INSERT INTO account_mass_reconcile (name, account, shard_count)"
+            " VALUES ('test lock', %s, 2) RETURNING id",
+            account,
+        )
+        self.mass_reconcile_id = self.lock_cr.fetchone()[0]
+        self.lock_cr.commit()
+        self.addCleanup(self._delete_profile)
+        # a regression must fail the test, not hang it
+        self.shard_cr.execute("SET lock_timeout = '2s'")
+
+    def _delete_profile(self):
+        self.lock_cr.rollback()
+        self.lock_cr.execute(
+            "DELETE FROM account_mass_reconcile WHERE id = %s",
+            (self.mass_reconcile_id,),
+        )
+        self.lock_cr.commit()
+
+    def test_shard_cursor_creates_history_while_locked(self):
+        AccountMassReconcile._lock_reconcile_run(self.lock_cr, self.mass_reconcile_id)
+        self.shard_cr.execute(
+            "INSERT INTO mass_reconcile_history (mass_reconcile_id, date)"
+            " VALUES (%s, now() at time zone 'UTC') RETURNING id",
+            (self.mass_reconcile_id,),
+        )
+        self.assertTrue(self.shard_cr.fetchone())
+        self.shard_cr.rollback()
+
+    def test_second_run_is_rejected(self):
+        AccountMassReconcile._lock_reconcile_run(self.lock_cr, self.mass_reconcile_id)
+        with self.assertRaises(psycopg2.OperationalError):
+            AccountMassReconcile._lock_reconcile_run(
+                self.shard_cr, self.mass_reconcile_id
+            )
+        self.shard_cr.rollback()
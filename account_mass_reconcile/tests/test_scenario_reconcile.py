@@ -68,6 +68,37 @@ class TestScenarioReconcile(TestAccountReconciliationCommon):
         mass_rec.run_reconcile()
         self.assertEqual("paid", invoice.payment_state)
 
+    def test_scenario_reconcile_sharded(self):
+        invoice = self.create_invoice()
+        receivable_account_id = invoice.partner_id.property_account_receivable_id.id
+        payment = self.env["account.payment"].create(
+            {
+                "partner_type": "customer",
+                "payment_type": "inbound",
+                "partner_id": invoice.partner_id.id,
+                "destination_account_id": receivable_account_id,
+                "amount": 50.0,
+                "journal_id": self.bank_journal.id,
+            }
+        )
+        payment.action_post()
+
+        mass_rec = self.mass_rec_obj.create(
+            {
+                "name": "mass_reconcile_1",
+                "account": receivable_account_id,
+                "shard_count": 3,
+                "reconcile_method": [(0, 0, {"name": "mass.reconcile.simple.partner"})],
+            }
+        )
+        mass_rec.run_reconcile()
+        self.assertEqual("paid", invoice.payment_state)
+        # the results of the shards are merged in one history
+        self.assertEqual(1, len(mass_rec.history_ids))
+        self.assertIn(
+            invoice.line_ids.full_reconcile_id, mass_rec.last_history.reconcile_ids
+        )
+
     def test_scenario_reconcile_newest(self):
         invoice = self.create_invoice()
         self.assertEqual("posted", invoice.state)
@@ -186,6 +217,49 @@ class TestScenarioReconcile(TestAccountReconciliationCommon):
         self.assertTrue(payment_old_line in mass_rec.last_history.reconcile_line_ids)
         self.assertTrue(payment_old_line.reconciled)
 
+    def test_scenario_reconcile_streaming(self):
+        invoice = self.create_invoice()
+        receivable_account_id = invoice.partner_id.property_account_receivable_id.id
+        payments = self.env["account.payment"]
+        for payment_date in ("2023-10-01", "2023-10-20"):
+            payments |= self.env["account.payment"].create(
+                {
+                    "partner_type": "customer",
+                    "payment_type": "inbound",
+                    "partner_id": invoice.partner_id.id,
+                    "destination_account_id": receivable_account_id,
+                    "amount": 50.0,
+                    "journal_id": self.bank_journal.id,
+                    "date": fields.Date.from_string(payment_date),
+                }
+            )
+        payments.action_post()
+        payment_old, payment_new = payments
+
+        mass_rec = self.mass_rec_obj.create(
+            {
+                "name": "mass_reconcile_1",
+                "account": receivable_account_id,
+                "reconcile_method": [
+                    (
+                        0,
+                        0,
+                        {
+                            "name": "mass.reconcile.simple.partner",
+                            "date_base_on": "oldest",
+                            "streaming": True,
+                        },
+                    )
+                ],
+            }
+        )
+        mass_rec.run_reconcile()
+        self.assertEqual("paid", invoice.payment_state)
+        payment_new_line = payment_new.move_id.line_ids.filtered(lambda l: l.credit)
+        payment_old_line = payment_old.move_id.line_ids.filtered(lambda l: l.credit)
+        self.assertTrue(payment_old_line.reconciled)
+        self.assertFalse(payment_new_line.reconciled)
+
     def test_scenario_reconcile_currency(self):
         currency_rate = (
             self.env["res.currency.rate"]
@@ -306,6 +380,85 @@ class TestScenarioReconcile(TestAccountReconciliationCommon):
 
         self.assertEqual(invoice2_line.amount_residual, 50.0)
 
+    def test_scenario_reconcile_advanced_indexed(self):
+        invoice = self.create_invoice()
+        invoice.ref = "test ref"
+        receivable_account_id = invoice.partner_id.property_account_receivable_id.id
+        payment = self.env["account.payment"].create(
+            {
+                "partner_type": "customer",
+                "payment_type": "inbound",
+                "partner_id": invoice.partner_id.id,
+                "destination_account_id": receivable_account_id,
+                "amount": 50.0,
+                "journal_id": self.bank_journal.id,
+                "ref": "test ref",
+            }
+        )
+        payment.action_post()
+
+        mass_rec = self.mass_rec_obj.create(
+            {
+                "name": "mass_reconcile_1",
+                "account": receivable_account_id,
+                "reconcile_method": [
+                    (
+                        0,
+                        0,
+                        {
+                            "name": "mass.reconcile.advanced.ref",
+                            "indexed_matching": True,
+                        },
+                    )
+                ],
+            }
+        )
+        mass_rec.run_reconcile()
+        self.assertEqual("paid", invoice.payment_state)
+        self.assertTrue(mass_rec.last_history.reconcile_ids)
+
+    def test_indexed_matching_search_opposites(self):
+        rec_method = self.env["mass.reconcile.advanced.ref"].create(
+            {"account_id": self.company_data["default_account_receivable"].id}
+        )
+        debit_lines = [
+            {"id": 1, "partner_id": 10, "ref": "INV/1", "name": "/"},
+            {"id": 2, "partner_id": 10, "ref": False, "name": "inv/1 "},
+            {"id": 3, "partner_id": 11, "ref": "INV/1", "name": "/"},
+            {"id": 4, "partner_id": 10, "ref": "INV/2", "name": "/"},
+        ]
+        credit_line = {"id": 5, "partner_id": 10, "ref": "inv/1", "name": "/"}
+        index = rec_method._build_opposite_index(debit_lines)
+        opposites, compared = rec_method._search_opposites_indexed(
+            credit_line, debit_lines, index
+        )
+        self.assertEqual([1, 2], [line["id"] for line in opposites])
+        self.assertEqual(
+            opposites, rec_method._search_opposites(credit_line, debit_lines)
+        )
+        # only the lines of the same partner and ref have been compared
+        self.assertEqual(2, compared)
+
+    def test_indexed_matching_merge_groups(self):
+        rec_method = self.env["mass.reconcile.advanced.ref"].create(
+            {"account_id": self.company_data["default_account_receivable"].id}
+        )
+        debit_lines = [
+            {"id": 1, "partner_id": 10, "ref": "A", "name": "B"},
+            {"id": 2, "partner_id": 10, "ref": "C", "name": "/"},
+        ]
+        credit_lines = [
+            {"id": 3, "partner_id": 10, "ref": "C", "name": "/"},
+            {"id": 4, "partner_id": 10, "ref": "A", "name": "/"},
+            {"id": 5, "partner_id": 10, "ref": "B", "name": "/"},
+            {"id": 6, "partner_id": False, "ref": "A", "name": "/"},
+        ]
+        groups, avoided = rec_method._match_groups_indexed(credit_lines, debit_lines)
+        self.assertEqual([{2, 3}, {1, 4, 5}], groups)
+        # 3 credit lines inspected (one is skipped) against 2 debit lines,
+        # each of them compared with only one candidate
+        self.assertEqual(3, avoided)
+
     def test_reconcile_with_writeoff(self):
         invoice = self.create_invoice()
 
@@ -5,7 +5,6 @@ from odoo import api, models, fields, _
 from odoo.exceptions import UserError
 from odoo.tools import float_is_zero
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
 
 
 class ReportAgedPartnerBalance(models.AbstractModel):
@@ -25,22 +24,6 @@ class ReportAgedPartnerBalance(models.AbstractModel):
         # 61 - 90  : 2018-12-09 - 2018-11-10
         # 91 - 120 : 2018-11-09 - 2018-10-11
         # +120     : 2018-10-10
-        periods = {}
-        start = datetime.strptime(str(date_from), "%Y-%m-%d")
-        date_from = datetime.strptime(str(date_from), "%Y-%m-%d").date()
-        for i in range(5)[::-1]:
-            stop = start - relativedelta(days=period_length)
-            period_name = str((5-(i+1)) * period_length + 1) + '-' + str((5-i) * period_length)
-            period_stop = (start - relativedelta(days=1)).strftime('%Y-%m-%d')
-            if i == 0:
-                period_name = '+' + str(4 * period_length)
-            periods[str(i)] = {
-                'name': period_name,
-                'stop': period_stop,
-                'start': (i!=0 and stop.strftime('%Y-%m-%d') or False),
-            }
-            start = stop
-
         res = []
         total = []
         cr = self.env.cr
@@ -50,146 +33,123 @@ class ReportAgedPartnerBalance(models.AbstractModel):
         move_state = ['draft', 'posted']
         date = self._context.get('date') or fields.Date.today()
         company = self.env['res.company'].browse(self._context.get('company_id')) or self.env.company
+        date_from = datetime.strptime(str(date_from), "%Y-%m-%d").date()
 
         if target_move == 'posted':
             move_state = ['posted']
-        arg_list = (tuple(move_state), tuple(account_type))
 
-        reconciliation_clause = '(l.reconciled IS FALSE)'
-        cr.execute('SELECT debit_move_id, credit_move_id FROM account_partial_reconcile where max_date > %s', (date_from,))
-        reconciled_after_date = []
-        for row in cr.fetchall():
-            reconciled_after_date += [row[0], row[1]]
-        if reconciled_after_date:
-            reconciliation_clause = '(l.reconciled IS FALSE OR l.id IN %s)'
-            arg_list += (tuple(reconciled_after_date),)
-        arg_list += (date_from, tuple(company_ids))
+        # Lines still open at date_from, or reconciled by a partial dated
+        # after it, are the only ones that can carry a residual.
+        reconciliation_clause = '''(l.reconciled IS FALSE OR l.id IN (
+                SELECT debit_move_id FROM account_partial_reconcile WHERE max_date > %(date_from)s
+                UNION ALL
+                SELECT credit_move_id FROM account_partial_reconcile WHERE max_date > %(date_from)s))'''
+        query_params = {
+            'move_state': tuple(move_state),
+            'account_type': tuple(account_type),
+            'date_from': date_from,
+            'company_ids': tuple(company_ids),
+            'period_length': period_length,
+        }
         query = '''
             SELECT DISTINCT l.partner_id, UPPER(res_partner.name)
             FROM account_move_line AS l left join res_partner on l.partner_id = res_partner.id, account_account, account_move am
             WHERE (l.account_id = account_account.id)
                 AND (l.move_id = am.id)
-                AND (am.state IN %s)
-                AND (account_account.account_type IN %s)
+                AND (am.state IN %(move_state)s)
+                AND (account_account.account_type IN %(account_type)s)
                 AND ''' + reconciliation_clause + '''
-                AND (l.date <= %s)
-                AND l.company_id IN %s
+                AND (l.date <= %(date_from)s)
+                AND l.company_id IN %(company_ids)s
             ORDER BY UPPER(res_partner.name)'''
-        cr.execute(query, arg_list)
+        cr.execute(query, query_params)
         partners = cr.dictfetchall()
         # put a total of 0
         for i in range(7):
             total.append(0)
 
-        # Build a string like (1,2,3) for easy use in SQL query
         if not partner_ids:
             partner_ids = [partner['partner_id'] for partner in partners if partner['partner_id']]
         lines = dict((partner['partner_id'] or False, []) for partner in partners)
         if not partner_ids:
             return [], [], {}
-
-        # This dictionary will store the not due amount of all partners
+        query_params['partner_ids'] = tuple(partner_ids)
+
+        # The residual of every line as of date_from is its balance corrected
+        # by the partials dated on or before date_from. Lines are then bucketed
+        # by due date: 6 is "not due", 0 to 4 are the aging periods, 4 being
+        # the most recent one (1 to period_length days overdue) and 0 the
+        # oldest one, open-ended. Amounts stay in the company currency of each
+        # line and are converted once per currency below.
+        query = '''
+            WITH residual AS (
+                SELECT l.id, l.partner_id, rc.currency_id,
+                    CASE WHEN COALESCE(l.date_maturity, l.date) >= %(date_from)s THEN 6
+                        ELSE GREATEST(4 - (%(date_from)s - COALESCE(l.date_maturity, l.date) - 1) / %(period_length)s, 0)
+                    END AS period,
+                    l.balance
+                        + COALESCE((SELECT SUM(p.amount) FROM account_partial_reconcile p
+                                    WHERE p.credit_move_id = l.id AND p.max_date <= %(date_from)s), 0)
+                        - COALESCE((SELECT SUM(p.amount) FROM account_partial_reconcile p
+                                    WHERE p.debit_move_id = l.id AND p.max_date <= %(date_from)s), 0)
+                        AS amount,
+                    cur.rounding
+                FROM account_move_line AS l
+                JOIN account_account ON l.account_id = account_account.id
+                JOIN account_move am ON l.move_id = am.id
+                JOIN res_company rc ON l.company_id = rc.id
+                JOIN res_currency cur ON rc.currency_id = cur.id
+                WHERE (am.state IN %(move_state)s)
+                    AND (account_account.account_type IN %(account_type)s)
+                    AND ((l.partner_id IN %(partner_ids)s) OR (l.partner_id IS NULL))
+                    AND (l.date <= %(date_from)s)
+                    AND l.company_id IN %(company_ids)s
+                    AND ABS(l.balance) >= cur.rounding / 2
+                    AND ''' + reconciliation_clause + '''
+            )
+            SELECT partner_id, period, currency_id,
+                SUM(amount) AS amount,
+                ARRAY_AGG(id ORDER BY id) AS line_ids,
+                ARRAY_AGG(amount ORDER BY id) AS line_amounts
+            FROM residual
+            WHERE ABS(amount) >= rounding / 2
+            GROUP BY partner_id, period, currency_id'''
+        cr.execute(query, query_params)
+        groups = cr.dictfetchall()
+
+        rates = {}
+        for currency_id in set(group['currency_id'] for group in groups):
+            currency = self.env['res.currency'].browse(currency_id)
+            rates[currency_id] = currency == user_currency and 1.0 or \
+                self.env['res.currency']._get_conversion_rate(currency, user_currency, company, date)
+
+        # undue_amounts stores the not due amount of all partners and history
+        # the amount of each period: history[1] = {'<partner_id>': <partner_debit-credit>}
         undue_amounts = {}
-        query = '''SELECT l.id
-                FROM account_move_line AS l, account_account, account_move am
-                WHERE (l.account_id = account_account.id) AND (l.move_id = am.id)
-                    AND (am.state IN %s)
-                    AND (account_account.account_type IN %s)
-                    AND (COALESCE(l.date_maturity,l.date) >= %s)\
-                    AND ((l.partner_id IN %s) OR (l.partner_id IS NULL))
-                AND (l.date <= %s)
-                AND l.company_id IN %s'''
-        cr.execute(query, (tuple(move_state), tuple(account_type), date_from,
-                           tuple(partner_ids), date_from, tuple(company_ids)))
-        aml_ids = cr.fetchall()
-        aml_ids = aml_ids and [x[0] for x in aml_ids] or []
-        for line in self.env['account.move.line'].browse(aml_ids):
-            partner_id = line.partner_id.id or False
-            if partner_id not in undue_amounts:
-                undue_amounts[partner_id] = 0.0
-            line_amount = line.company_id.currency_id._convert(line.balance,
-                                                               user_currency,
-                                                               company, date)
-            if user_currency.is_zero(line_amount):
-                continue
-            for partial_line in line.matched_debit_ids:
-                if partial_line.max_date <= date_from:
-                    line_currency = partial_line.company_id.currency_id
-                    line_amount += line_currency._convert(partial_line.amount,
-                                                          user_currency,
-                                                          company, date)
-            for partial_line in line.matched_credit_ids:
-                if partial_line.max_date <= date_from:
-                    line_currency = partial_line.company_id.currency_id
-                    line_amount -= line_currency._convert(partial_line.amount,
-                                                          user_currency,
-                                                          company, date)
-            if not self.env.user.company_id.currency_id.is_zero(line_amount):
-                undue_amounts[partner_id] += line_amount
-                lines[partner_id].append({
-                    'line': line,
-                    'amount': line_amount,
-                    'period': 6,
-                })
-
-        # Use one query per period and store results in history (a list variable)
-        # Each history will contain: history[1] = {'<partner_id>': <partner_debit-credit>}
-        history = []
-        for i in range(5):
-            args_list = (tuple(move_state), tuple(account_type), tuple(partner_ids),)
-            dates_query = '(COALESCE(l.date_maturity,l.date)'
-
-            if periods[str(i)]['start'] and periods[str(i)]['stop']:
-                dates_query += ' BETWEEN %s AND %s)'
-                args_list += (periods[str(i)]['start'], periods[str(i)]['stop'])
-            elif periods[str(i)]['start']:
-                dates_query += ' >= %s)'
-                args_list += (periods[str(i)]['start'],)
+        history = [{} for i in range(5)]
+        move_lines = self.env['account.move.line'].browse(
+            [line_id for group in groups for line_id in group['line_ids']])
+        for group in groups:
+            partner_id = group['partner_id'] or False
+            rate = rates[group['currency_id']]
+            if group['period'] == 6:
+                amounts = undue_amounts
+                period = 6
             else:
-                dates_query += ' <= %s)'
-                args_list += (periods[str(i)]['stop'],)
-            args_list += (date_from, tuple(company_ids))
-
-            query = '''SELECT l.id
-                    FROM account_move_line AS l, account_account, account_move am
-                    WHERE (l.account_id = account_account.id) AND (l.move_id = am.id)
-                        AND (am.state IN %s)
-                        AND (account_account.account_type IN %s)
-                        AND ((l.partner_id IN %s) OR (l.partner_id IS NULL))
-                        AND ''' + dates_query + '''
-                    AND (l.date <= %s)
-                    AND l.company_id IN %s'''
-            cr.execute(query, args_list)
-            partners_amount = {}
-            aml_ids = cr.fetchall()
-            aml_ids = aml_ids and [x[0] for x in aml_ids] or []
-            for line in self.env['account.move.line'].browse(aml_ids):
-                partner_id = line.partner_id.id or False
-                if partner_id not in partners_amount:
-                    partners_amount[partner_id] = 0.0
-                line_currency_id = line.company_id.currency_id
-                line_amount = line_currency_id._convert(line.balance, user_currency, company, date)
-                if user_currency.is_zero(line_amount):
-                    continue
-                for partial_line in line.matched_debit_ids:
-                    if partial_line.max_date <= date_from:
-                        line_currency_id = partial_line.company_id.currency_id
-                        line_amount += line_currency_id._convert(
-                            partial_line.amount, user_currency, company, date)
-                for partial_line in line.matched_credit_ids:
-                    if partial_line.max_date <= date_from:
-                        line_currency_id = partial_line.company_id.currency_id
-                        line_amount -= line_currency_id._convert(
-                            partial_line.amount, user_currency, company, date)
-                if not self.env.user.company_id.currency_id.is_zero(line_amount):
-                    partners_amount[partner_id] += line_amount
-                    lines[partner_id].append({
-                        'line': line,
-                        'amount': line_amount,
-                        'period': i + 1,
-                        })
-            history.append(partners_amount)
+                amounts = history[group['period']]
+                period = group['period'] + 1
+            amounts[partner_id] = amounts.get(partner_id, 0.0) + user_currency.round(group['amount'] * rate)
+            partner_lines = lines.setdefault(partner_id, [])
+            for line_id, amount in zip(group['line_ids'], group['line_amounts']):
+                partner_lines.append({
+                    'line': move_lines.browse(line_id).with_prefetch(move_lines._prefetch_ids),
+                    'amount': user_currency.round(amount * rate),
+                    'period': period,
+                })
 
+        browsed_partners = self.env['res.partner'].browse(
+            [partner['partner_id'] for partner in partners if partner['partner_id']])
+        browsed_partners = {partner.id: partner for partner in browsed_partners}
         for partner in partners:
             if partner['partner_id'] is None:
                 partner['partner_id'] = False
@@ -219,7 +179,7 @@ class ReportAgedPartnerBalance(models.AbstractModel):
             total[(i + 1)] += values['total']
             values['partner_id'] = partner['partner_id']
             if partner['partner_id']:
-                browsed_partner = self.env['res.partner'].browse(partner['partner_id'])
+                browsed_partner = browsed_partners[partner['partner_id']]
                 values['name'] = browsed_partner.name and len(
                     browsed_partner.name) >= 45 and browsed_partner.name[
                                                     0:40] + '...' or browsed_partner.name
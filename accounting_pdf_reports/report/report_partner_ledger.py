@@ -9,64 +9,88 @@ class ReportPartnerLedger(models.AbstractModel):
     _name = 'report.accounting_pdf_reports.report_partnerledger'
     _description = 'Partner Ledger Report'
 
-    def _lines(self, data, partner):
-        full_account = []
-        currency = self.env['res.currency']
+    def _get_ledger_clauses(self, data):
         query_get_data = self.env['account.move.line'].with_context(data['form'].get('used_context', {}))._query_get()
         reconcile_clause = "" if data['form']['reconciled'] else ' AND "account_move_line".full_reconcile_id IS NULL '
-        params = [partner.id, tuple(data['computed']['move_state']), tuple(data['computed']['account_ids'])] + query_get_data[2]
+        return query_get_data, reconcile_clause
+
+    def _compute_partner_lines(self, data, partner_ids):
+        """ Fetch the ledger lines of all the given partners in one query.
+
+        Returns a dict mapping each partner id to its list of line dicts,
+        ordered by date, with the running balance already computed.
+        """
+        result = {partner_id: [] for partner_id in partner_ids}
+        if not partner_ids or not data['computed']['account_ids']:
+            return result
+        currency = self.env['res.currency']
+        query_get_data, reconcile_clause = self._get_ledger_clauses(data)
+        params = [tuple(partner_ids), tuple(data['computed']['move_state']), tuple(data['computed']['account_ids'])] + query_get_data[2]
         query = """
-            SELECT "account_move_line".id, "account_move_line".date, j.code, acc.code as a_code, acc.name as a_name, "account_move_line".ref, m.name as move_name, "account_move_line".name, "account_move_line".debit, "account_move_line".credit, "account_move_line".amount_currency,"account_move_line".currency_id, c.symbol AS currency_code
+            SELECT "account_move_line".id, "account_move_line".partner_id, "account_move_line".date, j.code, acc.code as a_code, acc.name as a_name, "account_move_line".ref, m.name as move_name, "account_move_line".name, "account_move_line".debit, "account_move_line".credit, "account_move_line".amount_currency,"account_move_line".currency_id, c.symbol AS currency_code
             FROM """ + query_get_data[0] + """
             LEFT JOIN account_journal j ON ("account_move_line".journal_id = j.id)
             LEFT JOIN account_account acc ON ("account_move_line".account_id = acc.id)
             LEFT JOIN res_currency c ON ("account_move_line".currency_id=c.id)
             LEFT JOIN account_move m ON (m.id="account_move_line".move_id)
-            WHERE "account_move_line".partner_id = %s
+            WHERE "account_move_line".partner_id IN %s
                 AND m.state IN %s
                 AND "account_move_line".account_id IN %s AND """ + query_get_data[1] + reconcile_clause + """
-                ORDER BY "account_move_line".date"""
+                ORDER BY "account_move_line".partner_id, "account_move_line".date, "account_move_line".id"""
         self.env.cr.execute(query, tuple(params))
-        res = self.env.cr.dictfetchall()
-        sum = 0.0
-        lang_code = self.env.context.get('lang') or 'en_US'
-        lang = self.env['res.lang']
-        lang_id = lang._lang_get(lang_code)
-        date_format = lang_id.date_format
-        for r in res:
-            r['date'] = r['date']
+        progress = {}
+        for r in self.env.cr.dictfetchall():
+            partner_id = r.pop('partner_id')
             r['displayed_name'] = '-'.join(
                 r[field_name] for field_name in ('move_name', 'ref', 'name')
                 if r[field_name] not in (None, '', '/')
             )
-            sum += r['debit'] - r['credit']
-            r['progress'] = sum
+            progress[partner_id] = progress.get(partner_id, 0.0) + r['debit'] - r['credit']
+            r['progress'] = progress[partner_id]
             r['currency_id'] = currency.browse(r.get('currency_id'))
-            full_account.append(r)
-        return full_account
+            result[partner_id].append(r)
+        return result
 
-    def _sum_partner(self, data, partner, field):
-        if field not in ['debit', 'credit', 'debit - credit']:
-            return
-        result = 0.0
-        query_get_data = self.env['account.move.line'].with_context(data['form'].get('used_context', {}))._query_get()
-        reconcile_clause = "" if data['form']['reconciled'] else ' AND "account_move_line".full_reconcile_id IS NULL '
+    def _compute_partner_sums(self, data, partner_ids):
+        """ Compute the debit, credit and balance of all the given partners
+        with a single grouped query.
 
-        params = [partner.id, tuple(data['computed']['move_state']), tuple(data['computed']['account_ids'])] + query_get_data[2]
-        query = """SELECT sum(""" + field + """)
+        Returns a dict mapping each partner id to a dict keyed by the field
+        expressions accepted by :meth:`_sum_partner`.
+        """
+        result = {
+            partner_id: {'debit': 0.0, 'credit': 0.0, 'debit - credit': 0.0}
+            for partner_id in partner_ids
+        }
+        if not partner_ids or not data['computed']['account_ids']:
+            return result
+        query_get_data, reconcile_clause = self._get_ledger_clauses(data)
+        params = [tuple(partner_ids), tuple(data['computed']['move_state']), tuple(data['computed']['account_ids'])] + query_get_data[2]
+        query = """SELECT "account_move_line".partner_id, sum(debit), sum(credit), sum(debit - credit)
                 FROM """ + query_get_data[0] + """, account_move AS m
-                WHERE "account_move_line".partner_id = %s
+                WHERE "account_move_line".partner_id IN %s
                     AND m.id = "account_move_line".move_id
                     AND m.state IN %s
                     AND account_id IN %s
-                    AND """ + query_get_data[1] + reconcile_clause
+                    AND """ + query_get_data[1] + reconcile_clause + """
+                GROUP BY "account_move_line".partner_id"""
         self.env.cr.execute(query, tuple(params))
-
-        contemp = self.env.cr.fetchone()
-        if contemp is not None:
-            result = contemp[0] or 0.0
+        for partner_id, debit, credit, balance in self.env.cr.fetchall():
+            result[partner_id] = {
+                'debit': debit or 0.0,
+                'credit': credit or 0.0,
+                'debit - credit': balance or 0.0,
+            }
         return result
 
+    def _lines(self, data, partner):
+        return self._compute_partner_lines(data, [partner.id])[partner.id]
+
+    def _sum_partner(self, data, partner, field):
+        if field not in ['debit', 'credit', 'debit - credit']:
+            return
+        return self._compute_partner_sums(data, [partner.id])[partner.id][field]
+
     @api.model
     def _get_report_values(self, docids, data=None):
         if not data.get('form'):
@@ -113,12 +137,29 @@ class ReportPartnerLedger(models.AbstractModel):
         partners = obj_partner.browse(partner_ids)
         partners = sorted(partners, key=lambda x: (x.ref or '', x.name or ''))
 
+        # Everything the template needs is computed for all partners at once,
+        # so rendering the report no longer issues queries per partner.
+        partner_lines = self._compute_partner_lines(data, partner_ids)
+        partner_sums = self._compute_partner_sums(data, partner_ids)
+
+        def lines(data, partner):
+            if partner.id not in partner_lines:
+                return self._lines(data, partner)
+            return partner_lines[partner.id]
+
+        def sum_partner(data, partner, field):
+            if field not in ['debit', 'credit', 'debit - credit']:
+                return
+            if partner.id not in partner_sums:
+                return self._sum_partner(data, partner, field)
+            return partner_sums[partner.id][field]
+
         return {
             'doc_ids': partner_ids,
             'doc_model': self.env['res.partner'],
             'data': data,
             'docs': partners,
             'time': time,
-            'lines': self._lines,
-            'sum_partner': self._sum_partner,
+            'lines': lines,
+            'sum_partner': sum_partner,
         }
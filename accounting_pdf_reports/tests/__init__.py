@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from . import test_partner_ledger
+from . import test_aged_partner_balance
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+
+
+@tagged('post_install', '-at_install')
+class TestAgedPartnerBalance(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.report = cls.env['report.accounting_pdf_reports.report_agedpartnerbalance']
+        cls.receivable = cls.company_data['default_account_receivable']
+
+    def _create_entry(self, partner, date, date_maturity, amount):
+        move = self.env['account.move'].create({
+            'move_type': 'entry',
+            'date': date,
+            'journal_id': self.company_data['default_journal_misc'].id,
+            'line_ids': [
+                (0, 0, {
+                    'account_id': self.receivable.id,
+                    'partner_id': partner.id,
+                    'date_maturity': date_maturity,
+                    'debit': amount > 0 and amount or 0.0,
+                    'credit': amount < 0 and -amount or 0.0,
+                }),
+                (0, 0, {
+                    'account_id': self.company_data['default_account_revenue'].id,
+                    'debit': amount < 0 and -amount or 0.0,
+                    'credit': amount > 0 and amount or 0.0,
+                }),
+            ],
+        })
+        move.action_post()
+        return move.line_ids.filtered(lambda line: line.account_id == self.receivable)
+
+    def _get_partner_values(self, partner, date_from):
+        res, total, lines = self.report._get_partner_move_lines(
+            ['asset_receivable'], partner.ids, date_from, 'posted', 30)
+        values = [values for values in res if values['partner_id'] == partner.id]
+        return values and values[0], lines.get(partner.id, [])
+
+    def test_aged_partner_balance_periods(self):
+        partner = self.env['res.partner'].create({'name': 'Aged Partner'})
+        self._create_entry(partner, '2023-01-01', '2023-03-15', 10.0)
+        self._create_entry(partner, '2023-01-01', '2023-02-25', 20.0)
+        self._create_entry(partner, '2023-01-01', '2023-01-20', 40.0)
+        self._create_entry(partner, '2022-01-01', '2022-01-01', 80.0)
+        values, lines = self._get_partner_values(partner, fields.Date.to_date('2023-03-01'))
+        self.assertEqual(values['direction'], 10.0)
+        self.assertEqual(values['4'], 20.0)
+        self.assertEqual(values['3'], 40.0)
+        self.assertEqual(values['0'], 80.0)
+        self.assertEqual(values['total'], 150.0)
+        self.assertEqual(sorted(line['period'] for line in lines), [1, 4, 5, 6])
+
+    def test_aged_partner_balance_partial_residual(self):
+        partner = self.env['res.partner'].create({'name': 'Aged Partner'})
+        invoice_line = self._create_entry(partner, '2023-01-01', '2023-01-01', 100.0)
+        payment_line = self._create_entry(partner, '2023-02-15', '2023-02-15', -60.0)
+        (invoice_line + payment_line).reconcile()
+
+        # Before the payment, the whole amount is still due.
+        values, __ = self._get_partner_values(partner, fields.Date.to_date('2023-02-01'))
+        self.assertEqual(values['total'], 100.0)
+
+        # After the payment, only the residual remains.
+        values, lines = self._get_partner_values(partner, fields.Date.to_date('2023-03-01'))
+        self.assertEqual(values['total'], 40.0)
+        self.assertEqual([line['amount'] for line in lines], [40.0])
+        self.assertEqual(lines[0]['line'], invoice_line)
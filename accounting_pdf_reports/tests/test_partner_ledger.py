@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+
+
+@tagged('post_install', '-at_install')
+class TestPartnerLedger(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.report = cls.env['report.accounting_pdf_reports.report_partnerledger']
+        cls.partners = cls.env['res.partner'].create([
+            {'name': 'Ledger Partner %s' % index} for index in range(6)
+        ])
+        cls.env['account.move'].create([{
+            'move_type': 'entry',
+            'date': '2023-01-%02d' % (index + 1),
+            'journal_id': cls.company_data['default_journal_misc'].id,
+            'line_ids': [
+                (0, 0, {
+                    'account_id': cls.company_data['default_account_receivable'].id,
+                    'partner_id': partner.id,
+                    'debit': 100.0 * (index + 1),
+                    'credit': 0.0,
+                }),
+                (0, 0, {
+                    'account_id': cls.company_data['default_account_revenue'].id,
+                    'partner_id': partner.id,
+                    'debit': 0.0,
+                    'credit': 100.0 * (index + 1),
+                }),
+            ],
+        } for partner in cls.partners for index in range(3)]).action_post()
+
+    def _get_data(self, partners):
+        return {
+            'form': {
+                'used_context': {
+                    'journal_ids': False,
+                    'state': 'posted',
+                    'date_from': False,
+                    'date_to': False,
+                    'strict_range': False,
+                    'company_id': self.env.company.id,
+                },
+                'date_from': False,
+                'date_to': False,
+                'target_move': 'posted',
+                'result_selection': 'customer',
+                'reconciled': True,
+                'amount_currency': False,
+                'partner_ids': partners.ids,
+            },
+        }
+
+    def _render(self, partners):
+        """ Reproduce what the QWeb template asks for each partner and return
+        the number of queries issued along with the collected values. """
+        queries = self.cr.sql_log_count
+        values = self.report._get_report_values(partners.ids, data=self._get_data(partners))
+        rendered = {}
+        for partner in values['docs']:
+            rendered[partner.id] = (
+                values['sum_partner'](values['data'], partner, 'debit'),
+                values['sum_partner'](values['data'], partner, 'credit'),
+                values['sum_partner'](values['data'], partner, 'debit - credit'),
+                [line['progress'] for line in values['lines'](values['data'], partner)],
+            )
+        return self.cr.sql_log_count - queries, rendered
+
+    def test_partner_ledger_values(self):
+        __, rendered = self._render(self.partners)
+        for partner in self.partners:
+            self.assertEqual(rendered[partner.id], (600.0, 0.0, 600.0, [100.0, 300.0, 600.0]))
+
+    def test_partner_ledger_matches_single_partner_methods(self):
+        data = self._get_data(self.partners)
+        values = self.report._get_report_values(self.partners.ids, data=data)
+        for partner in self.partners:
+            self.assertEqual(
+                values['lines'](data, partner),
+                self.report._lines(data, partner),
+            )
+            for field in ('debit', 'credit', 'debit - credit'):
+                self.assertEqual(
+                    values['sum_partner'](data, partner, field),
+                    self.report._sum_partner(data, partner, field),
+                )
+
+    def test_partner_ledger_query_count(self):
+        """ The number of queries must not depend on the number of partners. """
+        self._render(self.partners[:1])
+        one_partner, __ = self._render(self.partners[:1])
+        all_partners, __ = self._render(self.partners)
+        self.assertEqual(one_partner, all_partners)
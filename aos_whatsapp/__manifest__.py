@@ -2,7 +2,7 @@
 
 {
     'name': 'Whatsapp Client',
-    'version': '16.0.0.2.0',
+    'version': '16.0.0.3.0',
     'license': 'OPL-1',
     'author': "Alphasoft",
     'sequence': 1,
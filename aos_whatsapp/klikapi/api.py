@@ -11,6 +11,9 @@ class KlikApi(object):
         self.APIUrl = 'https://klikodoo.id/api/wa/'
         self.klik_key = klik_key or ''
         self.klik_secret = klik_secret or ''
+        # Optional requests.Session, to reuse the connection for a batch of messages
+        self.session = kwargs.get('session') or requests
+        self.timeout = kwargs.get('timeout', 60)
     
     def auth(self):
         #if not self.klik_key and not self.klik_secret:
@@ -40,14 +43,14 @@ class KlikApi(object):
     def get_count(self):
         data = {}
         url = self.APIUrl + 'count/' + self.klik_key +'/' + self.klik_secret
-        data_req = requests.get(url, data=json.dumps(data), headers={'Content-Type': 'application/json'})
+        data_req = self.session.get(url, data=json.dumps(data), headers={'Content-Type': 'application/json'}, timeout=self.timeout)
         res = json.loads(data_req.text)
         return res.get('result') and res['result'] or {}
     
     def get_limit(self):
         data = {}
         url = self.APIUrl + 'limit/' + self.klik_key +'/' + self.klik_secret
-        data_req = requests.get(url, data=json.dumps(data), headers={'Content-Type': 'application/json'})
+        data_req = self.session.get(url, data=json.dumps(data), headers={'Content-Type': 'application/json'}, timeout=self.timeout)
         res = json.loads(data_req.text)
         #print ('===res===',res)
         return res.get('result') and res['result'] or {}
@@ -78,15 +81,15 @@ class KlikApi(object):
         data_s = {
             'params' : data
         }
-        response = requests.post(url, json=data_s, headers={'Content-Type': 'application/json'})
-        if response.status_code == 200:
-            message1 = json.loads(response.text)
-            print ('===message1=',message1)
-            message = message1.get('result').get('message')
-            chatID = message.get('id') and message.get('id').split('_')[1]
-            return {'chatID': chatID, 'message': message}
-        else:
-            return {'message': {'sent': False, 'message': 'Error'}}
+        response = self.session.post(url, json=data_s, headers={'Content-Type': 'application/json'}, timeout=self.timeout)
+        if response.status_code != 200:
+            # The server did not take the message: let the caller retry or use another server
+            raise requests.exceptions.HTTPError(
+                'Whatsapp server returned status %s' % response.status_code, response=response)
+        message1 = json.loads(response.text)
+        message = message1.get('result').get('message')
+        chatID = message.get('id') and message.get('id').split('_')[1]
+        return {'chatID': chatID, 'message': message}
     
     
     def get_phone(self, method, phone):
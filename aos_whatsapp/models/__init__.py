@@ -5,4 +5,5 @@ from . import models
 from . import mail_thread
 from . import mail_channel
 from . import res_partner
-from . import res_users_settings
\ No newline at end of file
+from . import res_users_settings
+from . import whatsapp_queue
\ No newline at end of file
@@ -61,6 +61,8 @@ class IrWhatsappServer(models.Model):
         domain=[('share', '=', False)], required=True, tracking=5,
         help="Users to notify when a message is received and there is no template send in last 15 days")
     notes = fields.Text(readonly=True)
+    rate_limit = fields.Integer('Messages per Minute', default=20,
+        help="Maximum number of queued messages sent through this server per minute")
 
     @api.model
     def _find_default_for_server(self):
@@ -126,7 +128,10 @@ class IrWhatsappServer(models.Model):
             'whatsapp_webhook': self.whatsapp_webhook,
         }
         data_number = json.dumps(number_data)
-        KlikApi.post_request(method='number', data=data_number)
+        try:
+            KlikApi.post_request(method='number', data=data_number)
+        except requests.exceptions.RequestException as e:
+            _logger.warning('Failed to register the Whatsapp number on the server: %s', e)
         #=======================================================================
         data = KlikApi.get_request(method='status', data=data)
         # print ('---data---',data)
@@ -186,7 +191,11 @@ A QR code is valid only for 45 seconds. Message sennding will be available right
                 'body': html2text.html2text(message),
             }
             data_message = json.dumps(message_data)
-            send_message = KlikApi.post_request(method='sendMessage', data=data_message)
+            try:
+                send_message = KlikApi.post_request(method='sendMessage', data=data_message)
+            except requests.exceptions.RequestException as e:
+                _logger.warning('Failed to send Message to WhatsApp number %s: %s', whatsapp, e)
+                continue
             if send_message.get('message')['sent']:
                 _logger.warning('Success to send Message to WhatsApp number %s', whatsapp)
             else:
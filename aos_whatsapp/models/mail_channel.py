@@ -1,15 +1,12 @@
 from odoo import api, fields, models, _, Command
-import requests
 import json
 import logging
 import re
 import ast
-import base64
 from markupsafe import Markup
 
 from datetime import timedelta
 from odoo import tools
-from odoo.tools.mimetypes import guess_mimetype
 from odoo.exceptions import UserError, ValidationError
 
 from odoo.tools.safe_eval import safe_eval
@@ -259,157 +256,34 @@ class mailChannel(models.Model):
         return html
 
     def send_whatsapp_message(self, message_ids, kwargs, message_id):
-        partner_id = False
-        WhatsappServer = self.env['ir.whatsapp_server']
-        whatsapp_id = WhatsappServer.search([('status','=','authenticated')], order='sequence asc', limit=1)
-        whatsapp_endpoint = 'https://klikodoo.id/api/wa'
-        whatsapp_instance = whatsapp_id.klik_key
-        whatsapp_token = whatsapp_id.klik_secret
-        # if 'author_id' in kwargs and kwargs.get('author_id'):
-        #     partner_id = self.channel_last_seen_partner_ids
-        #     partner_id = self.env['res.partner'].search([('id', '=', kwargs.get('author_id'))])
-        partner_ids = message_ids.mapped('author_id')
-        attachment_ids = message_ids.mapped('attachment_ids')
+        """Queue the message posted in the channel for its whatsapp numbers (see whatsapp.queue)."""
         whatsapp_numbers = list(filter(None, [*set(message_ids.mapped('whatsapp_numbers'))]))
-        print ('==whatsapp_numbers==',whatsapp_numbers,partner_ids,kwargs)
-        print ('===attachment_ids==',attachment_ids)
-        if whatsapp_numbers:#partner_ids and message_id.author_id and not partner_id:
-            #print ('-channel_last_seen_partner_ids--',self.channel_last_seen_partner_ids,self.channel_partner_ids)
-            #print ('--send_whatsapp_message-from livechat to whatsapp-client',partner_ids, list(filter(None, [*set(whatsapp_numbers)])), kwargs, message_id)
-            #partner.user_ids and all(user.has_group('base.group_user') for user in partner.user_ids)
-            #partners = partner_ids.filtered(lambda p: p != message_id.author_id)
-            #print ('===partner_id===',partner_id)
-            #Param = self.env['res.config.settings'].sudo().get_values()
-            #no_phone_partners = []
-            invalid_whatsapp_number_partner = []
-            if whatsapp_endpoint and whatsapp_token:
-                status_url = whatsapp_endpoint + '/auth/' + whatsapp_instance + '/' + whatsapp_token + '/status'
-                #print ('=status_url==',status_url,partner_id)
-                status_response = requests.get(status_url, data=json.dumps({}), headers={'Content-Type': 'application/json'})
-                json_response_status = json.loads(status_response.text)['result']
-                # status_url = param.get('whatsapp_endpoint') + '/status?token=' + param.get('whatsapp_token')
-                # status_response = requests.get(status_url)
-                # json_response_status = json.loads(status_response.text)
-                #print ('-send_whatsapp_message-',status_response,json_response_status,partner_id,partner_ids,partner_id.name,partner_id.country_id.phone_code, partner_id.mobile,partner_id.whatsapp)
-                for whatsapp_number in whatsapp_numbers:
-                    if (status_response.status_code == 200 or status_response.status_code == 201) and json_response_status['accountStatus'] == 'authenticated':
-                    #if partner_id.country_id.phone_code and partner_id.whatsapp:
-                        #whatsapp_msg_number = partner_id.whatsapp
-                        # whatsapp_msg_number_without_space = whatsapp_msg_number.replace(" ", "");
-                        # whatsapp_msg_number_without_strip = whatsapp_msg_number_without_space.replace("-", "")
-                        # whatsapp_msg_number_without_code = whatsapp_msg_number_without_strip.replace(
-                        #     '+' + str(partner_id.country_id.phone_code), "")
-                        # phone_exists_url = param.get('whatsapp_endpoint') + '/checkPhone?token=' + param.get('whatsapp_token') + '&phone=' + str(partner_id.country_id.phone_code) + "" + whatsapp_msg_number_without_code
-                        # phone_exists_response = requests.get(phone_exists_url)
-                        # json_response_phone_exists = json.loads(phone_exists_response.text)
-                        # phone_exists_url = whatsapp_endpoint + '/check/' + whatsapp_instance + '/' + whatsapp_token
-                        # phone_exists_response = requests.get(phone_exists_url, data=json.dumps({'phone': str(partner_id.country_id.phone_code) + whatsapp_msg_number_without_code}), headers={'Content-Type': 'application/json'})
-                        # json_response_phone_exists = json.loads(phone_exists_response.text)['result']
-                        # print ('==phone_exists_response==',phone_exists_url,str(partner_id.country_id.phone_code) + whatsapp_msg_number_without_code,phone_exists_response,phone_exists_response.status_code,json_response_phone_exists)
-                        # if (phone_exists_response.status_code == 200 or phone_exists_response.status_code == 201) and json_response_phone_exists['result'] == 'exists':
-                        #_logger.info("\nPartner phone exists")
-                        # url = param.get('whatsapp_endpoint') + '/sendMessage?token=' + param.get('whatsapp_token')
-                        # headers = {
-                        #     "Content-Type": "application/json",
-                        # }
-                        url = whatsapp_endpoint + '/post'
-                        headers = {"Content-Type": "application/json"}
-                        html_to_plain_text = self.custom_html2plaintext(kwargs.get('body'))
-
-                        # if kwargs.get('email_from'):
-                        #     if '<' in kwargs.get('email_from') and '>' in kwargs.get('email_from'):
-                        #         tmp_dict = {
-                        #             'params' : {
-                        #                 "phone": whatsapp_number,
-                        #                 "body": self.convert_email_from_to_name(kwargs.get('email_from'))+''+ str(self.id) + ': '+ html_to_plain_text,
-                        #                 'instance': whatsapp_instance,
-                        #                 'key': whatsapp_token,
-                        #                 'method': 'sendMessage',
-                        #             }
-                        #         }
-                        #     else:
-                        #         tmp_dict = {
-                        #             'params' : {
-                        #                 "phone": whatsapp_number,
-                        #                 "body": kwargs.get('email_from')+ '' + str(self.id) + ': ' + html_to_plain_text,
-                        #                 'instance': whatsapp_instance,
-                        #                 'key': whatsapp_token,
-                        #                 'method': 'sendMessage',
-                        #             }
-                        #         }
-                        # else:
-                        #     tmp_dict = {
-                        #         'params' : {
-                        #             "phone": whatsapp_number,
-                        #             "body": html_to_plain_text,
-                        #             'instance': whatsapp_instance,
-                        #             'key': whatsapp_token,
-                        #             'method': 'sendMessage',
-                        #         }
-                        #     }
-                        # message_dict = {
-                        #     'params' : {
-                        #         "phone": whatsapp_number,
-                        #         "body": html_to_plain_text,
-                        #         'instance': whatsapp_instance,
-                        #         'key': whatsapp_token,
-                        #         'method': 'sendMessage',
-                        #     }
-                        # }
-                        if kwargs.get('attachment_ids'):
-                            # message_attach = {
-                            #     'method': 'sendFile',
-                            #     'phone': whatsapp,
-                            #     'chatId': partner.chat_id or '',
-                            #     'body': att['datas'].split(",")[0],
-                            #     'filename': att['filename'],
-                            #     'caption': message.replace('_PARTNER_', partner.name).replace('_NUMBER_', origin).replace('_AMOUNT_TOTAL_', str(self.format_amount(amount_total, currency_id)) if currency_id else '').replace('\xa0', ' '),#att['caption'],
-                            #     'origin': origin,
-                            #     'link': link,
-                            # }
-                            for attachment in self.env['ir.attachment'].browse(kwargs.get('attachment_ids')):
-                                mimetype = guess_mimetype(base64.b64decode(attachment.datas))
-                                if mimetype == 'application/octet-stream':
-                                    mimetype = 'video/mp4'
-                                str_mimetype = 'data:' + mimetype + ';base64,'
-                                datas = str_mimetype + str(attachment.datas.decode("utf-8"))
-                                attachment_dict = {
-                                    'params' : {
-                                        'method': 'sendFile',
-                                        'filename': attachment.name,
-                                        "phone": whatsapp_number,
-                                        "body": datas,
-                                        'instance': whatsapp_instance,
-                                        'key': whatsapp_token,
-                                    }
-                                }
-                                #print ('=attachment==',attachment.datas.split(",")[0])
-                                #attachment_dict['params'].update({'method': 'sendFile', 'body': datas, 'filename': attachment.name})
-                                response = requests.post(url, json.dumps(attachment_dict), headers=headers)
-                        else:
-                            message_dict = {
-                                'params' : {
-                                    'method': 'sendMessage',
-                                    "phone": whatsapp_number,
-                                    "body": html_to_plain_text,
-                                    'instance': whatsapp_instance,
-                                    'key': whatsapp_token,
-                                }
-                            }
-                            #print ('----tmp_dict---',kwargs,tmp_dict)
-                            response = requests.post(url, json.dumps(message_dict), headers=headers)
-                        if response.status_code == 201 or response.status_code == 200:
-                            _logger.info("\nSend Message successfully")
-                            response_dict = response.json()
-                                #message_id.with_context({'from_odoobot': True}).write({'whatsapp_message_id': response_dict.get('id')})
-                            # else:
-                            #     invalid_whatsapp_number_partner.append(partner_id.name)
-                        # else:
-                        #     no_phone_partners.append(partner_id.name)
-                    else:
-                        raise UserError(_('Please authorize your mobile number with klikodoo'))
-            if len(invalid_whatsapp_number_partner) >= 1:
-                raise UserError(_('Please add valid whatsapp number for %s customer')% ', '.join(invalid_whatsapp_number_partner))
+        if not whatsapp_numbers:
+            return
+        if not self.env['ir.whatsapp_server'].sudo().search_count([('status', '=', 'authenticated')]):
+            raise UserError(_('Please authorize your mobile number with klikodoo'))
+        html_to_plain_text = self.custom_html2plaintext(kwargs.get('body') or '')
+        attachments = self.env['ir.attachment'].browse(kwargs.get('attachment_ids') or [])
+        vals_list = []
+        for whatsapp_number in whatsapp_numbers:
+            if attachments:
+                # The file content is added when sending, once per attachment
+                for attachment in attachments:
+                    vals_list.append({
+                        'phone': whatsapp_number,
+                        'method': 'sendFile',
+                        'attachment_id': attachment.id,
+                        'mail_message_id': message_id.id,
+                        'payload': json.dumps({'phone': whatsapp_number, 'filename': attachment.name}),
+                    })
+            else:
+                vals_list.append({
+                    'phone': whatsapp_number,
+                    'method': 'sendMessage',
+                    'mail_message_id': message_id.id,
+                    'payload': json.dumps({'phone': whatsapp_number, 'body': html_to_plain_text}),
+                })
+        self.env['whatsapp.queue'].enqueue(vals_list)
 
     # def send_whatsapp_message(self, partner_ids, kwargs, message_id):
     #     print ('--send_whatsapp_message--',partner_ids, kwargs, message_id)
@@ -1,13 +1,11 @@
 # See LICENSE file for full copyright and licensing details.
 
-import ast
 import base64
 from odoo import fields, models, _, sql_db, api, tools
 from odoo.tools.mimetypes import guess_mimetype
 from odoo.exceptions import Warning, UserError
 from datetime import datetime
 import html2text
-import threading
 import requests
 import json
 import logging
@@ -32,6 +30,7 @@ class MailMessage(models.Model):
     whatsapp_numbers = fields.Char()
     whatsapp_message_id = fields.Many2one('mail.message', string="Parent")
     wa_message_ids = fields.One2many('mail.message', 'whatsapp_message_id', string='Related WhatsApp Messages')
+    whatsapp_queue_ids = fields.One2many('whatsapp.queue', 'mail_message_id', string='Whatsapp Queue')
 
     # @api.model
     # def create(self, vals):
@@ -115,19 +114,47 @@ class MailMessage(models.Model):
         finally:
             pass
 
+    def _prepare_whatsapp_queue_vals(self):
+        """Outbound queue values of pending whatsapp messages, from their whatsapp_data."""
+        vals_list = []
+        for mail in self:
+            data = str(mail.whatsapp_data).replace("'", '"')
+            try:
+                data = json.loads(data)
+            except json.JSONDecodeError:
+                _logger.warning('Invalid Whatsapp data on message %s', mail.id)
+                continue
+            message_data = {
+                'chatId': mail.whatsapp_chat_id,
+                'body': html2text.html2text(mail.body or ''),
+                'phone': data.get('phone') or '',
+                'origin': data.get('origin') or '',
+                'link': data.get('link') or '',
+            }
+            vals = {
+                'phone': message_data['phone'],
+                'method': 'sendMessage',
+                'mail_message_id': mail.id,
+            }
+            if mail.whatsapp_method == 'sendFile' and mail.attachment_ids:
+                message_data.update({'caption': data.get('caption'), 'filename': mail.attachment_ids[0].name})
+                vals.update({'method': 'sendFile', 'attachment_id': mail.attachment_ids[0].id})
+            vals['payload'] = json.dumps(message_data)
+            vals_list.append(vals)
+        return vals_list
+
     @api.model
     def resend_whatsapp_mail_message(self):
-        """Resend whatsapp error message via threding.""" 
-        WhatsappServer = self.env['ir.whatsapp_server']
-        whatsapp_ids = WhatsappServer.search([('status','=','authenticated')], order='sequence asc')
-        #if len(whatsapp_ids) == 1:            
-        #print ('===',whatsapp_ids,whatsapp_ids.filtered(lambda ws: not ast.literal_eval(str(ws.message_response))))
-        for wserver in whatsapp_ids.filtered(lambda ws: not ast.literal_eval(str(ws.message_response))['block']):
-            #company_id = self.env.user.company_id
-            if wserver.status != 'authenticated':
-                _logger.warning('Whatsapp Authentication Failed!\nConfigure Whatsapp Configuration in General Setting.')
-            KlikApi = wserver.klikapi()
-            KlikApi.auth()
-            thread_start = threading.Thread(target=self._resend_whatsapp_message_resend(KlikApi))
-            thread_start.start()
+        """Move the pending whatsapp messages to the outbound queue."""
+        pending = self.search([
+            ('message_type', '=', 'whatsapp'),
+            ('whatsapp_status', '=', 'pending'),
+            ('whatsapp_queue_ids', '=', False),
+        ], limit=1000)
+        no_data = pending.filtered(lambda m: not m.whatsapp_data)
+        no_data.write({'whatsapp_status': 'error', 'whatsapp_response': 'No Message Datas'})
+        vals_list = (pending - no_data)._prepare_whatsapp_queue_vals()
+        invalid = pending - no_data - self.browse([vals['mail_message_id'] for vals in vals_list])
+        invalid.write({'whatsapp_status': 'error', 'whatsapp_response': 'Invalid Message Datas'})
+        self.env['whatsapp.queue'].enqueue(vals_list)
         return True
\ No newline at end of file
@@ -0,0 +1,286 @@
+# See LICENSE file for full copyright and licensing details.
+
+import base64
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from odoo import api, fields, models
+from odoo.tools.mimetypes import guess_mimetype
+
+from ..klikapi import KlikApi
+
+_logger = logging.getLogger(__name__)
+
+# Retry delays grow as 2^attempts minutes, up to this value
+MAX_BACKOFF_MINUTES = 60
+# Seconds to wait for a server's quota before skipping it for the run
+QUOTA_TIMEOUT = 15
+
+
+def _is_unsent(error):
+    """Whether a failed request is known not to have been taken by the server."""
+    if isinstance(error, (requests.exceptions.ConnectTimeout, requests.exceptions.HTTPError)):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        # Refused connection or unknown host: nothing was sent
+        return isinstance(getattr(error.args[0], 'reason', None), NewConnectionError)
+    return False
+
+
+class WhatsappQueue(models.Model):
+    """Outbound Whatsapp messages, sent by a cron outside of the user's transaction.
+
+    The cron sends the pending messages in batches per authenticated server,
+    within each server's rate limit and remaining quota. When a server fails,
+    its messages move to the next server; failed messages are retried with an
+    exponential backoff. Claimed messages are marked as sending and committed
+    before any request, and the results of each server are committed as soon
+    as its batch ends.
+    """
+    _name = 'whatsapp.queue'
+    _description = 'Whatsapp Outbound Queue'
+    _order = 'id'
+
+    phone = fields.Char('Whatsapp Number')
+    method = fields.Selection([('sendMessage', 'Message'), ('sendFile', 'File')], default='sendMessage', required=True)
+    payload = fields.Text('Data', required=True, help="JSON parameters of the request, without the file content")
+    attachment_id = fields.Many2one('ir.attachment', string='Attachment', ondelete='cascade')
+    mail_message_id = fields.Many2one('mail.message', string='Message', ondelete='set null', index='btree_not_null')
+    server_id = fields.Many2one('ir.whatsapp_server', string='Whatsapp Server', ondelete='set null',
+        help="Server of the last attempt")
+    state = fields.Selection([('pending', 'Pending'), ('sending', 'Sending'), ('send', 'Sent'), ('error', 'Error')],
+        default='pending', required=True, index=True)
+    attempts = fields.Integer()
+    next_attempt = fields.Datetime(default=fields.Datetime.now, index=True)
+    sent_date = fields.Datetime(index=True)
+    response = fields.Text(readonly=True)
+
+    @api.model
+    def enqueue(self, vals_list):
+        """Queue the messages and wake up the dispatcher."""
+        jobs = self.sudo().create(vals_list)
+        if jobs:
+            self.env.ref('aos_whatsapp.ir_cron_whatsapp_queue')._trigger()
+        return jobs
+
+    @api.model
+    def claim(self, limit):
+        """Take up to `limit` messages due for sending, locking them against other workers."""
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT id FROM whatsapp_queue
+             WHERE state = 'pending'
+               AND (next_attempt IS NULL OR next_attempt <= NOW() AT TIME ZONE 'UTC')
+             ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, (limit,))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _get_server_capacity(self, servers):
+        """Messages each server may still send now: its rate limit minus the last minute, capped by the quota.
+
+        The quota is read once per run from the Whatsapp API. A server whose
+        quota cannot be read is left out of the run.
+        """
+        since = fields.Datetime.now() - timedelta(minutes=1)
+        sent = {
+            group['server_id'][0]: group['server_id_count']
+            for group in self.read_group(
+                [('state', '=', 'send'), ('sent_date', '>=', since), ('server_id', 'in', servers.ids)],
+                ['server_id'], ['server_id'])
+        }
+        capacity = {}
+        for server in servers:
+            client = KlikApi(server.klik_key, server.klik_secret, timeout=QUOTA_TIMEOUT)
+            try:
+                limit = client.get_limit() or {}
+                count = int(client.get_count() or 0) if limit.get('limit_qty') else 0
+            except Exception as e:
+                _logger.warning('Whatsapp queue: cannot read the quota of server %s, skipped: %s', server.name, e)
+                continue
+            if limit.get('block'):
+                continue
+            available = server.rate_limit - sent.get(server.id, 0)
+            if limit.get('limit_qty'):
+                available = min(available, int(limit['limit_qty']) - count)
+            if available > 0:
+                capacity[server] = available
+        return capacity
+
+    def _attachment_body(self, cache):
+        """Data URI of the attachment, built once per attachment and run."""
+        attachment = self.attachment_id
+        if attachment.id not in cache:
+            raw = base64.b64decode(attachment.datas or b'')
+            mimetype = guess_mimetype(raw)
+            if mimetype == 'application/octet-stream':
+                mimetype = 'video/mp4'
+            cache[attachment.id] = 'data:' + mimetype + ';base64,' + (attachment.datas or b'').decode('utf-8')
+        return cache[attachment.id]
+
+    def _prepare_requests(self):
+        cache = {}
+        prepared = []
+        for job in self:
+            data = json.loads(job.payload)
+            if job.method == 'sendFile' and job.attachment_id:
+                data['body'] = job._attachment_body(cache)
+                data.setdefault('filename', job.attachment_id.name)
+            prepared.append((job.id, job.method, json.dumps(data)))
+        return prepared
+
+    @staticmethod
+    def _send_batch(klik_key, klik_secret, batch):
+        """Send a batch through one server, without the ORM (runs in a worker thread).
+
+        Returns {job id: (outcome, response)}, with outcome 'send', 'retry' when
+        the server refused the message, or 'unknown' when the request failed
+        after the server may have taken it; such a message is not sent again.
+        When the server fails before taking a message, that message and the
+        rest of the batch are left out so they can fail over.
+        """
+        results = {}
+        client = KlikApi(klik_key, klik_secret, session=requests.Session())
+        for job_id, method, data in batch:
+            try:
+                response = client.post_request(method=method, data=data)
+            except Exception as e:
+                _logger.warning('Whatsapp server %s failed: %s', klik_key, e)
+                if not _is_unsent(e):
+                    results[job_id] = ('unknown', {'error': str(e)})
+                break
+            sent = (response.get('message') or {}).get('sent')
+            results[job_id] = ('send' if sent else 'retry', response)
+        return results
+
+    def _dispatch(self, capacity):
+        """Distribute the jobs over the servers by priority and send them, one thread per server.
+
+        The results of each server are saved and committed as soon as its batch
+        ends. Returns the jobs left unsent because their server failed.
+        """
+        batches = {}
+        remaining = list(self)
+        for server, available in capacity.items():
+            batches[server], remaining = remaining[:available], remaining[available:]
+            capacity[server] -= len(batches[server])
+        batches = {server: self.browse([job.id for job in jobs]) for server, jobs in batches.items() if jobs}
+        unsent = self.browse([job.id for job in remaining])
+        if not batches:
+            return unsent
+
+        prepared = {server: jobs._prepare_requests() for server, jobs in batches.items()}
+        with ThreadPoolExecutor(max_workers=len(prepared)) as executor:
+            futures = {
+                executor.submit(self._send_batch, server.klik_key, server.klik_secret, batch): server
+                for server, batch in prepared.items()
+            }
+            for future in as_completed(futures):
+                server = futures[future]
+                jobs = batches[server]
+                results = future.result()
+                failed = jobs._save_results(server, results)
+                if failed or any(outcome == 'unknown' for outcome, __ in results.values()):
+                    # Do not use a failing server again in this run
+                    capacity.pop(server, None)
+                unsent |= failed
+                jobs._update_mail_messages()
+                self._commit()
+        return unsent
+
+    def _save_results(self, server, results):
+        """Save the outcome of the jobs sent through `server`; return the jobs to fail over."""
+        now = fields.Datetime.now()
+        max_attempts = int(self.env['ir.config_parameter'].sudo().get_param('aos_whatsapp.queue_max_attempts', 5))
+        failed = self.browse()
+        for job in self:
+            if job.id not in results:
+                failed |= job
+                continue
+            outcome, response = results[job.id]
+            if outcome == 'send':
+                job.write({'state': 'send', 'server_id': server.id, 'sent_date': now,
+                           'response': json.dumps(response)})
+                continue
+            if outcome == 'unknown':
+                # The server may have delivered it: a resend could duplicate the message
+                job.write({'state': 'error', 'server_id': server.id, 'response': json.dumps(response)})
+                continue
+            attempts = job.attempts + 1
+            job.write({
+                'state': 'error' if attempts >= max_attempts else 'pending',
+                'attempts': attempts,
+                'server_id': server.id,
+                'next_attempt': now + timedelta(minutes=min(2 ** attempts, MAX_BACKOFF_MINUTES)),
+                'response': json.dumps(response),
+            })
+        return failed
+
+    def _update_mail_messages(self):
+        for job in self.filtered('mail_message_id'):
+            if job.state in ('send', 'error'):
+                job.mail_message_id.sudo().write({
+                    'whatsapp_status': job.state,
+                    'whatsapp_response': job.response,
+                    'whatsapp_server_id': job.server_id.id,
+                })
+
+    @api.model
+    def _commit(self):
+        if not getattr(threading.current_thread(), 'testing', False):
+            self.env.cr.commit()
+
+    @api.model
+    def _process_queue(self):
+        """Send a batch of queued messages; reschedule itself while messages are due.
+
+        Runs only from its cron, never twice at once: messages still marked as
+        sending were left by an interrupted run. They may have been delivered,
+        so they are set to error instead of being sent again.
+        """
+        interrupted = self.search([('state', '=', 'sending')])
+        if interrupted:
+            _logger.warning('Whatsapp queue: %s messages interrupted while sending, not resent', len(interrupted))
+            interrupted.write({'state': 'error', 'response': 'Interrupted while sending'})
+            interrupted._update_mail_messages()
+
+        servers = self.env['ir.whatsapp_server'].sudo().search([('status', '=', 'authenticated')], order='sequence asc')
+        capacity = self._get_server_capacity(servers)
+        if not capacity:
+            _logger.info('Whatsapp queue: no authenticated server with capacity left')
+            return
+        jobs = self.claim(sum(capacity.values()))
+        if not jobs:
+            return
+        # Release the row locks before calling out to the servers
+        jobs.write({'state': 'sending'})
+        self._commit()
+
+        unsent = jobs._dispatch(capacity)
+        if unsent and capacity:
+            # Fail over to the servers that are still working
+            unsent = unsent._dispatch(capacity)
+        for job in unsent:
+            # No server could take it: keep it pending until one is back
+            attempts = job.attempts + 1
+            job.write({
+                'state': 'pending',
+                'attempts': attempts,
+                'next_attempt': fields.Datetime.now() + timedelta(minutes=min(2 ** attempts, MAX_BACKOFF_MINUTES)),
+                'response': 'No Whatsapp server available',
+            })
+        _logger.info('Whatsapp queue: %s sent, %s failed, %s postponed',
+                     len(jobs.filtered(lambda j: j.state == 'send')),
+                     len(jobs.filtered(lambda j: j.state == 'error')), len(unsent))
+
+        if self.search_count([('state', '=', 'pending'), ('next_attempt', '<=', fields.Datetime.now())]):
+            # Rate limits are per minute: come back when the window has moved
+            self.env.ref('aos_whatsapp.ir_cron_whatsapp_queue')._trigger(fields.Datetime.now() + timedelta(minutes=1))
@@ -0,0 +1,3 @@
+# See LICENSE file for full copyright and licensing details.
+
+from . import test_whatsapp_queue
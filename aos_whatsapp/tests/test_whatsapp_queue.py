@@ -0,0 +1,111 @@
+# See LICENSE file for full copyright and licensing details.
+
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+import requests
+
+from odoo import fields
+from odoo.tests.common import TransactionCase
+
+from ..klikapi import KlikApi
+
+
+class TestWhatsappQueue(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Server = cls.env['ir.whatsapp_server']
+        cls.server_a = Server.create({'name': 'Server A', 'sequence': 1, 'klik_key': 'a', 'rate_limit': 2,
+                                      'status': 'authenticated'})
+        cls.server_b = Server.create({'name': 'Server B', 'sequence': 2, 'klik_key': 'b', 'rate_limit': 20,
+                                      'status': 'authenticated'})
+        cls.Queue = cls.env['whatsapp.queue']
+        # Leave only the messages of the tests in the queue
+        cls.Queue.search([]).unlink()
+
+    def _create_jobs(self, count, **vals):
+        return self.Queue.create([
+            dict({'phone': '62800%s' % index, 'payload': json.dumps({'phone': '62800%s' % index, 'body': 'Hello'})},
+                 **vals)
+            for index in range(count)
+        ])
+
+    def _patch_post(self, failures):
+        """Patch KlikApi.post_request: servers in `failures` raise the given exception."""
+        sent = []
+
+        def post_request(api, method, data):
+            if api.klik_key in failures:
+                raise failures[api.klik_key]
+            sent.append((api.klik_key, json.loads(data)['phone']))
+            return {'chatID': '1', 'message': {'sent': True}}
+
+        return patch.object(KlikApi, 'post_request', autospec=True, side_effect=post_request), sent
+
+    def _process(self, failures):
+        capacity = {self.server_a: self.server_a.rate_limit, self.server_b: self.server_b.rate_limit}
+        post, sent = self._patch_post(failures)
+        with post, patch.object(type(self.Queue), '_get_server_capacity', return_value=capacity):
+            self.Queue._process_queue()
+        return sent
+
+    def test_claim(self):
+        due = self._create_jobs(2)
+        later = self._create_jobs(1, next_attempt=fields.Datetime.now() + timedelta(hours=1))
+        done = self._create_jobs(1, state='send')
+        claimed = self.Queue.claim(10)
+        self.assertEqual(claimed, due)
+        self.assertFalse(claimed & (later | done))
+        self.assertEqual(self.Queue.claim(1), due[0])
+
+    def test_capacity(self):
+        # Two messages sent through A in the last minute, out of 2 per minute
+        self._create_jobs(2, state='send', server_id=self.server_a.id, sent_date=fields.Datetime.now())
+        server_c = self.server_b.copy({'name': 'Server C', 'klik_key': 'c'})
+        server_d = self.server_b.copy({'name': 'Server D', 'klik_key': 'd'})
+
+        def get_limit(api):
+            if api.klik_key == 'c':
+                raise requests.exceptions.ConnectionError('unreachable')
+            if api.klik_key == 'd':
+                return {'block': True}
+            return {'limit_qty': 10}
+
+        with patch.object(KlikApi, 'get_limit', autospec=True, side_effect=get_limit), \
+                patch.object(KlikApi, 'get_count', autospec=True, return_value=8):
+            capacity = self.Queue._get_server_capacity(self.server_a | self.server_b | server_c | server_d)
+        # B is capped by its quota; C (unreadable quota) and D (blocked) are skipped
+        self.assertEqual(capacity, {self.server_b: 2})
+
+    def test_send(self):
+        jobs = self._create_jobs(3)
+        sent = self._process({})
+        self.assertEqual(set(jobs.mapped('state')), {'send'})
+        self.assertEqual(jobs.server_id, self.server_a | self.server_b)
+        self.assertEqual([key for key, __ in sent].count('a'), 2)
+
+    def test_failover(self):
+        jobs = self._create_jobs(3)
+        sent = self._process({'a': requests.exceptions.HTTPError('Whatsapp server returned status 503')})
+        # The messages refused by A are sent through B
+        self.assertEqual(set(jobs.mapped('state')), {'send'})
+        self.assertEqual(jobs.server_id, self.server_b)
+        self.assertEqual(len(sent), 3)
+
+    def test_no_resend_after_timeout(self):
+        jobs = self._create_jobs(3)
+        sent = self._process({'a': requests.exceptions.ReadTimeout('read timed out')})
+        # A may have delivered the first message: it is not sent again
+        self.assertEqual(jobs[0].state, 'error')
+        self.assertEqual(jobs[0].server_id, self.server_a)
+        self.assertEqual((jobs[1] | jobs[2]).mapped('state'), ['send', 'send'])
+        self.assertNotIn(jobs[0].phone, [phone for __, phone in sent])
+
+    def test_interrupted(self):
+        jobs = self._create_jobs(1, state='sending')
+        sent = self._process({})
+        self.assertEqual(jobs.state, 'error')
+        self.assertFalse(sent)
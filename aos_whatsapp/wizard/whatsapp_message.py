@@ -4,7 +4,6 @@ from ast import literal_eval
 from odoo import api, fields, models, sql_db, _, tools, Command
 from odoo.tools.misc import formatLang, get_lang, format_amount
 from odoo.exceptions import ValidationError, RedirectWarning
-from odoo.tools.mimetypes import guess_mimetype
 from datetime import datetime
 from odoo.tools import pycompat
 from odoo.exceptions import UserError
@@ -13,7 +12,6 @@ from ..klikapi import texttohtml
 import requests
 import json
 import ast
-import base64
 import threading
 import time
 import logging
@@ -509,24 +507,15 @@ class WhatsappComposeMessage(models.TransientModel):
             for rec in self:
                 active_model = rec.model                    
                 active_ids = context.get('active_ids') or rec.partner_ids.ids
-                print ('---rec---',context,rec)
                 if rec.whatsapp_type == 'post':
                     #SEND MESSAGE
                     #MULTI ATTACHMENT
                     message = rec.message
                     partner_ids = context.get('default_partner_ids')
                     #print ('--message--',message)
-                    attachment_new_ids = []
-                    if rec.attachment_ids:
-                        for attach in rec.attachment_ids:
-                            vals = {'filename': attach.name}
-                            mimetype = guess_mimetype(base64.b64decode(attach.datas))
-                            if mimetype == 'application/octet-stream':
-                                mimetype = 'video/mp4'
-                            str_mimetype = 'data:' + mimetype + ';base64,'
-                            attachment = str_mimetype + str(attach.datas.decode("utf-8"))
-                            vals.update({'datas': attachment})
-                            attachment_new_ids.append(vals)
+                    # Messages are queued and sent by the whatsapp.queue dispatcher
+                    message_vals_list = []
+                    queue_vals_list = []
                     #print ('===DETECT OBJECT===',rec.attachment_ids)
                     for record in self.env[active_model].browse(active_ids):
                         #print ('==FOR PARTNER ONLY==',record)      
@@ -593,55 +582,25 @@ class WhatsappComposeMessage(models.TransientModel):
                                     }
                                     if partner.whatsapp == '0' and partner.chat_id:
                                         message_data.update({'phone': '','chatId': partner.chat_id})
-                                    #MESSAGE SENT                            
-                                    if not attachment_new_ids and message_data['body']:
-                                        send_message = {}
-                                        # status = 'pending'
-                                        data_message = json.dumps(message_data)
-                                        #_logger.warning('Failed to send Message to WhatsApp number %s, No body found', whatsapp)
-                                        send_message = KlikApi.post_request(method='sendMessage', data=data_message)
-                                        if send_message.get('message')['sent']:
-                                            status = 'send'
-                                            _logger.warning('Success to send Message to WhatsApp number %s', whatsapp)
-                                        else:
-                                            status = 'error'
-                                            _logger.warning('Failed to send Message to WhatsApp number %s', whatsapp)
-                                        chatID = partner.chat_id if partner.chat_id else whatsapp#send_message.get('chatID')
-                                        vals = self._prepare_mail_message(self.env.user.partner_id.id, chatID, record and record.id, active_model, texttohtml.formatHtml(message.replace('_PARTNER_', partner.name).replace('_NUMBER_', origin).replace('_AMOUNT_TOTAL_', str(self.format_amount(amount_total, currency_id)) if currency_id else '').replace('\xa0', ' ')), message_data, rec.subject, [partner.id], [], send_message, status)
-                                        MailMessage += MailMessage.sudo().create(vals)
-                                        #partner.chat_id = chatID
-                                        new_cr.commit()
-                                    #ATTACHMENT SENT
-                                    elif attachment_new_ids:
-                                        for att in attachment_new_ids:
-                                            message_attach = {
-                                                'method': 'sendFile',
-                                                'phone': whatsapp,
-                                                'chatId': partner.chat_id or '',
-                                                'body': att['datas'].split(",")[0],
-                                                'filename': att['filename'],
-                                                'caption': message.replace('_PARTNER_', partner.name).replace('_NUMBER_', origin).replace('_AMOUNT_TOTAL_', str(self.format_amount(amount_total, currency_id)) if currency_id else '').replace('\xa0', ' '),#att['caption'],
-                                                'origin': origin,
-                                                'link': link,
-                                            }
-                                            #SENT ATTAHCMENT
-                                            if message_attach['body']:
-                                                send_attach = {}
-                                                status = 'pending'
-                                                # data_attach = json.dumps(message_attach)
-                                                # #_logger.warning('Failed to send Message to WhatsApp number %s, No attachment found', whatsapp)
-                                                # send_attach = KlikApi.post_request(method='sendFile', data=data_attach)
-                                                # if send_attach.get('message')['sent']:        
-                                                #     status = 'send'                
-                                                #     _logger.warning('Success to send Attachment to WhatsApp number %s', whatsapp)
-                                                # else:
-                                                #     status = 'error'
-                                                #     _logger.warning('Failed to send Attachment to WhatsApp number %s', whatsapp)
-                                                chatID = partner.chat_id if partner.chat_id else whatsapp#send_attach.get('chatID')
-                                                vals = self._prepare_mail_message(self.env.user.partner_id.id, chatID, record and record.id, active_model, texttohtml.formatHtml(message.replace('_PARTNER_', partner.name).replace('_NUMBER_', origin).replace('_AMOUNT_TOTAL_', str(self.format_amount(amount_total, currency_id)) if currency_id else '').replace('\xa0', ' ')), message_attach, rec.subject, [partner.id], rec.attachment_ids, send_attach, status)
-                                                MailMessage += MailMessage.sudo().create(vals)
-                                                #partner.chat_id = chatID
-                                                new_cr.commit()
+                                    body = message.replace('_PARTNER_', partner.name).replace('_NUMBER_', origin).replace('_AMOUNT_TOTAL_', str(self.format_amount(amount_total, currency_id)) if currency_id else '').replace('\xa0', ' ')
+                                    chatID = partner.chat_id if partner.chat_id else whatsapp
+                                    #MESSAGE QUEUED
+                                    if not rec.attachment_ids and message_data['body']:
+                                        message_vals_list.append(self._prepare_mail_message(self.env.user.partner_id.id, chatID, record and record.id, active_model, texttohtml.formatHtml(body), message_data, rec.subject, [partner.id], [], False, 'pending'))
+                                        queue_vals_list.append({'phone': message_data['phone'], 'method': 'sendMessage', 'payload': json.dumps(message_data)})
+                                    #ATTACHMENT QUEUED: the file content is added when sending, once per attachment
+                                    for attach in rec.attachment_ids:
+                                        message_attach = {
+                                            'method': 'sendFile',
+                                            'phone': message_data['phone'],
+                                            'chatId': message_data['chatId'],
+                                            'filename': attach.name,
+                                            'caption': body,
+                                            'origin': origin,
+                                            'link': link,
+                                        }
+                                        message_vals_list.append(self._prepare_mail_message(self.env.user.partner_id.id, chatID, record and record.id, active_model, texttohtml.formatHtml(body), message_attach, rec.subject, [partner.id], rec.attachment_ids, False, 'pending'))
+                                        queue_vals_list.append({'phone': message_data['phone'], 'method': 'sendFile', 'attachment_id': attach.id, 'payload': json.dumps(message_attach)})
                         # else:
                         #     whatsapp = partner._formatting_mobile_number()
                         #     if partner.whatsapp and partner.whatsapp != '0' and whatsapp not in opt_out_list:                          
@@ -706,6 +665,10 @@ class WhatsappComposeMessage(models.TransientModel):
                         #                     #partner.chat_id = chatID
                         #                     new_cr.commit()
                             #time.sleep(3)
+                    messages = MailMessage.sudo().create(message_vals_list)
+                    for mail, queue_vals in zip(messages, queue_vals_list):
+                        queue_vals['mail_message_id'] = mail.id
+                    self.env['whatsapp.queue'].enqueue(queue_vals_list)
                 elif rec.whatsapp_type == 'get' and rec.type in ('contact', 'group'):
                     #CREATE GROUP OR CONTACT
                     dialogs = {}
@@ -770,6 +733,9 @@ class WhatsappComposeMessage(models.TransientModel):
     def whatsapp_message_post(self):
         # print ("""Send whatsapp message via threding.""")
         KlikApi = False
+        if all(rec.whatsapp_type == 'post' for rec in self):
+            # Outgoing messages only go to the queue: no need to reach the server here
+            return self.whatsapp_message_post_new(KlikApi)
         # messages = self.env['mail.message']
         WhatsappServer = self.env['ir.whatsapp_server']
         domain = WhatsappServer._find_default_for_server()
@@ -1,6 +1,6 @@
 {
     "name": "Alfresco Report Integration",
-    "version": "1.8",
+    "version": "1.11",
     "summary": "Upload PDF reports to Alfresco automatically",
     "category": "Tools",
     'author': 'Javier, F3nrir',
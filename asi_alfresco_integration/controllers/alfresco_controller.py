@@ -1,6 +1,5 @@
 from odoo import http
 from odoo.http import request
-import requests
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -16,20 +15,14 @@ class AlfrescoController(http.Controller):
             if not file_record.exists():
                 return request.not_found()
             
-            config = request.env['ir.config_parameter'].sudo()
-            url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-            user = config.get_param('asi_alfresco_integration.alfresco_username')
-            pwd = config.get_param('asi_alfresco_integration.alfresco_password')
-            
-            if not all([url, user, pwd, file_record.alfresco_node_id]):
+            client = request.env['alfresco.client'].get_client()
+            if not client or not file_record.alfresco_node_id:
                 return request.not_found()
             
-            download_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{file_record.alfresco_node_id}/content"
-            response = requests.get(download_url, auth=(user, pwd), timeout=30)
-            response.raise_for_status()
+            content = client.download_content(file_record.alfresco_node_id, timeout=30)
             
             return request.make_response(
-                response.content,
+                content,
                 headers=[
                     ('Content-Type', 'application/pdf'),
                     ('Content-Disposition', f'inline; filename="{file_record.name}"'),
@@ -49,20 +42,14 @@ class AlfrescoController(http.Controller):
             if not file_record.exists():
                 return request.not_found()
             
-            config = request.env['ir.config_parameter'].sudo()
-            url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-            user = config.get_param('asi_alfresco_integration.alfresco_username')
-            pwd = config.get_param('asi_alfresco_integration.alfresco_password')
-            
-            if not all([url, user, pwd, file_record.alfresco_node_id]):
+            client = request.env['alfresco.client'].get_client()
+            if not client or not file_record.alfresco_node_id:
                 return request.not_found()
             
-            download_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{file_record.alfresco_node_id}/content"
-            response = requests.get(download_url, auth=(user, pwd), timeout=30)
-            response.raise_for_status()
+            content = client.download_content(file_record.alfresco_node_id, timeout=30)
             
             return request.make_response(
-                response.content,
+                content,
                 headers=[
                     ('Content-Type', 'application/pdf'),
                     ('Content-Disposition', f'attachment; filename="{file_record.name}"'),
@@ -1 +1 @@
-from . import res_users, res_config_settings, alfresco_report_mapping, report_override, alfresco_folder, alfresco_file, alfresco_explorer
+from . import alfresco_client, res_users, res_config_settings, alfresco_report_mapping, alfresco_report_document, report_override, alfresco_folder, alfresco_sync_queue, alfresco_file, alfresco_explorer
@@ -0,0 +1,262 @@
+import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from odoo import models, api
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# Segmentos de la URL que identifican un recurso concreto y se agrupan en las estadisticas
+ENDPOINT_ID_PATTERN = re.compile(r'/(nodes|tasks|processes|people|sites|groups)/[^/?]+')
+
+
+class AlfrescoClient(object):
+    """
+    Cliente HTTP de Alfresco compartido por los modulos de integracion.
+
+    - Una sesion con keep-alive y un pool de conexiones, en lugar de una
+      conexion TCP/TLS nueva por llamada.
+    - Reintentos con espera exponencial ante errores de conexion y respuestas
+      429/5xx (solo en metodos idempotentes).
+    - Un pool de hilos acotado para subidas/descargas en paralelo (`map`).
+    - Contadores de latencia por endpoint (`get_stats`).
+
+    Las URLs pueden ser absolutas o relativas al servidor configurado.
+    """
+
+    API_PATH = '/alfresco/api/-default-/public/alfresco/versions/1'
+    SEARCH_PATH = '/alfresco/api/-default-/public/search/versions/1/search'
+    WORKFLOW_PATH = '/alfresco/api/-default-/public/workflow/versions/1'
+
+    def __init__(self, url, user, pwd, pool_size=10, retries=3, backoff_factor=0.5,
+                 max_workers=4, timeout=30):
+        self.base_url = url.rstrip('/')
+        self.user = user
+        self.timeout = timeout
+        self.max_workers = max_workers
+
+        self.session = requests.Session()
+        self.session.auth = (user, pwd)
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    # -------------------------------------------------------------------------
+    # Peticiones
+    # -------------------------------------------------------------------------
+
+    def url(self, path):
+        """URL absoluta para `path` (una URL absoluta se devuelve sin cambios)."""
+        if path.startswith(('http://', 'https://')):
+            return path
+        return self.base_url + path
+
+    def request(self, method, path, endpoint=None, **kwargs):
+        """
+        Ejecuta la peticion y registra su latencia bajo `endpoint`. Si no se indica,
+        el endpoint es el metodo mas la ruta con los identificadores agrupados.
+        Devuelve la respuesta sin comprobar el codigo de estado.
+        """
+        url = self.url(path)
+        kwargs.setdefault('timeout', self.timeout)
+        if endpoint is None:
+            route = url[len(self.base_url):] if url.startswith(self.base_url) else url
+            endpoint = '%s %s' % (method.upper(), ENDPOINT_ID_PATTERN.sub(r'/\1/{id}', route.split('?')[0]))
+
+        start = time.monotonic()
+        error = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            error = response.status_code >= 400
+            return response
+        finally:
+            self._record(endpoint, time.monotonic() - start, error)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    # -------------------------------------------------------------------------
+    # Operaciones comunes
+    # -------------------------------------------------------------------------
+
+    def download_content(self, node_id, **kwargs):
+        """Contenido binario de un nodo. Lanza HTTPError si la respuesta no es 2xx."""
+        response = self.get(f"{self.API_PATH}/nodes/{node_id}/content", **kwargs)
+        response.raise_for_status()
+        return response.content
+
+    def upload_file(self, folder_node_id, filename, content, properties=None, auto_rename=True, **kwargs):
+        """Crea un archivo en la carpeta indicada y devuelve la entrada del nodo creado."""
+        data = {'name': filename, 'nodeType': 'cm:content'}
+        if properties:
+            data['properties'] = properties
+        response = self.post(
+            f"{self.API_PATH}/nodes/{folder_node_id}/children",
+            files={'filedata': (filename, content)},
+            data={'json': json.dumps(data)},
+            params={'autoRename': 'true' if auto_rename else 'false'},
+            **kwargs
+        )
+        response.raise_for_status()
+        return response.json().get('entry', {})
+
+    def update_content(self, node_id, content, content_type='application/pdf', **kwargs):
+        """Sube una nueva version del contenido de un nodo."""
+        response = self.put(
+            f"{self.API_PATH}/nodes/{node_id}/content",
+            headers={'Content-Type': content_type},
+            data=content,
+            **kwargs
+        )
+        response.raise_for_status()
+        return response
+
+    def search(self, query, language='afts', max_items=100, skip_count=0, sort=None, **kwargs):
+        """
+        Ejecuta una busqueda y devuelve la lista de entradas. `sort` es una lista
+        de campos; un prefijo '-' indica orden descendente (ej. ['cm:modified']).
+        """
+        body = {
+            'query': {'language': language, 'query': query},
+            'include': ['properties'],
+            'paging': {'maxItems': max_items, 'skipCount': skip_count},
+        }
+        if sort:
+            body['sort'] = [
+                {'type': 'FIELD', 'field': field.lstrip('-'), 'ascending': not field.startswith('-')}
+                for field in sort
+            ]
+        response = self.post(self.SEARCH_PATH, json=body, **kwargs)
+        response.raise_for_status()
+        return response.json().get('list', {}).get('entries', [])
+
+    # -------------------------------------------------------------------------
+    # Paralelismo
+    # -------------------------------------------------------------------------
+
+    def map(self, func, items):
+        """
+        Aplica `func` a cada elemento en el pool de hilos del cliente y devuelve
+        los resultados en orden. `func` no debe usar el ORM.
+        """
+        items = list(items)
+        if len(items) <= 1 or self.max_workers <= 1:
+            return [func(item) for item in items]
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='alfresco')
+        return list(self._executor.map(func, items))
+
+    # -------------------------------------------------------------------------
+    # Estadisticas
+    # -------------------------------------------------------------------------
+
+    def _record(self, endpoint, elapsed, error):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {
+                'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            })
+            elapsed_ms = elapsed * 1000
+            stats['count'] += 1
+            stats['errors'] += int(error)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+    def get_stats(self):
+        """Latencia por endpoint: llamadas, errores, media y maximo en milisegundos."""
+        with self._lock:
+            return {
+                endpoint: dict(stats, avg_ms=stats['total_ms'] / stats['count'] if stats['count'] else 0.0)
+                for endpoint, stats in self._stats.items()
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def shutdown(self):
+        """Detiene el pool de hilos; las tareas en curso terminan normalmente."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+# Un cliente por configuracion, compartido por todos los hilos del proceso
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(url, user, pwd, **options):
+    """Devuelve el cliente compartido para esta configuracion, creandolo si no existe."""
+    key = (url.rstrip('/'), user, pwd, tuple(sorted(options.items())))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            # La configuracion cambio: se descartan los clientes anteriores
+            for old_client in _clients.values():
+                old_client.shutdown()
+            _clients.clear()
+            client = _clients[key] = AlfrescoClient(url, user, pwd, **options)
+        return client
+
+
+class AlfrescoClientService(models.AbstractModel):
+    """Acceso al cliente compartido de Alfresco con la configuracion del sistema."""
+    _name = 'alfresco.client'
+    _description = 'Cliente de Alfresco'
+
+    @api.model
+    def get_client(self, raise_if_missing=False):
+        """
+        Cliente compartido para la configuracion actual, o None si la URL, el
+        usuario o la contrasena no estan configurados.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        url = config.get_param('asi_alfresco_integration.alfresco_server_url')
+        user = config.get_param('asi_alfresco_integration.alfresco_username')
+        pwd = config.get_param('asi_alfresco_integration.alfresco_password')
+        if not all([url, user, pwd]):
+            if raise_if_missing:
+                raise UserError("Configuración de Alfresco incompleta")
+            return None
+        return get_client(
+            url, user, pwd,
+            pool_size=int(config.get_param('asi_alfresco_integration.client_pool_size', 10)),
+            retries=int(config.get_param('asi_alfresco_integration.client_retries', 3)),
+            max_workers=int(config.get_param('asi_alfresco_integration.client_max_workers', 4)),
+        )
+
+    @api.model
+    def get_latency_stats(self):
+        """Contadores de latencia por endpoint del cliente actual."""
+        client = self.get_client()
+        return client.get_stats() if client else {}
@@ -68,11 +68,9 @@ class AlfrescoFile(models.Model):
         """
         self.ensure_one()
         
-        url = self._get_config_param('asi_alfresco_integration.alfresco_server_url')
-        user = self._get_config_param('asi_alfresco_integration.alfresco_username')
-        pwd = self._get_config_param('asi_alfresco_integration.alfresco_password')
+        client = self.env['alfresco.client'].get_client()
         
-        if not all([url, user, pwd, self.alfresco_node_id]):
+        if not client or not self.alfresco_node_id:
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -84,8 +82,8 @@ class AlfrescoFile(models.Model):
         
         try:
             # Eliminar archivo de Alfresco usando la API REST
-            delete_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{self.alfresco_node_id}"
-            response = requests.delete(delete_url, auth=(user, pwd), timeout=30)
+            delete_url = f"{client.API_PATH}/nodes/{self.alfresco_node_id}"
+            response = client.delete(delete_url, timeout=30)
         
             if response.status_code == 200:
                 _logger.info(f"Archivo {self.name} eliminado exitosamente de Alfresco")
@@ -129,11 +127,9 @@ class AlfrescoFile(models.Model):
         """Descarga el contenido del archivo desde Alfresco"""
         self.ensure_one()
         
-        url = self._get_config_param('asi_alfresco_integration.alfresco_server_url')
-        user = self._get_config_param('asi_alfresco_integration.alfresco_username')
-        pwd = self._get_config_param('asi_alfresco_integration.alfresco_password')
+        client = self.env['alfresco.client'].get_client()
         
-        if not all([url, user, pwd, self.alfresco_node_id]):
+        if not client or not self.alfresco_node_id:
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -144,8 +140,8 @@ class AlfrescoFile(models.Model):
             }
         
         try:
-            download_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{self.alfresco_node_id}/content"
-            response = requests.get(download_url, auth=(user, pwd), timeout=30)
+            download_url = f"{client.API_PATH}/nodes/{self.alfresco_node_id}/content"
+            response = client.get(download_url, timeout=30)
             response.raise_for_status()
         
             return {
@@ -170,11 +166,9 @@ class AlfrescoFile(models.Model):
         self.ensure_one()
         
         # Primero cargar el contenido del PDF
-        url = self._get_config_param('asi_alfresco_integration.alfresco_server_url')
-        user = self._get_config_param('asi_alfresco_integration.alfresco_username')
-        pwd = self._get_config_param('asi_alfresco_integration.alfresco_password')
+        client = self.env['alfresco.client'].get_client()
         
-        if not all([url, user, pwd, self.alfresco_node_id]):
+        if not client or not self.alfresco_node_id:
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -185,8 +179,8 @@ class AlfrescoFile(models.Model):
             }
         
         try:
-            download_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{self.alfresco_node_id}/content"
-            response = requests.get(download_url, auth=(user, pwd), timeout=30)
+            download_url = f"{client.API_PATH}/nodes/{self.alfresco_node_id}/content"
+            response = client.get(download_url, timeout=30)
             response.raise_for_status()
         
             # Guardar el contenido en el campo binary
@@ -221,16 +215,14 @@ class AlfrescoFile(models.Model):
         """Carga el contenido del PDF para preview en Odoo"""
         self.ensure_one()
         
-        url = self._get_config_param('asi_alfresco_integration.alfresco_server_url')
-        user = self._get_config_param('asi_alfresco_integration.alfresco_username')
-        pwd = self._get_config_param('asi_alfresco_integration.alfresco_password')
+        client = self.env['alfresco.client'].get_client()
         
-        if not all([url, user, pwd, self.alfresco_node_id]):
+        if not client or not self.alfresco_node_id:
             return False
         
         try:
-            download_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{self.alfresco_node_id}/content"
-            response = requests.get(download_url, auth=(user, pwd), timeout=30)
+            download_url = f"{client.API_PATH}/nodes/{self.alfresco_node_id}/content"
+            response = client.get(download_url, timeout=30)
             response.raise_for_status()
             
             # Guardar el contenido en el campo binary
@@ -2,9 +2,9 @@ import collections
 import logging
 import requests
 import base64
+import threading
+import time
 import urllib.parse
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from dateutil import parser as date_parser
 from datetime import timedelta
 
@@ -13,6 +13,21 @@ from odoo.exceptions import UserError
 
 _logger = logging.getLogger(__name__)
 
+# Nodos listados por tanda en el recorrido completo
+SCAN_BATCH_SIZE = 5
+# Nodos comprobados con una sola búsqueda
+CHECK_BATCH_SIZE = 100
+# Entradas por página de la API de búsqueda
+SEARCH_PAGE_SIZE = 500
+# Intentos antes de dejar un elemento de la cola en error
+MAX_QUEUE_ATTEMPTS = 3
+# Segundos de trabajo por ejecución del cron de la cola
+SYNC_BATCH_SECONDS = 240
+# Margen sobre la marca de agua por el retraso del índice de búsqueda
+SYNC_MARGIN_MINUTES = 10
+# Horas entre comprobaciones completas de nodos eliminados
+SYNC_CHECK_HOURS = 24
+
 
 class AlfrescoFolder(models.Model):
     _name = 'alfresco.folder'
@@ -53,55 +68,52 @@ class AlfrescoFolder(models.Model):
             rec.file_count = self.env['alfresco.file'].search_count([('folder_id', '=', rec.id)])
 
     def _get_http_session(self):
-        session = requests.Session()
-        retry_strategy = Retry(
-            total=2,  # Reducido de 3 a 2
-            status_forcelist=[500, 502, 503, 504],
-            allowed_methods=["GET"],
-            backoff_factor=0.5  # Reducido de 1 a 0.5
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
-        return session
+        """Cliente compartido de Alfresco (pool de conexiones y reintentos)"""
+        return self.env['alfresco.client'].get_client(raise_if_missing=True)
 
     @api.model
-    def sync_from_alfresco(self):
-        """Sincronización principal que maneja todo el proceso por lotes"""
+    def sync_from_alfresco(self, full=False):
+        """
+        Sincronización principal, lanzada por el cron cada hora.
+
+        - Sin marca de agua (primera vez) o con `full`: recorrido completo del
+          árbol, repartido en elementos 'scan' de la cola alfresco.sync.queue.
+        - Con marca de agua: solo se piden a la API de búsqueda las carpetas y
+          archivos modificados desde la última sincronización.
+
+        Las carpetas y archivos borrados en Alfresco se detectan con
+        comprobaciones de existencia por lotes encoladas como 'check'.
+        """
         config = self.env['ir.config_parameter'].sudo()
+        Queue = self.env['alfresco.sync.queue'].sudo()
         
         sync_status = config.get_param('asi_alfresco_integration.sync_status', 'idle')
-        if sync_status == 'running':
-            # Verificar si la sincronización lleva demasiado tiempo (más de 2 horas)
-            start_time_str = config.get_param('asi_alfresco_integration.sync_start_time')
-            if start_time_str:
-                try:
-                    start_time = fields.Datetime.from_string(start_time_str)
-                    if (fields.Datetime.now() - start_time).total_seconds() > 7200:  # 2 horas
-                        _logger.warning("[SYNC] Sincronización llevaba más de 2 horas, reiniciando...")
-                        config.set_param('asi_alfresco_integration.sync_status', 'timeout')
-                        # Cancelar crons temporales pendientes
-                        temp_crons = self.env['ir.cron'].sudo().search([
-                            ('name', 'like', 'Alfresco Sync Batch - Temporal'),
-                            ('active', '=', True)
-                        ])
-                        temp_crons.write({'active': False})
-                    else:
-                        _logger.info("[SYNC] Ya hay una sincronización en progreso, saltando...")
-                        return True
-                except:
-                    _logger.warning("[SYNC] Error verificando tiempo de sincronización, continuando...")
-            else:
+        if sync_status in ('running', 'checking'):
+            if Queue.search_count([('state', '=', 'pending')]):
                 _logger.info("[SYNC] Ya hay una sincronización en progreso, saltando...")
                 return True
+            # Sin trabajo pendiente la sincronización anterior quedó colgada
+            _logger.warning("[SYNC] Sincronización en estado '%s' sin trabajo pendiente, reiniciando...", sync_status)
         
         # Marcar sincronización como iniciada
+        start_time = fields.Datetime.now()
         config.set_param('asi_alfresco_integration.sync_status', 'running')
-        config.set_param('asi_alfresco_integration.sync_start_time', fields.Datetime.now().isoformat())
+        config.set_param('asi_alfresco_integration.sync_start_time', start_time.isoformat())
+        Queue.search([]).unlink()
         
         try:
-            # Inicializar la sincronización por lotes
-            self._init_batch_sync()
+            watermark = config.get_param('asi_alfresco_integration.sync_watermark')
+            if watermark and not full:
+                self._sync_incremental(fields.Datetime.from_string(watermark))
+                if self._existence_check_due(start_time):
+                    config.set_param('asi_alfresco_integration.sync_last_check', start_time.isoformat())
+                    if Queue.enqueue_checks(include_files=True):
+                        config.set_param('asi_alfresco_integration.sync_status', 'checking')
+                        self._trigger_sync_queue()
+                        return True
+                self._complete_sync()
+            else:
+                self._init_batch_sync()
             return True
         except Exception as e:
             _logger.error("Error iniciando sincronización: %s", e, exc_info=True)
@@ -110,234 +122,429 @@ class AlfrescoFolder(models.Model):
 
     @api.model
     def _init_batch_sync(self):
-        """Inicializa la sincronización por lotes"""
+        """Inicializa el recorrido completo encolando el nodo raíz"""
+        config = self.env['ir.config_parameter'].sudo()
+        root_node = config.get_param('asi_alfresco_integration.alfresco_repo_id') or '-root-'
+        
+        _logger.info("[SYNC] ***************** Iniciando sincronización completa ********************")
+        
+        self.env['alfresco.sync.queue'].sudo().create({'job_type': 'scan', 'node_id': root_node})
+        self._trigger_sync_queue()
+
+    @api.model
+    def _trigger_sync_queue(self):
+        """Pide al cron de la cola que se ejecute cuanto antes"""
+        cron = self.env.ref('asi_alfresco_integration.ir_cron_process_alfresco_sync_queue', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _existence_check_due(self, now):
+        """Indica si toca volver a comprobar qué nodos siguen existiendo en Alfresco"""
+        config = self.env['ir.config_parameter'].sudo()
+        last_check = config.get_param('asi_alfresco_integration.sync_last_check')
+        hours = int(config.get_param('asi_alfresco_integration.sync_check_hours', SYNC_CHECK_HOURS))
+        return not last_check or now - fields.Datetime.from_string(last_check) >= timedelta(hours=hours)
+
+    # -------------------------------------------------------------------------
+    # Sincronización incremental
+    # -------------------------------------------------------------------------
+
+    @api.model
+    def _sync_incremental(self, watermark):
+        """
+        Crea o actualiza las carpetas y archivos PDF modificados en Alfresco
+        desde `watermark`, con la API de búsqueda en lugar de recorrer el árbol.
+        """
         config = self.env['ir.config_parameter'].sudo()
         root_node = config.get_param('asi_alfresco_integration.alfresco_repo_id') or '-root-'
+        margin = int(config.get_param('asi_alfresco_integration.sync_margin_minutes', SYNC_MARGIN_MINUTES))
+        client = self._get_http_session()
         
-        _logger.info("[SYNC] ***************** Iniciando sincronización por lotes ********************")
+        # Margen de seguridad para cambios que el índice aún no tenía en la última pasada
+        since = (watermark - timedelta(minutes=margin)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        scope = ''
+        if root_node != '-root-':
+            scope = f' AND ANCESTOR:"workspace://SpacesStore/{root_node}"'
         
-        # Limpiar parámetros de lotes anteriores
-        config.set_param('asi_alfresco_integration.batch_queue', '[]')
-        config.set_param('asi_alfresco_integration.batch_processed', '0')
-        config.set_param('asi_alfresco_integration.batch_total', '0')
-        config.set_param('asi_alfresco_integration.fetched_node_ids', '[]')
+        # Los hijos directos de la raíz se guardan sin carpeta padre, igual que en el recorrido completo
+        response = client.get(f"{client.API_PATH}/nodes/{urllib.parse.quote(root_node, safe='')}", timeout=15)
+        response.raise_for_status()
+        root_id = response.json()['entry']['id']
         
-        # Inicializar la cola con el nodo raíz
-        import json
-        initial_queue = [{'node_id': root_node, 'parent_id': False}]
-        config.set_param('asi_alfresco_integration.batch_queue', json.dumps(initial_queue))
+        _logger.info("[SYNC] Sincronización incremental desde %s", since)
         
-        # Programar el primer lote
-        self._schedule_next_batch()
+        folders_data = self._search_modified_nodes(
+            client, f'TYPE:"cm:folder" AND cm:modified:["{since}" TO MAX]{scope}')
+        synced_folders = self._upsert_folders_by_parent(folders_data, root_id)
+        
+        files_data = self._search_modified_nodes(
+            client,
+            f'TYPE:"cm:content" AND (cm:content.mimetype:"application/pdf" OR cm:name:"*.pdf") '
+            f'AND cm:modified:["{since}" TO MAX]{scope}'
+        )
+        synced_files = self._upsert_files_by_parent(files_data)
+        
+        _logger.info("[SYNC] Incremental: %d carpetas y %d archivos modificados", synced_folders, synced_files)
 
     @api.model
-    def _schedule_next_batch(self):
-        """Programa la ejecución del siguiente lote"""
-        cron_vals = {
-            'name': 'Alfresco Sync Batch - Temporal',
-            'model_id': self.env.ref('asi_alfresco_integration.model_alfresco_folder').id,
-            'state': 'code',
-            'code': 'model._process_sync_batch()',
-            'interval_number': 1,
-            'interval_type': 'minutes',
-            'numbercall': 1,  # Solo ejecutar una vez
-            'active': True,
-            'nextcall': fields.Datetime.now() + timedelta(seconds=15),  # Aumentado de 5 a 15 segundos
-            'user_id': self.env.ref('base.user_root').id,
-        }
+    def _search_modified_nodes(self, client, query):
+        """Todas las entradas de una búsqueda, paginando y ordenadas por fecha de modificación"""
+        entries = []
+        skip = 0
+        while True:
+            page = client.search(query, max_items=SEARCH_PAGE_SIZE, skip_count=skip, sort=['cm:modified'], timeout=60)
+            entries.extend(entry['entry'] for entry in page)
+            if len(page) < SEARCH_PAGE_SIZE:
+                return entries
+            skip += SEARCH_PAGE_SIZE
+
+    @api.model
+    def _upsert_folders_by_parent(self, folders_data, root_id):
+        """
+        Crea o actualiza las carpetas recibidas resolviendo su padre por parentId.
+        Una carpeta cuyo padre también llega en la búsqueda se trata después de
+        él; las que cuelgan de carpetas no sincronizadas (p. ej. de System) se omiten.
+        """
+        node_ids = {data['id'] for data in folders_data}
+        node_ids.update(data['parentId'] for data in folders_data if data.get('parentId'))
+        known = {f.node_id: f for f in self.search([('node_id', 'in', list(node_ids))])}
+        
+        synced = self.browse()
+        pending = folders_data
+        while pending:
+            deferred = []
+            for folder_data in pending:
+                parent_node_id = folder_data.get('parentId')
+                if parent_node_id == root_id:
+                    parent = self.browse()
+                elif parent_node_id in known:
+                    parent = known[parent_node_id]
+                else:
+                    deferred.append(folder_data)
+                    continue
+                folder_rec = self._upsert_folder(folder_data, parent, known.get(folder_data['id']))
+                if folder_rec:
+                    known[folder_rec.node_id] = folder_rec
+                    synced |= folder_rec
+            if len(deferred) == len(pending):
+                _logger.info("[SYNC] Omitidas %d carpetas fuera del árbol sincronizado", len(deferred))
+                break
+            pending = deferred
         
-        cron = self.env['ir.cron'].sudo().create(cron_vals)
-        _logger.info("[SYNC] Programado siguiente lote con cron ID: %s", cron.id)
+        synced.write({'last_sync': fields.Datetime.now(), 'sync_status': 'synced'})
+        return len(synced)
 
     @api.model
-    def cleanup_inactive_temp_crons(self):
-        """Método para limpiar crons temporales inactivos - ejecutado por cron de limpieza"""
-        try:
-            temp_crons = self.env['ir.cron'].sudo().search([
-                ('name', '=', 'Alfresco Sync Batch - Temporal'),
-                ('active', '=', False)
-            ])
-            
-            if temp_crons:
-                temp_crons.unlink()
-                _logger.info("[CLEANUP] Eliminados %d crons temporales inactivos", len(temp_crons))
+    def _upsert_files_by_parent(self, files_data):
+        """Crea o actualiza los archivos recibidos en su carpeta (por parentId)"""
+        file_model = self.env['alfresco.file']
+        folder_map = {f.node_id: f for f in self.search([
+            ('node_id', 'in', list({data.get('parentId') for data in files_data}))
+        ])}
+        existing_file_map = {f.alfresco_node_id: f for f in file_model.search([
+            ('alfresco_node_id', 'in', [data['id'] for data in files_data])
+        ])}
+        
+        synced = 0
+        for file_data in files_data:
+            folder_rec = folder_map.get(file_data.get('parentId'))
+            if not folder_rec:
+                continue
+            file_vals = self._prepare_file_vals(file_data, folder_rec)
+            existing_file = existing_file_map.get(file_data['id'])
+            if existing_file:
+                if (existing_file.name != file_vals['name'] or
+                    existing_file.folder_id != folder_rec or
+                    existing_file.file_size != file_vals['file_size'] or
+                    existing_file.modified_at != file_vals['modified_at']):
+                    existing_file.write(file_vals)
             else:
-                _logger.info("[CLEANUP] No se encontraron crons temporales inactivos para eliminar")
-                
-        except Exception as e:
-            _logger.error("[CLEANUP] Error limpiando crons temporales inactivos: %s", e)
+                existing_file_map[file_data['id']] = file_model.create(file_vals)
+            synced += 1
+        return synced
 
     @api.model
-    def _process_sync_batch(self):
-        """Procesa un lote de la sincronización"""
-        from datetime import timedelta
-        import json
+    def _prepare_file_vals(self, file_data, folder_rec):
+        raw_date = file_data.get('modifiedAt')
+        parsed_modified = date_parser.parse(raw_date).replace(tzinfo=None) if raw_date else False
+        return {
+            'name': file_data['name'],
+            'folder_id': folder_rec.id,
+            'alfresco_node_id': file_data['id'],
+            'mime_type': file_data.get('content', {}).get('mimeType', ''),
+            'file_size': file_data.get('content', {}).get('sizeInBytes', 0),
+            'modified_at': parsed_modified,
+        }
+
+    @api.model
+    def _upsert_folder(self, folder_data, parent, folder_rec):
+        """
+        Crea o actualiza la carpeta recibida de Alfresco bajo `parent`.
+        Devuelve None si la carpeta se omite por haber sido creada por System.
+        """
+        nid = folder_data['id']
+        created_by = folder_data.get('createdByUser', {}).get('id', '')
+        folder_name = folder_data.get('properties', {}).get('cm:title', '')
+        if created_by == 'System' and folder_name != 'Sites':
+            _logger.info("[SYNC] Omitiendo carpeta creada por System: %s (node_id: %s)", folder_data['name'], nid)
+            return None
         
+        raw_date = folder_data.get('modifiedAt')
+        parsed_modified = date_parser.parse(raw_date).replace(tzinfo=None) if raw_date else False
+        
+        if not folder_rec:
+            folder_rec = self.create({
+                'name': folder_data['name'],
+                'node_id': nid,
+                'parent_id': parent.id,
+                'external_modified': parsed_modified,
+                'sync_status': 'synced',
+                'created_by': created_by,  # Almacenar el creador
+            })
+            _logger.info("[SYNC] Nueva carpeta creada: %s (node_id: %s, creada por: %s)", folder_data['name'], nid, created_by)
+        elif (folder_rec.name != folder_data['name'] or
+              folder_rec.parent_id != parent or
+              folder_rec.external_modified != parsed_modified or
+              folder_rec.created_by != created_by):
+            folder_rec.write({
+                'name': folder_data['name'],
+                'parent_id': parent.id,
+                'external_modified': parsed_modified,
+                'created_by': created_by,
+            })
+            _logger.info("[SYNC] Carpeta actualizada: %s (node_id: %s)", folder_data['name'], nid)
+        return folder_rec
+
+    # -------------------------------------------------------------------------
+    # Cola de sincronización
+    # -------------------------------------------------------------------------
+
+    @api.model
+    def _process_sync_queue(self):
+        """
+        Procesa la cola alfresco.sync.queue hasta vaciarla o agotar el tiempo
+        del lote, confirmando la transacción tras cada tanda. Lo ejecuta el cron
+        'Alfresco: procesar cola de sincronización'.
+        """
         config = self.env['ir.config_parameter'].sudo()
+        Queue = self.env['alfresco.sync.queue'].sudo()
         
         # Verificar si la sincronización sigue activa
         sync_status = config.get_param('asi_alfresco_integration.sync_status', 'idle')
-        if sync_status != 'running':
-            _logger.info("[SYNC] Sincronización no está activa, terminando lote")
+        if sync_status not in ('running', 'checking'):
             return
         
-        # Obtener configuración de Alfresco
-        url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-        user = config.get_param('asi_alfresco_integration.alfresco_username')
-        pwd = config.get_param('asi_alfresco_integration.alfresco_password')
-        
-        if not all([url, user, pwd]):
+        # Cliente compartido de Alfresco
+        client = self.env['alfresco.client'].get_client()
+        if not client:
             _logger.error("[SYNC] Configuración de Alfresco incompleta")
             config.set_param('asi_alfresco_integration.sync_status', 'error')
             return
         
-        # Obtener cola de trabajo
-        try:
-            queue_json = config.get_param('asi_alfresco_integration.batch_queue', '[]')
-            queue = json.loads(queue_json)
-            fetched_ids_json = config.get_param('asi_alfresco_integration.fetched_node_ids', '[]')
-            fetched_node_ids = set(json.loads(fetched_ids_json))
-        except json.JSONDecodeError:
-            _logger.error("[SYNC] Error decodificando cola de trabajo")
-            config.set_param('asi_alfresco_integration.sync_status', 'error')
-            return
+        max_seconds = int(config.get_param('asi_alfresco_integration.sync_batch_seconds', SYNC_BATCH_SECONDS))
+        deadline = time.monotonic() + max_seconds
+        testing = getattr(threading.current_thread(), 'testing', False)
         
-        if not queue:
-            # No hay más trabajo, finalizar sincronización
-            self._finalize_sync(fetched_node_ids)
-            return
+        while time.monotonic() < deadline:
+            items = Queue.claim('scan', SCAN_BATCH_SIZE)
+            if items:
+                for item in items:
+                    try:
+                        with self.env.cr.savepoint():
+                            self._process_scan_item(item, client)
+                            item.unlink()
+                    except Exception as e:
+                        _logger.error("[SYNC] Error procesando nodo %s: %s", item.node_id, e)
+                        item.mark_failed(e, MAX_QUEUE_ATTEMPTS)
+            else:
+                items = Queue.claim('check', CHECK_BATCH_SIZE)
+                if not items:
+                    break
+                try:
+                    with self.env.cr.savepoint():
+                        self._process_check_items(items)
+                        # Los elementos de nodos eliminados ya se borraron en cascada
+                        items.exists().unlink()
+                except Exception as e:
+                    _logger.error("[SYNC] Error comprobando %d nodos: %s", len(items), e)
+                    items.mark_failed(e, MAX_QUEUE_ATTEMPTS)
+            if not testing:
+                self.env.cr.commit()
         
-        batch_size = 5  # Reducido de 10 a 5
-        current_batch = queue[:batch_size]
-        remaining_queue = queue[batch_size:]
+        pending = Queue.search_count([('state', '=', 'pending')])
+        if pending:
+            _logger.info("[SYNC] Quedan %d elementos en cola", pending)
+            self._trigger_sync_queue()
+        else:
+            self._finalize_sync()
+
+    @api.model
+    def _process_scan_item(self, item, client):
+        """Lista las subcarpetas del nodo, las crea o actualiza, sincroniza sus archivos y las encola"""
+        folders = self._fetch_folder_batch(client, item.node_id)
+        if folders is None:
+            raise UserError(_("No se pudieron obtener las subcarpetas del nodo %s") % item.node_id)
         
-        _logger.info("[SYNC] Procesando lote de %d carpetas. Quedan %d en cola", len(current_batch), len(remaining_queue))
+        folder_map = {f.node_id: f for f in self.search([('node_id', 'in', [f['id'] for f in folders])])}
+        parent = item.folder_id
+        synced = self.browse()
         
-        auth = (user, pwd)
-        session = self._get_http_session()
+        for folder_data in folders:
+            folder_rec = self._upsert_folder(folder_data, parent, folder_map.get(folder_data['id']))
+            if not folder_rec:
+                continue
+            synced |= folder_rec
+            
+            # Sincronizar archivos de esta carpeta
+            try:
+                self._sync_folder_files_only(folder_rec, client)
+            except Exception as e:
+                _logger.error("[SYNC] Error sincronizando archivos de %s: %s", folder_rec.name, e)
+        
+        synced.write({'last_sync': fields.Datetime.now()})
+        
+        # Agregar subcarpetas a la cola
+        self.env['alfresco.sync.queue'].sudo().create([
+            {'job_type': 'scan', 'node_id': folder_rec.node_id, 'folder_id': folder_rec.id}
+            for folder_rec in synced
+        ])
+
+    @api.model
+    def _process_check_items(self, items):
+        """
+        Comprueba por lotes si las carpetas y archivos de la cola
+        siguen existiendo en Alfresco, y elimina de Odoo los que ya no existen.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        margin = int(config.get_param('asi_alfresco_integration.sync_margin_minutes', SYNC_MARGIN_MINUTES))
+        existing_ids = self._find_existing_node_ids(items.mapped('node_id'))
+        
+        # Los nodos recién creados pueden no estar aún en el índice de búsqueda
+        recent = fields.Datetime.now() - timedelta(minutes=margin)
+    
+        def is_settled(item):
+            record = item.folder_id or item.file_id
+            return bool(record) and record.create_date < recent
+    
+        found = items.filtered(lambda item: item.node_id in existing_ids)
+        missing = (items - found).filtered(is_settled)
+        
+        found.folder_id.write({'last_sync': fields.Datetime.now(), 'sync_status': 'synced'})
+        
+        missing_files = missing.file_id
+        if missing_files:
+            _logger.warning("[SYNC] Eliminados %d archivos que ya no existen en Alfresco", len(missing_files))
+            missing_files.unlink()
+        missing_folders = missing.folder_id
+        if missing_folders:
+            _logger.warning("[SYNC] Eliminadas %d carpetas que ya no existen en Alfresco: %s",
+                            len(missing_folders), ', '.join(missing_folders.mapped('name')[:20]))
+            # Los archivos se eliminan en cascada con la carpeta
+            missing_folders.unlink()
+
+    @api.model
+    def _find_existing_node_ids(self, node_ids):
+        """
+        Devuelve los node_id que siguen existiendo en Alfresco. Una búsqueda por
+        cada CHECK_BATCH_SIZE nodos descarta los que están indexados; como el
+        índice puede ir con retraso, los no encontrados se confirman con una
+        petición al nodo y solo un 404 cuenta como eliminado.
+        """
+        client = self._get_http_session()
+        node_ids = list(node_ids)
+        existing = set()
+        for start in range(0, len(node_ids), CHECK_BATCH_SIZE):
+            chunk = node_ids[start:start + CHECK_BATCH_SIZE]
+            query = ' OR '.join(f'ID:"workspace://SpacesStore/{node_id}"' for node_id in chunk)
+            entries = client.search(query, max_items=len(chunk), timeout=60)
+            existing.update(entry['entry']['id'] for entry in entries)
+        candidates = [node_id for node_id in node_ids if node_id not in existing]
+        deleted = self._confirm_deleted_node_ids(client, candidates)
+        existing.update(node_id for node_id in candidates if node_id not in deleted)
+        return existing
+
+    @api.model
+    def _confirm_deleted_node_ids(self, client, node_ids):
+        """
+        Devuelve los node_id cuyo GET responde 404. Cualquier otra respuesta o
+        error de red deja el nodo como existente: ante la duda no se elimina.
+        """
+        def is_deleted(node_id):
+            try:
+                response = client.get(
+                    f"{client.API_PATH}/nodes/{urllib.parse.quote(node_id, safe='')}", timeout=15)
+            except requests.exceptions.RequestException as e:
+                _logger.warning("[SYNC] No se pudo comprobar el nodo %s: %s", node_id, e)
+                return False
+            return response.status_code == 404
+
+        node_ids = list(node_ids)
+        return {node_id for node_id, deleted in zip(node_ids, client.map(is_deleted, node_ids)) if deleted}
+
+    @api.model
+    def _finalize_sync(self):
+        """
+        Cierra la fase actual de la sincronización. Al terminar el recorrido
+        completo se encolan las comprobaciones de las carpetas que no aparecieron;
+        al terminar las comprobaciones la sincronización queda completada.
+        """
+        config = self.env['ir.config_parameter'].sudo()
         
         try:
-            existing_folders = self.search([])
-            folder_map = {f.node_id: f for f in existing_folders}
-            
-            for item in current_batch:
-                node_id = item['node_id']
-                parent_id = item['parent_id']
-                
-                # Buscar carpeta padre si existe
-                parent = None
-                if parent_id:
-                    parent = self.browse(parent_id)
-                    if not parent.exists():
-                        parent = None
-                
-                # Obtener subcarpetas de este nodo
-                folders = self._fetch_folder_batch(session, url, auth, node_id)
-                
-                if folders is None:
-                    continue
-                
-                for folder_data in folders:
-                    nid = folder_data['id']
-                    fetched_node_ids.add(nid)
-                    
-                    created_by = folder_data.get('createdByUser', {}).get('id', '')
-                    folder_name = folder_data.get('properties', {}).get('cm:title', '')
-                    if created_by == 'System' and folder_name != 'Sites':
-                        _logger.info("[SYNC] Omitiendo carpeta creada por System: %s (node_id: %s)", folder_data['name'], nid)
-                        continue
-                    
-                    raw_date = folder_data.get('modifiedAt')
-                    parsed_modified = date_parser.parse(raw_date).replace(tzinfo=None) if raw_date else False
-                    
-                    folder_rec = folder_map.get(nid)
-                    if not folder_rec:
-                        folder_rec = self.create({
-                            'name': folder_data['name'],
-                            'node_id': nid,
-                            'parent_id': parent.id if parent else False,
-                            'external_modified': parsed_modified,
-                            'sync_status': 'synced',
-                            'created_by': created_by,  # Almacenar el creador
-                        })
-                        folder_map[nid] = folder_rec
-                        _logger.info("[SYNC] Nueva carpeta creada: %s (node_id: %s, creada por: %s)", folder_data['name'], nid, created_by)
-                    else:
-                        # Actualizar si es necesario
-                        if (folder_rec.name != folder_data['name'] or
-                            folder_rec.parent_id != (parent if parent else False) or
-                            folder_rec.external_modified != parsed_modified or
-                            folder_rec.created_by != created_by):
-                            folder_rec.write({
-                                'name': folder_data['name'],
-                                'parent_id': parent.id if parent else False,
-                                'external_modified': parsed_modified,
-                                'created_by': created_by,
-                            })
-                            _logger.info("[SYNC] Carpeta actualizada: %s (node_id: %s)", folder_data['name'], nid)
-                    
-                    folder_rec.last_sync = fields.Datetime.now()
-                    
-                    # Agregar subcarpetas a la cola
-                    remaining_queue.append({'node_id': nid, 'parent_id': folder_rec.id})
-                    
-                    # Sincronizar archivos de esta carpeta
-                    try:
-                        self._sync_folder_files_only(folder_rec, url, auth)
-                    except Exception as e:
-                        _logger.error("[SYNC] Error sincronizando archivos de %s: %s", folder_rec.name, e)
-            
-            # Actualizar progreso
-            processed = int(config.get_param('asi_alfresco_integration.batch_processed', '0'))
-            processed += len(current_batch)
-            config.set_param('asi_alfresco_integration.batch_processed', str(processed))
-            
-            # Guardar estado actualizado
-            config.set_param('asi_alfresco_integration.batch_queue', json.dumps(remaining_queue))
-            config.set_param('asi_alfresco_integration.fetched_node_ids', json.dumps(list(fetched_node_ids)))
-            
-            # Programar siguiente lote si hay más trabajo
-            if remaining_queue:
-                self._schedule_next_batch()
-            else:
-                # Finalizar sincronización
-                self._finalize_sync(fetched_node_ids)
-                
+            if config.get_param('asi_alfresco_integration.sync_status') == 'running':
+                start_time = config.get_param('asi_alfresco_integration.sync_start_time')
+                config.set_param('asi_alfresco_integration.sync_last_check', start_time)
+                missing = self.env['alfresco.sync.queue'].sudo().enqueue_checks(
+                    'last_sync IS NULL OR last_sync < %s', (fields.Datetime.from_string(start_time),))
+                if missing:
+                    _logger.info("[SYNC] Verificando %d carpetas que no fueron encontradas en el recorrido", missing)
+                    config.set_param('asi_alfresco_integration.sync_status', 'checking')
+                    self._trigger_sync_queue()
+                    return
+            self._complete_sync()
         except Exception as e:
-            _logger.error("[SYNC] Error procesando lote: %s", e, exc_info=True)
+            _logger.error("[SYNC] Error finalizando sincronización: %s", e, exc_info=True)
             config.set_param('asi_alfresco_integration.sync_status', 'error')
-        finally:
-            session.close()
 
     @api.model
-    def _finalize_sync(self, fetched_node_ids):
-        """Finaliza la sincronización limpiando carpetas faltantes"""
-        import json
-        
+    def _complete_sync(self):
+        """Marca la sincronización como completada y avanza la marca de agua"""
         config = self.env['ir.config_parameter'].sudo()
         
-        _logger.info("[SYNC] Finalizando sincronización. Total nodos procesados: %d", len(fetched_node_ids))
+        # La marca de agua es la última modificación vista en Alfresco, no el
+        # reloj de Odoo, para no depender de que ambos servidores estén en hora
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT GREATEST((SELECT MAX(external_modified) FROM alfresco_folder),
+                            (SELECT MAX(modified_at) FROM alfresco_file))
+        """)
+        watermark = self.env.cr.fetchone()[0]
+        if watermark:
+            config.set_param('asi_alfresco_integration.sync_watermark', fields.Datetime.to_string(watermark))
         
+        config.set_param('asi_alfresco_integration.sync_status', 'completed')
+        config.set_param('asi_alfresco_integration.sync_end_time', fields.Datetime.now().isoformat())
+        
+        _logger.info("[SYNC] ***************** Sincronización completada exitosamente ********************")
+
+    @api.model
+    def cleanup_inactive_temp_crons(self):
+        """Método para limpiar crons temporales inactivos - ejecutado por cron de limpieza"""
         try:
-            # Limpiar carpetas faltantes
-            existing_folders = self.search([])
-            folder_map = {f.node_id: f for f in existing_folders}
-            self._clean_missing_folders(fetched_node_ids, folder_map)
-            
-            # Marcar sincronización como completada
-            config.set_param('asi_alfresco_integration.sync_status', 'completed')
-            config.set_param('asi_alfresco_integration.sync_end_time', fields.Datetime.now().isoformat())
-            
-            # Limpiar parámetros temporales
-            config.set_param('asi_alfresco_integration.batch_queue', '[]')
-            config.set_param('asi_alfresco_integration.fetched_node_ids', '[]')
-            
-            _logger.info("[SYNC] ***************** Sincronización completada exitosamente ********************")
-            
+            temp_crons = self.env['ir.cron'].sudo().search([
+                ('name', '=', 'Alfresco Sync Batch - Temporal'),
+                ('active', '=', False)
+            ])
             
+            if temp_crons:
+                temp_crons.unlink()
+                _logger.info("[CLEANUP] Eliminados %d crons temporales inactivos", len(temp_crons))
+            else:
+                _logger.info("[CLEANUP] No se encontraron crons temporales inactivos para eliminar")
+                
         except Exception as e:
-            _logger.error("[SYNC] Error finalizando sincronización: %s", e, exc_info=True)
-            config.set_param('asi_alfresco_integration.sync_status', 'error')
+            _logger.error("[CLEANUP] Error limpiando crons temporales inactivos: %s", e)
 
     @api.model
     def _cleanup_temp_crons(self):
@@ -360,25 +567,14 @@ class AlfrescoFolder(models.Model):
     def get_sync_status(self):
         """Obtiene el estado actual de la sincronización"""
         config = self.env['ir.config_parameter'].sudo()
-        
-        status = config.get_param('asi_alfresco_integration.sync_status', 'idle')
-        processed = int(config.get_param('asi_alfresco_integration.batch_processed', '0'))
-        start_time = config.get_param('asi_alfresco_integration.sync_start_time')
-        
-        if status == 'running' and start_time:
-            try:
-                start_dt = fields.Datetime.from_string(start_time)
-                elapsed_hours = (fields.Datetime.now() - start_dt).total_seconds() / 3600
-                if elapsed_hours > 2:  # Más de 2 horas
-                    status = 'timeout'
-                    config.set_param('asi_alfresco_integration.sync_status', 'timeout')
-            except:
-                pass
+        Queue = self.env['alfresco.sync.queue'].sudo()
         
         return {
-            'status': status,
-            'processed': processed,
-            'start_time': start_time,
+            'status': config.get_param('asi_alfresco_integration.sync_status', 'idle'),
+            'pending': Queue.search_count([('state', '=', 'pending')]),
+            'errors': Queue.search_count([('state', '=', 'error')]),
+            'start_time': config.get_param('asi_alfresco_integration.sync_start_time'),
+            'watermark': config.get_param('asi_alfresco_integration.sync_watermark'),
         }
 
     @api.model
@@ -387,15 +583,9 @@ class AlfrescoFolder(models.Model):
         config = self.env['ir.config_parameter'].sudo()
         config.set_param('asi_alfresco_integration.sync_status', 'stopped')
         
-        temp_crons = self.env['ir.cron'].sudo().search([
-            ('name', '=', 'Alfresco Sync Batch - Temporal'),
-            ('active', '=', True)
-        ])
-        if temp_crons:
-            temp_crons.write({'active': False})
-            _logger.info("[SYNC] Desactivados %d crons temporales", len(temp_crons))
-        
-        _logger.info("[SYNC] Sincronización detenida manualmente")
+        pending = self.env['alfresco.sync.queue'].sudo().search([('state', '=', 'pending')])
+        pending.unlink()
+        _logger.info("[SYNC] Sincronización detenida manualmente (%d elementos descartados)", len(pending))
         
         return {
             'type': 'ir.actions.client',
@@ -411,19 +601,9 @@ class AlfrescoFolder(models.Model):
         """Reinicia el estado de sincronización si está colgado"""
         config = self.env['ir.config_parameter'].sudo()
         
-        temp_crons = self.env['ir.cron'].sudo().search([
-            ('name', '=', 'Alfresco Sync Batch - Temporal'),
-            ('active', '=', True)
-        ])
-        if temp_crons:
-            temp_crons.write({'active': False})
-            _logger.info("[SYNC] Desactivados %d crons temporales durante reset", len(temp_crons))
-        
-        # Limpiar parámetros de sincronización
+        # Limpiar la cola y el estado de sincronización
+        self.env['alfresco.sync.queue'].sudo().search([]).unlink()
         config.set_param('asi_alfresco_integration.sync_status', 'idle')
-        config.set_param('asi_alfresco_integration.batch_queue', '[]')
-        config.set_param('asi_alfresco_integration.fetched_node_ids', '[]')
-        config.set_param('asi_alfresco_integration.batch_processed', '0')
         
         _logger.info("[SYNC] Estado de sincronización reiniciado")
         
@@ -436,14 +616,14 @@ class AlfrescoFolder(models.Model):
             }
         }
 
-    def _fetch_folder_batch(self, session, base_url, auth, node_id):
+    def _fetch_folder_batch(self, client, node_id):
         all_folders = []
         skip = 0
         max_items = 1000  # Aumentado significativamente para reducir llamadas API
 
         while True:
             encoded_node_id = urllib.parse.quote(node_id, safe='')
-            url = f"{base_url.rstrip('/')}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{encoded_node_id}/children"
+            url = f"{client.API_PATH}/nodes/{encoded_node_id}/children"
             params = {
                 'skipCount': skip,
                 'maxItems': max_items,
@@ -452,12 +632,12 @@ class AlfrescoFolder(models.Model):
             }
 
             try:
-                resp = session.get(url, auth=auth, params=params, timeout=15, headers={'Accept': 'application/json'})
+                resp = client.get(url, params=params, timeout=15, headers={'Accept': 'application/json'})
 
                 if resp.status_code == 400 and node_id == '-root-':
                     _logger.warning("Fallo acceso público a '-root-', probando endpoint privado")
                     private_url = url.replace('/public/', '/private/')
-                    resp = session.get(private_url, auth=auth, params=params, timeout=15)
+                    resp = client.get(private_url, params=params, timeout=15)
                     resp.raise_for_status()
                 else:
                     resp.raise_for_status()
@@ -496,82 +676,15 @@ class AlfrescoFolder(models.Model):
         _logger.info("[SYNC] Total de carpetas obtenidas del nodo %s: %d", node_id, len(all_folders))
         return all_folders
 
-    def _clean_missing_folders(self, fetched_ids, folder_map):
-        """
-        NUEVO: Solo elimina carpetas que definitivamente no existen en Alfresco
-        Las carpetas persisten una vez sincronizadas, solo se eliminan si no se encuentran
-        """
-        missing_ids = set(folder_map.keys()) - fetched_ids
-        if not missing_ids:
-            _logger.info("[SYNC] Todas las carpetas sincronizadas siguen existiendo en Alfresco")
-            return
-
-        _logger.info("[SYNC] Verificando %d carpetas que no fueron encontradas en la sincronización actual", len(missing_ids))
-        
-        # Verificar individualmente cada carpeta "faltante" antes de eliminarla
-        config = self.env['ir.config_parameter'].sudo()
-        url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-        user = config.get_param('asi_alfresco_integration.alfresco_username')
-        pwd = config.get_param('asi_alfresco_integration.alfresco_password')
-        
-        confirmed_missing = []
-        
-        for node_id in missing_ids:
-            folder_rec = folder_map[node_id]
-            try:
-                # Verificar directamente si la carpeta existe en Alfresco
-                check_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}"
-                response = requests.get(check_url, auth=(user, pwd), timeout=10)
-                
-                if response.status_code == 404:
-                    # La carpeta definitivamente no existe
-                    confirmed_missing.append(node_id)
-                    _logger.warning("[SYNC] Carpeta confirmada como eliminada en Alfresco: %s (node_id: %s)", folder_rec.name, node_id)
-                elif response.status_code == 200:
-                    # La carpeta existe pero no fue encontrada en la sincronización (posible cambio de ubicación)
-                    _logger.info("[SYNC] Carpeta existe en Alfresco pero cambió de ubicación: %s (node_id: %s)", folder_rec.name, node_id)
-                    # Actualizar last_sync para indicar que sigue existiendo
-                    folder_rec.last_sync = fields.Datetime.now()
-                    folder_rec.sync_status = 'synced'
-                else:
-                    _logger.warning("[SYNC] No se pudo verificar el estado de la carpeta %s: HTTP %s", folder_rec.name, response.status_code)
-                    
-            except Exception as e:
-                _logger.error("[SYNC] Error verificando carpeta %s: %s", folder_rec.name, e)
-                folder_rec.sync_status = 'error'
-        
-        # Solo eliminar las carpetas confirmadas como faltantes
-        if confirmed_missing:
-            folders_to_delete = self.env['alfresco.folder'].browse(
-                [folder_map[nid].id for nid in confirmed_missing]
-            )
-            
-            # Eliminar archivos asociados antes de eliminar las carpetas
-            file_model = self.env['alfresco.file']
-            for folder in folders_to_delete:
-                files = file_model.search([('folder_id', '=', folder.id)])
-                if files:
-                    files.unlink()
-                    _logger.info("[SYNC] Eliminados %d archivos de la carpeta %s", len(files), folder.name)
-            
-            folders_to_delete.unlink()
-            _logger.info("[SYNC] Eliminadas %d carpetas confirmadas como faltantes en Alfresco", len(folders_to_delete))
-        else:
-            _logger.info("[SYNC] No se eliminaron carpetas - todas siguen existiendo en Alfresco")
-
     def _sync_folder_content(self):
         """Sincroniza tanto subcarpetas como archivos de esta carpeta"""
-        config = self.env['ir.config_parameter'].sudo()
-        url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-        user = config.get_param('asi_alfresco_integration.alfresco_username')
-        pwd = config.get_param('asi_alfresco_integration.alfresco_password')
-        
-        if not all([url, user, pwd]):
+        client = self.env['alfresco.client'].get_client()
+        if not client:
             return
         
         try:
             # Sincronizar subcarpetas
-            folders_data = self._fetch_folder_batch(self._get_http_session(), url, (user, pwd), self.node_id)
+            folders_data = self._fetch_folder_batch(client, self.node_id)
             existing_subfolders_in_odoo = self.search([('parent_id', '=', self.id)])
             existing_subfolder_map = {f.node_id: f for f in existing_subfolders_in_odoo}
             fetched_subfolder_node_ids = set()
@@ -605,29 +718,29 @@ class AlfrescoFolder(models.Model):
                         existing.last_sync = fields.Datetime.now()
                         existing.sync_status = 'synced'
             
-            # CAMBIO: Verificar individualmente subcarpetas faltantes
+            # Verificar por lotes las subcarpetas faltantes
             missing_subfolder_ids = set(existing_subfolder_map.keys()) - fetched_subfolder_node_ids
             if missing_subfolder_ids:
                 _logger.info("[SYNC] Verificando %d subcarpetas faltantes en %s", len(missing_subfolder_ids), self.name)
                 
-                confirmed_missing_subfolders = []
-                for node_id in missing_subfolder_ids:
-                    try:
-                        check_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}"
-                        response = requests.get(check_url, auth=(user, pwd), timeout=10)
-                        
-                        if response.status_code == 404:
-                            confirmed_missing_subfolders.append(node_id)
-                            _logger.warning("[SYNC] Subcarpeta confirmada como eliminada: %s", existing_subfolder_map[node_id].name)
-                        elif response.status_code == 200:
-                            _logger.info("[SYNC] Subcarpeta existe pero cambió de ubicación: %s", existing_subfolder_map[node_id].name)
-                            existing_subfolder_map[node_id].last_sync = fields.Datetime.now()
-                            existing_subfolder_map[node_id].sync_status = 'synced'
-                            
-                    except Exception as e:
-                        _logger.error("[SYNC] Error verificando subcarpeta: %s", e)
+                # Búsqueda por lote; solo las no indexadas se confirman nodo a nodo
+                try:
+                    still_existing = self._find_existing_node_ids(missing_subfolder_ids)
+                except Exception as e:
+                    _logger.error("[SYNC] Error verificando subcarpetas: %s", e)
+                    still_existing = set(missing_subfolder_ids)
+                    for node_id in missing_subfolder_ids:
                         existing_subfolder_map[node_id].sync_status = 'error'
                 
+                confirmed_missing_subfolders = list(set(missing_subfolder_ids) - still_existing)
+                for node_id in confirmed_missing_subfolders:
+                    _logger.warning("[SYNC] Subcarpeta confirmada como eliminada: %s", existing_subfolder_map[node_id].name)
+                moved = self.browse([existing_subfolder_map[node_id].id for node_id in still_existing
+                                     if existing_subfolder_map[node_id].sync_status != 'error'])
+                if moved:
+                    _logger.info("[SYNC] %d subcarpetas existen pero cambiaron de ubicación", len(moved))
+                    moved.write({'last_sync': fields.Datetime.now(), 'sync_status': 'synced'})
+                
                 if confirmed_missing_subfolders:
                     subfolders_to_delete = self.search([
                         ('parent_id', '=', self.id),
@@ -644,7 +757,7 @@ class AlfrescoFolder(models.Model):
                     _logger.info("[SYNC] Eliminadas %d subcarpetas confirmadas como faltantes de %s", len(subfolders_to_delete), self.name)
 
             # Sincronizar archivos PDF (mantener lógica similar)
-            files_data = self._fetch_folder_files(url, (user, pwd), self.node_id)
+            files_data = self._fetch_folder_files(client, self.node_id)
             file_model = self.env['alfresco.file']
             
             existing_files_in_odoo = file_model.search([('folder_id', '=', self.id)])
@@ -677,24 +790,20 @@ class AlfrescoFolder(models.Model):
                 else:
                     file_model.create(file_vals)
             
-            # Verificar archivos faltantes individualmente
+            # Verificar por lotes los archivos faltantes
             missing_file_ids = set(existing_file_map.keys()) - fetched_file_node_ids
             if missing_file_ids:
                 _logger.info("[SYNC] Verificando %d archivos faltantes en %s", len(missing_file_ids), self.name)
                 
-                confirmed_missing_files = []
-                for node_id in missing_file_ids:
-                    try:
-                        check_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}"
-                        response = requests.get(check_url, auth=(user, pwd), timeout=10)
-                        
-                        if response.status_code == 404:
-                            confirmed_missing_files.append(node_id)
-                            _logger.warning("[SYNC] Archivo confirmado como eliminado: %s", existing_file_map[node_id].name)
-                            
-                    except Exception as e:
-                        _logger.error("[SYNC] Error verificando archivo: %s", e)
-                        existing_file_map[node_id].sync_status = 'error' # Assuming alfresco.file has sync_status
+                try:
+                    still_existing = self._find_existing_node_ids(missing_file_ids)
+                except Exception as e:
+                    _logger.error("[SYNC] Error verificando archivos: %s", e)
+                    still_existing = set(missing_file_ids)
+                
+                confirmed_missing_files = list(set(missing_file_ids) - still_existing)
+                for node_id in confirmed_missing_files:
+                    _logger.warning("[SYNC] Archivo confirmado como eliminado: %s", existing_file_map[node_id].name)
                 
                 if confirmed_missing_files:
                     files_to_delete = file_model.search([
@@ -711,10 +820,10 @@ class AlfrescoFolder(models.Model):
             _logger.error("Error sincronizando contenido de carpeta %s: %s", self.name, e)
             self.sync_status = 'error'
 
-    def _sync_folder_files_only(self, folder_rec, url, auth):
+    def _sync_folder_files_only(self, folder_rec, client):
         """Sincroniza solo los archivos de una carpeta específica, usado en la sincronización global."""
         try:
-            files_data = self._fetch_folder_files(url, auth, folder_rec.node_id)
+            files_data = self._fetch_folder_files(client, folder_rec.node_id)
             file_model = self.env['alfresco.file']
             
             existing_files_in_odoo = file_model.search([('folder_id', '=', folder_rec.id)])
@@ -762,12 +871,11 @@ class AlfrescoFolder(models.Model):
             _logger.error("Error sincronizando archivos de carpeta %s durante sync global: %s", folder_rec.name, e)
             folder_rec.sync_status = 'error'
 
-    def _fetch_folder_files(self, base_url, auth, node_id):
+    def _fetch_folder_files(self, client, node_id):
         """Obtiene archivos PDF de un nodo específico en Alfresco - OPTIMIZADO"""
-        session = self._get_http_session()
         try:
             encoded_node_id = urllib.parse.quote(node_id, safe='')
-            url = f"{base_url.rstrip('/')}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{encoded_node_id}/children"
+            url = f"{client.API_PATH}/nodes/{encoded_node_id}/children"
             
             all_files = []
             skip = 0
@@ -780,12 +888,12 @@ class AlfrescoFolder(models.Model):
                     'where': '(isFile=true)'
                 }
                 
-                resp = session.get(url, auth=auth, params=params, timeout=15)
+                resp = client.get(url, params=params, timeout=15)
                 
                 # Si falla con público, probar privado
                 if resp.status_code == 400:
                     private_url = url.replace('/public/', '/private/')
-                    resp = session.get(private_url, auth=auth, params=params, timeout=15)
+                    resp = client.get(private_url, params=params, timeout=15)
                 
                 resp.raise_for_status()
                 
@@ -820,8 +928,6 @@ class AlfrescoFolder(models.Model):
         except Exception as e:
             _logger.error("Error obteniendo archivos del nodo %s: %s", node_id, e)
             return []
-        finally:
-            session.close()
 
     def action_view_content(self):
         """Ver contenido de esta carpeta (subcarpetas y archivos)"""
@@ -905,12 +1011,9 @@ class AlfrescoFolder(models.Model):
         """
         self.ensure_one()
         
-        config = self.env['ir.config_parameter'].sudo()
-        url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-        user = config.get_param('asi_alfresco_integration.alfresco_username')
-        pwd = config.get_param('asi_alfresco_integration.alfresco_password')
+        client = self.env['alfresco.client'].get_client()
         
-        if not all([url, user, pwd, self.node_id]):
+        if not client or not self.node_id:
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -933,8 +1036,8 @@ class AlfrescoFolder(models.Model):
         
         try:
             # Eliminar carpeta de Alfresco usando la API REST
-            delete_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{self.node_id}"
-            response = requests.delete(delete_url, auth=(user, pwd), timeout=30)
+            delete_url = f"{client.API_PATH}/nodes/{self.node_id}"
+            response = client.delete(delete_url, timeout=30)
             
             if response.status_code == 200:
                 _logger.info(f"Carpeta {self.name} eliminada exitosamente de Alfresco")
@@ -978,12 +1081,9 @@ class AlfrescoFolder(models.Model):
         """Forzar sincronización de una carpeta específica, incluso si parece faltante"""
         self.ensure_one()
         
-        config = self.env['ir.config_parameter'].sudo()
-        url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-        user = config.get_param('asi_alfresco_integration.alfresco_username')
-        pwd = config.get_param('asi_alfresco_integration.alfresco_password')
+        client = self.env['alfresco.client'].get_client()
         
-        if not all([url, user, pwd]):
+        if not client:
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -995,8 +1095,8 @@ class AlfrescoFolder(models.Model):
         
         try:
             # Verificar si la carpeta existe en Alfresco
-            check_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{self.node_id}"
-            response = requests.get(check_url, auth=(user, pwd), timeout=10)
+            check_url = f"{client.API_PATH}/nodes/{self.node_id}"
+            response = client.get(check_url, timeout=10)
             
             if response.status_code == 200:
                 # La carpeta existe, sincronizar su contenido
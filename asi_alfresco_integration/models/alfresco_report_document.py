@@ -0,0 +1,53 @@
+import hashlib
+import logging
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+class AlfrescoReportDocument(models.Model):
+    """
+    Índice de los PDFs de reportes archivados en Alfresco, uno por (reporte, registro).
+    Guarda el hash del contenido subido y el nodo de Alfresco, de forma que un
+    documento que no cambió no se vuelve a buscar, descargar ni comparar.
+    """
+    _name = 'alfresco.report.document'
+    _description = 'Documento de reporte archivado en Alfresco'
+
+    report_id = fields.Many2one('ir.actions.report', string='Reporte', required=True, ondelete='cascade')
+    res_model = fields.Char(string='Modelo', required=True)
+    res_id = fields.Integer(string='ID del registro', required=True)
+    filename = fields.Char(string='Nombre del archivo')
+    alfresco_node_id = fields.Char(string='ID de nodo en Alfresco')
+    content_hash = fields.Char(string='Hash del contenido', help="SHA-256 del texto extraído del PDF")
+    last_upload_date = fields.Datetime(string='Última subida')
+
+    _sql_constraints = [
+        ('report_record_unique', 'UNIQUE(report_id, res_id)',
+         'Solo puede existir un documento por reporte y registro.'),
+    ]
+
+    @api.model
+    def compute_content_hash(self, text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @api.model
+    def get_documents(self, report, res_ids):
+        """Devuelve {res_id: documento} para los registros indicados, con una sola búsqueda."""
+        documents = self.search([('report_id', '=', report.id), ('res_id', 'in', list(res_ids))])
+        return {doc.res_id: doc for doc in documents}
+
+    @api.model
+    def register(self, report, res_id, filename, node_id, content_hash, document=None):
+        """Crea o actualiza la entrada del índice tras subir o comparar el PDF."""
+        values = {
+            'filename': filename,
+            'alfresco_node_id': node_id,
+            'content_hash': content_hash,
+            'last_upload_date': fields.Datetime.now(),
+        }
+        if document:
+            document.write(values)
+            return document
+        values.update({'report_id': report.id, 'res_model': report.model, 'res_id': res_id})
+        return self.create(values)
@@ -1,4 +1,3 @@
-import requests
 import logging
 from odoo import models, fields, api, _
 
@@ -14,15 +13,10 @@ class AlfrescoReportMapping(models.Model):
 
     @api.model
     def _alfresco_get_children(self, repo_id, node_id, skip=0, max_items=100):
-        RCS = self.env['ir.config_parameter'].sudo()
-        url_base = RCS.get_param('asi_alfresco_integration.alfresco_server_url')
-        user = RCS.get_param('asi_alfresco_integration.alfresco_username')
-        pwd = RCS.get_param('asi_alfresco_integration.alfresco_password')
-
-        endpoint = f"{url_base}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}/children"
         params = {'include': 'isFolder','skipCount': skip,'maxItems': max_items}
         try:
-            resp = requests.get(endpoint, auth=(user, pwd), params=params)
+            client = self.env['alfresco.client'].get_client(raise_if_missing=True)
+            resp = client.get(f"{client.API_PATH}/nodes/{node_id}/children", params=params)
             resp.raise_for_status()
             data = resp.json().get('list', {})
             entries = data.get('entries', [])
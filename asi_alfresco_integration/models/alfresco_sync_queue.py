@@ -0,0 +1,96 @@
+import logging
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+class AlfrescoSyncQueue(models.Model):
+    """
+    Cola de trabajo de la sincronización de carpetas de Alfresco.
+
+    - scan: listar las subcarpetas y archivos de un nodo (recorrido completo).
+    - check: comprobar si una carpeta o archivo sigue existiendo en Alfresco;
+      se procesan por lotes con una sola búsqueda por lote.
+
+    Los elementos procesados se eliminan; los que fallan varias veces quedan
+    en estado 'error' hasta la próxima sincronización.
+    """
+    _name = 'alfresco.sync.queue'
+    _description = 'Cola de sincronización de Alfresco'
+    _order = 'id'
+
+    job_type = fields.Selection([
+        ('scan', 'Listar contenido'),
+        ('check', 'Comprobar existencia'),
+    ], string='Tipo', required=True, default='scan', index=True)
+    node_id = fields.Char(string='ID de nodo en Alfresco', required=True)
+    folder_id = fields.Many2one(
+        'alfresco.folder', string='Carpeta', ondelete='cascade',
+        help="scan: carpeta del nodo listado (vacía para la raíz). check: carpeta a comprobar.")
+    file_id = fields.Many2one('alfresco.file', string='Archivo', ondelete='cascade',
+                              help="check: archivo a comprobar")
+    state = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('error', 'Error'),
+    ], string='Estado', required=True, default='pending', index=True)
+    attempts = fields.Integer(string='Intentos')
+    error = fields.Text(string='Último error')
+
+    @api.model
+    def claim(self, job_type, limit):
+        """
+        Toma hasta `limit` elementos pendientes del tipo indicado, bloqueándolos
+        para que otro proceso no los trate a la vez.
+        """
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT id FROM alfresco_sync_queue
+             WHERE state = 'pending' AND job_type = %s
+             ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, (job_type, limit))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def mark_failed(self, error, max_attempts):
+        """Cuenta un intento fallido; al llegar a `max_attempts` el elemento queda en error."""
+        for item in self:
+            attempts = item.attempts + 1
+            item.write({
+                'attempts': attempts,
+                'error': str(error),
+                'state': 'error' if attempts >= max_attempts else 'pending',
+            })
+
+    @api.model
+    def enqueue_checks(self, folder_where=None, folder_params=(), include_files=False):
+        """
+        Encola comprobaciones de existencia para las carpetas que cumplen
+        `folder_where` (todas si es None) y, opcionalmente, para todos los
+        archivos. Se hace con un INSERT ... SELECT para no crear decenas de
+        miles de registros uno a uno. Devuelve el número de elementos encolados.
+        """
+        self.env.flush_all()
+        uid = self.env.uid
+        self.env.cr.execute("""
+            INSERT INTO alfresco_sync_queue
+                   (job_type, node_id, folder_id, state, attempts,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT 'check', node_id, id, 'pending', 0,
+                   %s, now() at time zone 'UTC', %s, now() at time zone 'UTC'
+              FROM alfresco_folder
+             WHERE {}
+        """.format(folder_where or 'TRUE'), (uid, uid) + tuple(folder_params))
+        count = self.env.cr.rowcount
+        if include_files:
+            self.env.cr.execute("""
+                INSERT INTO alfresco_sync_queue
+                       (job_type, node_id, file_id, state, attempts,
+                        create_uid, create_date, write_uid, write_date)
+                SELECT 'check', alfresco_node_id, id, 'pending', 0,
+                       %s, now() at time zone 'UTC', %s, now() at time zone 'UTC'
+                  FROM alfresco_file
+            """, (uid, uid))
+            count += self.env.cr.rowcount
+        self.invalidate_model()
+        return count
@@ -1,7 +1,7 @@
+import functools
 import logging
 import requests
 import re
-import json
 from odoo import models, fields, api,_
 from odoo.exceptions import UserError, ValidationError
 from datetime import datetime
@@ -11,6 +11,98 @@ from odoo.tools.safe_eval import safe_eval
 
 _logger = logging.getLogger(__name__)
 
+# Registros por PDF combinado en la exportacion programada
+EXPORT_BATCH_SIZE = 50
+
+
+def extract_text_from_pdf(pdf_content):
+    """
+    Extrae texto de un PDF usando pypdf para comparar contenido.
+    """
+    try:
+        reader = PdfReader(BytesIO(pdf_content))
+        text = ''
+        for page in reader.pages:
+            text += page.extract_text() or ''
+        return text.strip()
+    except Exception as e:
+        _logger.error("Error extrayendo texto del PDF: %s", e)
+        return ''
+
+
+# Resultado de archive_document cuando el PDF no existe en Alfresco y hay que crearlo
+NEW_DOCUMENT = object()
+
+
+def archive_document(client, task):
+    """
+    Actualiza en Alfresco el PDF de un registro y devuelve su node_id, None si
+    falla o NEW_DOCUMENT si hay que crearlo. Se ejecuta en el pool de hilos del
+    cliente: no usa el ORM.
+
+    - Con node_id indexado se actualiza ese nodo directamente.
+    - Sin indice (o si el nodo ya no existe) se busca por nombre en la carpeta:
+      si existe se descarga, compara texto y actualiza si cambia; si no, se
+      devuelve NEW_DOCUMENT para crearlo con upload_document.
+    """
+    filename = task['filename']
+    node_id = task['node_id']
+    if node_id:
+        try:
+            client.update_content(node_id, task['pdf_content'])
+            _logger.info("PDF actualizado en Alfresco: %s (node_id=%s)", filename, node_id)
+            return node_id
+        except requests.exceptions.HTTPError as e_update:
+            if e_update.response is None or e_update.response.status_code != 404:
+                _logger.error("Error actualizando '%s' (node_id=%s): %s", filename, node_id, e_update)
+                return None
+            _logger.warning("El nodo %s ya no existe en Alfresco. Se busca de nuevo '%s'.", node_id, filename)
+        except Exception as e_update:
+            _logger.error("Error actualizando '%s' (node_id=%s): %s", filename, node_id, e_update)
+            return None
+
+    # Busca si ya existe en Alfresco
+    try:
+        results = client.search(
+            f'=cm:name:"{filename}" AND ANCESTOR:"workspace://SpacesStore/{task["folder_node_id"]}"',
+            max_items=1,
+        )
+        node_id = results[0]['entry']['id'] if results else None
+    except Exception as e_search:
+        _logger.error("Error buscando '%s' en Alfresco: %s", filename, e_search)
+        node_id = None
+
+    # Si existe: descarga, compara texto y actualiza si cambia. Si no existe: crea nuevo.
+    if node_id:
+        try:
+            existing_text = extract_text_from_pdf(client.download_content(node_id))
+            if existing_text != task['text']:
+                client.update_content(node_id, task['pdf_content'])
+                _logger.info("PDF actualizado en Alfresco: %s (node_id=%s)", filename, node_id)
+            else:
+                _logger.info("El contenido no cambio para '%s'. No se sube nueva version.", filename)
+            return node_id
+        except Exception as e_update:
+            _logger.error("Error actualizando '%s' (node_id=%s): %s", filename, node_id, e_update)
+            return None
+
+    return NEW_DOCUMENT
+
+
+def upload_document(client, task):
+    """
+    Crea en la carpeta el PDF de un registro con sus metadatos y devuelve su
+    node_id, o None si falla. Se ejecuta en el pool de hilos del cliente.
+    """
+    filename = task['filename']
+    try:
+        entry = client.upload_file(task['folder_node_id'], filename, task['pdf_content'], task['metadata'])
+        _logger.info("Nuevo PDF subido a Alfresco: %s", filename)
+        return entry.get('id')
+    except Exception as e_upload:
+        _logger.error("Error subiendo nuevo PDF '%s' a Alfresco: %s", filename, e_upload)
+        return None
+
 
 class Report(models.Model):
     _inherit = 'ir.actions.report'
@@ -62,17 +154,33 @@ class Report(models.Model):
                 rec.related_model_name = rec.model or ''
        
 
+    def _render_qweb_pdf_prepare_streams(self, report_ref, data, res_ids=None):
+        """
+        Si el contexto trae el diccionario `alfresco_collected_pdfs`, guarda en él
+        el PDF individual de cada registro antes de que Odoo los combine.
+        """
+        collected_streams = super()._render_qweb_pdf_prepare_streams(report_ref, data, res_ids=res_ids)
+        collected_pdfs = self._context.get('alfresco_collected_pdfs')
+        if collected_pdfs is not None:
+            for res_id, stream_data in collected_streams.items():
+                if res_id and stream_data['stream']:
+                    collected_pdfs[res_id] = stream_data['stream'].getvalue()
+        return collected_streams
+
     def _render_qweb_pdf(self, report_ref, res_ids=None, data=None, **kwargs):
         """
         Para cada ID en res_ids:
-         1) Genera un PDF individual (llamando a super con [id])
+         1) Toma el PDF individual del PDF combinado ya generado
          2) Evalua el nombre del archivo usando print_report_name
-         3) Sube o actualiza en Alfresco el PDF individual
+         3) Sube o actualiza en Alfresco el PDF individual, solo si su contenido
+            cambio respecto al indice alfresco.report.document
         """
-        # 1) Obtiene el PDF combinado tal y como Odoo lo haria por defecto
-        pdf_content_combined, report_type = super()._render_qweb_pdf(
-            report_ref, res_ids=res_ids, data=data, **kwargs
-        )
+        # 1) Obtiene el PDF combinado tal y como Odoo lo haria por defecto,
+        #    guardando el PDF de cada registro antes de combinarlos
+        collected_pdfs = {}
+        pdf_content_combined, report_type = super(
+            Report, self.with_context(alfresco_collected_pdfs=collected_pdfs)
+        )._render_qweb_pdf(report_ref, res_ids=res_ids, data=data, **kwargs)
     
         _logger.debug("RES_IDS recibidos: %s  | REPORT_REF: %s", res_ids, report_ref)
     
@@ -80,15 +188,12 @@ class Report(models.Model):
         report = self._get_report(report_ref)
         folder = report.folder_id
     
-        # 3) Carga configuracion de Alfresco desde parametros
-        config = self.env['ir.config_parameter'].sudo()
-        url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-        user = config.get_param('asi_alfresco_integration.alfresco_username')
-        pwd = config.get_param('asi_alfresco_integration.alfresco_password')
+        # 3) Obtiene el cliente compartido de Alfresco
+        client = self.env['alfresco.client'].get_client()
     
         # Validaciones minimas
-        if not url:
-            _logger.warning("URL de servidor Alfresco no configurada. No se procesan subidas.")
+        if not client:
+            _logger.warning("Configuracion de Alfresco incompleta. No se procesan subidas.")
             return pdf_content_combined, report_type
     
         if not folder:
@@ -99,7 +204,13 @@ class Report(models.Model):
             _logger.warning("La carpeta '%s' no tiene definido node_id. No se suben PDFs.", folder.name)
             return pdf_content_combined, report_type
     
-        # 4) Itera sobre cada registro individualmente
+        if isinstance(res_ids, int):
+            res_ids = [res_ids]
+        Index = self.env['alfresco.report.document'].sudo()
+        documents = Index.get_documents(report, res_ids or [])
+    
+        # 4) Prepara el PDF de cada registro que haya cambiado
+        tasks = []
         for rid in res_ids or []:
             # 4.1) Obtiene el registro actual
             Model = self.env[report.model]
@@ -108,22 +219,18 @@ class Report(models.Model):
                 _logger.warning("El registro con ID %s no existe en %s. Se omite.", rid, report.model)
                 continue
     
-            # 4.2) Genera solo el PDF para este registro
-            try:
-                # Obtengo el XML ID de este action.report
-                ext_id = self.env['ir.model.data'].search([
-                    ('model', '=', 'ir.actions.report'),
-                    ('res_id', '=', report.id)], limit=1).module + '.' + \
-                    self.env['ir.model.data'].search([
-                        ('model', '=', 'ir.actions.report'),
-                        ('res_id', '=', report.id)], limit=1).name
-                _logger.warning("Intentando hacer el pdf para la plantilla %s . Registo actual %s", ext_id,rid)
-                pdf_content_single, _ = super()._render_qweb_pdf(
-                    ext_id, res_ids=[rid], data=data, **kwargs)
-
-            except Exception as e:
-                _logger.error("Error generando PDF para %s ID=%s: %s", report.model, rid, e)
-                continue
+            # 4.2) Toma el PDF de este registro del PDF combinado. Solo se genera
+            #      de nuevo si Odoo no pudo separar el PDF combinado por registro.
+            pdf_content_single = collected_pdfs.get(rid)
+            if pdf_content_single is None:
+                try:
+                    _logger.warning("Generando el PDF por separado para el reporte %s. Registo actual %s",
+                                    report.report_name, rid)
+                    pdf_content_single, _ = super()._render_qweb_pdf(
+                        report.id, res_ids=[rid], data=data, **kwargs)
+                except Exception as e:
+                    _logger.error("Error generando PDF para %s ID=%s: %s", report.model, rid, e)
+                    continue
     
             # 4.3) Evalua el nombre de archivo usando print_report_name
             filename = self._evaluate_report_filename(report, record)
@@ -131,43 +238,46 @@ class Report(models.Model):
                 filename = f"{report_ref}_{rid}.pdf"
             _logger.debug("  -> Filename para ID %s: %s", rid, filename)
     
-            # 4.4) Busca si ya existe en Alfresco
-            try:
-                node_id = self._find_existing_file(
-                    url, user, pwd, filename, folder.node_id
-                )
-            except Exception as e_search:
-                _logger.error("Error buscando '%s' en Alfresco: %s", filename, e_search)
-                node_id = None
+            # 4.4) Compara con el hash guardado: si no cambio no hace falta
+            #      buscar, descargar ni comparar el archivo en Alfresco
+            new_text = self._extract_text_from_pdf(pdf_content_single)
+            content_hash = Index.compute_content_hash(new_text)
+            document = documents.get(rid)
+            if document and document.alfresco_node_id and document.content_hash == content_hash:
+                _logger.info("El contenido no cambio para '%s'. No se sube nueva version.", filename)
+                continue
+    
+            tasks.append({
+                'res_id': rid,
+                'filename': filename,
+                'pdf_content': pdf_content_single,
+                'text': new_text,
+                'content_hash': content_hash,
+                'node_id': document.alfresco_node_id if document else None,
+                'folder_node_id': folder.node_id,
+            })
+    
+        # 5) Actualiza los PDFs en paralelo en el pool de hilos del cliente
+        node_ids = client.map(functools.partial(archive_document, client), tasks)
     
-            # 4.5) Si existe: descarga, compara texto y actualiza si cambia. Si no existe: crea nuevo.
+        # 6) Crea los PDFs que aun no existen en Alfresco. Los metadatos solo se
+        #    construyen para estos registros: al actualizar un nodo no se envian
+        new_tasks = [task for task, node_id in zip(tasks, node_ids) if node_id is NEW_DOCUMENT]
+        for task in new_tasks:
+            _, task['metadata'] = self._build_metadata(report_ref, [task['res_id']])
+            _logger.info("Metadatos asociados al reporte: %s  | Diccionario: %s", task['res_id'], task['metadata'])
+        new_node_ids = iter(client.map(functools.partial(upload_document, client), new_tasks))
+        node_ids = [next(new_node_ids) if node_id is NEW_DOCUMENT else node_id for node_id in node_ids]
+    
+        # 7) Actualiza el indice con el nodo de cada documento archivado
+        for task, node_id in zip(tasks, node_ids):
             if node_id:
-                try:
-                    existing_content = self._download_existing_content(url, user, pwd, node_id)
-                    existing_text = self._extract_text_from_pdf(existing_content)
-                    new_text = self._extract_text_from_pdf(pdf_content_single)
-    
-                    if existing_text != new_text:
-                        self._update_existing_file(url, user, pwd, node_id, pdf_content_single, filename)
-                        _logger.info("PDF actualizado en Alfresco: %s (node_id=%s)", filename, node_id)
-                    else:
-                        _logger.info("El contenido no cambio para '%s'. No se sube nueva version.", filename)
-                except Exception as e_update:
-                    _logger.error("Error actualizando '%s' (node_id=%s): %s", filename, node_id, e_update)
-            else:
-                try:
-                    # Construir metadatos para este registro
-                    _, metadata = self._build_metadata(report_ref, [rid])
-                    _logger.info("Metadatos asociados al reporte: %s  | Diccionario: %s", rid, metadata)
-                    self._upload_new_file(
-                        url, user, pwd, folder.node_id,
-                        filename, pdf_content_single, metadata
-                    )
-                    _logger.info("Nuevo PDF subido a Alfresco: %s", filename)
-                except Exception as e_upload:
-                    _logger.error("Error subiendo nuevo PDF '%s' a Alfresco: %s", filename, e_upload)
-    
-        # 5) Devuelve siempre el PDF combinado original
+                documents[task['res_id']] = Index.register(
+                    report, task['res_id'], task['filename'], node_id,
+                    task['content_hash'], documents.get(task['res_id'])
+                )
+    
+        # 8) Devuelve siempre el PDF combinado original
         return pdf_content_combined, report_type
         
     
@@ -243,89 +353,11 @@ class Report(models.Model):
         return filename, properties
     
     
-    def _find_existing_file(self, url, user, pwd, filename, folder_node_id):
-        """
-        Busca en Alfresco usando CMIS‐AFTS si ya existe un archivo con ese nombre
-        dentro de la carpeta cuyo node_id es `folder_node_id`.
-        Si lo encuentra, devuelve el node_id; si no, devuelve None.
-        """
-        search_url = f"{url}/alfresco/api/-default-/public/search/versions/1/search"
-        query = {
-            "query": {
-                "language": "afts",
-                "query": f'=cm:name:"{filename}" AND ANCESTOR:"workspace://SpacesStore/{folder_node_id}"'
-            },
-            "include": ["properties"],
-            "paging": {"maxItems": 1, "skipCount": 0}
-        }
-        response = requests.post(
-            search_url,
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(query),
-            auth=(user, pwd),
-        )
-        response.raise_for_status()
-        results = response.json().get('list', {}).get('entries', [])
-        return results[0]['entry']['id'] if results else None
-
-    def _download_existing_content(self, url, user, pwd, node_id):
-        """
-        Descarga el contenido binario (PDF) de un nodo existente en Alfresco.
-        """
-        download_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}/content"
-        response = requests.get(download_url, auth=(user, pwd))
-        response.raise_for_status()
-        return response.content
-
-    def _upload_new_file(self, url, user, pwd, folder_node_id, filename, pdf_content, properties):
-        """
-        Sube un nuevo archivo a Alfresco dentro de la carpeta indicada (folder_node_id).
-        properties es un dict con metadatos JSON aceptados por Alfresco.
-        """
-        endpoint = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{folder_node_id}/children"
-        files = {'filedata': (filename, pdf_content)}
-        data = {
-            "json": json.dumps({
-                "name": filename,
-                "nodeType": "cm:content",
-                "properties": properties
-            })
-        }
-        response = requests.post(
-            endpoint,
-            files=files,
-            data=data,
-            params={'autoRename': 'true'},
-            auth=(user, pwd)
-        )
-        response.raise_for_status()
-
-    def _update_existing_file(self, url, user, pwd, node_id, pdf_content, filename):
-        """
-        Reemplaza la version de un archivo existente en Alfresco.
-        """
-        update_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}/content"
-        response = requests.put(
-            update_url,
-            headers={"Content-Type": "application/pdf"},
-            data=pdf_content,
-            auth=(user, pwd),
-        )
-        response.raise_for_status()
-
     def _extract_text_from_pdf(self, pdf_content):
         """
         Extrae texto de un PDF usando pypdf para comparar contenido.
         """
-        try:
-            reader = PdfReader(BytesIO(pdf_content))
-            text = ''
-            for page in reader.pages:
-                text += page.extract_text() or ''
-            return text.strip()
-        except Exception as e:
-            _logger.error("Error extrayendo texto del PDF: %s", e)
-            return ''
+        return extract_text_from_pdf(pdf_content)
 
 
     def verificar_y_configurar_report_url(self):
@@ -385,12 +417,22 @@ class Report(models.Model):
             records = model.search(final_domain)
             _logger.info("******** Reporte %s: se procesarán %s registros. Dominio aplicado: %s ", report.name, len(records), final_domain)
     
-            for record in records:
+            # Un solo PDF combinado por bloque: el PDF de cada registro se separa de él
+            for start in range(0, len(records), EXPORT_BATCH_SIZE):
+                batch = records[start:start + EXPORT_BATCH_SIZE]
                 try:
-                    report._render_qweb_pdf(report.id, [record.id])
-                    _logger.info("PDF generado para %s ID=%s", report.model, record.id)
+                    report._render_qweb_pdf(report.id, batch.ids)
+                    _logger.info("PDF generado para %s IDs=%s", report.model, batch.ids)
+                    continue
                 except Exception as e:
-                    _logger.error("Error generando reporte %s para ID=%s: %s", report.model, record.id, e)
+                    _logger.error("Error generando reporte %s para IDs=%s: %s. Se reintenta por registro.",
+                                  report.model, batch.ids, e)
+                for record in batch:
+                    try:
+                        report._render_qweb_pdf(report.id, [record.id])
+                        _logger.info("PDF generado para %s ID=%s", report.model, record.id)
+                    except Exception as e:
+                        _logger.error("Error generando reporte %s para ID=%s: %s", report.model, record.id, e)
     
             # Actualizar última fecha de sincronización solo si no falló
             report.write({'last_sync_date': fields.Datetime.now()})
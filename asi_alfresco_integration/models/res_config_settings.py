@@ -62,6 +62,28 @@ class ResConfigSettings(models.TransientModel):
             raise UserError(f"Error al conectar con Alfresco:\n{e}")        
             
 
+    def action_show_alfresco_latency(self):
+        """Muestra los contadores de latencia por endpoint del cliente compartido"""
+        stats = self.env['alfresco.client'].get_latency_stats()
+        if not stats:
+            message = "Todavía no hay llamadas registradas a Alfresco en este proceso."
+        else:
+            lines = [
+                "%s: %d llamadas, %d errores, media %.0f ms, máx. %.0f ms" % (
+                    endpoint, data['count'], data['errors'], data['avg_ms'], data['max_ms'])
+                for endpoint, data in sorted(stats.items(), key=lambda item: -item[1]['total_ms'])
+            ]
+            message = "\n".join(lines)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Latencia de Alfresco',
+                'message': message,
+                'sticky': True,
+            }
+        }
+
     def action_sync_alfresco_users(self):
         """Sincroniza todos los usuarios de Odoo con Alfresco"""
         try:
@@ -98,7 +98,6 @@ class ResUsers(models.Model):
         """Crea usuario en Alfresco con manejo mejorado de errores"""
         config = self._get_alfresco_config()
         url = f"{config['server_url']}/alfresco/api/-default-/public/alfresco/versions/1/people"
-        auth = (config['username'], config['password'])
         
         success_users = self.env['res.users']
         
@@ -107,9 +106,8 @@ class ResUsers(models.Model):
                 payload = self._prepare_alfresco_payload(user)
                 
                 try:
-                    response = requests.post(
+                    response = self.env['alfresco.client'].get_client().post(
                         url,
-                        auth=auth,
                         json=payload,
                         timeout=10,
                         verify=True
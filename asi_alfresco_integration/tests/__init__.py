@@ -0,0 +1,3 @@
+from . import test_alfresco_check
+from . import test_alfresco_client
+from . import test_report_archive
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+
+class FakeResponse:
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeClient:
+    """Cliente de Alfresco en memoria: `indexed` son los nodos que devuelve la
+    búsqueda y `stored` los que existen al consultarlos directamente."""
+
+    API_PATH = '/api'
+
+    def __init__(self, indexed, stored):
+        self.indexed = set(indexed)
+        self.stored = set(stored)
+        self.requested = []
+
+    def search(self, query, **kwargs):
+        return [{'entry': {'id': node_id}} for node_id in self.indexed if node_id in query]
+
+    def get(self, path, **kwargs):
+        node_id = path.rsplit('/', 1)[-1]
+        self.requested.append(node_id)
+        return FakeResponse(200 if node_id in self.stored else 404)
+
+    def map(self, func, items):
+        return [func(item) for item in items]
+
+
+class TestAlfrescoCheck(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Folder = cls.env['alfresco.folder']
+        cls.root = Folder.create({'name': 'Raiz', 'node_id': 'root'})
+        cls.indexed = Folder.create({'name': 'Indexada', 'node_id': 'indexed', 'parent_id': cls.root.id})
+        cls.missing = Folder.create({'name': 'Eliminada', 'node_id': 'missing', 'parent_id': cls.root.id})
+        cls.lagging = Folder.create({'name': 'Sin indexar', 'node_id': 'lagging', 'parent_id': cls.root.id})
+        folders = cls.indexed | cls.missing | cls.lagging
+        # Fuera del margen de retraso del índice
+        cls.env.flush_all()
+        cls.env.cr.execute(
+            "UPDATE alfresco_folder SET create_date = create_date - interval '1 day' WHERE id IN %s",
+            (tuple(folders.ids),))
+        folders.invalidate_recordset(['create_date'])
+
+    def setUp(self):
+        super().setUp()
+        self.client = FakeClient(indexed={'indexed'}, stored={'indexed', 'lagging'})
+
+    def _patch_client(self):
+        client = self.client
+        return patch.object(type(self.env['alfresco.folder']), '_get_http_session', lambda folder: client)
+
+    def test_find_existing_node_ids(self):
+        with self._patch_client():
+            existing = self.env['alfresco.folder']._find_existing_node_ids(['indexed', 'missing', 'lagging'])
+        self.assertEqual(existing, {'indexed', 'lagging'})
+        # Los nodos indexados no se consultan uno a uno
+        self.assertNotIn('indexed', self.client.requested)
+
+    def test_process_check_items(self):
+        folders = self.indexed | self.missing | self.lagging
+        items = self.env['alfresco.sync.queue'].create([
+            {'job_type': 'check', 'node_id': folder.node_id, 'folder_id': folder.id}
+            for folder in folders
+        ])
+        with self._patch_client():
+            self.env['alfresco.folder']._process_check_items(items)
+        self.assertTrue(self.indexed.exists())
+        self.assertTrue(self.lagging.exists())
+        self.assertFalse(self.missing.exists())
+
+    def test_request_error_keeps_node(self):
+        client = FakeClient(indexed=set(), stored=set())
+        client.get = lambda path, **kwargs: FakeResponse(503)
+        deleted = self.env['alfresco.folder']._confirm_deleted_node_ids(client, ['indexed', 'missing'])
+        self.assertFalse(deleted)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+
+from ..models import alfresco_client
+from ..models.alfresco_client import AlfrescoClient
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Responde a cada ruta con los códigos de `server.script`, en orden; el último se repite."""
+
+    def _respond(self):
+        self.server.requests.append((self.command, self.path))
+        codes = self.server.script.get(self.path, [200])
+        code = codes.pop(0) if len(codes) > 1 else codes[0]
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        self.send_response(code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAlfrescoClient(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = 'http://127.0.0.1:%d' % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.server.script = {}
+        self.server.requests = []
+
+    def _client(self, **options):
+        options.setdefault('backoff_factor', 0)
+        client = AlfrescoClient(self.base_url, 'admin', 'secreto', **options)
+        self.addCleanup(client.shutdown)
+        return client
+
+    def test_retry_on_throttling_and_server_errors(self):
+        self.server.script['/nodes/a'] = [503, 429, 200]
+        response = self._client().get('/nodes/a')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_retry_gives_up(self):
+        self.server.script['/nodes/a'] = [500]
+        response = self._client(retries=2).get('/nodes/a')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_no_retry_on_post(self):
+        # Un POST no es idempotente: no se repite aunque el servidor falle
+        self.server.script['/nodes/a/children'] = [503, 200]
+        response = self._client().post('/nodes/a/children', json={})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_no_retry_on_client_errors(self):
+        self.server.script['/nodes/a'] = [404, 200]
+        self.assertEqual(self._client().get('/nodes/a').status_code, 404)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_absolute_url(self):
+        client = self._client()
+        self.assertEqual(client.url('/nodes/a'), self.base_url + '/nodes/a')
+        self.assertEqual(client.url('http://otro/nodes/a'), 'http://otro/nodes/a')
+
+    def test_stats_per_endpoint(self):
+        self.server.script['/nodes/b?include=properties'] = [404]
+        client = self._client()
+        client.get('/nodes/a')
+        client.get('/nodes/b?include=properties')
+        client.get('/nodes/a', endpoint='descarga')
+        stats = client.get_stats()
+
+        # Los identificadores de nodo se agrupan en un solo endpoint
+        self.assertEqual(set(stats), {'GET /nodes/{id}', 'descarga'})
+        self.assertEqual(stats['GET /nodes/{id}']['count'], 2)
+        self.assertEqual(stats['GET /nodes/{id}']['errors'], 1)
+        self.assertEqual(stats['descarga']['count'], 1)
+        self.assertGreaterEqual(stats['descarga']['max_ms'], stats['descarga']['avg_ms'])
+
+        client.reset_stats()
+        self.assertEqual(client.get_stats(), {})
+
+    def test_map(self):
+        client = self._client(max_workers=3)
+
+        def work(item):
+            return item * 2, threading.current_thread().name
+
+        results = client.map(work, range(6))
+        self.assertEqual([value for value, _ in results], [0, 2, 4, 6, 8, 10])
+        self.assertTrue(all(name.startswith('alfresco') for _, name in results))
+
+        # Un solo elemento se procesa en el hilo actual
+        [(_, name)] = client.map(work, [1])
+        self.assertEqual(name, threading.current_thread().name)
+
+    def test_get_client_cache(self):
+        with patch.dict(alfresco_client._clients, clear=True):
+            client = alfresco_client.get_client(self.base_url + '/', 'admin', 'secreto', max_workers=2)
+            self.assertIs(alfresco_client.get_client(self.base_url, 'admin', 'secreto', max_workers=2), client)
+            client.map(lambda item: item, [1, 2])
+            self.assertIsNotNone(client._executor)
+
+            # Con otra configuración se crea un cliente nuevo y se detiene el anterior
+            other = alfresco_client.get_client(self.base_url, 'admin', 'otra', max_workers=2)
+            self.assertIsNot(other, client)
+            self.assertIsNone(client._executor)
+            self.assertEqual(list(alfresco_client._clients.values()), [other])
+            other.shutdown()
+
+    def test_service_configuration(self):
+        config = self.env['ir.config_parameter'].sudo()
+        config.set_param('asi_alfresco_integration.alfresco_server_url', self.base_url)
+        config.set_param('asi_alfresco_integration.alfresco_username', 'admin')
+        config.set_param('asi_alfresco_integration.alfresco_password', False)
+        Service = self.env['alfresco.client']
+        self.assertIsNone(Service.get_client())
+        with self.assertRaises(UserError):
+            Service.get_client(raise_if_missing=True)
+
+        config.set_param('asi_alfresco_integration.alfresco_password', 'secreto')
+        with patch.dict(alfresco_client._clients, clear=True):
+            client = Service.get_client()
+            self.addCleanup(client.shutdown)
+            self.assertEqual(client.base_url, self.base_url)
+            self.assertIs(Service.get_client(), client)
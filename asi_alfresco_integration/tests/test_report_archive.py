@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.base.models.ir_actions_report import IrActionsReport
+
+from ..models import report_override
+
+
+class FakeClient:
+    """Cliente de Alfresco en memoria: `nodes` es {node_id: (nombre, contenido)}."""
+
+    def __init__(self):
+        self.nodes = {}
+        self.calls = []
+
+    def search(self, query, **kwargs):
+        self.calls.append(('search', query))
+        return [{'entry': {'id': node_id}} for node_id, (name, _content) in self.nodes.items()
+                if '"%s"' % name in query]
+
+    def download_content(self, node_id, **kwargs):
+        self.calls.append(('download', node_id))
+        return self.nodes[node_id][1]
+
+    def update_content(self, node_id, content):
+        self.calls.append(('update', node_id))
+        self.nodes[node_id] = (self.nodes[node_id][0], content)
+
+    def upload_file(self, folder_node_id, filename, content, metadata):
+        self.calls.append(('upload', filename))
+        node_id = 'node-%s' % (len(self.nodes) + 1)
+        self.nodes[node_id] = (filename, content)
+        return {'id': node_id}
+
+    def map(self, func, items):
+        return [func(item) for item in items]
+
+
+class TestReportArchive(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        folder = cls.env['alfresco.folder'].create({'name': 'Reportes', 'node_id': 'folder-1'})
+        cls.partners = cls.env['res.partner'].create([{'name': 'Cliente %s' % i} for i in range(5)])
+        cls.report = cls.env['ir.actions.report'].create({
+            'name': 'Ficha de contacto',
+            'model': 'res.partner',
+            'report_type': 'qweb-pdf',
+            'report_name': 'asi_alfresco_integration.ficha_contacto',
+            'print_report_name': "'Ficha %s' % object.id",
+            'alfresco_archive': True,
+            'folder_id': folder.id,
+            'record_domain': str([('id', 'in', cls.partners.ids)]),
+        })
+        cls.Index = cls.env['alfresco.report.document']
+        cls.Report = type(cls.env['ir.actions.report'])
+
+    def setUp(self):
+        super().setUp()
+        self.client = FakeClient()
+        # Contenido del PDF de cada registro; el texto extraído es el propio contenido
+        self.contents = {partner.id: b'version 1 de %s' % partner.name.encode() for partner in self.partners}
+        client = self.client
+        contents = self.contents
+
+        def render(report, report_ref, res_ids=None, data=None, **kwargs):
+            collected_pdfs = report._context.get('alfresco_collected_pdfs')
+            if collected_pdfs is not None:
+                collected_pdfs.update({res_id: contents[res_id] for res_id in res_ids})
+            return b'combinado', 'pdf'
+
+        for patcher in [
+            patch.object(type(self.env['alfresco.client']), 'get_client', lambda service, **kw: client),
+            patch.object(IrActionsReport, '_render_qweb_pdf', render),
+            patch.object(report_override, 'extract_text_from_pdf', lambda content: content.decode()),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _archive(self, partners):
+        return self.report._render_qweb_pdf(self.report.id, partners.ids)
+
+    def _calls(self, kind):
+        return [arg for call, arg in self.client.calls if call == kind]
+
+    def test_new_documents_indexed_by_hash(self):
+        partners = self.partners[:2]
+        self.assertEqual(self._archive(partners), (b'combinado', 'pdf'))
+        self.assertEqual(self._calls('upload'), ['Ficha %s.pdf' % p.id for p in partners])
+
+        documents = self.Index.get_documents(self.report, partners.ids)
+        self.assertEqual(set(documents), set(partners.ids))
+        for partner in partners:
+            document = documents[partner.id]
+            self.assertEqual(document.filename, 'Ficha %s.pdf' % partner.id)
+            self.assertEqual(document.content_hash,
+                             self.Index.compute_content_hash(self.contents[partner.id].decode()))
+            self.assertEqual(self.client.nodes[document.alfresco_node_id][1], self.contents[partner.id])
+
+    def test_unchanged_documents_skipped(self):
+        partners = self.partners[:2]
+        self._archive(partners)
+        self.client.calls.clear()
+
+        # Sin cambios no se consulta Alfresco
+        self._archive(partners)
+        self.assertEqual(self.client.calls, [])
+
+        # El documento que cambió se actualiza en su nodo, sin buscarlo
+        changed = partners[0]
+        self.contents[changed.id] = b'version 2'
+        self._archive(partners)
+        document = self.Index.get_documents(self.report, changed.ids)[changed.id]
+        self.assertEqual(self.client.calls, [('update', document.alfresco_node_id)])
+        self.assertEqual(document.content_hash, self.Index.compute_content_hash('version 2'))
+
+    def test_existing_node_found_by_name(self):
+        partner = self.partners[0]
+        self.client.nodes['node-existente'] = ('Ficha %s.pdf' % partner.id, self.contents[partner.id])
+        self._archive(partner)
+        # Mismo texto: se indexa el nodo existente sin subir una nueva versión
+        self.assertFalse(self._calls('update') or self._calls('upload'))
+        document = self.Index.get_documents(self.report, partner.ids)[partner.id]
+        self.assertEqual(document.alfresco_node_id, 'node-existente')
+
+    def _export(self, fail_batches=False):
+        rendered = []
+        render_qweb_pdf = self.Report._render_qweb_pdf
+
+        def render(report, report_ref, res_ids=None, data=None, **kwargs):
+            if report == self.report:
+                rendered.append(list(res_ids))
+            if fail_batches and len(res_ids) > 1:
+                raise ValueError('error al generar el PDF combinado')
+            return render_qweb_pdf(report, report_ref, res_ids=res_ids, data=data, **kwargs)
+
+        with patch.object(report_override, 'EXPORT_BATCH_SIZE', 2), \
+                patch.object(self.Report, '_render_qweb_pdf', render):
+            self.env['ir.actions.report'].cron_export_reports_to_alfresco()
+        return rendered
+
+    def test_export_in_batches(self):
+        rendered = self._export()
+        ids = self.partners.ids
+        self.assertEqual(rendered, [ids[0:2], ids[2:4], ids[4:5]])
+        self.assertEqual(len(self._calls('upload')), 5)
+        self.assertTrue(self.report.last_sync_date)
+
+    def test_export_failed_batch_retried_per_record(self):
+        rendered = self._export(fail_batches=True)
+        ids = self.partners.ids
+        self.assertEqual(rendered, [
+            ids[0:2], [ids[0]], [ids[1]],
+            ids[2:4], [ids[2]], [ids[3]],
+            [ids[4]],
+        ])
+        self.assertEqual(set(self.Index.get_documents(self.report, ids)), set(ids))
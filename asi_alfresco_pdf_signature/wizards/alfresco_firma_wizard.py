@@ -487,20 +487,11 @@ class AlfrescoFirmaWizard(models.TransientModel):
                                  private_key, certificate, additional_certificates):
         """Firma un archivo individual"""
         # Descargar el PDF desde Alfresco
-        config = self.env['ir.config_parameter'].sudo()
-        url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-        user = config.get_param('asi_alfresco_integration.alfresco_username')
-        pwd = config.get_param('asi_alfresco_integration.alfresco_password')
-        
-        if not all([url, user, pwd]):
+        client = self.env['alfresco.client'].get_client()
+        if not client:
             raise UserError(_('Configuración de Alfresco incompleta'))
         
-        # Descargar contenido del archivo
-        download_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{archivo.alfresco_node_id}/content"
-        response = requests.get(download_url, auth=(user, pwd), timeout=30)
-        response.raise_for_status()
-        
-        pdf_contenido = response.content
+        pdf_contenido = client.download_content(archivo.alfresco_node_id, timeout=30)
         
         # Crear archivo temporal para el PDF
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_pdf:
@@ -608,23 +599,10 @@ class AlfrescoFirmaWizard(models.TransientModel):
         Actualiza el archivo original en Alfresco con la versión firmada,
         creando una nueva versión del mismo documento
         """
-        config = self.env['ir.config_parameter'].sudo()
-        url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-        user = config.get_param('asi_alfresco_integration.alfresco_username')
-        pwd = config.get_param('asi_alfresco_integration.alfresco_password')
-        
         # Actualizar el archivo en Alfresco
-        update_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{archivo_original.alfresco_node_id}/content"
-        
         try:
-            response = requests.put(
-                update_url,
-                headers={"Content-Type": "application/pdf"},
-                data=pdf_firmado_contenido,
-                auth=(user, pwd),
-                timeout=30
-            )
-            response.raise_for_status()
+            client = self.env['alfresco.client'].get_client(raise_if_missing=True)
+            client.update_content(archivo_original.alfresco_node_id, pdf_firmado_contenido, timeout=30)
             
             # Actualizar el tamaño del archivo en Odoo
             archivo_original.write({
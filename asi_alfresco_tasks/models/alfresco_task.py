@@ -237,14 +237,14 @@ class AlfrescoTask(models.Model):
             raise UserError("Esta tarea ya ha sido rechazada.")
         
         # Obtener configuración de Alfresco
-        url, user, pwd = self._get_alfresco_config()
+        client = self.env['alfresco.client'].get_client()
         
-        if not url or not user or not pwd:
+        if not client:
             raise UserError('Configuración de Alfresco incompleta')
         
         # Endpoint para actualizar el estado de la tarea en Alfresco
         # Según la API de Alfresco (PDF página 22-24), se usa PUT /tasks/{taskId} con ?select=state
-        task_endpoint = f"{url.rstrip('/')}/alfresco/api/-default-/public/workflow/versions/1/tasks/{self.alfresco_task_id}?select=state"
+        task_endpoint = f"/alfresco/api/-default-/public/workflow/versions/1/tasks/{self.alfresco_task_id}?select=state"
         
         _logger.debug(
             "Actualizando estado de tarea %s a 'completed' en Alfresco (rechazo)",
@@ -252,9 +252,8 @@ class AlfrescoTask(models.Model):
         )
         
         try:
-            response = requests.put(
+            response = client.put(
                 task_endpoint,
-                auth=(user, pwd),
                 json={"state": "completed"},
                 timeout=30,
                 allow_redirects=False,
@@ -333,13 +332,13 @@ class AlfrescoTask(models.Model):
             raise UserError("Esta tarea ya ha sido completada.")
         
         # Obtener configuración de Alfresco
-        url, user, pwd = self._get_alfresco_config()
+        client = self.env['alfresco.client'].get_client()
         
-        if not url or not user or not pwd:
+        if not client:
             raise UserError('Configuración de Alfresco incompleta')
         
         # Endpoint para actualizar el estado de la tarea en Alfresco
-        task_endpoint = f"{url.rstrip('/')}/alfresco/api/-default-/public/workflow/versions/1/tasks/{self.alfresco_task_id}?select=state"
+        task_endpoint = f"/alfresco/api/-default-/public/workflow/versions/1/tasks/{self.alfresco_task_id}?select=state"
         
         _logger.debug(
             "Actualizando estado de tarea rechazada %s a 'completed' en Alfresco",
@@ -347,9 +346,8 @@ class AlfrescoTask(models.Model):
         )
         
         try:
-            response = requests.put(
+            response = client.put(
                 task_endpoint,
-                auth=(user, pwd),
                 json={"state": "completed"},
                 timeout=30,
                 allow_redirects=False,
@@ -467,14 +465,14 @@ class AlfrescoTask(models.Model):
         Descarga el contenido de un documento desde Alfresco por su node_id.
         Retorna una tupla (contenido, nombre_archivo, tipo_mime) o (None, None, None) en caso de error.
         """
-        url, user, pwd = self._get_alfresco_config()
+        client = self.env['alfresco.client'].get_client()
         
-        if not url or not user or not pwd:
+        if not client:
             _logger.warning("Configuración de Alfresco incompleta")
             return None, None, None
         
         # Endpoint para descargar contenido de un nodo
-        download_endpoint = f"{url.rstrip('/')}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}/content"
+        download_endpoint = f"/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}/content"
         
         _logger.debug(
             "Descargando contenido del nodo: %s desde: %s",
@@ -483,9 +481,8 @@ class AlfrescoTask(models.Model):
         )
         
         try:
-            response = requests.get(
+            response = client.get(
                 download_endpoint,
-                auth=(user, pwd),
                 timeout=30,
                 allow_redirects=False,
             )
@@ -624,37 +621,21 @@ class AlfrescoTask(models.Model):
             )
             return False
 
-    @api.model
-    def _get_alfresco_config(self):
-        """Obtiene la configuración de conexión a Alfresco desde los parámetros del sistema."""
-        config = self.env["ir.config_parameter"].sudo()
-        url = config.get_param("asi_alfresco_integration.alfresco_server_url")
-        user = config.get_param("asi_alfresco_integration.alfresco_username")
-        pwd = config.get_param("asi_alfresco_integration.alfresco_password")
-        
-        _logger.debug(
-            "Configuración Alfresco obtenida - URL: %s, Usuario: %s",
-            url,
-            user,
-        )
-        
-        return url, user, pwd
-
     @api.model
     def _fetch_alfresco_tasks(self):
         """
         Obtiene todas las tareas desde la API de Alfresco.
         """
-        url, user, pwd = self._get_alfresco_config()
+        client = self.env['alfresco.client'].get_client()
         
-        if not url or not user or not pwd:
+        if not client:
             _logger.warning(
                 "Configuración de Alfresco incompleta. "
                 "Verifique URL, usuario y contraseña en Ajustes."
             )
             return []
 
-        tasks_endpoint = f"{url}/alfresco/api/-default-/public/workflow/versions/1/tasks"
+        tasks_endpoint = "/alfresco/api/-default-/public/workflow/versions/1/tasks"
         all_tasks = []
         skip_count = 0
         max_items = 100
@@ -675,9 +656,8 @@ class AlfrescoTask(models.Model):
                     max_items,
                 )
                 
-                response = requests.get(
+                response = client.get(
                     tasks_endpoint,
-                    auth=(user, pwd),
                     params=params,
                     timeout=30,
                 )
@@ -907,12 +887,12 @@ class AlfrescoTask(models.Model):
         """
         self.ensure_one()
         
-        url, user, pwd = self._get_alfresco_config()
+        client = self.env['alfresco.client'].get_client()
         
-        if not url or not user or not pwd:
+        if not client:
             return
         
-        items_endpoint = f"{url}/alfresco/api/-default-/public/workflow/versions/1/tasks/{self.alfresco_task_id}/items"
+        items_endpoint = f"/alfresco/api/-default-/public/workflow/versions/1/tasks/{self.alfresco_task_id}/items"
         
         _logger.debug(
             "Obteniendo items de tarea %s desde: %s",
@@ -921,9 +901,8 @@ class AlfrescoTask(models.Model):
         )
         
         try:
-            response = requests.get(
+            response = client.get(
                 items_endpoint,
-                auth=(user, pwd),
                 timeout=30,
             )
             
@@ -620,28 +620,18 @@ class AlfrescoTaskFirmaWizard(models.TransientModel):
     def _firmar_documento_individual(self, documento, imagen_firma_path, imagen_width, imagen_height,
                                    private_key, certificate, additional_certificates):
         """Firma un documento individual y lo sube a Alfresco como nueva versión"""
-        # Obtener configuración de Alfresco
-        config = self.env['ir.config_parameter'].sudo()
-        url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-        user = config.get_param('asi_alfresco_integration.alfresco_username')
-        pwd = config.get_param('asi_alfresco_integration.alfresco_password')
-        
-        if not all([url, user, pwd]):
+        client = self.env['alfresco.client'].get_client()
+        if not client:
             raise UserError(_('Configuración de Alfresco incompleta'))
         
         # Descargar el documento desde Alfresco
-        download_url = f"{url.rstrip('/')}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{documento.node_id}/content"
-        
         _logger.debug(
-            "Descargando documento para firma: %s desde: %s",
+            "Descargando documento para firma: %s (nodo %s)",
             documento.name,
-            download_url,
+            documento.node_id,
         )
         
-        response = requests.get(download_url, auth=(user, pwd), timeout=30)
-        response.raise_for_status()
-        
-        pdf_contenido = response.content
+        pdf_contenido = client.download_content(documento.node_id, timeout=30)
         
         # Crear archivo temporal para el PDF
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_pdf:
@@ -749,28 +739,15 @@ class AlfrescoTaskFirmaWizard(models.TransientModel):
         Actualiza el documento en Alfresco con la versión firmada,
         creando una nueva versión del mismo documento
         """
-        config = self.env['ir.config_parameter'].sudo()
-        url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-        user = config.get_param('asi_alfresco_integration.alfresco_username')
-        pwd = config.get_param('asi_alfresco_integration.alfresco_password')
-        
-        # Actualizar el documento en Alfresco
-        update_url = f"{url.rstrip('/')}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{documento.node_id}/content"
-        
         _logger.debug(
             "Actualizando documento firmado en Alfresco: %s",
             documento.name,
         )
         
+        # Actualizar el documento en Alfresco
         try:
-            response = requests.put(
-                update_url,
-                headers={"Content-Type": "application/pdf"},
-                data=pdf_firmado_contenido,
-                auth=(user, pwd),
-                timeout=30
-            )
-            response.raise_for_status()
+            client = self.env['alfresco.client'].get_client(raise_if_missing=True)
+            client.update_content(documento.node_id, pdf_firmado_contenido, timeout=30)
             
             _logger.info(
                 "Documento %s actualizado con versión firmada en Alfresco",
@@ -796,18 +773,13 @@ class AlfrescoTaskFirmaWizard(models.TransientModel):
             _logger.debug("La tarea ya está completada, no se actualiza")
             return
         
-        # Obtener configuración de Alfresco
-        config = self.env['ir.config_parameter'].sudo()
-        url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-        user = config.get_param('asi_alfresco_integration.alfresco_username')
-        pwd = config.get_param('asi_alfresco_integration.alfresco_password')
-        
-        if not all([url, user, pwd]):
+        client = self.env['alfresco.client'].get_client()
+        if not client:
             _logger.warning("Configuración de Alfresco incompleta para actualizar tarea")
             return
         
         # Endpoint para actualizar el estado de la tarea
-        task_endpoint = f"{url.rstrip('/')}/alfresco/api/-default-/public/workflow/versions/1/tasks/{task.alfresco_task_id}?select=state"
+        task_endpoint = f"/alfresco/api/-default-/public/workflow/versions/1/tasks/{task.alfresco_task_id}?select=state"
         
         _logger.debug(
             "Actualizando estado de tarea %s a 'completed' en Alfresco",
@@ -815,9 +787,8 @@ class AlfrescoTaskFirmaWizard(models.TransientModel):
         )
         
         try:
-            response = requests.put(
+            response = client.put(
                 task_endpoint,
-                auth=(user, pwd),
                 json={"state": "completed"},
                 timeout=30,
                 allow_redirects=False,
@@ -2,7 +2,7 @@
 
 {
     'name': 'Odoo Local IA Integration',
-    'version': '16.0.1.0.0',
+    'version': '16.0.1.1.0',
     'license': 'AGPL-3',
     'summary': 'Odoo ChatGPT Integration',
     'description': 'Odoo-IA connection',
@@ -14,6 +14,7 @@
         'security/ir.model.access.csv',
         
         'data/mail_channel_data.xml',
+        'data/ir_cron_data.xml',
         'data/user_partner_data.xml',
         'views/res_config_settings_views.xml',
     ],
@@ -4,4 +4,5 @@ from . import local_ai_model
 from . import mail_channel
 from . import mail_message
 from . import ia_service
+from . import ia_job
 from . import res_config_settings
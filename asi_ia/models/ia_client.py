@@ -0,0 +1,192 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_logger = logging.getLogger(__name__)
+
+# Etiquetas HTML y espacios: no cambian el significado de la pregunta
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+class IaError(Exception):
+    """Error al obtener la respuesta de la IA (sin traducir: se usa fuera del ORM)."""
+
+
+def normalize_prompt(prompt):
+    """Texto normalizado de la pregunta: sin HTML, sin espacios repetidos y en minúsculas."""
+    text = HTML_TAG_PATTERN.sub(' ', prompt or '')
+    return WHITESPACE_PATTERN.sub(' ', text).strip().casefold()
+
+
+class ResponseCache(object):
+    """
+    Caché LRU de respuestas con caducidad, compartida por todos los hilos del
+    proceso. La clave es la configuración de la IA más la pregunta normalizada,
+    de forma que la misma pregunta se responde sin volver a llamar a la IA.
+    """
+
+    def __init__(self, max_entries=1000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(config, prompt):
+        backend = config['external_url'] if config['use_external'] else '%s|%s' % (config['base_url'], config['model'])
+        return hashlib.sha1(('%s\n%s' % (backend, normalize_prompt(prompt))).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, response):
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def configure(self, max_entries, ttl):
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl = ttl
+            while len(self._entries) > max(max_entries, 0):
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class IaClientPool(object):
+    """
+    Clientes HTTP de la IA compartidos por el proceso: un cliente OpenAI por
+    URL de LocalAI y una sesión con pool de conexiones para el endpoint externo,
+    más un pool de hilos acotado para atender varias preguntas en paralelo.
+    """
+
+    def __init__(self, max_workers=4, pool_size=10):
+        self.max_workers = max_workers
+        self.pool_size = pool_size
+        self._openai_clients = {}
+        self._session = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def openai_client(self, base_url, api_key):
+        from openai import OpenAI
+        key = (base_url, api_key)
+        with self._lock:
+            client = self._openai_clients.get(key)
+            if client is None:
+                client = self._openai_clients[key] = OpenAI(
+                    base_url=base_url, api_key=api_key or "noapykey", max_retries=2)
+            return client
+
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                self._session.mount('http://', adapter)
+                self._session.mount('https://', adapter)
+            return self._session
+
+    def map(self, func, items):
+        """Aplica `func` a cada elemento en el pool de hilos y devuelve los resultados en orden."""
+        items = list(items)
+        if len(items) <= 1 or self.max_workers <= 1:
+            return [func(item) for item in items]
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='asi_ia')
+        return list(self._executor.map(func, items))
+
+    def configure(self, max_workers):
+        with self._lock:
+            if max_workers != self.max_workers and self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self.max_workers = max_workers
+
+
+# Compartidos por todos los hilos del proceso
+response_cache = ResponseCache()
+client_pool = IaClientPool()
+
+
+def request_completion(config, prompt):
+    """
+    Pide la respuesta a la IA configurada. No usa el ORM: `config` es la
+    configuración leída previamente (ver asi_ia.service._get_ia_config).
+    Lanza IaError si la IA no responde correctamente.
+    """
+    if config['use_external'] and config['external_url']:
+        return _request_external(config, prompt)
+    return _request_local(config, prompt)
+
+
+def _request_local(config, prompt):
+    try:
+        _logger.info('Prompt enviado a IA local: %s', prompt)
+        client = client_pool.openai_client(config['base_url'], config['api_key'])
+        response = client.chat.completions.create(
+            messages=[{"role": "system", "content": prompt}],
+            model=config['model'],
+            temperature=0.6,
+            max_tokens=3000,
+            top_p=1,
+            frequency_penalty=0,
+            presence_penalty=0,
+            user=config['user'],
+            timeout=config['timeout'],
+        )
+        return response.choices[0].message.content
+    except Exception as e:
+        raise IaError('Error en respuesta IA local: %s' % e)
+
+
+def _request_external(config, prompt):
+    url = config['external_url']
+    _logger.info('Prompt enviado a IA externa: %s , url : %s', prompt, url)
+    try:
+        response = client_pool.session().post(
+            url,
+            json={"prompt": prompt},
+            headers={"Content-Type": "application/json"},
+            timeout=config['timeout'],
+        )
+    except Exception as e:
+        raise IaError('Error de conexión a IA externa: %s' % e)
+
+    if response.status_code != 200:
+        raise IaError('Error en respuesta IA externa: Código %s - %s' % (response.status_code, response.text))
+    try:
+        data = response.json()
+    except ValueError:
+        raise IaError('La respuesta de la IA no es JSON válido. Contenido recibido: %s' % response.text)
+    # Asumimos que la respuesta es una lista de diccionarios
+    if isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict):
+        return data[0].get("output", "")
+    raise IaError('La respuesta JSON no es una lista de diccionarios válida: %s' % data)
@@ -0,0 +1,139 @@
+import logging
+import threading
+
+from odoo import models, fields, api, _
+
+_logger = logging.getLogger(__name__)
+
+
+class IaJob(models.Model):
+    """
+    Cola de preguntas pendientes para la IA. Los mensajes del chat se encolan
+    al publicarse y un cron los atiende por lotes fuera de la petición HTTP,
+    publicando la respuesta en el canal (que la envía a los clientes por el bus).
+    """
+    _name = 'asi_ia.job'
+    _description = 'Pregunta pendiente para la IA'
+    _order = 'id'
+
+    channel_id = fields.Many2one('mail.channel', string='Canal', required=True, ondelete='cascade')
+    prompt = fields.Text(string='Pregunta', required=True)
+    author_id = fields.Many2one('res.partner', string='Autor', ondelete='set null')
+    state = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('running', 'En curso'),
+        ('error', 'Error'),
+    ], string='Estado', required=True, default='pending', index=True)
+    attempts = fields.Integer(string='Intentos')
+    started_at = fields.Datetime(string='Inicio del último intento')
+    error = fields.Text(string='Último error')
+
+    @api.model
+    def enqueue(self, channel, prompt, author_id=False):
+        """Encola una pregunta y despierta al cron que procesa la cola."""
+        job = self.sudo().create({
+            'channel_id': channel.id,
+            'prompt': prompt,
+            'author_id': author_id,
+        })
+        self.env.ref('asi_ia.ir_cron_process_ia_jobs').sudo()._trigger()
+        return job
+
+    @api.model
+    def claim(self, limit, running_timeout=900):
+        """
+        Toma hasta `limit` preguntas pendientes y las marca en curso, contando
+        el intento. Las que siguen en curso más de `running_timeout` segundos
+        (el proceso que las tomó terminó sin guardar el resultado) se vuelven
+        a tomar.
+        """
+        self.flush_model()
+        self.env.cr.execute("""
+            UPDATE asi_ia_job
+               SET state = 'running',
+                   attempts = COALESCE(attempts, 0) + 1,
+                   started_at = now() AT TIME ZONE 'UTC'
+             WHERE id IN (
+                    SELECT id FROM asi_ia_job
+                     WHERE state = 'pending'
+                        OR (state = 'running'
+                            AND started_at < now() AT TIME ZONE 'UTC' - %s * interval '1 second')
+                     ORDER BY id
+                     LIMIT %s
+                       FOR UPDATE SKIP LOCKED)
+            RETURNING id
+        """, (running_timeout, limit))
+        jobs = self.browse(sorted(row[0] for row in self.env.cr.fetchall()))
+        jobs.invalidate_recordset(['state', 'attempts', 'started_at'])
+        return jobs
+
+    @api.model
+    def _process_jobs(self, limit=None):
+        """
+        Atiende un lote de preguntas: se marcan en curso y se confirman antes de
+        llamar a la IA, de forma que otro proceso no las repita mientras tanto.
+        Las respuestas se piden en paralelo (ver asi_ia.service.get_ai_responses)
+        y el resultado de cada pregunta se guarda por separado: un error al
+        publicar una respuesta no anula las demás.
+        Si quedan preguntas pendientes, el cron se vuelve a lanzar.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        limit = limit or int(ICP.get_param('asi_ia.job_batch_size', 20))
+        max_attempts = int(ICP.get_param('asi_ia.job_max_attempts', 3))
+        running_timeout = int(ICP.get_param('asi_ia.job_running_timeout', 900))
+        jobs = self.claim(limit, running_timeout)
+        if not jobs:
+            return
+        prompts = jobs.mapped('prompt')
+        self._commit_jobs()
+
+        user_localai = self.env.ref('asi_ia.user_localai')
+        results = self.env['asi_ia.service'].with_user(user_localai).get_ai_responses(prompts)
+        for job, (response, error) in zip(jobs, results):
+            try:
+                with self.env.cr.savepoint():
+                    if error:
+                        job._register_error(error, max_attempts, user_localai)
+                    else:
+                        job._post_response(response, user_localai)
+            except Exception as e:
+                _logger.exception('***->ASI IA  Error al guardar la respuesta de la pregunta %s', job.id)
+                job.write({
+                    'error': str(e),
+                    'state': 'error' if job.attempts >= max_attempts else 'pending',
+                })
+            self._commit_jobs()
+
+        if self.search([('state', '=', 'pending')], limit=1):
+            self.env.ref('asi_ia.ir_cron_process_ia_jobs')._trigger()
+
+    def _post_response(self, response, user_localai):
+        """Publica la respuesta en el canal y elimina la pregunta."""
+        self.ensure_one()
+        self.channel_id.with_user(user_localai).message_post(
+            body=response,
+            message_type='comment',
+            subtype_xmlid='mail.mt_comment'
+        )
+        self.unlink()
+
+    def _register_error(self, error, max_attempts, user_localai):
+        """Deja la pregunta pendiente para otro intento, o en error si ya no quedan."""
+        self.ensure_one()
+        _logger.error('***->ASI IA  Error: %s', error)
+        exhausted = self.attempts >= max_attempts
+        self.write({
+            'error': error,
+            'state': 'error' if exhausted else 'pending',
+        })
+        if exhausted:
+            self.channel_id.with_user(user_localai).message_post(
+                body=_("Error al procesar la respuesta de la IA: %s") % error,
+                message_type='comment',
+                subtype_xmlid='mail.mt_comment'
+            )
+
+    def _commit_jobs(self):
+        # No se permiten commits durante las pruebas
+        if not getattr(threading.current_thread(), 'testing', False):
+            self.env.cr.commit()  # pylint: disable=invalid-commit
@@ -1,10 +1,8 @@
 import logging
-import requests
-from openai import OpenAI
 from odoo import models, _
 from odoo.exceptions import UserError
-import re
-import json
+
+from .ia_client import IaError, client_pool, request_completion, response_cache
 
 _logger = logging.getLogger(__name__)
 
@@ -12,73 +10,75 @@ class IaService(models.AbstractModel):
     _name = 'asi_ia.service'
     _description = 'Servicio de conexión a IA (local o externa)'
     _inherit = ['mail.thread', 'mail.activity.mixin']
-    
-    def get_ai_response(self, prompt):
-        ICP = self.env['ir.config_parameter'].sudo()
-        use_external = ICP.get_param('asi_ia.use_external_ia') == 'True'
-        external_url = ICP.get_param('asi_ia.external_ia_url')
-        prompt_ok = prompt + '. Responder en el idioma de la pregunta.'
-        if use_external and external_url:
-            response = self._get_external_response(prompt_ok, external_url)
-            return response
-        return self._get_local_response(prompt_ok)
-
-    def _get_local_response(self, prompt):
-        ICP = self.env['ir.config_parameter'].sudo()
-        url = ICP.get_param('asi_ia.openapi_base_url')
-        localai_model_id = ICP.get_param('asi_ia.localai_model')
 
-        try:
-            client = OpenAI(base_url=url, api_key="noapykey")
-            localai_model = self.env['localai.model'].browse(int(localai_model_id)).name
-        except Exception as ex:
-            _logger.warning('Fallo al obtener modelo: %s', ex)
-            localai_model = 'qwen2-0.5b-instruct'
-
-        try:
-            _logger.info('Prompt enviado a IA local: %s', prompt)
-            response = client.chat.completions.create(
-                messages=[{"role": "system", "content": prompt}],
-                model=localai_model,
-                temperature=0.6,
-                max_tokens=3000,
-                top_p=1,
-                frequency_penalty=0,
-                presence_penalty=0,
-                user=self.env.user.name,
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            raise UserError(_('Error en respuesta IA local: %s') % str(e))
+    def get_ai_response(self, prompt):
+        """Respuesta de la IA a `prompt`; las preguntas repetidas se sirven desde la caché."""
+        response, error = self.get_ai_responses([prompt])[0]
+        if error:
+            raise UserError(_('Error al obtener la respuesta de la IA: %s') % error)
+        return response
 
-    
+    def get_ai_responses(self, prompts):
+        """
+        Respuestas de la IA a varias preguntas, consultadas en paralelo con el
+        pool de clientes compartido. Solo se llama a la IA para las preguntas
+        que no están en la caché.
 
-    def _get_external_response(self, prompt, url):
-        try:
-            _logger.info('Prompt enviado a IA externa: %s , url : %s', prompt, url)
-            response = requests.post(
-                url,
-                json={"prompt": prompt},
-                headers={"Content-Type": "application/json"},
-                timeout=60,
-            )
+        :return: lista de tuplas (respuesta, error) en el orden de `prompts`;
+            `error` es None si la pregunta se respondió correctamente.
+        """
+        config = self._get_ia_config()
+        keys = [response_cache.make_key(config, prompt) for prompt in prompts]
+        results = [None] * len(prompts)
+        pending = {}
+        for index, key in enumerate(keys):
+            cached = response_cache.get(key)
+            if cached is not None:
+                results[index] = (cached, None)
+            else:
+                # Las preguntas repetidas dentro del mismo lote se consultan una sola vez
+                pending.setdefault(key, []).append(index)
 
-            if response.status_code == 200:
+        if pending:
+            def fetch(key):
+                prompt = prompts[pending[key][0]] + '. Responder en el idioma de la pregunta.'
                 try:
-                    data = response.json()
-                    # Asumimos que la respuesta es una lista de diccionarios
-                    if isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict):
-                        ia_response=data[0].get("output", "")
-                        #self.message_post(body=f"<b>Respuesta de la IA:</b><br/><pre>{ia_response}</pre>", subtype_xmlid="mail.mt_note" )
-                        return ia_response
-                    else:
-                        raise UserError(_('La respuesta JSON no es una lista de diccionarios válida: %s') % str(data))
-                except ValueError:
-                    raise UserError(_('La respuesta de la IA no es JSON válido. Contenido recibido: %s') % response.text)
-            else:
-                raise UserError(_('Error en respuesta IA externa: Código %s - %s') % (response.status_code, response.text))
+                    return request_completion(config, prompt), None
+                except IaError as e:
+                    return None, str(e)
 
-        except Exception as e:
-            raise UserError(_('Error de conexión a IA externa: %s') % str(e))
+            for key, result in zip(pending, client_pool.map(fetch, list(pending))):
+                if result[1] is None:
+                    response_cache.set(key, result[0])
+                for index in pending[key]:
+                    results[index] = result
+        return results
 
+    def _get_ia_config(self):
+        """
+        Configuración de la IA leída una sola vez, para que los hilos del pool
+        no accedan al ORM. También ajusta el tamaño del pool y de la caché.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        localai_model_id = ICP.get_param('asi_ia.localai_model') or ICP.get_param('asi_ia.localai_model_id')
+        localai_model = 'qwen2-0.5b-instruct'
+        if localai_model_id:
+            try:
+                localai_model = self.env['localai.model'].browse(int(localai_model_id)).name or localai_model
+            except Exception as ex:
+                _logger.warning('Fallo al obtener modelo: %s', ex)
 
+        client_pool.configure(int(ICP.get_param('asi_ia.max_workers', 4)))
+        response_cache.configure(
+            int(ICP.get_param('asi_ia.cache_size', 1000)),
+            int(ICP.get_param('asi_ia.cache_ttl', 3600)),
+        )
+        return {
+            'use_external': ICP.get_param('asi_ia.use_external_ia') == 'True',
+            'external_url': ICP.get_param('asi_ia.external_ia_url'),
+            'base_url': ICP.get_param('asi_ia.openapi_base_url'),
+            'api_key': ICP.get_param('asi_ia.openapi_api_key'),
+            'model': localai_model,
+            'user': self.env.user.name,
+            'timeout': int(ICP.get_param('asi_ia.request_timeout', 60)),
+        }
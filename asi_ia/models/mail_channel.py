@@ -18,7 +18,6 @@ class Channel(models.Model):
 
         # Referencias de configuración
         localai_channel_id = self.env.ref('asi_ia.channel_localai')
-        user_localai = self.env.ref("asi_ia.user_localai")
         partner_localai = self.env.ref("asi_ia.partner_localai")
 
         author_id = msg_vals.get('author_id')
@@ -38,29 +37,18 @@ class Channel(models.Model):
                 if (author_id != partner_localai.id and
                         (localai_name in record_name or 'Local AI,' in record_name)):
                     _logger.warning('***->ASI IA  Condición de chat cumplida')
-                    res = self.env['asi_ia.service'].get_ai_response(prompt)
-                    _logger.warning('***->ASI IA  Respuesta obtenida: %s', res)
-                    self.with_user(user_localai).message_post(
-                        body=res,
-                        message_type='comment',
-                        subtype_xmlid='mail.mt_comment'
-                    )
+                    # La respuesta se publica desde la cola, sin bloquear la petición
+                    self.env['asi_ia.job'].enqueue(self, prompt, author_id)
 
             # 💬 Mensajes en canal de la IA
             elif (msg_vals.get('model', '') == 'mail.channel' and
                   msg_vals.get('res_id', 0) == localai_channel_id.id and
                   author_id != partner_localai.id):
                 _logger.warning('***->ASI IA  Condición de canal cumplida')
-                res = self.env['asi_ia.service'].get_ai_response(prompt)
-                _logger.warning('***->ASI IA  Respuesta obtenida: %s', res)
-                localai_channel_id.with_user(user_localai).message_post(
-                    body=res,
-                    message_type='comment',
-                    subtype_xmlid='mail.mt_comment'
-                )
+                self.env['asi_ia.job'].enqueue(localai_channel_id, prompt, author_id)
 
         except Exception as e:
             _logger.error('***->ASI IA  Error: %s', str(e))
-            raise UserError(_("Error al procesar la respuesta de la IA: %s") % str(e))
+            raise UserError(_("Error al encolar la pregunta para la IA: %s") % str(e))
 
         return rdata
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+from ..models import ia_client
+from ..models.ia_client import IaClientPool, ResponseCache
+
+CONFIG = {'use_external': False, 'external_url': False, 'base_url': 'http://localai', 'model': 'qwen'}
+
+
+class TestResponseCache(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = 1000.0
+        clock = SimpleNamespace(monotonic=lambda: self.now)
+        patcher = patch.object(ia_client, 'time', clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_same_question_same_key(self):
+        key = ResponseCache.make_key(CONFIG, '<p>¿Qué   hora es?</p>')
+        self.assertEqual(key, ResponseCache.make_key(CONFIG, '¿qué hora es?'))
+        other_model = dict(CONFIG, model='llama')
+        self.assertNotEqual(key, ResponseCache.make_key(other_model, '¿qué hora es?'))
+
+    def test_expired_entries(self):
+        cache = ResponseCache(max_entries=10, ttl=60)
+        cache.set('a', 'respuesta')
+        self.now += 59
+        self.assertEqual(cache.get('a'), 'respuesta')
+        self.now += 2
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # La entrada caducada se elimina
+        self.assertNotIn('a', cache._entries)
+
+    def test_least_recently_used_evicted(self):
+        cache = ResponseCache(max_entries=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        # 'a' pasa a ser la más reciente
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_configure_shrinks_cache(self):
+        cache = ResponseCache(max_entries=3, ttl=60)
+        for key in 'abc':
+            cache.set(key, key)
+        cache.configure(1, 60)
+        self.assertEqual(list(cache._entries), ['c'])
+        # Sin tamaño o sin caducidad no se guarda nada
+        cache.configure(0, 60)
+        cache.set('d', 'd')
+        self.assertIsNone(cache.get('d'))
+
+
+class TestIaClientPool(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pool = IaClientPool(max_workers=3)
+        self.addCleanup(self.pool.configure, 0)
+
+    def test_map_keeps_order(self):
+        threads = set()
+
+        def square(value):
+            threads.add(threading.current_thread().name)
+            return value * value
+
+        self.assertEqual(self.pool.map(square, range(10)), [value * value for value in range(10)])
+        self.assertTrue(all(name.startswith('asi_ia') for name in threads))
+
+    def test_single_item_runs_inline(self):
+        names = self.pool.map(lambda item: threading.current_thread().name, ['a'])
+        self.assertEqual(names, [threading.current_thread().name])
+        self.assertIsNone(self.pool._executor)
+
+    def test_configure_replaces_executor(self):
+        self.pool.map(str, [1, 2])
+        executor = self.pool._executor
+        self.pool.configure(3)
+        self.assertIs(self.pool._executor, executor)
+        self.pool.configure(2)
+        self.assertIsNone(self.pool._executor)
+        self.assertEqual(self.pool.map(str, [1, 2]), ['1', '2'])
+
+    def test_shared_session(self):
+        session = self.pool.session()
+        self.assertIs(self.pool.session(), session)
+        self.assertEqual(session.get_adapter('https://ia').poolmanager.connection_pool_kw['maxsize'],
+                         self.pool.pool_size)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+
+class TestIaJob(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Job = cls.env['asi_ia.job']
+        # Solo deben procesarse las preguntas de la prueba
+        cls.Job.search([]).unlink()
+        cls.env['ir.config_parameter'].sudo().set_param('asi_ia.job_max_attempts', 2)
+        cls.channel = cls.env['mail.channel'].create({'name': 'Pruebas IA'})
+        cls.service_class = type(cls.env['asi_ia.service'])
+
+    def _create_job(self, prompt):
+        return self.Job.create({'channel_id': self.channel.id, 'prompt': prompt})
+
+    def _process(self, answers):
+        """Procesa la cola con las respuestas (respuesta, error) de `answers` por pregunta."""
+        asked = []
+
+        def get_ai_responses(service, prompts):
+            asked.extend(prompts)
+            return [answers[prompt] for prompt in prompts]
+
+        with patch.object(self.service_class, 'get_ai_responses', get_ai_responses):
+            self.Job._process_jobs()
+        return asked
+
+    def _channel_bodies(self):
+        return self.channel.message_ids.mapped('body')
+
+    def test_claim_marks_jobs_running(self):
+        job = self._create_job('a')
+        self.assertEqual(self.Job.claim(10), job)
+        self.assertEqual(job.state, 'running')
+        self.assertEqual(job.attempts, 1)
+        self.assertTrue(job.started_at)
+        # Una pregunta en curso no se vuelve a tomar hasta que caduca
+        self.assertFalse(self.Job.claim(10))
+        self.env.cr.execute(
+            "UPDATE asi_ia_job SET started_at = started_at - interval '1 hour' WHERE id = %s", (job.id,))
+        self.assertEqual(self.Job.claim(10, running_timeout=60), job)
+        self.assertEqual(job.attempts, 2)
+
+    def test_answers_posted(self):
+        jobs = self._create_job('a') | self._create_job('b')
+        asked = self._process({'a': ('respuesta a', None), 'b': ('respuesta b', None)})
+        self.assertEqual(asked, ['a', 'b'])
+        self.assertFalse(jobs.exists())
+        bodies = self._channel_bodies()
+        self.assertTrue(any('respuesta a' in body for body in bodies))
+        self.assertTrue(any('respuesta b' in body for body in bodies))
+
+    def test_error_retried_then_reported(self):
+        job = self._create_job('a')
+        self._process({'a': (None, 'sin conexión')})
+        self.assertEqual((job.state, job.attempts, job.error), ('pending', 1, 'sin conexión'))
+        self.assertFalse(self._channel_bodies())
+
+        self._process({'a': (None, 'sin conexión')})
+        self.assertEqual((job.state, job.attempts), ('error', 2))
+        self.assertTrue(any('sin conexión' in body for body in self._channel_bodies()))
+        # Las preguntas en error ya no se toman
+        self.assertEqual(self._process({}), [])
+
+    def test_failure_saving_one_job_keeps_the_others(self):
+        failing = self._create_job('a')
+        other = self._create_job('b')
+        post_response = type(self.Job)._post_response
+
+        def fake_post_response(job, response, user_localai):
+            if job == failing:
+                raise ValueError('canal no disponible')
+            return post_response(job, response, user_localai)
+
+        with patch.object(type(self.Job), '_post_response', fake_post_response):
+            self._process({'a': ('respuesta a', None), 'b': ('respuesta b', None)})
+        self.assertFalse(other.exists())
+        self.assertTrue(any('respuesta b' in body for body in self._channel_bodies()))
+        self.assertEqual((failing.state, failing.error), ('pending', 'canal no disponible'))
@@ -12,10 +12,11 @@
     'author': 'F3nrir',
     'company': 'ASI S.U.R.L.',
     'website': 'https://antasi.asisurl.cu',
-    'depends': ['base', 'web'],
+    'depends': ['base', 'web', 'bus'],
     'data': [
         'security/security.xml',        
         'data/signature_tags.xml',
+        'data/ir_cron_data.xml',
         'views/res_users_views.xml',
         'wizards/firma_documento_views.xml',
         'views/firma_digital_menu.xml',
@@ -25,6 +26,7 @@
         'web.assets_backend': [
             'asi_pdf_signature/static/src/js/firma_digital.js',
             'asi_pdf_signature/static/src/js/drag_drop_widget.js',
+            'asi_pdf_signature/static/src/js/firma_progreso_service.js',
             'asi_pdf_signature/static/src/css/firma_digital.css'
         ],
     },
@@ -1,11 +1,12 @@
 from odoo import http
-from odoo.http import request, content_disposition
+from odoo.http import request, content_disposition, Response
 import base64
 import logging
 import tempfile
 import os
 from io import BytesIO
 import json
+from werkzeug.wsgi import wrap_file
 
 _logger = logging.getLogger(__name__)
 
@@ -48,7 +49,21 @@ class FirmaDigitalController(http.Controller):
         try:
             # Obtener el registro del wizard
             wizard = request.env['firma.documento.wizard'].browse(int(wizard_id))
-            
+
+            # ZIP generado en disco por la firma por lotes: se envía por bloques
+            if wizard.zip_path and os.path.exists(wizard.zip_path):
+                zip_headers = [
+                    ('Content-Type', 'application/zip'),
+                    ('Content-Length', os.path.getsize(wizard.zip_path)),
+                    ('Content-Disposition', content_disposition(wizard.zip_name))
+                ]
+                zip_file = open(wizard.zip_path, 'rb')
+                return Response(
+                    wrap_file(request.httprequest.environ, zip_file),
+                    headers=zip_headers,
+                    direct_passthrough=True,
+                )
+
             if not wizard.zip_signed:
                 return request.not_found()
             
@@ -0,0 +1,25 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+
+// Muestra el progreso de la firma por lotes enviado por el servidor por el bus
+const firmaProgresoService = {
+  dependencies: ["bus_service", "notification"],
+
+  start(env, { bus_service, notification }) {
+    bus_service.addEventListener("notification", ({ detail: notifications }) => {
+      for (const { payload, type } of notifications) {
+        if (type !== "firma_digital/progreso") {
+          continue
+        }
+        notification.add(payload.message, {
+          title: env._t("Firma por lotes"),
+          type: payload.type || "info",
+        })
+      }
+    })
+    bus_service.start()
+  },
+}
+
+registry.category("services").add("firma_progreso", firmaProgresoService)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import base64
+import datetime
+import logging
+import os
+import time
+import unittest
+from io import BytesIO
+
+from PIL import Image
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..wizards.firma_documento_wizard import HAS_ENDESIVE, HAS_PYPDF2
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('-standard', 'asi_pdf_signature_benchmark')
+class TestFirmaBenchmark(TransactionCase):
+    """Compara el tiempo de firma de todas las páginas con una firma digital
+    por página o con una sola firma digital.
+
+    No se ejecuta por defecto, usar `--test-tags asi_pdf_signature_benchmark`.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if not HAS_ENDESIVE or not HAS_PYPDF2:
+            raise unittest.SkipTest('endesive y PyPDF2 son necesarios')
+        cls.private_key, cls.certificate = cls._crear_certificado()
+        cls.wizard = cls.env['firma.documento.wizard'].create({
+            'signature_role': cls.env.ref('asi_pdf_signature.signature_tag_aprobado').id,
+            'sign_all_pages': True,
+        })
+        imagen = Image.new('RGBA', (200, 80), (0, 0, 0, 255))
+        buffer = BytesIO()
+        imagen.save(buffer, format='PNG')
+        cls.imagen_path, cls.imagen_size = cls.wizard._crear_imagen_firma_con_rol(
+            base64.b64encode(buffer.getvalue()), cls.wizard.signature_role.name
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.imagen_path)
+        super().tearDownClass()
+
+    @classmethod
+    def _crear_certificado(cls):
+        from cryptography import x509
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from cryptography.x509.oid import NameOID
+
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        nombre = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'Benchmark')])
+        ahora = datetime.datetime.utcnow()
+        certificate = (
+            x509.CertificateBuilder()
+            .subject_name(nombre)
+            .issuer_name(nombre)
+            .public_key(private_key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(ahora)
+            .not_valid_after(ahora + datetime.timedelta(days=1))
+            .sign(private_key, hashes.SHA256())
+        )
+        return private_key, certificate
+
+    def _crear_pdf(self, num_paginas):
+        from reportlab.pdfgen import canvas
+
+        buffer = BytesIO()
+        lienzo = canvas.Canvas(buffer)
+        for pagina in range(num_paginas):
+            lienzo.drawString(100, 700, 'Página %s' % (pagina + 1))
+            lienzo.showPage()
+        lienzo.save()
+        return buffer.getvalue()
+
+    def _firmar(self, num_paginas, modo):
+        self.wizard.sign_all_pages_mode = modo
+        documento = self.env['documento.firma'].create({
+            'wizard_id': self.wizard.id,
+            'document_name': 'benchmark_%s' % num_paginas,
+            'pdf_document': base64.b64encode(self._crear_pdf(num_paginas)),
+        })
+        inicio = time.perf_counter()
+        self.wizard._firmar_documento_individual(
+            documento, self.imagen_path, self.imagen_size[0], self.imagen_size[1],
+            self.private_key, self.certificate, [],
+        )
+        duracion = time.perf_counter() - inicio
+        firmado = base64.b64decode(documento.pdf_signed)
+        _logger.info(
+            'Firma de %d páginas, modo %s: %.3fs, %d bytes',
+            num_paginas, modo, duracion, len(firmado),
+        )
+        return duracion, firmado
+
+    def test_benchmark_una_firma(self):
+        for num_paginas in (1, 10, 100):
+            __, firmado = self._firmar(num_paginas, 'una_firma')
+            # Una sola firma criptográfica, sea cual sea el número de páginas
+            self.assertEqual(firmado.count(b'/ByteRange'), 1)
+
+    def test_benchmark_comparacion(self):
+        por_pagina, __ = self._firmar(10, 'por_pagina')
+        una_firma, __ = self._firmar(10, 'una_firma')
+        self.assertLess(una_firma, por_pagina)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import base64
+import datetime
+import os
+import unittest
+import zipfile
+from io import BytesIO
+
+from PIL import Image
+
+from odoo import fields
+from odoo.tests.common import TransactionCase
+
+from ..wizards.firma_documento_wizard import HAS_ENDESIVE, HAS_PYPDF2
+
+requiere_firma = unittest.skipUnless(HAS_ENDESIVE and HAS_PYPDF2, 'endesive y PyPDF2 son necesarios')
+
+
+class TestFirmaLote(TransactionCase):
+    """Firma por lotes: encolado, reclamación por el cron y resultado final."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        imagen = Image.new('RGBA', (200, 80), (0, 0, 0, 255))
+        buffer = BytesIO()
+        imagen.save(buffer, format='PNG')
+        cls.wizard = cls.env['firma.documento.wizard'].create({
+            'signature_role': cls.env.ref('asi_pdf_signature.signature_tag_aprobado').id,
+            'batch_signing': True,
+            'certificate_wizard': base64.b64encode(cls._crear_certificado('secreto')),
+            'certificate_wizard_name': 'prueba.p12',
+            'signature_password': 'secreto',
+            'wizard_signature_image': base64.b64encode(buffer.getvalue()),
+        })
+
+    def tearDown(self):
+        self.wizard._eliminar_zip()
+        super().tearDown()
+
+    @classmethod
+    def _crear_certificado(cls, contrasena):
+        from cryptography import x509
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from cryptography.hazmat.primitives.serialization import pkcs12
+        from cryptography.x509.oid import NameOID
+
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        nombre = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'Firma por lotes')])
+        ahora = datetime.datetime.utcnow()
+        certificate = (
+            x509.CertificateBuilder()
+            .subject_name(nombre)
+            .issuer_name(nombre)
+            .public_key(private_key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(ahora)
+            .not_valid_after(ahora + datetime.timedelta(days=1))
+            .sign(private_key, hashes.SHA256())
+        )
+        return pkcs12.serialize_key_and_certificates(
+            b'prueba', private_key, certificate, None,
+            serialization.BestAvailableEncryption(contrasena.encode('utf-8')),
+        )
+
+    def _crear_pdf(self):
+        from reportlab.pdfgen import canvas
+
+        buffer = BytesIO()
+        lienzo = canvas.Canvas(buffer)
+        lienzo.drawString(100, 700, 'Contrato')
+        lienzo.showPage()
+        lienzo.save()
+        return buffer.getvalue()
+
+    def _crear_documentos(self, contenidos):
+        return self.env['documento.firma'].create([{
+            'wizard_id': self.wizard.id,
+            'document_name': 'documento_%s.pdf' % indice,
+            'pdf_document': base64.b64encode(contenido),
+        } for indice, contenido in enumerate(contenidos)])
+
+    def test_reclamar_lote(self):
+        Wizard = self.env['firma.documento.wizard']
+        self.wizard.write({'status': 'procesando', 'batch_heartbeat': False})
+        self.assertEqual(Wizard._reclamar_lote(), self.wizard)
+        self.assertTrue(self.wizard.batch_heartbeat)
+        # Un lote con actividad reciente pertenece a otro proceso
+        self.assertFalse(Wizard._reclamar_lote())
+        # Sin actividad durante más del margen, el lote se retoma
+        self.wizard.batch_heartbeat = fields.Datetime.now() - datetime.timedelta(hours=1)
+        self.assertEqual(Wizard._reclamar_lote(), self.wizard)
+
+    @requiere_firma
+    def test_iniciar_firma_lote(self):
+        documentos = self._crear_documentos([self._crear_pdf()])
+        documentos.write({'signature_status': 'error', 'error_message': 'anterior'})
+        self.wizard.action_firmar_documentos()
+        self.assertEqual(self.wizard.status, 'procesando')
+        self.assertFalse(self.wizard.batch_heartbeat)
+        self.assertEqual(documentos.signature_status, 'pendiente')
+        self.assertFalse(documentos.error_message)
+
+    @requiere_firma
+    def test_firma_lote(self):
+        pdf = self._crear_pdf()
+        documentos = self._crear_documentos([pdf, pdf, b'no es un pdf'])
+        self.wizard.action_firmar_documentos()
+        self.env['firma.documento.wizard']._cron_firmar_lotes()
+
+        firmados = documentos.filtered(lambda d: d.signature_status == 'firmado')
+        self.assertEqual(len(firmados), 2)
+        for documento in firmados:
+            self.assertEqual(base64.b64decode(documento.pdf_signed).count(b'/ByteRange'), 1)
+        # Un documento que no se puede firmar no detiene el lote
+        self.assertEqual(documentos[2].signature_status, 'error')
+        self.assertTrue(documentos[2].error_message)
+
+        self.assertEqual(self.wizard.status, 'completado')
+        self.assertEqual(self.wizard.documents_processed, 2)
+        self.assertEqual(self.wizard.documents_with_error, 1)
+        self.assertTrue(os.path.exists(self.wizard.zip_path))
+        with zipfile.ZipFile(self.wizard.zip_path) as zip_file:
+            self.assertEqual(len(zip_file.namelist()), 2)
+
+    @requiere_firma
+    def test_reanudar_lote(self):
+        pdf = self._crear_pdf()
+        documentos = self._crear_documentos([pdf, pdf])
+        self.wizard.action_firmar_documentos()
+        # Lote interrumpido tras firmar el primer documento
+        documentos[0].write({'signature_status': 'firmado', 'pdf_signed': base64.b64encode(b'firmado antes')})
+        self.wizard.batch_heartbeat = fields.Datetime.now() - datetime.timedelta(hours=1)
+        self.env['firma.documento.wizard']._cron_firmar_lotes()
+
+        self.assertEqual(base64.b64decode(documentos[0].pdf_signed), b'firmado antes')
+        self.assertEqual(documentos[1].signature_status, 'firmado')
+        self.assertEqual(self.wizard.status, 'completado')
+        self.assertEqual(self.wizard.documents_processed, 2)
+        with zipfile.ZipFile(self.wizard.zip_path) as zip_file:
+            self.assertEqual(len(zip_file.namelist()), 2)
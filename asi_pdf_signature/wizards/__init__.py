@@ -1 +1,2 @@
 from . import firma_documento_wizard
+from . import firma_lote
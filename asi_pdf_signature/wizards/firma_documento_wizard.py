@@ -6,11 +6,14 @@ import base64
 import tempfile
 import os
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from io import BytesIO
 from PIL import Image, ImageDraw, ImageFont
 import binascii
 import zipfile
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 
 # Importaciones para firma digital
 try:
@@ -41,6 +44,104 @@ except ImportError:
 
 _logger = logging.getLogger(__name__)
 
+
+# Funciones sin acceso al ORM, utilizadas también por los procesos de firma por lotes
+
+def calcular_coordenadas_firma(page_width, page_height, imagen_width, imagen_height, posicion):
+    """Calcula las coordenadas de la firma según la posición seleccionada"""
+    margen_inferior = 25
+    margen_lateral = 13
+    separacion = 5
+    ancho = page_width / 4 - 20
+    y = margen_inferior
+
+    # Calcualar nueva altura de imagen
+    escala = min(ancho, imagen_width) / max(ancho, imagen_width)
+    alto = imagen_height * escala   
+    y1 = y + alto 
+
+    # Calcular coordenada X según la posición
+    xi = margen_lateral
+    x1i = xi+ancho
+
+    xci = x1i+xi+separacion
+    x1ci = xci+ancho
+
+    xcd = x1ci+xi+separacion
+    x1cd = xcd+ancho
+
+    xd = x1cd+xi+separacion
+    x1d = xd+ancho
+
+    if posicion == 'izquierda':
+        x = xi
+        x1 = x1i
+    elif posicion == 'centro_izquierda':
+        x = xci
+        x1 = x1ci
+    elif posicion == 'centro_derecha':
+        x = xcd
+        x1 = x1cd
+    else:  # derecha
+        x = xd
+        x1 = x1d
+
+    return x, y, x1, y1
+
+
+def dimensiones_pagina(page):
+    """Devuelve el ancho y alto de una página según la versión de PyPDF2"""
+    if NEW_PYPDF2:
+        return float(page.mediabox.width), float(page.mediabox.height)
+    return float(page.mediaBox.getWidth()), float(page.mediaBox.getHeight())
+
+
+def estampar_imagen_paginas(datau, paginas, imagen_firma_path, imagen_width, imagen_height, posicion):
+    """Estampa la imagen de firma en las páginas indicadas reescribiendo el PDF una sola vez.
+
+    La imagen se dibuja con reportlab en una página superpuesta, generada una
+    sola vez por tamaño de página, y se combina con cada página a estampar.
+    """
+    if not paginas:
+        return datau
+    from reportlab.pdfgen import canvas
+
+    reader = PdfReader(BytesIO(datau))
+    writer = PdfWriter()
+    if NEW_PYPDF2:
+        pages = reader.pages
+    else:
+        pages = [reader.getPage(i) for i in range(reader.getNumPages())]
+    paginas = set(paginas)
+    superposiciones = {}
+    for index, page in enumerate(pages):
+        if index in paginas:
+            page_width, page_height = dimensiones_pagina(page)
+            if (page_width, page_height) not in superposiciones:
+                x, y, x1, y1 = calcular_coordenadas_firma(
+                    page_width, page_height, imagen_width, imagen_height, posicion
+                )
+                buffer = BytesIO()
+                lienzo = canvas.Canvas(buffer, pagesize=(page_width, page_height))
+                lienzo.drawImage(imagen_firma_path, x, y, width=x1 - x, height=y1 - y, mask='auto')
+                lienzo.save()
+                superposicion = PdfReader(BytesIO(buffer.getvalue()))
+                superposiciones[(page_width, page_height)] = (
+                    superposicion.pages[0] if NEW_PYPDF2 else superposicion.getPage(0)
+                )
+            if NEW_PYPDF2:
+                page.merge_page(superposiciones[(page_width, page_height)])
+            else:
+                page.mergePage(superposiciones[(page_width, page_height)])
+        if NEW_PYPDF2:
+            writer.add_page(page)
+        else:
+            writer.addPage(page)
+    salida = BytesIO()
+    writer.write(salida)
+    return salida.getvalue()
+
+
 class DocumentSignatureTag(models.Model):
     _name = 'document.signature.tag'
     _description = 'Etiqueta de Firma'
@@ -160,6 +261,28 @@ class FirmaDocumentoWizard(models.TransientModel):
         help='Si está marcado, se firmará todas las páginas del documento en lugar de solo la última'
     )
 
+    batch_signing = fields.Boolean(
+        string='Firma por lotes en segundo plano',
+        default=False,
+        help='Si está marcado, los documentos se firman fuera de la petición, por lotes y en '
+             'varios procesos. El progreso se notifica en pantalla y el ZIP se genera en disco.'
+    )
+    zip_path = fields.Char(string='Ruta del ZIP', readonly=True)
+    batch_heartbeat = fields.Datetime(
+        string='Última actividad del lote', readonly=True,
+        help='Se actualiza tras cada bloque firmado. Un lote en proceso sin actividad '
+             'reciente se considera interrumpido y el cron lo retoma.'
+    )
+
+    sign_all_pages_mode = fields.Selection([
+        ('una_firma', 'Una sola firma digital'),
+        ('por_pagina', 'Una firma digital por página')
+    ], string='Modo de firma de todas las páginas', default='una_firma',
+       help='Una sola firma digital: se estampa la imagen en todas las páginas en una sola pasada '
+            'y se aplica una única firma criptográfica sobre la última página.\n'
+            'Una firma digital por página: se aplica una firma criptográfica por cada página, '
+            'el tiempo de firma crece con el cuadrado del número de páginas.')
+
     @api.depends('document_ids')
     def _compute_documento_count(self):
         for record in self:
@@ -439,44 +562,7 @@ class FirmaDocumentoWizard(models.TransientModel):
 
     def _calcular_coordenadas_firma(self, page_width, page_height, imagen_width, imagen_height, posicion):
         """Calcula las coordenadas de la firma según la posición seleccionada"""
-        margen_inferior = 25
-        margen_lateral = 13
-        separacion = 5
-        ancho = page_width / 4 - 20
-        y = margen_inferior
-        
-        # Calcualar nueva altura de imagen
-        escala = min(ancho, imagen_width) / max(ancho, imagen_width)
-        alto = imagen_height * escala   
-        y1 = y + alto 
-        
-        # Calcular coordenada X según la posición
-        xi = margen_lateral
-        x1i = xi+ancho
-        
-        xci = x1i+xi+separacion
-        x1ci = xci+ancho
-        
-        xcd = x1ci+xi+separacion
-        x1cd = xcd+ancho
-        
-        xd = x1cd+xi+separacion
-        x1d = xd+ancho
-        
-        if posicion == 'izquierda':
-            x = xi
-            x1 = x1i
-        elif posicion == 'centro_izquierda':
-            x = xci
-            x1 = x1ci
-        elif posicion == 'centro_derecha':
-            x = xcd
-            x1 = x1cd
-        else:  # derecha
-            x = xd
-            x1 = x1d
-                    
-        return x, y, x1, y1
+        return calcular_coordenadas_firma(page_width, page_height, imagen_width, imagen_height, posicion)
 
     def action_firmar_documentos(self):
         """Acción principal para firmar todos los documentos seleccionados"""
@@ -497,6 +583,9 @@ class FirmaDocumentoWizard(models.TransientModel):
         if not self.signature_role:
             raise UserError(_('Debe especificar el rol para la firma.'))
         
+        if self.batch_signing:
+            return self._iniciar_firma_lote()
+
         # Cambiar status a procesando
         self.write({
             'status': 'procesando',
@@ -559,26 +648,7 @@ class FirmaDocumentoWizard(models.TransientModel):
             self._crear_zip_firmados()
         
             # Preparar mensaje final
-            if documents_with_error == 0:
-                mensaje = f'✅ Proceso completado exitosamente!\n\n'
-                mensaje += f'📄 {documents_processed} archivos firmados correctamente\n'
-                mensaje += f'Puede descargar todos los documentos firmados usando el botón de descarga'
-                estado_final = 'completado'
-            else:
-                mensaje = f'⚠️ Proceso completado con errores:\n\n'
-                mensaje += f'✅ {documents_processed} archivos firmados correctamente\n'
-                mensaje += f'❌ {documents_with_error} archivos con errores\n\n'
-                if documents_processed > 0:
-                    mensaje += 'Los archivos firmados exitosamente están disponibles para descarga.\n\n'
-                mensaje += 'Errores detallados:\n' + '\n'.join(errores_detalle)
-                estado_final = 'completado' if documents_processed > 0 else 'error'
-        
-            self.write({
-                'status': estado_final,
-                'message_result': mensaje,
-                'documents_processed': documents_processed,
-                'documents_with_error': documents_with_error
-            })
+            self.write(self._preparar_resultado(documents_processed, documents_with_error, errores_detalle))
         
         except Exception as e:
             _logger.error(f"Error general en proceso de firma: {e}")
@@ -590,6 +660,254 @@ class FirmaDocumentoWizard(models.TransientModel):
     
         return self._recargar_wizard()
 
+    def _preparar_resultado(self, documents_processed, documents_with_error, errores_detalle):
+        """Valores finales del wizard con el mensaje de resultado del proceso"""
+        if documents_with_error == 0:
+            mensaje = f'✅ Proceso completado exitosamente!\n\n'
+            mensaje += f'📄 {documents_processed} archivos firmados correctamente\n'
+            mensaje += f'Puede descargar todos los documentos firmados usando el botón de descarga'
+            estado_final = 'completado'
+        else:
+            mensaje = f'⚠️ Proceso completado con errores:\n\n'
+            mensaje += f'✅ {documents_processed} archivos firmados correctamente\n'
+            mensaje += f'❌ {documents_with_error} archivos con errores\n\n'
+            if documents_processed > 0:
+                mensaje += 'Los archivos firmados exitosamente están disponibles para descarga.\n\n'
+            mensaje += 'Errores detallados:\n' + '\n'.join(errores_detalle)
+            estado_final = 'completado' if documents_processed > 0 else 'error'
+
+        return {
+            'status': estado_final,
+            'message_result': mensaje,
+            'documents_processed': documents_processed,
+            'documents_with_error': documents_with_error
+        }
+
+    def _iniciar_firma_lote(self):
+        """Deja el lote pendiente de firma y despierta al cron que lo procesa.
+
+        Los documentos se firman en el cron, en un pool de procesos, para no
+        bloquear al worker HTTP con lotes grandes.
+        """
+        # Comprobar el certificado y la contraseña antes de encolar el lote
+        self._obtener_datos_firma()
+        self._eliminar_zip()
+        self.write({
+            'status': 'procesando',
+            'message_result': f'Firma por lotes en cola... 0/{len(self.document_ids)} archivos completados',
+            'documents_processed': 0,
+            'documents_with_error': 0,
+            'zip_signed': False,
+            'zip_name': False,
+            'batch_heartbeat': False,
+        })
+        self.document_ids.write({
+            'signature_status': 'pendiente',
+            'error_message': False,
+            'pdf_signed': False,
+        })
+        self.env.ref('asi_pdf_signature.ir_cron_firma_lote')._trigger()
+        return self._recargar_wizard()
+
+    @api.model
+    def _cron_firmar_lotes(self):
+        """Firma los lotes en cola, uno tras otro, hasta que no quede ninguno"""
+        while True:
+            wizard = self._reclamar_lote()
+            if not wizard:
+                return
+            # El certificado, la imagen y las notificaciones son los del usuario del lote
+            wizard.with_user(wizard.create_uid)._procesar_lote()
+
+    @api.model
+    def _reclamar_lote(self):
+        """Reserva el siguiente lote en cola o interrumpido.
+
+        Un lote en proceso cuya última actividad es anterior a
+        `asi_pdf_signature.batch_stale_minutes` se considera interrumpido (el
+        proceso que lo firmaba terminó) y se vuelve a reclamar.
+        """
+        minutos = int(self.env['ir.config_parameter'].sudo().get_param(
+            'asi_pdf_signature.batch_stale_minutes', 15))
+        ahora = fields.Datetime.now()
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT id FROM firma_documento_wizard
+             WHERE batch_signing AND status = 'procesando'
+               AND (batch_heartbeat IS NULL OR batch_heartbeat < %s)
+             ORDER BY id
+             LIMIT 1
+               FOR UPDATE SKIP LOCKED
+        """, (ahora - timedelta(minutes=minutos),))
+        row = self.env.cr.fetchone()
+        if not row:
+            return self.browse()
+        wizard = self.browse(row[0])
+        if wizard.batch_heartbeat:
+            _logger.warning(f"Reanudando la firma por lotes interrumpida del asistente {wizard.id}")
+        wizard.batch_heartbeat = ahora
+        if not getattr(threading.current_thread(), 'testing', False):
+            self.env.cr.commit()
+        return wizard
+
+    def _procesar_lote(self):
+        """Firma los documentos pendientes por bloques en un pool de procesos.
+
+        Cada proceso carga el certificado una sola vez. Tras cada bloque se
+        guardan los documentos firmados, se añaden al ZIP en disco, se
+        actualiza la actividad del lote, se hace commit y se notifica el
+        progreso por el bus. Un lote retomado conserva los documentos ya
+        firmados y sus errores.
+        """
+        from . import firma_lote
+
+        ICP = self.env['ir.config_parameter'].sudo()
+        tamano_bloque = int(ICP.get_param('asi_pdf_signature.batch_size', 20))
+        max_procesos = min(
+            int(ICP.get_param('asi_pdf_signature.batch_workers', 4)),
+            os.cpu_count() or 1
+        )
+        en_test = getattr(threading.current_thread(), 'testing', False)
+        documentos = self.document_ids
+        firmados = documentos.filtered(lambda d: d.signature_status == 'firmado')
+        con_error = documentos.filtered(lambda d: d.signature_status == 'error')
+        pendientes = documentos - firmados - con_error
+        documents_processed = len(firmados)
+        documents_with_error = len(con_error)
+        errores_detalle = [f"Error en {d.document_name}: {d.error_message}" for d in con_error]
+
+        imagen_firma_path = None
+        zip_fd, zip_path = tempfile.mkstemp(prefix='firmados_', suffix='.zip')
+        os.close(zip_fd)
+        try:
+            certificado_data, imagen_firma, contrasena = self._obtener_datos_firma()
+            imagen_firma_path, imagen_size = self._crear_imagen_firma_con_rol(
+                imagen_firma,
+                self.signature_role.name
+            )
+            opciones = {
+                'imagen_path': imagen_firma_path,
+                'imagen_width': imagen_size[0],
+                'imagen_height': imagen_size[1],
+                'posicion': self.signature_position,
+                'sign_all_pages': self.sign_all_pages,
+                'contact': self.env.user.email or '',
+                'location': self.env.user.company_id.city or '',
+                'signingdate': datetime.now().strftime("D:%Y%m%d%H%M%S+00'00'"),
+                'reason': f"Firma Digital - {self.signature_role.name}",
+            }
+            with ProcessPoolExecutor(
+                max_workers=max_procesos,
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=firma_lote.inicializar_proceso,
+                initargs=(certificado_data, contrasena),
+            ) as executor, zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+                for documento in firmados:
+                    zip_file.writestr(self._nombre_firmado(documento), base64.b64decode(documento.pdf_signed))
+                    documento.invalidate_recordset(['pdf_signed'])
+                for inicio in range(0, len(pendientes), tamano_bloque):
+                    bloque = pendientes[inicio:inicio + tamano_bloque]
+                    tareas = [
+                        (documento.id, base64.b64decode(documento.pdf_document), opciones)
+                        for documento in bloque
+                    ]
+                    for documento_id, pdf_firmado, error in executor.map(
+                            firma_lote.firmar_documento_proceso, tareas):
+                        documento = bloque.browse(documento_id)
+                        if error:
+                            documents_with_error += 1
+                            documento.write({'signature_status': 'error', 'error_message': error})
+                            errores_detalle.append(f"Error en {documento.document_name}: {error}")
+                            continue
+                        documento.write({
+                            'signature_status': 'firmado',
+                            'pdf_signed': base64.b64encode(pdf_firmado),
+                        })
+                        zip_file.writestr(self._nombre_firmado(documento), pdf_firmado)
+                        documents_processed += 1
+                    mensaje = (f'Firma por lotes en curso... {documents_processed + documents_with_error}'
+                               f'/{len(documentos)} archivos completados')
+                    self.write({
+                        'documents_processed': documents_processed,
+                        'documents_with_error': documents_with_error,
+                        'message_result': mensaje,
+                        'batch_heartbeat': fields.Datetime.now(),
+                    })
+                    # Liberar la memoria de los PDF del bloque
+                    bloque.invalidate_recordset(['pdf_document', 'pdf_signed'])
+                    if not en_test:
+                        self.env.cr.commit()
+                    self._notificar_progreso(mensaje, 'info')
+
+            valores = self._preparar_resultado(documents_processed, documents_with_error, errores_detalle)
+            if documents_processed > 1:
+                timestamp = datetime.now().strftime("%d.%m.%Y_%H.%M.%S")
+                valores.update({
+                    'zip_path': zip_path,
+                    'zip_name': f"Documentos_firmados_{timestamp}.zip",
+                })
+            else:
+                os.unlink(zip_path)
+            self.write(valores)
+            self._notificar_progreso(valores['message_result'], 'success' if valores['status'] == 'completado' else 'danger')
+        except Exception as e:
+            _logger.error(f"Error general en proceso de firma por lotes: {e}")
+            if not en_test:
+                self.env.cr.rollback()
+            try:
+                os.unlink(zip_path)
+            except Exception:
+                pass
+            self.write({
+                'status': 'error',
+                'message_result': f'Error general: {str(e)}',
+                'documents_with_error': len(documentos) - documents_processed,
+            })
+            self._notificar_progreso(f'Error general: {str(e)}', 'danger')
+        finally:
+            if imagen_firma_path:
+                try:
+                    os.unlink(imagen_firma_path)
+                except Exception:
+                    pass
+            if not en_test:
+                self.env.cr.commit()
+
+    def _notificar_progreso(self, mensaje, tipo):
+        """Envía el progreso de la firma por lotes al usuario por el bus"""
+        self.env['bus.bus']._sendone(self.env.user.partner_id, 'firma_digital/progreso', {
+            'wizard_id': self.id,
+            'message': mensaje,
+            'type': tipo,
+            'documents_processed': self.documents_processed,
+            'documents_with_error': self.documents_with_error,
+            'document_count': len(self.document_ids),
+        })
+
+    def _nombre_firmado(self, documento):
+        """Nombre del PDF firmado dentro del ZIP"""
+        nombre_base, extension = os.path.splitext(documento.document_name)
+        if not extension:
+            extension = '.pdf'
+        return f"{nombre_base} - firmado{extension}"
+
+    def _eliminar_zip(self):
+        """Elimina los ZIP generados en disco por la firma por lotes"""
+        for wizard in self.filtered('zip_path'):
+            try:
+                os.unlink(wizard.zip_path)
+            except OSError:
+                pass
+        self.filtered('zip_path').write({'zip_path': False})
+
+    def unlink(self):
+        self._eliminar_zip()
+        return super().unlink()
+
+    def action_actualizar_progreso(self):
+        """Recarga el wizard para mostrar el progreso de la firma por lotes"""
+        return self._recargar_wizard()
+
     def _firmar_documento_individual(self, documento, imagen_firma_path, imagen_width, imagen_height,
                                    private_key, certificate, additional_certificates):
         """Firma un documento individual"""
@@ -638,7 +956,15 @@ class FirmaDocumentoWizard(models.TransientModel):
             datau = None
             with open(temp_pdf_path, 'rb') as f:
                 datau = f.read()
-            
+
+            if self.sign_all_pages and self.sign_all_pages_mode == 'una_firma':
+                # Estampar la imagen en todas las páginas menos la última y
+                # aplicar una sola firma digital visible en la última página
+                datau = self._estampar_imagen_paginas(
+                    datau, paginas_a_firmar[:-1], imagen_firma_path, imagen_width, imagen_height
+                )
+                paginas_a_firmar = paginas_a_firmar[-1:]
+
             # Firmar cada página seleccionada
             for i, pagina_index in enumerate(paginas_a_firmar):
                 _logger.info(f"Firmando la página {pagina_index + 1}/{num_paginas} del documento")
@@ -681,25 +1007,28 @@ class FirmaDocumentoWizard(models.TransientModel):
                         temp_final.write(datas)
                         temp_final_path = temp_final.name
 
-                    # Flatten the PDF to avoid xref issues in subsequent signatures
-                    with open(temp_final_path, 'rb') as f:
-                        reader = PdfReader(f)
-                        writer = PdfWriter()
-                        if NEW_PYPDF2:
-                            pages = reader.pages
-                        else:
-                            pages = [reader.getPage(i) for i in range(reader.getNumPages())]
-                        for page in pages:
+                    # Aplanar solo si quedan firmas por aplicar: reescribir el PDF
+                    # después de la última firma la invalidaría
+                    if i < len(paginas_a_firmar) - 1:
+                        # Flatten the PDF to avoid xref issues in subsequent signatures
+                        with open(temp_final_path, 'rb') as f:
+                            reader = PdfReader(f)
+                            writer = PdfWriter()
                             if NEW_PYPDF2:
-                                writer.add_page(page)
+                                pages = reader.pages
                             else:
-                                writer.addPage(page)
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='_flattened.pdf') as temp_flat:
-                            writer.write(temp_flat)
-                            temp_flat_path = temp_flat.name
-                    os.unlink(temp_final_path)
-                    temp_final_path = temp_flat_path
-                    datau = open(temp_flat_path, 'rb').read()
+                                pages = [reader.getPage(i) for i in range(reader.getNumPages())]
+                            for page in pages:
+                                if NEW_PYPDF2:
+                                    writer.add_page(page)
+                                else:
+                                    writer.addPage(page)
+                            with tempfile.NamedTemporaryFile(delete=False, suffix='_flattened.pdf') as temp_flat:
+                                writer.write(temp_flat)
+                                temp_flat_path = temp_flat.name
+                        os.unlink(temp_final_path)
+                        temp_final_path = temp_flat_path
+                        datau = open(temp_flat_path, 'rb').read()
                 else:
                     # Para firmas adicionales, leer el archivo ya firmado y agregar la nueva firma
                     with open(temp_final_path, 'rb') as f:
@@ -711,24 +1040,27 @@ class FirmaDocumentoWizard(models.TransientModel):
                         temp_next.write(datas)
                         temp_next_path = temp_next.name
 
-                    # Flatten the PDF to avoid xref issues in subsequent signatures
-                    with open(temp_next_path, 'rb') as f:
-                        reader = PdfReader(f)
-                        writer = PdfWriter()
-                        if NEW_PYPDF2:
-                            pages = reader.pages
-                        else:
-                            pages = [reader.getPage(i) for i in range(reader.getNumPages())]
-                        for page in pages:
+                    # Aplanar solo si quedan firmas por aplicar: reescribir el PDF
+                    # después de la última firma la invalidaría
+                    if i < len(paginas_a_firmar) - 1:
+                        # Flatten the PDF to avoid xref issues in subsequent signatures
+                        with open(temp_next_path, 'rb') as f:
+                            reader = PdfReader(f)
+                            writer = PdfWriter()
                             if NEW_PYPDF2:
-                                writer.add_page(page)
+                                pages = reader.pages
                             else:
-                                writer.addPage(page)
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=f'_flattened_p{pagina_index + 1}.pdf') as temp_flat:
-                            writer.write(temp_flat)
-                            temp_flat_path = temp_flat.name
-                    os.unlink(temp_next_path)
-                    temp_next_path = temp_flat_path
+                                pages = [reader.getPage(i) for i in range(reader.getNumPages())]
+                            for page in pages:
+                                if NEW_PYPDF2:
+                                    writer.add_page(page)
+                                else:
+                                    writer.addPage(page)
+                            with tempfile.NamedTemporaryFile(delete=False, suffix=f'_flattened_p{pagina_index + 1}.pdf') as temp_flat:
+                                writer.write(temp_flat)
+                                temp_flat_path = temp_flat.name
+                        os.unlink(temp_next_path)
+                        temp_next_path = temp_flat_path
 
                     # Eliminar el archivo anterior y usar el nuevo
                     try:
@@ -738,7 +1070,7 @@ class FirmaDocumentoWizard(models.TransientModel):
                     temp_final_path = temp_next_path
 
                     # Actualizar datau para la siguiente iteración
-                    datau = open(temp_flat_path, 'rb').read()
+                    datau = open(temp_final_path, 'rb').read()
             
             # Leer el PDF final firmado
             with open(temp_final_path, 'rb') as f:
@@ -762,6 +1094,16 @@ class FirmaDocumentoWizard(models.TransientModel):
                 pass
             raise e
 
+    def _dimensiones_pagina(self, page):
+        """Devuelve el ancho y alto de una página según la versión de PyPDF2"""
+        return dimensiones_pagina(page)
+
+    def _estampar_imagen_paginas(self, datau, paginas, imagen_firma_path, imagen_width, imagen_height):
+        """Estampa la imagen de firma en las páginas indicadas reescribiendo el PDF una sola vez"""
+        return estampar_imagen_paginas(
+            datau, paginas, imagen_firma_path, imagen_width, imagen_height, self.signature_position
+        )
+
     def _crear_zip_firmados(self):
         """Crea un archivo ZIP con todos los documentos firmados exitosamente solo si hay más de uno"""
         documents_signed = self.document_ids.filtered(lambda d: d.signature_status == 'firmado' and d.pdf_signed)
@@ -774,10 +1116,7 @@ class FirmaDocumentoWizard(models.TransientModel):
             with zipfile.ZipFile(temp_zip, 'w', zipfile.ZIP_DEFLATED) as zip_file:
                 for documento in documents_signed:
                     # Obtener el nombre base y añadir " - firmado"
-                    nombre_base, extension = os.path.splitext(documento.document_name)
-                    if not extension:
-                        extension = '.pdf'
-                    nombre_firmado = f"{nombre_base} - firmado{extension}"
+                    nombre_firmado = self._nombre_firmado(documento)
 
                     # Añadir el PDF firmado al ZIP
                     pdf_content = base64.b64decode(documento.pdf_signed)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Firma de documentos en procesos hijos, para la firma por lotes.
+
+Estas funciones no acceden al ORM: reciben el contenido de los PDF y
+devuelven el resultado, para poder ejecutarse en un ProcessPoolExecutor.
+"""
+import logging
+from io import BytesIO
+
+from . import firma_documento_wizard as firma
+
+_logger = logging.getLogger(__name__)
+
+# Clave y certificados cargados una sola vez por proceso
+_datos_proceso = {}
+
+
+def inicializar_proceso(certificado_data, contrasena):
+    """Inicializador del proceso: carga el PKCS#12 una sola vez"""
+    private_key, certificate, additional_certificates = firma.pkcs12.load_key_and_certificates(
+        certificado_data,
+        contrasena.encode('utf-8')
+    )
+    _datos_proceso.update({
+        'private_key': private_key,
+        'certificate': certificate,
+        'additional_certificates': additional_certificates or [],
+    })
+
+
+def firmar_pdf(datau, opciones, private_key, certificate, additional_certificates):
+    """Firma un PDF con una sola firma digital visible en la última página.
+
+    Si `opciones['sign_all_pages']` está activo, la imagen de firma se estampa
+    antes en el resto de páginas.
+    """
+    reader = firma.PdfReader(BytesIO(datau))
+    num_paginas = len(reader.pages)
+    page_width, page_height = firma.dimensiones_pagina(reader.pages[-1])
+    x, y, x1, y1 = firma.calcular_coordenadas_firma(
+        page_width, page_height, opciones['imagen_width'], opciones['imagen_height'], opciones['posicion']
+    )
+    if opciones['sign_all_pages']:
+        datau = firma.estampar_imagen_paginas(
+            datau, range(num_paginas - 1), opciones['imagen_path'],
+            opciones['imagen_width'], opciones['imagen_height'], opciones['posicion']
+        )
+    dct = {
+        "aligned": 0,
+        "sigflags": 3,
+        "sigflagsft": 132,
+        "sigpage": num_paginas - 1,
+        "sigbutton": True,
+        "sigfield": f"Signature_{opciones['documento_id']}_page_{num_paginas}",
+        "auto_sigfield": True,
+        "sigandcertify": True,
+        "signaturebox": (x, y, x1, y1),
+        "signature_img": opciones['imagen_path'],
+        "contact": opciones['contact'],
+        "location": opciones['location'],
+        "signingdate": opciones['signingdate'],
+        "reason": f"{opciones['reason']} - Página {num_paginas}",
+    }
+    datas = firma.pdf.cms.sign(
+        datau,
+        dct,
+        private_key,
+        certificate,
+        additional_certificates,
+        'sha256'
+    )
+    return datau + datas
+
+
+def firmar_documento_proceso(tarea):
+    """Firma un documento con la clave cargada por `inicializar_proceso`.
+
+    :param tarea: tupla (id del documento, contenido del PDF, opciones)
+    :return: tupla (id del documento, PDF firmado o None, mensaje de error o None)
+    """
+    documento_id, datau, opciones = tarea
+    try:
+        opciones = dict(opciones, documento_id=documento_id)
+        return documento_id, firmar_pdf(datau, opciones, **_datos_proceso), None
+    except Exception as e:
+        _logger.error(f"Error firmando documento {documento_id}: {e}")
+        return documento_id, None, str(e)
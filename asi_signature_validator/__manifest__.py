@@ -4,11 +4,12 @@
 # 1. Validar certificados P12 y ver su información (emisor, titular, expiración)
 # 2. Verificar firmas digitales en documentos PDF
 # 3. Validar contra entidades certificadoras configuradas
+# 4. Verificar por lotes los PDFs adjuntos y de Alfresco, guardando el resultado por hash
 
 {
     'name': 'ASI Validador de Firmas',
     'summary': 'Validar certificados P12 y verificar firmas digitales en PDFs desde el sitio web',
-    'version': '2.5.0',
+    'version': '2.6.0',
     'category': 'Website',
     'author': 'F3nrir',
     'company': 'ASI S.U.R.L.',
@@ -18,6 +19,7 @@
         'security/ir.model.access.csv',
         'views/certificate_authority_views.xml',
         'views/user_p12_report_views.xml',
+        'views/pdf_signature_verification_views.xml',
         'data/ir_cron.xml',
         'data/website_menu.xml',
         'views/templates.xml',
@@ -7,6 +7,7 @@ Proporciona endpoints para:
 - Validación de cadena de confianza contra CAs configuradas
 """
 import base64
+import hashlib
 import json
 import logging
 import re
@@ -19,6 +20,15 @@ from werkzeug.utils import secure_filename
 from odoo import http
 from odoo.http import request
 
+from odoo.addons.asi_signature_validator.models.certificate_authority import (
+    CertificateIndex,
+    TrustStore,
+)
+from odoo.addons.asi_signature_validator.models.pdf_signature_verification import (
+    find_signature_byte_ranges,
+    verify_byte_range_digest,
+)
+
 _logger = logging.getLogger(__name__)
 
 # Importaciones para manejo de certificados
@@ -74,6 +84,10 @@ class SignatureValidatorController(http.Controller):
     Controlador para las páginas de validación de certificados y verificación de firmas PDF.
     """
 
+    # Almacén de confianza fijo para instancias usadas fuera de una petición
+    # (p. ej. procesos de verificación por lotes). Si es None se usa el del registro.
+    _trust_store = None
+
     # =========================================================================
     # MÉTODOS AUXILIARES PARA ENTIDADES CERTIFICADORAS
     # =========================================================================
@@ -91,6 +105,21 @@ class SignatureValidatorController(http.Controller):
         except Exception as e:
             _logger.error(f"Error obteniendo CAs configuradas: {e}")
             return []
+
+    def _get_trust_store(self):
+        """
+        Obtiene el almacén de confianza en caché con las CAs activas.
+
+        Returns:
+            TrustStore: Índice de las CAs por DN, SKI y CN
+        """
+        if self._trust_store is not None:
+            return self._trust_store
+        try:
+            return request.env['asi.certificate.authority'].sudo()._get_trust_store()
+        except Exception as e:
+            _logger.error(f"Error obteniendo el almacén de confianza: {e}")
+            return TrustStore()
     
     # =========================================================================
     # para soportar cadenas con intermedios y verificación criptográfica real
@@ -124,7 +153,8 @@ class SignatureValidatorController(http.Controller):
             return result
         
         # Obtener CAs configuradas
-        configured_cas = self._get_configured_cas()
+        trust_store = self._get_trust_store()
+        configured_cas = trust_store.entries
         
         if not configured_cas:
             result['validation_warnings'].append(
@@ -162,26 +192,19 @@ class SignatureValidatorController(http.Controller):
         # Listar todas las CAs configuradas para debug
         _logger.info(f"[CHAIN] --- CAs configuradas ---")
         ca_subjects = []
-        for ca_record, ca_cert in configured_cas:
-            ca_subject_cn = self._get_cn_from_name(ca_cert.subject)
-            ca_subject_full = self._name_to_dict(ca_cert.subject)
+        for ca_entry in configured_cas:
+            ca_subject_cn = ca_entry['subject_cn']
+            ca_subject_full = self._name_to_dict(ca_entry['subject'])
             ca_subjects.append(ca_subject_cn)
-            _logger.info(f"[CHAIN]   - {ca_record.name}: {ca_subject_cn}")
+            _logger.info(f"[CHAIN]   - {ca_entry['name']}: {ca_subject_cn}")
             _logger.info(f"[CHAIN]     Subject completo: {ca_subject_full}")
-            result['debug_info'].append(f"CA disponible: {ca_record.name} ({ca_subject_cn})")
+            result['debug_info'].append(f"CA disponible: {ca_entry['name']} ({ca_subject_cn})")
         
         # Construir pool de certificados disponibles (intermedios del P12 + CAs configuradas)
         cert_pool = []
         
         # Agregar CAs configuradas al pool
-        for ca_record, ca_cert in configured_cas:
-            cert_pool.append({
-                'cert': ca_cert,
-                'name': ca_record.name,
-                'subject_cn': self._get_cn_from_name(ca_cert.subject),
-                'subject': ca_cert.subject,
-                'is_configured_ca': True
-            })
+        cert_pool.extend(trust_store.entries)
         
         # Agregar certificados adicionales del P12 (intermedios)
         if additional_certs:
@@ -206,36 +229,27 @@ class SignatureValidatorController(http.Controller):
         _logger.info(f"[CHAIN] --- Estrategia 1: Verificación directa ---")
         result['debug_info'].append("--- Verificación directa contra CAs ---")
         
-        for ca_record, ca_cert in configured_cas:
-            ca_subject_cn = self._get_cn_from_name(ca_cert.subject)
-            
-            # Comparar issuer del certificado con subject de la CA
-            names_match = self._names_match(certificate.issuer, ca_cert.subject)
-            _logger.info(f"[CHAIN] Comparando issuer con CA '{ca_record.name}': match={names_match}")
+        # Las CAs candidatas se obtienen del índice por SKI/DN/CN del emisor
+        for ca_entry in trust_store.find_issuers(certificate):
+            ca_cert = ca_entry['cert']
+            _logger.info(f"[CHAIN] Issuer coincide con CA '{ca_entry['name']}', verificando firma criptográfica...")
+            sig_valid, sig_error = self._verify_certificate_signature_detailed(certificate, ca_cert)
             
-            if names_match:
-                _logger.info(f"[CHAIN] Nombres coinciden, verificando firma criptográfica...")
-                sig_valid, sig_error = self._verify_certificate_signature_detailed(certificate, ca_cert)
-                
-                if sig_valid:
-                    _logger.info(f"[CHAIN] ¡ÉXITO! Firma válida contra CA: {ca_record.name}")
-                    result['chain_valid'] = True
-                    result['chain_verified'] = True
-                    result['trusted_ca'] = {
-                        'name': ca_record.name,
-                        'subject_cn': ca_record.subject_cn,
-                        'organization': ca_record.subject_org
-                    }
-                    result['chain_path'].append({
-                        'type': 'trusted_ca',
-                        'subject': ca_subject_cn,
-                        'issuer': self._get_cn_from_name(ca_cert.issuer)
-                    })
-                    result['debug_info'].append(f"VÁLIDO: Firmado directamente por CA '{ca_record.name}'")
-                    return result
-                else:
-                    _logger.warning(f"[CHAIN] Nombres coinciden pero firma inválida: {sig_error}")
-                    result['debug_info'].append(f"CA '{ca_record.name}' coincide por nombre pero firma inválida: {sig_error}")
+            if sig_valid:
+                _logger.info(f"[CHAIN] ¡ÉXITO! Firma válida contra CA: {ca_entry['name']}")
+                result['chain_valid'] = True
+                result['chain_verified'] = True
+                result['trusted_ca'] = dict(ca_entry['trusted_ca'])
+                result['chain_path'].append({
+                    'type': 'trusted_ca',
+                    'subject': ca_entry['subject_cn'],
+                    'issuer': self._get_cn_from_name(ca_cert.issuer)
+                })
+                result['debug_info'].append(f"VÁLIDO: Firmado directamente por CA '{ca_entry['name']}'")
+                return result
+            else:
+                _logger.warning(f"[CHAIN] Nombres coinciden pero firma inválida: {sig_error}")
+                result['debug_info'].append(f"CA '{ca_entry['name']}' coincide por nombre pero firma inválida: {sig_error}")
         
         # =====================================================================
         # ESTRATEGIA 2: Construir cadena completa usando pool de certificados
@@ -260,27 +274,24 @@ class SignatureValidatorController(http.Controller):
         _logger.info(f"[CHAIN] --- Estrategia 3: Verificación criptográfica bruta ---")
         result['debug_info'].append("--- Verificación criptográfica sin comparar nombres ---")
         
-        for ca_record, ca_cert in configured_cas:
+        for ca_entry in trust_store.entries:
+            ca_cert = ca_entry['cert']
             sig_valid, sig_error = self._verify_certificate_signature_detailed(certificate, ca_cert)
-            _logger.info(f"[CHAIN] Verificación bruta contra '{ca_record.name}': válida={sig_valid}")
+            _logger.info(f"[CHAIN] Verificación bruta contra '{ca_entry['name']}': válida={sig_valid}")
             
             if sig_valid:
-                _logger.info(f"[CHAIN] ¡ÉXITO por verificación bruta! CA: {ca_record.name}")
+                _logger.info(f"[CHAIN] ¡ÉXITO por verificación bruta! CA: {ca_entry['name']}")
                 result['chain_valid'] = True
                 result['chain_verified'] = True
-                result['trusted_ca'] = {
-                    'name': ca_record.name,
-                    'subject_cn': ca_record.subject_cn,
-                    'organization': ca_record.subject_org
-                }
+                result['trusted_ca'] = dict(ca_entry['trusted_ca'])
                 result['chain_path'].append({
                     'type': 'trusted_ca',
                     'subject': self._get_cn_from_name(ca_cert.subject),
                     'issuer': self._get_cn_from_name(ca_cert.issuer)
                 })
-                result['debug_info'].append(f"VÁLIDO: Firma verificada criptográficamente con CA '{ca_record.name}'")
+                result['debug_info'].append(f"VÁLIDO: Firma verificada criptográficamente con CA '{ca_entry['name']}'")
                 result['validation_warnings'].append(
-                    f"El certificado fue validado por verificación criptográfica directa con '{ca_record.name}', "
+                    f"El certificado fue validado por verificación criptográfica directa con '{ca_entry['name']}', "
                     f"aunque los nombres del emisor no coinciden exactamente."
                 )
                 return result
@@ -297,9 +308,9 @@ class SignatureValidatorController(http.Controller):
         
         # Verificar si es un problema de CA intermedia faltante
         issuer_is_configured = any(
-            self._get_cn_from_name(ca_cert.subject) == cert_issuer_cn or 
-            ca_record.subject_cn == cert_issuer_cn
-            for ca_record, ca_cert in configured_cas
+            ca_entry['subject_cn'] == cert_issuer_cn or
+            ca_entry['trusted_ca']['subject_cn'] == cert_issuer_cn
+            for ca_entry in configured_cas
         )
         
         if issuer_is_configured:
@@ -338,6 +349,8 @@ class SignatureValidatorController(http.Controller):
         current_cert = certificate
         visited = set()
         max_depth = 10
+        pool_index = CertificateIndex(cert_pool)
+        trust_store = self._get_trust_store()
         
         for depth in range(max_depth):
             current_serial = current_cert.serial_number
@@ -354,46 +367,38 @@ class SignatureValidatorController(http.Controller):
             # Buscar el emisor en el pool de certificados
             issuer_found = None
             
-            for pool_entry in cert_pool:
+            for pool_entry in pool_index.find_issuers(current_cert):
                 pool_cert = pool_entry['cert']
                 pool_name = pool_entry['name']
                 
-                # Comparar nombres
-                if self._names_match(current_cert.issuer, pool_cert.subject):
-                    _logger.info(f"[CHAIN] Candidato encontrado: {pool_name}")
+                # Los candidatos del índice ya coinciden por SKI o nombre
+                _logger.info(f"[CHAIN] Candidato encontrado: {pool_name}")
+                
+                # Verificar firma
+                sig_valid, sig_error = self._verify_certificate_signature_detailed(current_cert, pool_cert)
+                
+                if sig_valid:
+                    _logger.info(f"[CHAIN] Firma válida con: {pool_name}")
+                    debug_info.append(f"Encontrado y verificado: {pool_name}")
                     
-                    # Verificar firma
-                    sig_valid, sig_error = self._verify_certificate_signature_detailed(current_cert, pool_cert)
+                    result['chain_path'].append({
+                        'type': 'intermediate' if not pool_entry['is_configured_ca'] else 'trusted_ca',
+                        'subject': pool_entry['subject_cn'],
+                        'issuer': self._get_cn_from_name(pool_cert.issuer)
+                    })
                     
-                    if sig_valid:
-                        _logger.info(f"[CHAIN] Firma válida con: {pool_name}")
-                        debug_info.append(f"Encontrado y verificado: {pool_name}")
-                        
-                        result['chain_path'].append({
-                            'type': 'intermediate' if not pool_entry['is_configured_ca'] else 'trusted_ca',
-                            'subject': pool_entry['subject_cn'],
-                            'issuer': self._get_cn_from_name(pool_cert.issuer)
-                        })
-                        
-                        # Si es una CA configurada, hemos terminado
-                        if pool_entry['is_configured_ca']:
-                            # Buscar el record de la CA
-                            for ca_record, ca_cert in configured_cas:
-                                if ca_cert == pool_cert:
-                                    result['success'] = True
-                                    result['trusted_ca'] = {
-                                        'name': ca_record.name,
-                                        'subject_cn': ca_record.subject_cn,
-                                        'organization': ca_record.subject_org
-                                    }
-                                    _logger.info(f"[CHAIN] Cadena completa hasta CA: {ca_record.name}")
-                                    return result
-                        
-                        issuer_found = pool_cert
-                        break
-                    else:
-                        _logger.warning(f"[CHAIN] Firma inválida con {pool_name}: {sig_error}")
-                        debug_info.append(f"Candidato {pool_name} - firma inválida: {sig_error}")
+                    # Si es una CA configurada, hemos terminado
+                    if pool_entry['is_configured_ca']:
+                        result['success'] = True
+                        result['trusted_ca'] = dict(pool_entry['trusted_ca'])
+                        _logger.info(f"[CHAIN] Cadena completa hasta CA: {pool_name}")
+                        return result
+                    
+                    issuer_found = pool_cert
+                    break
+                else:
+                    _logger.warning(f"[CHAIN] Firma inválida con {pool_name}: {sig_error}")
+                    debug_info.append(f"Candidato {pool_name} - firma inválida: {sig_error}")
             
             if issuer_found is None:
                 _logger.info(f"[CHAIN] No se encontró emisor válido para '{current_issuer_cn}'")
@@ -404,15 +409,10 @@ class SignatureValidatorController(http.Controller):
             if self._names_match(issuer_found.subject, issuer_found.issuer):
                 _logger.info(f"[CHAIN] Encontrado certificado raíz (self-signed)")
                 # Verificar si está en las CAs configuradas
-                for ca_record, ca_cert in configured_cas:
-                    if self._names_match(ca_cert.subject, issuer_found.subject):
-                        result['success'] = True
-                        result['trusted_ca'] = {
-                            'name': ca_record.name,
-                            'subject_cn': ca_record.subject_cn,
-                            'organization': ca_record.subject_org
-                        }
-                        return result
+                for ca_entry in trust_store.find_by_name(issuer_found.subject):
+                    result['success'] = True
+                    result['trusted_ca'] = dict(ca_entry['trusted_ca'])
+                    return result
                 
                 debug_info.append(f"Certificado raíz encontrado pero no está en CAs configuradas")
                 break
@@ -424,6 +424,23 @@ class SignatureValidatorController(http.Controller):
     def _verify_certificate_signature_detailed(self, certificate, issuer_cert):
         """
         Verifica si un certificado fue firmado por otro certificado.
+
+        El resultado se memoriza en el almacén de confianza por par
+        certificado/emisor.
+        
+        Returns:
+            tuple: (bool válido, str mensaje_error o None)
+        """
+        try:
+            return self._get_trust_store().verify_signature(
+                certificate, issuer_cert, self._check_certificate_signature
+            )
+        except Exception as e:
+            return False, f"Error general: {str(e)}"
+
+    def _check_certificate_signature(self, certificate, issuer_cert):
+        """
+        Verificación criptográfica de la firma de un certificado por su emisor.
         
         Returns:
             tuple: (bool válido, str mensaje_error o None)
@@ -788,6 +805,66 @@ class SignatureValidatorController(http.Controller):
             _logger.error(f"Error en análisis de PDFs: {e}", exc_info=True)
             return self._json_error_response(f'Error al procesar los PDFs: {str(e)}')
 
+    @http.route(['/verificar-firmas-pdf/lote'], type='http', auth='user', csrf=False, methods=['POST'])
+    def verify_pdf_batch(self, **post):
+        """
+        Endpoint para verificar por lotes las firmas de PDFs subidos y/o adjuntos.
+
+        Parámetros:
+            pdfs: Archivos PDF (multipart)
+            attachment_ids: IDs de ir.attachment separados por comas
+
+        Los archivos ya verificados con las CAs actuales se responden desde los
+        resultados guardados; el resto se analiza en paralelo.
+        """
+        try:
+            documents = []
+            for pdf_file in request.httprequest.files.getlist('pdfs'):
+                if pdf_file.filename:
+                    documents.append({
+                        'filename': secure_filename(pdf_file.filename),
+                        'data': pdf_file.read(),
+                        'source': 'upload',
+                    })
+            
+            attachment_ids = [int(x) for x in (post.get('attachment_ids') or '').split(',') if x.strip()]
+            if attachment_ids:
+                attachments = request.env['ir.attachment'].browse(attachment_ids).exists()
+                attachments.check('read')
+                for attachment in attachments.sudo():
+                    documents.append({
+                        'filename': attachment.name,
+                        'file_hash': attachment.checksum,
+                        'data': attachment.raw,
+                        'source': 'attachment',
+                        'attachment_id': attachment.id,
+                    })
+            
+            if not documents:
+                return self._json_error_response('Debe indicar al menos un archivo PDF.')
+            
+            verifications = request.env['asi.pdf.signature.verification'].sudo().verify_documents(documents)
+            results = []
+            for document, verification in zip(documents, verifications):
+                result = verification.get_result()
+                result.update({
+                    'filename': document['filename'],
+                    'file_hash': verification.file_hash,
+                    'verified_on': verification.verified_on.strftime('%d/%m/%Y %H:%M:%S'),
+                    'all_valid': verification.all_valid,
+                })
+                results.append(result)
+            
+            return request.make_json_response({
+                'success': True,
+                'total_files': len(results),
+                'results': results
+            })
+            
+        except Exception as e:
+            _logger.error(f"Error en verificación por lotes de PDFs: {e}", exc_info=True)
+            return self._json_error_response(f'Error al procesar los PDFs: {str(e)}')
+
     def _analyze_single_pdf(self, pdf_data, filename):
         """
         Analiza un único PDF y extrae información de sus firmas.
@@ -849,6 +926,32 @@ class SignatureValidatorController(http.Controller):
         seen_hashes = set()
         
         try:
+            # Las firmas se localizan por su /ByteRange: el /Contents está justo
+            # entre los dos rangos firmados, sin recorrer el archivo
+            located_signatures = find_signature_byte_ranges(pdf_data)
+            _logger.info(f"Encontradas {len(located_signatures)} firma(s) por /ByteRange en el PDF")
+            
+            for idx, located in enumerate(located_signatures):
+                pkcs7_hash = hashlib.sha256(located['contents']).hexdigest()
+                if pkcs7_hash in seen_hashes:
+                    continue
+                try:
+                    sig_info = self._parse_pkcs7_signature(located['contents'], idx + 1, located['dict_chunk'])
+                except Exception as e:
+                    _logger.error(f"Error procesando firma #{idx + 1}: {e}", exc_info=True)
+                    continue
+                if not sig_info:
+                    continue
+                self._check_byte_range_integrity(sig_info, pdf_data, located)
+                seen_hashes.add(pkcs7_hash)
+                sig_info['index'] = len(signatures) + 1
+                sig_info['field_name'] = f'Firma #{sig_info["index"]}'
+                signatures.append(sig_info)
+            
+            if signatures:
+                return signatures
+            
+            # PDFs sin /ByteRange legible: buscar los diccionarios /Type /Sig
             pdf_str = pdf_data
             sig_pattern = rb'/Type\s*/Sig'
             sig_dict_starts = [m.start() for m in re.finditer(sig_pattern, pdf_str)]
@@ -880,6 +983,24 @@ class SignatureValidatorController(http.Controller):
         
         return signatures
 
+    def _check_byte_range_integrity(self, sig_info, pdf_data, located):
+        """
+        Comprueba que los rangos firmados no se modificaron tras la firma.
+        """
+        integrity_valid = verify_byte_range_digest(pdf_data, located['byte_range'], located['contents'])
+        sig_info['integrity_valid'] = integrity_valid
+        sig_info['covers_whole_document'] = located['covers_whole_document']
+        
+        if integrity_valid is False:
+            sig_info['valid'] = False
+            sig_info['validation_errors'].append(
+                'El contenido firmado del documento fue modificado después de la firma.'
+            )
+        elif not located['covers_whole_document']:
+            sig_info['validation_warnings'].append(
+                'La firma no cubre el documento completo: se añadieron revisiones posteriores a la firma.'
+            )
+
     def _extract_single_signature(self, pdf_data, sig_pos, sig_index):
         """
         Extrae información de una única firma desde la posición dada.
@@ -1259,7 +1380,7 @@ class SignatureValidatorController(http.Controller):
                 )
             
             # Determinar validez final de la firma
-            has_cas = len(self._get_configured_cas()) > 0
+            has_cas = len(self._get_trust_store().entries) > 0
             if has_cas:
                 chain_valid = sig_info.get('chain_validation', {}).get('valid', False)
                 # La firma es válida si el certificado es válido Y la cadena de confianza es válida
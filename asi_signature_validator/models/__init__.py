@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
 from . import certificate_authority
+from . import pdf_signature_verification
 from . import user_p12_report
 from . import res_users
@@ -4,10 +4,13 @@ Modelo para gestionar las Entidades Certificadoras (CA) de confianza.
 Almacena los certificados .crt que se usarán para validar firmas digitales.
 """
 import base64
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
 
 _logger = logging.getLogger(__name__)
@@ -15,13 +18,134 @@ _logger = logging.getLogger(__name__)
 try:
     from cryptography import x509
     from cryptography.hazmat.backends import default_backend
-    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.x509.oid import ExtensionOID, NameOID
     HAS_CRYPTOGRAPHY = True
 except ImportError:
     HAS_CRYPTOGRAPHY = False
     _logger.warning("Módulo 'cryptography' no disponible.")
 
 
+def get_cn_from_name(name):
+    """Extrae el Common Name de un x509.Name, o su representación si no tiene."""
+    try:
+        for attr in name:
+            if attr.oid == NameOID.COMMON_NAME:
+                return attr.value
+    except Exception:
+        pass
+    return str(name)
+
+
+def get_subject_key_identifier(certificate):
+    """Devuelve el Subject Key Identifier del certificado o None."""
+    try:
+        return certificate.extensions.get_extension_for_oid(
+            ExtensionOID.SUBJECT_KEY_IDENTIFIER
+        ).value.digest
+    except Exception:
+        return None
+
+
+def get_authority_key_identifier(certificate):
+    """Devuelve el Authority Key Identifier del certificado o None."""
+    try:
+        return certificate.extensions.get_extension_for_oid(
+            ExtensionOID.AUTHORITY_KEY_IDENTIFIER
+        ).value.key_identifier
+    except Exception:
+        return None
+
+
+class CertificateIndex(object):
+    """
+    Índice de certificados por DN del sujeto, Subject Key Identifier y CN.
+
+    Cada entrada es un diccionario con al menos la clave 'cert' (x509.Certificate).
+    Permite encontrar los posibles emisores de un certificado con búsquedas en
+    diccionarios en lugar de recorrer y comparar todos los certificados.
+    """
+
+    def __init__(self, entries=()):
+        self.entries = []
+        self._by_subject = {}
+        self._by_ski = {}
+        self._by_cn = {}
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        certificate = entry['cert']
+        self.entries.append(entry)
+        self._by_subject.setdefault(certificate.subject, []).append(entry)
+        self._by_cn.setdefault(get_cn_from_name(certificate.subject), []).append(entry)
+        ski = get_subject_key_identifier(certificate)
+        if ski:
+            self._by_ski.setdefault(ski, []).append(entry)
+
+    def find_by_name(self, name):
+        """Entradas cuyo sujeto coincide con `name`: primero por DN exacto, luego por CN."""
+        found = []
+        for entry in self._by_subject.get(name, []) + self._by_cn.get(get_cn_from_name(name), []):
+            if not any(entry is other for other in found):
+                found.append(entry)
+        return found
+
+    def find_issuers(self, certificate):
+        """
+        Posibles emisores de `certificate`, por orden de preferencia: el SKI
+        coincide con su Authority Key Identifier, el DN coincide con su emisor,
+        el CN coincide con el de su emisor.
+        """
+        found = []
+        aki = get_authority_key_identifier(certificate)
+        candidates = (self._by_ski.get(aki, []) if aki else []) + self.find_by_name(certificate.issuer)
+        for entry in candidates:
+            if not any(entry is other for other in found):
+                found.append(entry)
+        return found
+
+
+class TrustStore(CertificateIndex):
+    """
+    Almacén de confianza con las CAs activas, compartido por todas las
+    peticiones del registro. Memoriza además el resultado de las verificaciones
+    de firma entre pares certificado/emisor.
+    """
+
+    SIGNATURE_CACHE_SIZE = 4096
+
+    def __init__(self, entries=()):
+        super().__init__(entries)
+        self._signatures = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        """Huella de las CAs del almacén; cambia al añadir, quitar o sustituir una CA."""
+        digest = hashlib.sha256()
+        for fingerprint in sorted(entry['cert'].fingerprint(hashes.SHA256()) for entry in self.entries):
+            digest.update(fingerprint)
+        return digest.hexdigest()
+
+    def verify_signature(self, certificate, issuer_cert, verify):
+        """
+        Devuelve el resultado de `verify(certificate, issuer_cert)`, calculado
+        una sola vez por par de certificados.
+        """
+        key = (certificate.fingerprint(hashes.SHA256()), issuer_cert.fingerprint(hashes.SHA256()))
+        with self._lock:
+            if key in self._signatures:
+                self._signatures.move_to_end(key)
+                return self._signatures[key]
+        result = verify(certificate, issuer_cert)
+        with self._lock:
+            self._signatures[key] = result
+            if len(self._signatures) > self.SIGNATURE_CACHE_SIZE:
+                self._signatures.popitem(last=False)
+        return result
+
+
 class CertificateAuthority(models.Model):
     """
     Modelo para almacenar certificados de Entidades Certificadoras (CA).
@@ -139,14 +263,23 @@ class CertificateAuthority(models.Model):
             if vals.get('certificate_file'):
                 cert_info = self._extract_certificate_info(vals['certificate_file'])
                 vals.update(cert_info)
-        return super().create(vals_list)
+        records = super().create(vals_list)
+        self.clear_caches()
+        return records
 
     def write(self, vals):
         """Actualiza información del certificado si se modifica el archivo."""
         if vals.get('certificate_file'):
             cert_info = self._extract_certificate_info(vals['certificate_file'])
             vals.update(cert_info)
-        return super().write(vals)
+        res = super().write(vals)
+        self.clear_caches()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        return res
 
     def _extract_certificate_info(self, certificate_b64):
         """
@@ -237,24 +370,54 @@ class CertificateAuthority(models.Model):
             return None
 
     @api.model
-    def get_all_active_certificates(self):
+    @tools.ormcache()
+    def _get_trust_store(self):
         """
-        Obtiene todos los certificados CA activos como objetos x509.
-        
+        Construye el almacén de confianza con todas las CAs activas.
+
+        Se calcula una vez por registro y se invalida al crear, modificar o
+        eliminar una CA, evitando decodificar y parsear los certificados en
+        cada petición.
+
         Returns:
-            list: Lista de tuplas (record, x509_certificate)
+            TrustStore: Índice de las CAs activas
         """
-        certificates = []
-        active_cas = self.search([('active', '=', True)], order='sequence')
-        
+        trust_store = TrustStore()
+        active_cas = self.sudo().search([('active', '=', True)], order='sequence')
+
         for ca in active_cas:
             x509_cert = ca.get_x509_certificate()
-            if x509_cert:
-                certificates.append((ca, x509_cert))
-            else:
+            if not x509_cert:
                 _logger.warning(f"No se pudo cargar certificado CA: {ca.name}")
+                continue
+            trust_store.add({
+                'id': ca.id,
+                'cert': x509_cert,
+                'name': ca.name,
+                'subject_cn': get_cn_from_name(x509_cert.subject),
+                'subject': x509_cert.subject,
+                'is_configured_ca': True,
+                'trusted_ca': {
+                    'name': ca.name,
+                    'subject_cn': ca.subject_cn,
+                    'organization': ca.subject_org
+                },
+            })
+
+        return trust_store
+
+    @api.model
+    def get_all_active_certificates(self):
+        """
+        Obtiene todos los certificados CA activos como objetos x509.
         
-        return certificates
+        Returns:
+            list: Lista de tuplas (record, x509_certificate)
+        """
+        return [
+            (self.browse(entry['id']), entry['cert'])
+            for entry in self._get_trust_store().entries
+        ]
 
     def action_view_certificate_details(self):
         """Acción para ver los detalles del certificado en una ventana."""
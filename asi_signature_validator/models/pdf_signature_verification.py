@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+"""
+Verificación masiva de firmas digitales en PDFs.
+
+Los resultados se guardan por hash del archivo (SHA-1, el mismo que usa
+ir.attachment como checksum), de forma que un archivo sin cambios no se
+vuelve a verificar mientras no cambien las CAs configuradas.
+"""
+import functools
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import requests
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+try:
+    from asn1crypto import cms
+    HAS_ASN1CRYPTO = True
+except ImportError:
+    HAS_ASN1CRYPTO = False
+
+
+BYTE_RANGE_PATTERN = re.compile(rb'/ByteRange\s*\[\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s*\]')
+
+# Bytes del diccionario de la firma que se conservan a cada lado de /Contents
+SIGNATURE_DICT_MARGIN = 3000
+
+# Datos de ubicación del archivo que se guardan junto al resultado. Los nodos de
+# Alfresco se guardan aparte, porque varios nodos pueden tener el mismo contenido.
+LOCATION_FIELDS = ('source', 'attachment_id')
+
+# Espera máxima, en horas, antes de reintentar un nodo de Alfresco que no se pudo descargar
+MAX_RETRY_DELAY_HOURS = 24
+
+
+def trim_der(data):
+    """Recorta el relleno de ceros que sigue a una estructura DER en /Contents."""
+    if len(data) < 2 or data[0] != 0x30 or data[1] == 0x80:
+        return data
+    if data[1] < 0x80:
+        total = 2 + data[1]
+    else:
+        num_bytes = data[1] & 0x7F
+        total = 2 + num_bytes + int.from_bytes(data[2:2 + num_bytes], 'big')
+    return data[:total] if total <= len(data) else data
+
+
+def find_signature_byte_ranges(pdf_data):
+    """
+    Localiza las firmas del PDF a partir de sus entradas /ByteRange.
+
+    El valor hexadecimal de /Contents ocupa exactamente el hueco entre los dos
+    rangos firmados, por lo que se lee directamente sin recorrer el archivo.
+
+    Returns:
+        list: Diccionarios con 'byte_range', 'contents' (DER del PKCS#7),
+        'dict_chunk' (diccionario de la firma sin /Contents) y
+        'covers_whole_document'
+    """
+    signatures = []
+    seen = set()
+    for match in BYTE_RANGE_PATTERN.finditer(pdf_data):
+        byte_range = tuple(int(value) for value in match.groups())
+        start1, length1, start2, length2 = byte_range
+        contents_start = start1 + length1
+        if byte_range in seen or start2 <= contents_start or start2 + length2 > len(pdf_data):
+            continue
+        contents = pdf_data[contents_start:start2].strip()
+        if not (contents.startswith(b'<') and contents.endswith(b'>')):
+            continue
+        try:
+            pkcs7_data = trim_der(bytes.fromhex(contents[1:-1].decode('ascii')))
+        except ValueError:
+            continue
+        seen.add(byte_range)
+        signatures.append({
+            'byte_range': byte_range,
+            'contents': pkcs7_data,
+            'dict_chunk': (
+                pdf_data[max(0, contents_start - SIGNATURE_DICT_MARGIN):contents_start]
+                + pdf_data[start2:start2 + SIGNATURE_DICT_MARGIN]
+            ),
+            'covers_whole_document': start1 == 0 and start2 + length2 == len(pdf_data),
+        })
+    return signatures
+
+
+def verify_byte_range_digest(pdf_data, byte_range, pkcs7_data):
+    """
+    Comprueba que el resumen de los rangos firmados coincide con el firmado.
+
+    Returns:
+        bool: True/False según coincida, o None si no se puede determinar
+    """
+    if not HAS_ASN1CRYPTO:
+        return None
+    try:
+        start1, length1, start2, length2 = byte_range
+        signed_data = cms.ContentInfo.load(pkcs7_data)['content']
+        signer_info = signed_data['signer_infos'][0]
+
+        digest = hashlib.new(signer_info['digest_algorithm']['algorithm'].native)
+        encapsulated = signed_data['encap_content_info']['content'].native
+        if encapsulated:
+            # adbe.pkcs7.sha1: el contenido firmado es el SHA-1 de los rangos
+            digest = hashlib.sha1()
+            expected = encapsulated
+        else:
+            expected = None
+            for attr in signer_info['signed_attrs'] or []:
+                if attr['type'].native == 'message_digest':
+                    expected = attr['values'][0].native
+                    break
+            if expected is None:
+                return None
+
+        digest.update(pdf_data[start1:start1 + length1])
+        digest.update(pdf_data[start2:start2 + length2])
+        return digest.digest() == expected
+    except Exception as e:
+        _logger.debug(f"No se pudo comprobar el resumen del /ByteRange: {e}")
+        return None
+
+
+def download_node(client, node_id):
+    """
+    Descarga el contenido de un nodo de Alfresco en el pool de hilos del cliente.
+
+    Returns:
+        tuple: (contenido, None) o (None, mensaje de error)
+    """
+    try:
+        return client.download_content(node_id, timeout=30), None
+    except requests.exceptions.RequestException as e:
+        return None, str(e)
+
+
+class PdfSignatureVerification(models.Model):
+    """Resultado de la verificación de las firmas de un archivo PDF."""
+    _name = 'asi.pdf.signature.verification'
+    _description = 'Verificación de Firmas PDF'
+    _order = 'verified_on desc, id desc'
+
+    name = fields.Char(string='Archivo', required=True)
+    file_hash = fields.Char(string='Hash del Archivo', required=True, index=True, readonly=True,
+                            help='SHA-1 del contenido del PDF')
+    trust_version = fields.Char(string='Versión del Almacén de Confianza', readonly=True)
+    source = fields.Selection([
+        ('upload', 'Subida'),
+        ('attachment', 'Adjunto'),
+        ('alfresco', 'Alfresco'),
+    ], string='Origen', default='upload', readonly=True)
+    attachment_id = fields.Many2one('ir.attachment', string='Adjunto', ondelete='set null', readonly=True)
+    alfresco_node_ids = fields.One2many('asi.pdf.signature.alfresco.node', 'verification_id',
+                                        string='Nodos de Alfresco', readonly=True)
+    verified_on = fields.Datetime(string='Verificado el', default=fields.Datetime.now, readonly=True)
+    has_signatures = fields.Boolean(string='Tiene Firmas', readonly=True)
+    total_signatures = fields.Integer(string='Firmas', readonly=True)
+    valid_signatures = fields.Integer(string='Firmas Válidas', readonly=True)
+    all_valid = fields.Boolean(string='Todas Válidas', readonly=True)
+    error = fields.Text(string='Error', readonly=True)
+    result = fields.Text(string='Resultado (JSON)', readonly=True)
+
+    _sql_constraints = [
+        ('file_hash_unique', 'UNIQUE(file_hash)', 'Ya existe una verificación para este archivo.'),
+    ]
+
+    def get_result(self):
+        """Resultado del análisis tal como lo devuelve el verificador web."""
+        self.ensure_one()
+        return json.loads(self.result) if self.result else {}
+
+    # =========================================================================
+    # VERIFICACIÓN POR LOTES
+    # =========================================================================
+
+    @api.model
+    def verify_documents(self, documents):
+        """
+        Verifica las firmas de varios PDFs, reutilizando los resultados guardados.
+
+        Solo se analizan los archivos cuyo hash no tiene resultado o lo tiene con
+        otro conjunto de CAs; el resto se resuelve con una única búsqueda.
+
+        Args:
+            documents: Lista de diccionarios con 'filename' y 'data' (bytes) y,
+                opcionalmente, 'file_hash' y valores extra del registro
+                ('source', 'attachment_id')
+
+        Returns:
+            list: Registros de verificación, en el mismo orden que `documents`
+        """
+        trust_store = self.env['asi.certificate.authority'].sudo()._get_trust_store()
+        trust_version = trust_store.version
+
+        for document in documents:
+            if not document.get('file_hash'):
+                document['file_hash'] = hashlib.sha1(document['data']).hexdigest()
+
+        existing = {
+            record.file_hash: record
+            for record in self.search([('file_hash', 'in', list({d['file_hash'] for d in documents}))])
+        }
+        pending = {}
+        for document in documents:
+            record = existing.get(document['file_hash'])
+            if record and record.trust_version == trust_version:
+                location = {key: document[key] for key in LOCATION_FIELDS if key in document}
+                if location:
+                    record.write(location)
+                continue
+            pending.setdefault(document['file_hash'], document)
+
+        if pending:
+            _logger.info(f"Verificando firmas de {len(pending)} PDF(s), "
+                         f"{len(documents) - len(pending)} ya verificado(s)")
+            to_create = []
+            for file_hash, analysis in self._analyze_documents(list(pending.values()), trust_store):
+                values = self._prepare_verification_values(pending[file_hash], analysis, trust_version)
+                if file_hash in existing:
+                    existing[file_hash].write(values)
+                else:
+                    to_create.append(values)
+            for record in self.create(to_create):
+                existing[record.file_hash] = record
+
+        return [existing[document['file_hash']] for document in documents]
+
+    @api.model
+    def _analyze_documents(self, documents, trust_store):
+        """
+        Analiza los PDFs en un pool de procesos.
+
+        Cada proceso recibe las CAs una sola vez en su inicializador. Con un único
+        documento, o durante los tests, el análisis se hace en el propio proceso.
+
+        Returns:
+            list: Tuplas (hash del archivo, resultado del análisis)
+        """
+        from . import verificacion_lote
+
+        tareas = [(d['file_hash'], d['filename'], d['data']) for d in documents]
+        max_procesos = min(
+            int(self.env['ir.config_parameter'].sudo().get_param('asi_signature_validator.batch_workers', 4)),
+            os.cpu_count() or 1,
+            len(tareas),
+        )
+        if max_procesos <= 1 or getattr(threading.current_thread(), 'testing', False):
+            verificacion_lote.inicializar_proceso(trust_store.entries)
+            return [verificacion_lote.verificar_documento_proceso(tarea) for tarea in tareas]
+
+        with ProcessPoolExecutor(
+            max_workers=max_procesos,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=verificacion_lote.inicializar_proceso,
+            initargs=(trust_store.entries,),
+        ) as executor:
+            return list(executor.map(verificacion_lote.verificar_documento_proceso, tareas))
+
+    @api.model
+    def _prepare_verification_values(self, document, analysis, trust_version):
+        signatures = analysis.get('signatures', [])
+        valid_signatures = len([sig for sig in signatures if sig.get('valid')])
+        values = {
+            'name': document['filename'],
+            'file_hash': document['file_hash'],
+            'trust_version': trust_version,
+            'verified_on': fields.Datetime.now(),
+            'has_signatures': bool(analysis.get('has_signatures')),
+            'total_signatures': analysis.get('total_signatures', 0),
+            'valid_signatures': valid_signatures,
+            'all_valid': bool(signatures) and valid_signatures == len(signatures),
+            'error': analysis.get('error') or False,
+            'result': json.dumps(analysis, default=str),
+        }
+        values.update({key: document[key] for key in LOCATION_FIELDS if key in document})
+        return values
+
+    # =========================================================================
+    # TAREAS PROGRAMADAS
+    # =========================================================================
+
+    def _get_batch_size(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'asi_signature_validator.batch_size', 50))
+
+    @api.model
+    def _cron_verify_attachment_pdfs(self):
+        """
+        Verifica los PDFs adjuntos que aún no tienen resultado con las CAs actuales.
+
+        Usa el checksum de ir.attachment como hash, por lo que los adjuntos ya
+        verificados se descartan en SQL sin leer su contenido.
+        """
+        trust_version = self.env['asi.certificate.authority'].sudo()._get_trust_store().version
+        self.env['ir.attachment'].flush_model(['mimetype', 'checksum'])
+        self.flush_model(['file_hash', 'trust_version'])
+        self.env.cr.execute("""
+            SELECT a.id
+              FROM ir_attachment a
+             WHERE a.mimetype = 'application/pdf'
+               AND a.checksum IS NOT NULL
+               AND NOT EXISTS (
+                   SELECT 1
+                     FROM asi_pdf_signature_verification v
+                    WHERE v.file_hash = a.checksum
+                      AND v.trust_version = %s
+               )
+          ORDER BY a.id DESC
+             LIMIT %s
+        """, (trust_version, self._get_batch_size()))
+        attachments = self.env['ir.attachment'].sudo().browse([row[0] for row in self.env.cr.fetchall()])
+        if not attachments:
+            return
+
+        documents = [{
+            'filename': attachment.name,
+            'file_hash': attachment.checksum,
+            'data': attachment.raw,
+            'source': 'attachment',
+            'attachment_id': attachment.id,
+        } for attachment in attachments]
+        self.verify_documents(documents)
+
+    @api.model
+    def _cron_verify_alfresco_pdfs(self):
+        """
+        Verifica los PDFs de Alfresco que cambiaron desde su última verificación
+        o cuyo resultado es de otro conjunto de CAs.
+
+        Solo disponible si asi_alfresco_integration está instalado. Los archivos
+        se descartan por nodo, fecha de modificación y hash del último contenido
+        descargado, antes de descargarlos. Los nodos que no se pudieron descargar
+        se reintentan con una espera creciente.
+        """
+        if 'alfresco.file' not in self.env:
+            return
+
+        client = self.env['alfresco.client'].get_client()
+        if not client:
+            _logger.warning("Configuración de Alfresco incompleta, no se verifican sus PDFs")
+            return
+
+        trust_version = self.env['asi.certificate.authority'].sudo()._get_trust_store().version
+        Node = self.env['asi.pdf.signature.alfresco.node'].sudo()
+        self.env['alfresco.file'].flush_model(['alfresco_node_id', 'mime_type', 'modified_at'])
+        Node.flush_model(['alfresco_node_id', 'alfresco_modified_at', 'file_hash', 'next_attempt'])
+        self.flush_model(['file_hash', 'trust_version'])
+        self.env.cr.execute("""
+            SELECT f.id
+              FROM alfresco_file f
+         LEFT JOIN asi_pdf_signature_alfresco_node n ON n.alfresco_node_id = f.alfresco_node_id
+             WHERE f.mime_type = 'application/pdf'
+               AND (n.next_attempt IS NULL OR n.next_attempt <= %s)
+               AND NOT (
+                   n.file_hash IS NOT NULL
+                   AND COALESCE(n.alfresco_modified_at, '-infinity') >= COALESCE(f.modified_at, '-infinity')
+                   AND EXISTS (
+                       SELECT 1
+                         FROM asi_pdf_signature_verification v
+                        WHERE v.file_hash = n.file_hash
+                          AND v.trust_version = %s
+                   )
+               )
+          ORDER BY f.modified_at DESC NULLS LAST
+             LIMIT %s
+        """, (fields.Datetime.now(), trust_version, self._get_batch_size()))
+        files = self.env['alfresco.file'].sudo().browse([row[0] for row in self.env.cr.fetchall()])
+        if not files:
+            return
+
+        # Las descargas se hacen en paralelo en el pool de hilos del cliente
+        downloads = client.map(functools.partial(download_node, client), files.mapped('alfresco_node_id'))
+
+        documents, downloaded = [], self.env['alfresco.file']
+        for alfresco_file, (content, error) in zip(files, downloads):
+            if error:
+                _logger.error(f"Error descargando {alfresco_file.name} de Alfresco: {error}")
+                Node._register_failure(alfresco_file, error)
+                continue
+            documents.append({'filename': alfresco_file.name, 'data': content, 'source': 'alfresco'})
+            downloaded |= alfresco_file
+        if documents:
+            verifications = self.verify_documents(documents)
+            for alfresco_file, verification in zip(downloaded, verifications):
+                Node._register_verification(alfresco_file, verification)
+
+
+class PdfSignatureAlfrescoNode(models.Model):
+    """Último contenido verificado de cada nodo PDF de Alfresco."""
+    _name = 'asi.pdf.signature.alfresco.node'
+    _description = 'Nodo de Alfresco Verificado'
+    _rec_name = 'alfresco_node_id'
+
+    alfresco_node_id = fields.Char(string='Nodo de Alfresco', required=True, index=True, readonly=True)
+    alfresco_modified_at = fields.Datetime(string='Modificado en Alfresco', readonly=True)
+    file_hash = fields.Char(string='Hash del Archivo', index=True, readonly=True)
+    verification_id = fields.Many2one('asi.pdf.signature.verification', string='Verificación',
+                                      ondelete='set null', readonly=True)
+    failed_attempts = fields.Integer(string='Descargas Fallidas', readonly=True)
+    next_attempt = fields.Datetime(string='Próximo Intento', readonly=True)
+    last_error = fields.Text(string='Último Error', readonly=True)
+
+    _sql_constraints = [
+        ('alfresco_node_id_unique', 'UNIQUE(alfresco_node_id)', 'El nodo de Alfresco ya está registrado.'),
+    ]
+
+    @api.model
+    def _register(self, alfresco_file, values):
+        node = self.search([('alfresco_node_id', '=', alfresco_file.alfresco_node_id)], limit=1)
+        if node:
+            node.write(values)
+        else:
+            node = self.create(dict(values, alfresco_node_id=alfresco_file.alfresco_node_id))
+        return node
+
+    @api.model
+    def _register_verification(self, alfresco_file, verification):
+        """Guarda el contenido verificado del nodo y reinicia sus reintentos."""
+        return self._register(alfresco_file, {
+            'alfresco_modified_at': alfresco_file.modified_at,
+            'file_hash': verification.file_hash,
+            'verification_id': verification.id,
+            'failed_attempts': 0,
+            'next_attempt': False,
+            'last_error': False,
+        })
+
+    @api.model
+    def _register_failure(self, alfresco_file, error):
+        """Aplaza el siguiente intento del nodo: 1, 2, 4... horas, hasta MAX_RETRY_DELAY_HOURS."""
+        node = self.search([('alfresco_node_id', '=', alfresco_file.alfresco_node_id)], limit=1)
+        failed_attempts = node.failed_attempts + 1
+        delay = min(2 ** (failed_attempts - 1), MAX_RETRY_DELAY_HOURS)
+        return self._register(alfresco_file, {
+            'failed_attempts': failed_attempts,
+            'next_attempt': fields.Datetime.now() + timedelta(hours=delay),
+            'last_error': error,
+        })
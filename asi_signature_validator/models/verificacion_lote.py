@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Verificación de firmas de PDF en procesos hijos, para la verificación por lotes.
+
+Estas funciones no acceden al ORM: reciben el contenido de los PDF y las
+entradas del almacén de confianza, para poder ejecutarse en un ProcessPoolExecutor.
+"""
+import logging
+
+from .certificate_authority import TrustStore
+
+_logger = logging.getLogger(__name__)
+
+# Verificador creado una sola vez por proceso
+_datos_proceso = {}
+
+
+def inicializar_proceso(entradas_ca):
+    """Inicializador del proceso: crea un verificador con su propio almacén de confianza"""
+    from ..controllers.main import SignatureValidatorController
+
+    validador = SignatureValidatorController()
+    validador._trust_store = TrustStore(entradas_ca)
+    _datos_proceso['validador'] = validador
+
+
+def verificar_documento_proceso(tarea):
+    """Analiza las firmas de un PDF con el verificador de `inicializar_proceso`.
+
+    :param tarea: tupla (hash del archivo, nombre del archivo, contenido del PDF)
+    :return: tupla (hash del archivo, resultado del análisis)
+    """
+    file_hash, filename, pdf_data = tarea
+    try:
+        return file_hash, _datos_proceso['validador']._analyze_single_pdf(pdf_data, filename)
+    except Exception as e:
+        _logger.error(f"Error verificando {filename}: {e}")
+        return file_hash, {
+            'filename': filename,
+            'has_signatures': False,
+            'total_signatures': 0,
+            'unique_signatures': 0,
+            'signatures': [],
+            'error': str(e),
+        }
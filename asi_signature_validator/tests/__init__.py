@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+from . import test_alfresco_verification
+from . import test_certificate_authority
+from . import test_pdf_signature_verification
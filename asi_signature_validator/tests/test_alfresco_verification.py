@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import requests
+
+from odoo import fields
+from odoo.tests.common import TransactionCase
+
+
+class FakeClient(object):
+    """Cliente de Alfresco con el contenido de cada nodo en memoria."""
+
+    def __init__(self, contents):
+        self.contents = contents
+        self.downloads = []
+
+    def download_content(self, node_id, **kwargs):
+        self.downloads.append(node_id)
+        content = self.contents.get(node_id)
+        if content is None:
+            raise requests.exceptions.ConnectionError('sin conexión')
+        return content
+
+    def map(self, func, items):
+        return [func(item) for item in items]
+
+
+class TestAlfrescoVerification(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if 'alfresco.file' not in cls.env:
+            return
+        cls.Verification = cls.env['asi.pdf.signature.verification']
+        cls.Node = cls.env['asi.pdf.signature.alfresco.node']
+        AlfrescoFile = cls.env['alfresco.file']
+        # Solo deben influir los PDFs de la prueba
+        AlfrescoFile.search([]).unlink()
+        modified_at = fields.Datetime.now()
+        cls.file_a = AlfrescoFile.create({
+            'name': 'a.pdf', 'alfresco_node_id': 'nodo-a', 'mime_type': 'application/pdf',
+            'modified_at': modified_at,
+        })
+        cls.file_copia = AlfrescoFile.create({
+            'name': 'a-copia.pdf', 'alfresco_node_id': 'nodo-copia', 'mime_type': 'application/pdf',
+            'modified_at': modified_at,
+        })
+        cls.file_sin_fecha = AlfrescoFile.create({
+            'name': 'b.pdf', 'alfresco_node_id': 'nodo-b', 'mime_type': 'application/pdf',
+        })
+
+    def setUp(self):
+        super().setUp()
+        if 'alfresco.file' not in self.env:
+            self.skipTest('asi_alfresco_integration no está instalado')
+        self.client = FakeClient({
+            'nodo-a': b'%PDF-1.7 A',
+            'nodo-copia': b'%PDF-1.7 A',
+            'nodo-b': b'%PDF-1.7 B',
+        })
+        client = self.client
+        patcher = patch.object(type(self.env['alfresco.client']), 'get_client', lambda model, *a, **kw: client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _run_cron(self):
+        self.client.downloads = []
+        self.Verification._cron_verify_alfresco_pdfs()
+        return sorted(self.client.downloads)
+
+    def test_nodes_with_same_content(self):
+        self.assertEqual(self._run_cron(), ['nodo-a', 'nodo-b', 'nodo-copia'])
+        nodo_a = self.Node.search([('alfresco_node_id', '=', 'nodo-a')])
+        copia = self.Node.search([('alfresco_node_id', '=', 'nodo-copia')])
+        # Un solo resultado por contenido, con los dos nodos que lo tienen
+        self.assertEqual(nodo_a.verification_id, copia.verification_id)
+        self.assertEqual(len(nodo_a.verification_id.alfresco_node_ids), 2)
+
+        # Ningún nodo sin cambios se descarga de nuevo, tampoco el que no tiene fecha
+        self.assertEqual(self._run_cron(), [])
+
+    def test_modified_node_is_verified_again(self):
+        self._run_cron()
+        self.file_a.modified_at = fields.Datetime.now() + timedelta(minutes=5)
+        self.assertEqual(self._run_cron(), ['nodo-a'])
+
+    def test_trust_store_change(self):
+        self._run_cron()
+        trust_store = SimpleNamespace(version='otra-version', entries=[])
+        with patch.object(type(self.env['asi.certificate.authority']), '_get_trust_store',
+                          lambda model: trust_store):
+            self.assertEqual(self._run_cron(), ['nodo-a', 'nodo-b', 'nodo-copia'])
+            self.assertEqual(self._run_cron(), [])
+
+    def test_failed_download_is_postponed(self):
+        del self.client.contents['nodo-b']
+        self.assertEqual(self._run_cron(), ['nodo-a', 'nodo-b', 'nodo-copia'])
+        nodo_b = self.Node.search([('alfresco_node_id', '=', 'nodo-b')])
+        self.assertEqual(nodo_b.failed_attempts, 1)
+        self.assertFalse(nodo_b.verification_id)
+        self.assertGreater(nodo_b.next_attempt, fields.Datetime.now())
+
+        # No se reintenta hasta que pasa la espera
+        self.assertEqual(self._run_cron(), [])
+        nodo_b.next_attempt = fields.Datetime.now() - timedelta(minutes=1)
+        self.client.contents['nodo-b'] = b'%PDF-1.7 B'
+        self.assertEqual(self._run_cron(), ['nodo-b'])
+        self.assertEqual(nodo_b.failed_attempts, 0)
+        self.assertTrue(nodo_b.verification_id)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import base64
+from datetime import datetime, timedelta
+from unittest import skipUnless
+from unittest.mock import Mock
+
+from odoo.tests.common import TransactionCase
+
+from ..models.certificate_authority import HAS_CRYPTOGRAPHY, CertificateIndex, TrustStore
+
+try:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+except ImportError:
+    pass
+
+
+def _name(cn, org=None):
+    attributes = [x509.NameAttribute(NameOID.COMMON_NAME, cn)]
+    if org:
+        attributes.append(x509.NameAttribute(NameOID.ORGANIZATION_NAME, org))
+    return x509.Name(attributes)
+
+
+def _certificate(subject, issuer=None, key_identifiers=True, issuer_name=None):
+    """
+    Certificado de prueba firmado por `issuer` (tupla certificado, clave) o
+    autofirmado. Devuelve (certificado, clave).
+    """
+    key = ec.generate_private_key(ec.SECP256R1())
+    issuer_cert, issuer_key = issuer or (None, key)
+    now = datetime.utcnow()
+    builder = x509.CertificateBuilder().subject_name(subject).issuer_name(
+        issuer_name or (issuer_cert.subject if issuer_cert else subject)
+    ).public_key(key.public_key()).serial_number(x509.random_serial_number()).not_valid_before(
+        now - timedelta(days=1)
+    ).not_valid_after(now + timedelta(days=365))
+    if key_identifiers:
+        builder = builder.add_extension(
+            x509.SubjectKeyIdentifier.from_public_key(key.public_key()), critical=False)
+        builder = builder.add_extension(
+            x509.AuthorityKeyIdentifier.from_issuer_public_key(issuer_key.public_key()), critical=False)
+    return builder.sign(issuer_key, hashes.SHA256()), key
+
+
+@skipUnless(HAS_CRYPTOGRAPHY, "Requiere el módulo cryptography")
+class TestCertificateIndex(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = _certificate(_name('CA Raíz', 'Pruebas'))
+        cls.intermediate = _certificate(_name('CA Intermedia', 'Pruebas'), cls.root)
+        cls.leaf = _certificate(_name('Firmante'), cls.intermediate)
+
+    def _entry(self, certificate):
+        return {'cert': certificate[0]}
+
+    def _chain(self, index, certificate):
+        """Cadena desde `certificate` hasta la raíz siguiendo el primer emisor de cada certificado."""
+        chain = [certificate]
+        while certificate.subject != certificate.issuer:
+            issuers = index.find_issuers(certificate)
+            if not issuers:
+                break
+            certificate = issuers[0]['cert']
+            chain.append(certificate)
+        return chain
+
+    def test_chain_by_key_identifier(self):
+        index = CertificateIndex([self._entry(self.root), self._entry(self.intermediate)])
+        self.assertEqual(self._chain(index, self.leaf[0]),
+                         [self.leaf[0], self.intermediate[0], self.root[0]])
+
+    def test_issuer_by_name_without_key_identifier(self):
+        leaf = _certificate(_name('Firmante'), self.intermediate, key_identifiers=False)
+        index = CertificateIndex([self._entry(self.root), self._entry(self.intermediate)])
+        self.assertEqual([entry['cert'] for entry in index.find_issuers(leaf[0])], [self.intermediate[0]])
+
+    def test_issuer_by_common_name(self):
+        # El DN del emisor no coincide exactamente, pero sí su CN
+        leaf = _certificate(_name('Firmante'), self.intermediate, key_identifiers=False,
+                            issuer_name=_name('CA Intermedia', 'Otra organización'))
+        index = CertificateIndex([self._entry(self.intermediate)])
+        self.assertEqual([entry['cert'] for entry in index.find_issuers(leaf[0])], [self.intermediate[0]])
+        self.assertEqual(len(index.find_by_name(_name('CA Intermedia'))), 1)
+
+    def test_key_identifier_preferred_without_duplicates(self):
+        # Una CA renovada con el mismo nombre y otra clave
+        renewed = _certificate(_name('CA Intermedia', 'Pruebas'), self.root)
+        index = CertificateIndex([self._entry(renewed), self._entry(self.intermediate)])
+        issuers = [entry['cert'] for entry in index.find_issuers(self.leaf[0])]
+        self.assertEqual(issuers, [self.intermediate[0], renewed[0]])
+
+    def test_unknown_issuer(self):
+        other_root = _certificate(_name('Otra CA'))
+        index = CertificateIndex([self._entry(other_root)])
+        self.assertEqual(index.find_issuers(self.leaf[0]), [])
+        self.assertEqual(self._chain(index, self.leaf[0]), [self.leaf[0]])
+
+    def test_version_changes_with_cas(self):
+        root, intermediate = self._entry(self.root), self._entry(self.intermediate)
+        version = TrustStore([root, intermediate]).version
+        # No depende del orden de las CAs
+        self.assertEqual(TrustStore([intermediate, root]).version, version)
+        self.assertNotEqual(TrustStore([root]).version, version)
+        self.assertNotEqual(TrustStore([]).version, version)
+        renewed = self._entry(_certificate(_name('CA Intermedia', 'Pruebas'), self.root))
+        self.assertNotEqual(TrustStore([root, renewed]).version, version)
+
+    def test_signature_verified_once(self):
+        store = TrustStore([self._entry(self.intermediate)])
+        verify = Mock(return_value=True)
+        self.assertTrue(store.verify_signature(self.leaf[0], self.intermediate[0], verify))
+        self.assertTrue(store.verify_signature(self.leaf[0], self.intermediate[0], verify))
+        self.assertEqual(verify.call_count, 1)
+        store.verify_signature(self.intermediate[0], self.root[0], verify)
+        self.assertEqual(verify.call_count, 2)
+
+    def test_trust_store_follows_configured_cas(self):
+        CertificateAuthority = self.env['asi.certificate.authority']
+        version = CertificateAuthority._get_trust_store().version
+        ca = CertificateAuthority.create({
+            'name': 'CA Raíz de pruebas',
+            'certificate_file': base64.b64encode(self.root[0].public_bytes(serialization.Encoding.PEM)),
+        })
+        self.assertEqual(ca.subject_cn, 'CA Raíz')
+        self.assertTrue(ca.is_self_signed)
+        store = CertificateAuthority._get_trust_store()
+        self.assertNotEqual(store.version, version)
+        self.assertEqual([entry['id'] for entry in store.find_issuers(self.intermediate[0])], [ca.id])
+
+        ca.active = False
+        self.assertEqual(CertificateAuthority._get_trust_store().version, version)
+        ca.active = True
+        self.assertEqual(CertificateAuthority._get_trust_store().version, store.version)
+        ca.unlink()
+        self.assertEqual(CertificateAuthority._get_trust_store().version, version)
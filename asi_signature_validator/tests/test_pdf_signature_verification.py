@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+from ..models.pdf_signature_verification import PdfSignatureVerification, find_signature_byte_ranges
+
+
+def _pdf_firmado(contenido_der, relleno=16):
+    """PDF mínimo con un diccionario de firma cuyo /ByteRange rodea a /Contents."""
+    contenido_hex = b'<' + (contenido_der + b'\0' * relleno).hex().encode() + b'>'
+    plantilla = b'%%PDF-1.7\n1 0 obj << /Type /Sig /ByteRange [0 %10d %10d %10d] /Reason (Prueba) /Contents '
+    cola = b' >>\nendobj\n%EOF\n'
+    inicio = len(plantilla % (0, 0, 0))
+    fin = inicio + len(contenido_hex)
+    cabecera = plantilla % (inicio, fin, len(cola))
+    return cabecera + contenido_hex + cola
+
+
+class TestPdfSignatureVerification(TransactionCase):
+
+    def test_find_signature_byte_ranges(self):
+        contenido = bytes([0x30, 0x03, 0x01, 0x02, 0x03])
+        pdf_data = _pdf_firmado(contenido)
+
+        firmas = find_signature_byte_ranges(pdf_data)
+
+        self.assertEqual(len(firmas), 1)
+        # El relleno de ceros tras la estructura DER se descarta
+        self.assertEqual(firmas[0]['contents'], contenido)
+        self.assertTrue(firmas[0]['covers_whole_document'])
+        self.assertIn(b'/Reason (Prueba)', firmas[0]['dict_chunk'])
+        self.assertNotIn(contenido.hex().encode(), firmas[0]['dict_chunk'])
+
+    def test_find_signature_byte_ranges_without_signatures(self):
+        self.assertEqual(find_signature_byte_ranges(b'%PDF-1.7\n%%EOF\n'), [])
+
+    def test_verify_documents_reuses_results_by_hash(self):
+        Verification = self.env['asi.pdf.signature.verification']
+        documentos = [
+            {'filename': 'a.pdf', 'data': b'%PDF-1.7 A'},
+            {'filename': 'b.pdf', 'data': b'%PDF-1.7 B'},
+            {'filename': 'a-copia.pdf', 'data': b'%PDF-1.7 A'},
+        ]
+        analizar = PdfSignatureVerification._analyze_documents
+
+        with patch.object(PdfSignatureVerification, '_analyze_documents',
+                          autospec=True, side_effect=analizar) as mock_analizar:
+            verificaciones = Verification.verify_documents([dict(d) for d in documentos])
+            self.assertEqual(mock_analizar.call_count, 1)
+            # El contenido repetido se analiza una sola vez
+            self.assertEqual(len(mock_analizar.call_args[0][1]), 2)
+            self.assertEqual(verificaciones[0], verificaciones[2])
+            self.assertFalse(verificaciones[0].has_signatures)
+
+            # Los archivos sin cambios no se vuelven a verificar
+            otra_vez = Verification.verify_documents([dict(d) for d in documentos])
+            self.assertEqual(mock_analizar.call_count, 1)
+            self.assertEqual(otra_vez, verificaciones)
@@ -83,28 +83,21 @@ class SignatureWorkflowController(http.Controller):
         _logger.info(f"[ALFRESCO_SIMPLE] Documento: {document_name}")
         
         try:
-            config = request.env['ir.config_parameter'].sudo()
-            url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-            user = config.get_param('asi_alfresco_integration.alfresco_username')
-            pwd = config.get_param('asi_alfresco_integration.alfresco_password')
-            
-            _logger.info(f"[ALFRESCO_SIMPLE] URL: {url}")
-            _logger.info(f"[ALFRESCO_SIMPLE] Usuario: {user}")
-            _logger.info(f"[ALFRESCO_SIMPLE] Password configurado: {'SÍ' if pwd else 'NO'}")
-            
-            if not all([url, user, pwd]):
+            client = request.env['alfresco.client'].get_client()
+            if not client:
                 _logger.error("[ALFRESCO_SIMPLE] Configuración de Alfresco incompleta")
                 return request.not_found()
             
-            import requests
+            _logger.info(f"[ALFRESCO_SIMPLE] URL: {client.base_url}")
+            
             
             node_id = alfresco_file.alfresco_node_id
             
             # ESTRATEGIA SIMPLE: Primero intentar obtener información del nodo actual
-            node_info_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}"
+            node_info_url = f"/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}"
             _logger.info(f"[ALFRESCO_SIMPLE] Consultando info del nodo: {node_info_url}")
             
-            node_response = requests.get(node_info_url, auth=(user, pwd), timeout=30)
+            node_response = client.get(node_info_url, timeout=30)
             _logger.info(f"[ALFRESCO_SIMPLE] Respuesta info nodo: {node_response.status_code}")
             
             if node_response.status_code == 200:
@@ -119,10 +112,10 @@ class SignatureWorkflowController(http.Controller):
                     _logger.info(f"[ALFRESCO_SIMPLE] Versión actual: {version_label}, Modificado: {modified_at}")
             
             # ESTRATEGIA SIMPLE: Intentar descargar directamente el nodo actual (debería ser la versión más reciente)
-            download_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}/content"
+            download_url = f"/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}/content"
             _logger.info(f"[ALFRESCO_SIMPLE] URL de descarga directa: {download_url}")
             
-            response = requests.get(download_url, auth=(user, pwd), timeout=30)
+            response = client.get(download_url, timeout=30)
             _logger.info(f"[ALFRESCO_SIMPLE] Respuesta descarga: {response.status_code}")
             _logger.info(f"[ALFRESCO_SIMPLE] Headers respuesta: {dict(response.headers)}")
             
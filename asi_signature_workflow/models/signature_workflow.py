@@ -310,15 +310,11 @@ class SignatureWorkflow(models.Model):
         
         try:
             config = self.env['ir.config_parameter'].sudo()
-            url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-            user = config.get_param('asi_alfresco_integration.alfresco_username')
-            pwd = config.get_param('asi_alfresco_integration.alfresco_password')
             repo_id = config.get_param('asi_alfresco_integration.alfresco_repo_id', '-root-')
             
-            if not all([url, user, pwd]):
+            if not self.env['alfresco.client'].get_client():
                 raise UserError(_('Configuración de Alfresco incompleta'))
             
-            import requests
             import json
             
             sites_folder = self._get_or_create_alfresco_folder('Sites', repo_id, None)
@@ -359,24 +355,19 @@ class SignatureWorkflow(models.Model):
             if existing_folder:
                 return existing_folder
             
-            config = self.env['ir.config_parameter'].sudo()
-            url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-            user = config.get_param('asi_alfresco_integration.alfresco_username')
-            pwd = config.get_param('asi_alfresco_integration.alfresco_password')
+            client = self.env['alfresco.client'].get_client(raise_if_missing=True)
             
-            import requests
             import json
             
-            search_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{parent_node_id}/children"
+            search_url = f"/alfresco/api/-default-/public/alfresco/versions/1/nodes/{parent_node_id}/children"
             search_params = {
                 'where': f"(nodeType='cm:folder' AND name='{folder_name}')",
                 'maxItems': 1
             }
             
-            search_response = requests.get(
+            search_response = client.get(
                 search_url,
                 params=search_params,
-                auth=(user, pwd),
                 timeout=30
             )
             
@@ -395,7 +386,7 @@ class SignatureWorkflow(models.Model):
                     _logger.info(f"Carpeta existente {folder_name} sincronizada desde Alfresco")
                     return existing_folder
             
-            create_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{parent_node_id}/children"
+            create_url = f"/alfresco/api/-default-/public/alfresco/versions/1/nodes/{parent_node_id}/children"
             folder_data = {
                 "name": folder_name,
                 "nodeType": "cm:folder",
@@ -405,10 +396,9 @@ class SignatureWorkflow(models.Model):
                 }
             }
             
-            response = requests.post(
+            response = client.post(
                 create_url,
                 json=folder_data,
-                auth=(user, pwd),
                 timeout=30
             )
             
@@ -429,10 +419,9 @@ class SignatureWorkflow(models.Model):
             elif response.status_code == 409:
                 _logger.info(f"Carpeta {folder_name} ya existe en Alfresco (409), buscando...")
                 
-                search_response_retry = requests.get(
+                search_response_retry = client.get(
                     search_url,
                     params=search_params,
-                    auth=(user, pwd),
                     timeout=30
                 )
                 
@@ -464,19 +453,15 @@ class SignatureWorkflow(models.Model):
     def _upload_document_to_workflow_folder(self, document, workflow_folder):
         """Sube un documento a la carpeta de la solicitud en Alfresco"""
         try:
-            config = self.env['ir.config_parameter'].sudo()
-            url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-            user = config.get_param('asi_alfresco_integration.alfresco_username')
-            pwd = config.get_param('asi_alfresco_integration.alfresco_password')
+            client = self.env['alfresco.client'].get_client(raise_if_missing=True)
             
-            import requests
             import base64
             import json
             from datetime import datetime
             
             pdf_data = base64.b64decode(document.pdf_content)
             
-            upload_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{workflow_folder.node_id}/children"
+            upload_url = f"/alfresco/api/-default-/public/alfresco/versions/1/nodes/{workflow_folder.node_id}/children"
             
             files = {
                 'filedata': (document.name, pdf_data, 'application/pdf')
@@ -499,11 +484,10 @@ class SignatureWorkflow(models.Model):
             
             _logger.info(f"Subiendo documento {document.name} a carpeta {workflow_folder.node_id}")
             
-            response = requests.post(
+            response = client.post(
                 upload_url,
                 files=files,
                 data=data,
-                auth=(user, pwd),
                 timeout=60
             )
             
@@ -571,24 +555,18 @@ class SignatureWorkflow(models.Model):
             return
         
         try:
-            config = self.env['ir.config_parameter'].sudo()
-            url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-            user = config.get_param('asi_alfresco_integration.alfresco_username')
-            pwd = config.get_param('asi_alfresco_integration.alfresco_password')
-            
-            if not all([url, user, pwd]):
+            client = self.env['alfresco.client'].get_client()
+            if not client:
                 raise UserError(_('Configuración de Alfresco incompleta'))
             
-            import requests
             
             # Obtener lista de archivos en la carpeta de Alfresco
-            list_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{workflow_folder.node_id}/children"
+            list_url = f"/alfresco/api/-default-/public/alfresco/versions/1/nodes/{workflow_folder.node_id}/children"
             
             _logger.info(f"Buscando archivos reales en carpeta {workflow_folder.node_id}")
             
-            response = requests.get(
+            response = client.get(
                 list_url,
-                auth=(user, pwd),
                 timeout=30
             )
             
@@ -1167,15 +1145,10 @@ class SignatureWorkflow(models.Model):
             return
         
         try:
-            config = self.env['ir.config_parameter'].sudo()
-            url = config.get_param('asi_alfresco_integration.alfresco_server_url')
-            user = config.get_param('asi_alfresco_integration.alfresco_username')
-            pwd = config.get_param('asi_alfresco_integration.alfresco_password')
-            
-            if not all([url, user, pwd]):
+            client = self.env['alfresco.client'].get_client()
+            if not client:
                 raise UserError(_('Configuración de Alfresco incompleta para mover documentos'))
             
-            import requests
             import json
             
             target_parent_id = self.destination_folder_id.node_id
@@ -1194,7 +1167,7 @@ class SignatureWorkflow(models.Model):
                         continue
                     
                     # API de Alfresco para mover nodo
-                    move_url = f"{url}/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}/move"
+                    move_url = f"/alfresco/api/-default-/public/alfresco/versions/1/nodes/{node_id}/move"
                     
                     move_data = {
                         "targetParentId": target_parent_id
@@ -1202,10 +1175,9 @@ class SignatureWorkflow(models.Model):
                     
                     _logger.info(f"[MOVE] Moviendo documento {doc.name} (node: {node_id}) a carpeta {target_parent_id}")
                     
-                    response = requests.post(
+                    response = client.post(
                         move_url,
                         json=move_data,
-                        auth=(user, pwd),
                         headers={'Content-Type': 'application/json'},
                         timeout=60
                     )
@@ -4,5 +4,6 @@ from . import rule
 from . import http_session
 from . import http_request
 from . import log
+from . import log_queue
 from . import auditlog_log_line_view
 from . import autovacuum
@@ -1,6 +1,10 @@
 # Copyright 2016 ABF OSIELL <https://osiell.com>
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+import gzip
 import logging
+import os
+import threading
+import time
 from datetime import datetime, timedelta
 
 from odoo import api, fields, models
@@ -35,3 +39,136 @@ class AuditlogAutovacuum(models.TransientModel):
                 records.unlink()
             _logger.info("AUTOVACUUM - %s '%s' records deleted", nb_records, data_model)
         return True
+
+    @api.model
+    def autovacuum_sql(
+        self,
+        days,
+        step_hours=24,
+        max_duration=None,
+        archive_dir=None,
+        batch_size=10000,
+    ):
+        """Delete all logs older than ``days`` with set-based SQL queries,
+        by ranges of ``step_hours`` of creation date starting from the oldest
+        logs. Each range is deleted by batches of at most ``batch_size`` logs
+        (their lines first), and each batch is committed.
+
+        :param max_duration: no new range is started once this number of
+            seconds has elapsed, the next run goes on from there
+        :param archive_dir: when set, the logs and log lines of each range
+            are exported in gzipped CSV files of this directory beforehand
+        :return: True when all the logs older than ``days`` have been deleted
+
+        Called from a cron.
+        """
+        days = (days > 0) and int(days) or 0
+        deadline = datetime.now() - timedelta(days=days)
+        step = timedelta(hours=max(step_hours, 1))
+        started = time.monotonic()
+        self.env["auditlog.rule"].flush_log_lines()
+        self.env.flush_all()
+        self.env.cr.execute("SELECT min(create_date) FROM auditlog_log")
+        start = self.env.cr.fetchone()[0]
+        done = True
+        while start and start < deadline:
+            if max_duration and time.monotonic() - started > max_duration:
+                _logger.info("AUTOVACUUM - time budget exhausted at %s", start)
+                deadline = start
+                done = False
+                break
+            end = min(start + step, deadline)
+            if archive_dir:
+                self._archive_range(archive_dir, start, end)
+            nb_lines, nb_logs = self._vacuum_range(start, end, batch_size)
+            _logger.info(
+                "AUTOVACUUM - %s logs and %s log lines created before %s deleted",
+                nb_logs,
+                nb_lines,
+                end,
+            )
+            start = end
+        # HTTP requests and sessions are far less numerous than the logs
+        for table in ("auditlog_http_request", "auditlog_http_session"):
+            self.env.cr.execute(
+                "DELETE FROM {} WHERE create_date < %s".format(table), (deadline,)
+            )
+            _logger.info(
+                "AUTOVACUUM - %s '%s' records deleted", self.env.cr.rowcount, table
+            )
+        self._commit_vacuum()
+        self.env.invalidate_all()
+        return done
+
+    def _vacuum_range(self, start, end, batch_size=10000):
+        """Delete the logs created in [start, end[ and their lines, by
+        batches of at most ``batch_size`` logs committed one by one, so that
+        a busy range neither holds its locks nor grows the WAL for long
+
+        :return: tuple (number of log lines, number of logs) deleted
+        """
+        nb_lines = nb_logs = 0
+        while True:
+            self.env.cr.execute(
+                """
+                SELECT id FROM auditlog_log
+                WHERE create_date >= %s AND create_date < %s
+                ORDER BY id
+                LIMIT %s
+                """,
+                (start, end, batch_size),
+            )
+            log_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not log_ids:
+                break
+            self.env.cr.execute(
+                "DELETE FROM auditlog_log_line WHERE log_id = ANY(%s)", (log_ids,)
+            )
+            nb_lines += self.env.cr.rowcount
+            self.env.cr.execute(
+                "DELETE FROM auditlog_log WHERE id = ANY(%s)", (log_ids,)
+            )
+            nb_logs += self.env.cr.rowcount
+            self._commit_vacuum()
+            if len(log_ids) < batch_size:
+                break
+        return nb_lines, nb_logs
+
+    def _archive_range(self, archive_dir, start, end):
+        """Export the logs created in [start, end[ and their lines in
+        gzipped CSV files of ``archive_dir``
+        """
+        self.env.cr.execute(
+            "SELECT 1 FROM auditlog_log WHERE create_date >= %s AND create_date < %s"
+            " LIMIT 1",
+            (start, end),
+        )
+        if not self.env.cr.fetchone():
+            return
+        os.makedirs(archive_dir, exist_ok=True)
+        suffix = "{}_{}".format(
+            start.strftime("%Y%m%d%H%M%S"), end.strftime("%Y%m%d%H%M%S")
+        )
+        queries = {
+            "auditlog_log": """
+                SELECT * FROM auditlog_log
+                WHERE create_date >= %s AND create_date < %s
+            """,
+            "auditlog_log_line": """
+                SELECT line.* FROM auditlog_log_line line
+                JOIN auditlog_log log ON log.id = line.log_id
+                WHERE log.create_date >= %s AND log.create_date < %s
+            """,
+        }
+        for table, query in queries.items():
+            query = self.env.cr.mogrify(query, (start, end)).decode()
+            path = os.path.join(archive_dir, "%s_%s.csv.gz" % (table, suffix))
+            with gzip.open(path, "wb") as archive:
+                self.env.cr.copy_expert(
+                    "COPY (%s) TO STDOUT WITH CSV HEADER" % query, archive
+                )
+
+    def _commit_vacuum(self):
+        # commits are not allowed while testing
+        if not getattr(threading.current_thread(), "testing", False):
+            self.env.cr.commit()  # pylint: disable=invalid-commit
@@ -1,6 +1,6 @@
 # Copyright 2015 ABF OSIELL <https://osiell.com>
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
-from odoo import _, api, fields, models
+from odoo import _, api, fields, models, tools
 from odoo.exceptions import UserError
 
 
@@ -29,6 +29,12 @@ class AuditlogLog(models.Model):
         [("full", "Full log"), ("fast", "Fast log")], string="Type"
     )
 
+    def init(self):
+        # used by the autovacuum to delete the logs by date ranges
+        tools.create_index(
+            self._cr, "auditlog_log_create_date_index", self._table, ["create_date"]
+        )
+
     @api.model_create_multi
     def create(self, vals_list):
         """Insert model_name and model_model field values upon creation."""
@@ -49,6 +55,12 @@ class AuditlogLog(models.Model):
             vals.update({"model_name": model.name, "model_model": model.model})
         return super().write(vals)
 
+    def unlink(self):
+        """Insert the buffered log lines first, they may belong to the logs
+        to delete."""
+        self.env["auditlog.rule"].flush_log_lines()
+        return super().unlink()
+
 
 class AuditlogLogLine(models.Model):
     _name = "auditlog.log.line"
@@ -67,6 +79,11 @@ class AuditlogLogLine(models.Model):
     field_name = fields.Char("Technical name", readonly=True)
     field_description = fields.Char("Description", readonly=True)
 
+    def flush_model(self, fnames=None):
+        """Insert the log lines buffered by the rules before flushing."""
+        self.env["auditlog.rule"].flush_log_lines()
+        return super().flush_model(fnames)
+
     @api.model_create_multi
     def create(self, vals_list):
         """Ensure field_id is not empty on creation and store field_name and
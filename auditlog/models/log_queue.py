@@ -0,0 +1,218 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+import json
+import logging
+from collections import defaultdict
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class AuditlogLogQueue(models.Model):
+    """Operations of the rules in deferred mode, waiting to be logged
+
+    Only the raw values of the records are captured during the audited
+    operation, the logs and their lines are created later by a cron. The
+    operations that cannot be logged are kept in the failed state with
+    their error, they do not block the next ones.
+    """
+
+    _name = "auditlog.log.queue"
+    _description = "Auditlog - Operations waiting to be logged"
+    _order = "id"
+
+    res_model = fields.Char("Technical Model Name", required=True)
+    res_ids = fields.Text("Resource IDs", required=True)
+    res_names = fields.Text("Resource Names")
+    method = fields.Char(size=64)
+    user_id = fields.Many2one("res.users", string="User")
+    old_values = fields.Text()
+    new_values = fields.Text()
+    http_session_id = fields.Many2one("auditlog.http.session", string="Session")
+    http_request_id = fields.Many2one("auditlog.http.request", string="HTTP Request")
+    state = fields.Selection(
+        [("pending", "Pending"), ("failed", "Failed")],
+        default="pending",
+        required=True,
+        index=True,
+    )
+    error = fields.Text()
+
+    @api.model
+    def read_raw_values(self, records, fields_list):
+        """Read the values of the records as stored in the database:
+        the columns in one query and the ids of the x2many fields, without
+        any conversion nor name_get.
+
+        :return: dictionary {RES_ID: {'FIELD': VALUE, ...}}
+        """
+        if not records:
+            return {}
+        records.flush_recordset()
+        columns = []
+        x2many_fields = []
+        for field_name in fields_list:
+            field = records._fields[field_name]
+            if field.type in ("one2many", "many2many"):
+                x2many_fields.append(field_name)
+            elif (
+                field_name != "id"
+                and field.store
+                and field.column_type
+                and field.type != "binary"
+            ):
+                columns.append(field_name)
+        values = {record_id: {} for record_id in records.ids}
+        if columns:
+            query = 'SELECT "id", {} FROM "{}" WHERE "id" IN %s'.format(
+                ", ".join('"%s"' % column for column in columns), records._table
+            )
+            self.env.cr.execute(query, (tuple(records.ids),))
+            for row in self.env.cr.dictfetchall():
+                values[row.pop("id")].update(row)
+        for record in records:
+            for field_name in x2many_fields:
+                values[record.id][field_name] = record[field_name].ids
+        return values
+
+    @api.model
+    def enqueue(self, records, method, old_values=None, new_values=None):
+        """Queue an operation on `records` with their raw values"""
+        http_request_model = self.env["auditlog.http.request"]
+        http_session_model = self.env["auditlog.http.session"]
+        vals = {
+            "res_model": records._name,
+            "res_ids": json.dumps(records.ids),
+            "method": method,
+            "user_id": self.env.uid,
+            "http_request_id": http_request_model.current_http_request(),
+            "http_session_id": http_session_model.current_http_session(),
+        }
+        if old_values is not None:
+            vals["old_values"] = json.dumps(old_values, default=str)
+        if new_values is not None:
+            vals["new_values"] = json.dumps(new_values, default=str)
+        if method == "unlink":
+            # the records will not exist anymore when the logs are created
+            vals["res_names"] = json.dumps(dict(records.name_get()))
+        return self.create(vals)
+
+    @staticmethod
+    def _decode_values(values):
+        if not values:
+            return None
+        return {int(res_id): vals for res_id, vals in json.loads(values).items()}
+
+    def _convert_raw_values(self, model, values, display_names):
+        """Convert raw values as returned by `read()` in the full mode"""
+        lang = self.env.lang or "en_US"
+        for res_values in (values or {}).values():
+            for field_name, value in res_values.items():
+                field = model._fields.get(field_name)
+                if field is None:
+                    continue
+                if value is None:
+                    value = False
+                elif field.type == "many2one":
+                    names = display_names.get(field.comodel_name, {})
+                    value = (value, names.get(value, "DELETED"))
+                elif field.translate and isinstance(value, dict):
+                    value = value.get(lang, value.get("en_US", False))
+                res_values[field_name] = value
+
+    def _get_display_names(self, batch):
+        """Resolve the names of all the related records of a batch at once,
+        this also fills the cache used later on by the x2many log lines.
+        """
+        related_ids = defaultdict(set)
+        for dummy, model, old_values, new_values in batch:
+            for values in (old_values, new_values):
+                for res_values in (values or {}).values():
+                    for field_name, value in res_values.items():
+                        field = model._fields.get(field_name)
+                        if not (field and field.relational and value):
+                            continue
+                        if isinstance(value, list):
+                            related_ids[field.comodel_name].update(value)
+                        else:
+                            related_ids[field.comodel_name].add(value)
+        return {
+            comodel: dict(self.env[comodel].browse(ids).exists().name_get())
+            for comodel, ids in related_ids.items()
+        }
+
+    @api.model
+    def process_queue(self, limit=1000):
+        """Create the logs of the queued operations. Called from a cron."""
+        entries = self.search([("state", "=", "pending")], limit=limit)
+        batch = []
+        for entry in entries:
+            if entry.res_model not in self.env:
+                _logger.warning(
+                    "AUDITLOG - queued operation %s on the unknown model %s",
+                    entry.id,
+                    entry.res_model,
+                )
+                entry._mark_failed("Model %s does not exist" % entry.res_model)
+                continue
+            batch.append(
+                (
+                    entry,
+                    self.env[entry.res_model],
+                    self._decode_values(entry.old_values),
+                    self._decode_values(entry.new_values),
+                )
+            )
+        display_names = self._get_display_names(batch)
+        logged = self.browse()
+        for entry, model, old_values, new_values in batch:
+            try:
+                with self.env.cr.savepoint():
+                    entry._create_logs(model, old_values, new_values, display_names)
+            except Exception as e:
+                _logger.exception("AUDITLOG - queued operation %s failed", entry.id)
+                entry._mark_failed(str(e))
+            else:
+                logged |= entry
+        logged.unlink()
+        _logger.info(
+            "AUDITLOG - %d queued operations logged, %d failed",
+            len(logged),
+            len(entries) - len(logged),
+        )
+        if len(entries) == limit:
+            self.env.ref("auditlog.ir_cron_auditlog_process_queue")._trigger()
+        return True
+
+    def _create_logs(self, model, old_values, new_values, display_names):
+        """Create the logs of the queued operation"""
+        self.ensure_one()
+        for values in (old_values, new_values):
+            self._convert_raw_values(model, values, display_names)
+        logs = self.env["auditlog.rule"].sudo().create_logs(
+            self.user_id.id,
+            self.res_model,
+            json.loads(self.res_ids),
+            self.method,
+            old_values,
+            new_values,
+            {
+                "log_type": "full",
+                "http_request_id": self.http_request_id.id,
+                "http_session_id": self.http_session_id.id,
+            },
+        )
+        if not logs:
+            return
+        # date the logs with the operation, not with the cron run
+        self.env.cr.execute(
+            "UPDATE auditlog_log SET create_date = %s WHERE id IN %s",
+            (self.create_date, tuple(logs.ids)),
+        )
+        if self.res_names:
+            res_names = json.loads(self.res_names)
+            for log in logs:
+                log.name = res_names.get(str(log.res_id))
+
+    def _mark_failed(self, error):
+        self.write({"state": "failed", "error": error})
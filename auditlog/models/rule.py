@@ -3,7 +3,7 @@
 
 import copy
 
-from odoo import _, api, fields, models, modules
+from odoo import _, api, fields, models, modules, tools
 from odoo.exceptions import UserError
 
 FIELDS_BLACKLIST = [
@@ -18,6 +18,9 @@ FIELDS_BLACKLIST = [
 # Used for performance, to avoid a dictionary instanciation when we need an
 # empty dict to simplify algorithms
 EMPTY_DICT = {}
+# Key of the log lines buffered until the end of the transaction
+# in the data of the cursor pre-commit hooks
+LOG_LINE_BUFFER = "auditlog.log.line.buffer"
 
 
 class DictDiffer(object):
@@ -134,6 +137,15 @@ class AuditlogRule(models.Model):
     capture_record = fields.Boolean(
         help="Select this if you want to keep track of Unlink Record",
     )
+    deferred = fields.Boolean(
+        help=(
+            "Full log only: capture the raw values of the records in a queue "
+            "during the operation, the logs are created later on by a "
+            "scheduled action. The audited operations are then almost as "
+            "fast as without log."
+        ),
+        states={"subscribed": [("readonly", True)]},
+    )
     users_to_exclude_ids = fields.Many2many(
         "res.users",
         string="Users to Exclude",
@@ -232,6 +244,7 @@ class AuditlogRule(models.Model):
             model = self.env["ir.model"].sudo().browse(vals["model_id"])
             vals.update({"model_name": model.name, "model_model": model.model})
         new_records = super().create(vals_list)
+        self.clear_caches()
         updated = [record._register_hook() for record in new_records]
         if any(updated):
             modules.registry.Registry(self.env.cr.dbname).signal_changes()
@@ -245,6 +258,7 @@ class AuditlogRule(models.Model):
             model = self.env["ir.model"].sudo().browse(vals["model_id"])
             vals.update({"model_name": model.name, "model_model": model.model})
         res = super().write(vals)
+        self.clear_caches()
         if self._register_hook():
             modules.registry.Registry(self.env.cr.dbname).signal_changes()
         return res
@@ -252,6 +266,7 @@ class AuditlogRule(models.Model):
     def unlink(self):
         """Unsubscribe rules before removing them."""
         self.unsubscribe()
+        self.clear_caches()
         return super(AuditlogRule, self).unlink()
 
     @api.model
@@ -329,7 +344,22 @@ class AuditlogRule(models.Model):
             )
             return new_records
 
-        return create_full if self.log_type == "full" else create_fast
+        @api.model_create_multi
+        @api.returns("self", lambda value: value.id)
+        def create_deferred(self, vals_list, **kwargs):
+            self = self.with_context(auditlog_disabled=True)
+            new_records = create_deferred.origin(self, vals_list, **kwargs)
+            if self.env.user in users_to_exclude:
+                return new_records
+            queue_model = self.env["auditlog.log.queue"].sudo()
+            fields_list = self.env["auditlog.rule"].get_auditlog_fields(self)
+            new_values = queue_model.read_raw_values(new_records.sudo(), fields_list)
+            queue_model.enqueue(new_records, "create", None, new_values)
+            return new_records
+
+        if self.log_type == "fast":
+            return create_fast
+        return create_deferred if self.deferred else create_full
 
     def _make_read(self):
         """Instanciate a read method that log its calls."""
@@ -430,7 +460,21 @@ class AuditlogRule(models.Model):
             )
             return result
 
-        return write_full if self.log_type == "full" else write_fast
+        def write_deferred(self, vals, **kwargs):
+            self = self.with_context(auditlog_disabled=True)
+            if self.env.user in users_to_exclude:
+                return write_deferred.origin(self, vals, **kwargs)
+            queue_model = self.env["auditlog.log.queue"].sudo()
+            fields_list = self.env["auditlog.rule"].get_auditlog_fields(self)
+            old_values = queue_model.read_raw_values(self.sudo(), fields_list)
+            result = write_deferred.origin(self, vals, **kwargs)
+            new_values = queue_model.read_raw_values(self.sudo(), fields_list)
+            queue_model.enqueue(self, "write", old_values, new_values)
+            return result
+
+        if self.log_type == "fast":
+            return write_fast
+        return write_deferred if self.deferred else write_full
 
     def _make_unlink(self):
         """Instanciate an unlink method that log its calls."""
@@ -477,7 +521,19 @@ class AuditlogRule(models.Model):
             )
             return unlink_fast.origin(self, **kwargs)
 
-        return unlink_full if self.log_type == "full" else unlink_fast
+        def unlink_deferred(self, **kwargs):
+            self = self.with_context(auditlog_disabled=True)
+            if self.env.user in users_to_exclude:
+                return unlink_deferred.origin(self, **kwargs)
+            queue_model = self.env["auditlog.log.queue"].sudo()
+            fields_list = self.env["auditlog.rule"].get_auditlog_fields(self)
+            old_values = queue_model.read_raw_values(self.sudo(), fields_list)
+            queue_model.enqueue(self.sudo(), "unlink", old_values, None)
+            return unlink_deferred.origin(self, **kwargs)
+
+        if self.log_type == "fast":
+            return unlink_fast
+        return unlink_deferred if self.deferred else unlink_full
 
     def create_logs(
         self,
@@ -491,6 +547,8 @@ class AuditlogRule(models.Model):
     ):
         """Create logs. `old_values` and `new_values` are dictionaries, e.g:
         {RES_ID: {'FIELD': VALUE, ...}}
+
+        :return: the logs created
         """
         if old_values is None:
             old_values = EMPTY_DICT
@@ -500,23 +558,31 @@ class AuditlogRule(models.Model):
         http_request_model = self.env["auditlog.http.request"]
         http_session_model = self.env["auditlog.http.session"]
         model_model = self.env[res_model]
-        model_id = self.pool._auditlog_model_cache[res_model]
-        auditlog_rule = self.env["auditlog.rule"].search([("model_id", "=", model_id)])
-        fields_to_exclude = auditlog_rule.fields_to_exclude_ids.mapped("name")
+        model_id = self.pool._auditlog_model_cache.get(res_model) or self.env[
+            "ir.model"
+        ]._get_id(res_model)
+        fields_to_exclude, capture_record = self._get_rule_data(model_id)
+        fields_to_exclude = list(fields_to_exclude)
+        # records of queued operations may have been deleted since
+        names = dict(model_model.browse(res_ids).exists().name_get())
+        http_request_id = http_request_model.current_http_request()
+        http_session_id = http_session_model.current_http_session()
+        vals_list = []
         for res_id in res_ids:
-            name = model_model.browse(res_id).name_get()
-            res_name = name and name[0] and name[0][1]
             vals = {
-                "name": res_name,
+                "name": names.get(res_id),
                 "model_id": model_id,
                 "res_id": res_id,
                 "method": method,
                 "user_id": uid,
-                "http_request_id": http_request_model.current_http_request(),
-                "http_session_id": http_session_model.current_http_session(),
+                "http_request_id": http_request_id,
+                "http_session_id": http_session_id,
             }
             vals.update(additional_log_values or {})
-            log = log_model.create(vals)
+            vals_list.append(vals)
+        logs = log_model.create(vals_list)
+        for log in logs:
+            res_id = log.res_id
             diff = DictDiffer(
                 new_values.get(res_id, EMPTY_DICT), old_values.get(res_id, EMPTY_DICT)
             )
@@ -535,13 +601,24 @@ class AuditlogRule(models.Model):
                 self._create_log_line_on_write(
                     log, diff.changed(), old_values, new_values, fields_to_exclude
                 )
-            elif method == "unlink" and auditlog_rule.capture_record:
+            elif method == "unlink" and capture_record:
                 self._create_log_line_on_read(
                     log,
                     list(old_values.get(res_id, EMPTY_DICT).keys()),
                     old_values,
                     fields_to_exclude,
                 )
+        return logs
+
+    @api.model
+    @tools.ormcache("model_id")
+    def _get_rule_data(self, model_id):
+        """Return the names of the fields to exclude and the `capture_record`
+        option of the rule of a model, instead of searching the rule
+        each time a log is created.
+        """
+        rule = self.sudo().search([("model_id", "=", model_id)], limit=1)
+        return tuple(rule.fields_to_exclude_ids.mapped("name")), rule.capture_record
 
     def _get_field(self, model, field_name):
         cache = self.pool._auditlog_field_cache
@@ -549,27 +626,55 @@ class AuditlogRule(models.Model):
             cache.setdefault(model.model, {})
             # - we use 'search()' then 'read()' instead of the 'search_read()'
             #   to take advantage of the 'classic_write' loading
-            # - search the field in the current model and those it inherits
+            # - search the fields of the current model and those it inherits
+            #   all at once, the next fields to log are then already cached
             field_model = self.env["ir.model.fields"].sudo()
             all_model_ids = [model.id]
             all_model_ids.extend(model.inherited_model_ids.ids)
-            field = field_model.search(
-                [("model_id", "in", all_model_ids), ("name", "=", field_name)]
-            )
+            field_records = field_model.search([("model_id", "in", all_model_ids)])
+            model_fields = {}
+            for field_data in field_records.read(load="_classic_write"):
+                model_fields.setdefault(field_data["name"], field_data)
+            cache[model.model].update(model_fields)
             # The field can be a dummy one, like 'in_group_X' on 'res.users'
             # As such we can't log it (field_id is required to create a log)
-            if not field:
-                cache[model.model][field_name] = False
-            else:
-                field_data = field.read(load="_classic_write")[0]
-                cache[model.model][field_name] = field_data
+            cache[model.model].setdefault(field_name, False)
         return cache[model.model][field_name]
 
+    def _create_log_line(self, vals):
+        """Buffer the values of a log line, they are inserted with the
+        other lines of the transaction by `flush_log_lines`.
+        """
+        if self.env.context.get("auditlog_unbuffered"):
+            self.env["auditlog.log.line"].create(vals)
+            return
+        precommit = self.env.cr.precommit
+        if LOG_LINE_BUFFER not in precommit.data:
+            precommit.data[LOG_LINE_BUFFER] = []
+            precommit.add(self.sudo().flush_log_lines)
+        precommit.data[LOG_LINE_BUFFER].append(vals)
+        # `line_ids` was cached as empty when the log was created: reading it
+        # again searches the lines, which flushes the buffer first
+        self.env["auditlog.log"].browse(vals["log_id"]).invalidate_recordset(
+            ["line_ids"]
+        )
+
+    def flush_log_lines(self):
+        """Insert the buffered log lines, by batches of multiple rows
+
+        Called before the commit of the transaction and when the log lines
+        are flushed (i.e. before being searched).
+        """
+        vals_list = self.env.cr.precommit.data.pop(LOG_LINE_BUFFER, None)
+        if vals_list:
+            log_line_model = self.env["auditlog.log.line"].sudo()
+            log_line_model.create(vals_list)
+            log_line_model.flush_model()
+
     def _create_log_line_on_read(
         self, log, fields_list, read_values, fields_to_exclude
     ):
         """Log field filled on a 'read' operation."""
-        log_line_model = self.env["auditlog.log.line"]
         fields_to_exclude = fields_to_exclude + FIELDS_BLACKLIST
         for field_name in fields_list:
             if field_name in fields_to_exclude:
@@ -578,7 +683,7 @@ class AuditlogRule(models.Model):
             # not all fields have an ir.models.field entry (ie. related fields)
             if field:
                 log_vals = self._prepare_log_line_vals_on_read(log, field, read_values)
-                log_line_model.create(log_vals)
+                self._create_log_line(log_vals)
 
     def _prepare_log_line_vals_on_read(self, log, field, read_values):
         """Prepare the dictionary of values used to create a log line on a
@@ -603,7 +708,6 @@ class AuditlogRule(models.Model):
         self, log, fields_list, old_values, new_values, fields_to_exclude
     ):
         """Log field updated on a 'write' operation."""
-        log_line_model = self.env["auditlog.log.line"]
         fields_to_exclude = fields_to_exclude + FIELDS_BLACKLIST
         for field_name in fields_list:
             if field_name in fields_to_exclude:
@@ -614,7 +718,7 @@ class AuditlogRule(models.Model):
                 log_vals = self._prepare_log_line_vals_on_write(
                     log, field, old_values, new_values
                 )
-                log_line_model.create(log_vals)
+                self._create_log_line(log_vals)
 
     def _prepare_log_line_vals_on_write(self, log, field, old_values, new_values):
         """Prepare the dictionary of values used to create a log line on a
@@ -655,7 +759,6 @@ class AuditlogRule(models.Model):
         self, log, fields_list, new_values, fields_to_exclude
     ):
         """Log field filled on a 'create' operation."""
-        log_line_model = self.env["auditlog.log.line"]
         fields_to_exclude = fields_to_exclude + FIELDS_BLACKLIST
         for field_name in fields_list:
             if field_name in fields_to_exclude:
@@ -664,7 +767,7 @@ class AuditlogRule(models.Model):
             # not all fields have an ir.models.field entry (ie. related fields)
             if field:
                 log_vals = self._prepare_log_line_vals_on_create(log, field, new_values)
-                log_line_model.create(log_vals)
+                self._create_log_line(log_vals)
 
     def _prepare_log_line_vals_on_create(self, log, field, new_values):
         """Prepare the dictionary of values used to create a log line on a
@@ -547,3 +547,93 @@ class AuditLogRuleTestForUserFields(TransactionCase):
 
         # Removing auditlog_rule
         self.auditlog_rule.unlink()
+
+
+class TestAuditlogDeferred(TransactionCase):
+    def setUp(self):
+        super(TestAuditlogDeferred, self).setUp()
+        self.groups_model_id = self.env.ref("base.model_res_groups").id
+        self.groups_rule = self.env["auditlog.rule"].create(
+            {
+                "name": "testrule for groups in deferred mode",
+                "model_id": self.groups_model_id,
+                "log_read": False,
+                "log_create": True,
+                "log_write": True,
+                "log_unlink": True,
+                "log_type": "full",
+                "deferred": True,
+            }
+        )
+        self.groups_rule.subscribe()
+
+    def tearDown(self):
+        self.groups_rule.unlink()
+        super(TestAuditlogDeferred, self).tearDown()
+
+    def test_deferred_logs(self):
+        auditlog_log = self.env["auditlog.log"]
+        queue_model = self.env["auditlog.log.queue"]
+        implied_group = self.env["res.groups"].create({"name": "testgroup7"})
+        group = self.env["res.groups"].create({"name": "testgroup8"})
+        group.write({"name": "testgroup9", "implied_ids": [(4, implied_group.id)]})
+        domain = [("model_id", "=", self.groups_model_id), ("res_id", "=", group.id)]
+        # nothing logged until the queue is processed
+        self.assertFalse(auditlog_log.search(domain))
+        self.assertEqual(
+            queue_model.search_count([("res_model", "=", "res.groups")]), 3
+        )
+
+        queue_model.process_queue()
+        self.assertFalse(queue_model.search([("res_model", "=", "res.groups")]))
+        self.assertTrue(
+            auditlog_log.search(domain + [("method", "=", "create")]).ensure_one()
+        )
+        write_log = auditlog_log.search(
+            domain + [("method", "=", "write")]
+        ).ensure_one()
+        self.assertEqual(write_log.log_type, "full")
+        name_line = write_log.line_ids.filtered(lambda l: l.field_name == "name")
+        self.assertEqual(name_line.old_value_text, "testgroup8")
+        self.assertEqual(name_line.new_value_text, "testgroup9")
+        self.assertTrue(
+            write_log.line_ids.filtered(lambda l: l.field_name == "implied_ids")
+        )
+
+        group.unlink()
+        queue_model.process_queue()
+        unlink_log = auditlog_log.search(
+            domain + [("method", "=", "unlink")]
+        ).ensure_one()
+        self.assertTrue(unlink_log.name)
+
+    def test_deferred_failed_entries(self):
+        auditlog_log = self.env["auditlog.log"]
+        queue_model = self.env["auditlog.log.queue"]
+        unknown = queue_model.create(
+            {"res_model": "auditlog.unknown.model", "res_ids": "[1]", "method": "write"}
+        )
+        broken = queue_model.create(
+            {"res_model": "res.groups", "res_ids": "not json", "method": "write"}
+        )
+        group = self.env["res.groups"].create({"name": "testgroup10"})
+
+        queue_model.process_queue()
+        # the failed operations are kept, the others are logged
+        self.assertEqual(unknown.state, "failed")
+        self.assertIn("auditlog.unknown.model", unknown.error)
+        self.assertEqual(broken.state, "failed")
+        self.assertTrue(broken.error)
+        self.assertTrue(
+            auditlog_log.search(
+                [
+                    ("model_id", "=", self.groups_model_id),
+                    ("res_id", "=", group.id),
+                    ("method", "=", "create"),
+                ]
+            )
+        )
+        res_models = ("res.groups", unknown.res_model)
+        self.assertEqual(
+            queue_model.search([("res_model", "in", res_models)]), unknown | broken
+        )
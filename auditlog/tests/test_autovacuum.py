@@ -1,6 +1,9 @@
 # Copyright 2016 ABF OSIELL <https://osiell.com>
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+import os
+import tempfile
 import time
+from unittest.mock import patch
 
 from odoo.tests.common import TransactionCase
 
@@ -42,3 +45,42 @@ class TestAuditlogAutovacuum(TransactionCase):
             [("model_id", "=", self.groups_model_id), ("res_id", "=", group.id)]
         )
         self.assertEqual(nb_logs, 0)
+
+    def test_autovacuum_sql(self):
+        log_model = self.env["auditlog.log"]
+        autovacuum_model = self.env["auditlog.autovacuum"]
+        group = self.env["res.groups"].create({"name": "testgroup1"})
+        group.write({"name": "testgroup2"})
+        domain = [("model_id", "=", self.groups_model_id), ("res_id", "=", group.id)]
+        self.assertGreater(log_model.search_count(domain), 0)
+        time.sleep(1)
+        with tempfile.TemporaryDirectory() as archive_dir:
+            done = autovacuum_model.autovacuum_sql(days=0, archive_dir=archive_dir)
+            self.assertTrue(done)
+            archives = os.listdir(archive_dir)
+            self.assertTrue(any(a.startswith("auditlog_log_line_") for a in archives))
+        self.assertEqual(log_model.search_count(domain), 0)
+        self.assertFalse(
+            self.env["auditlog.log.line"].search([("log_id.res_id", "=", group.id)])
+        )
+
+    def test_autovacuum_sql_batches(self):
+        log_model = self.env["auditlog.log"]
+        autovacuum_model = self.env["auditlog.autovacuum"]
+        groups = self.env["res.groups"].create(
+            [{"name": "testgroup%s" % i} for i in range(3)]
+        )
+        domain = [("model_id", "=", self.groups_model_id), ("res_id", "in", groups.ids)]
+        self.env["auditlog.rule"].flush_log_lines()
+        nb_logs = log_model.search_count(domain)
+        self.assertGreaterEqual(nb_logs, 3)
+        time.sleep(1)
+        commits = []
+        with patch.object(
+            type(autovacuum_model), "_commit_vacuum", lambda self: commits.append(1)
+        ):
+            done = autovacuum_model.autovacuum_sql(days=0, batch_size=1)
+        self.assertTrue(done)
+        self.assertEqual(log_model.search_count(domain), 0)
+        # one commit per log, plus the final one
+        self.assertGreaterEqual(len(commits), nb_logs + 1)
@@ -0,0 +1,65 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+import logging
+import time
+
+from odoo.tests.common import TransactionCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged("-standard", "auditlog_benchmark")
+class TestAuditlogBenchmark(TransactionCase):
+    """Compare the cost of auditing mass writes with the log lines inserted
+    one by one (as before, `auditlog_unbuffered` context key) or buffered
+    until the end of the transaction.
+
+    Not run by default, use `--test-tags auditlog_benchmark`.
+    """
+
+    nb_records = 500
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.groups_model_id = cls.env.ref("base.model_res_groups").id
+        cls.groups = cls.env["res.groups"].create(
+            [{"name": "benchmark group %s" % idx} for idx in range(cls.nb_records)]
+        )
+
+    def _run_benchmark(self, log_type, buffered):
+        rule = self.env["auditlog.rule"].create(
+            {
+                "name": "benchmark rule for groups",
+                "model_id": self.groups_model_id,
+                "log_read": False,
+                "log_create": False,
+                "log_write": True,
+                "log_unlink": False,
+                "log_type": log_type,
+            }
+        )
+        rule.subscribe()
+        groups = self.groups.with_context(auditlog_unbuffered=not buffered)
+        queries = self.cr.sql_log_count
+        start = time.perf_counter()
+        for group in groups:
+            group.write({"comment": "%s %s" % (log_type, buffered)})
+        self.env["auditlog.log.line"].flush_model()
+        duration = time.perf_counter() - start
+        queries = self.cr.sql_log_count - queries
+        rule.unlink()
+        _logger.info(
+            "auditlog %s log, %s: %d writes in %.3fs, %d queries",
+            log_type,
+            "buffered" if buffered else "unbuffered",
+            len(groups),
+            duration,
+            queries,
+        )
+        return duration, queries
+
+    def test_benchmark_write(self):
+        for log_type in ("full", "fast"):
+            dummy, unbuffered_queries = self._run_benchmark(log_type, False)
+            dummy, buffered_queries = self._run_benchmark(log_type, True)
+            self.assertLess(buffered_queries, unbuffered_queries)
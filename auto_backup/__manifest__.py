@@ -19,7 +19,7 @@
     'author': "Yenthe Van Ginneken",
     'website': "http://www.odoo.yenthevg.com",
     'category': 'Administration',
-    'version': '16.0.0.1',
+    'version': '16.0.0.2',
     'installable': True,
     'license': 'LGPL-3',
 
@@ -21,6 +21,8 @@ except ImportError:
         'This module needs paramiko to automatically write backups to the FTP through SFTP. '
         'Please install paramiko on your system. (sudo pip3 install paramiko)')
 
+from .incremental_backup import ChunkStore, SftpUploader
+
 
 class DbBackup(models.Model):
     _name = 'db.backup'
@@ -37,7 +39,13 @@ class DbBackup(models.Model):
                        default=_get_db_name)
     folder = fields.Char('Backup Directory', help='Absolute path for storing the backups', required='True',
                          default='/odoo/backups')
-    backup_type = fields.Selection([('zip', 'Zip'), ('dump', 'Dump')], 'Backup Type', required=True, default='zip')
+    backup_type = fields.Selection([('zip', 'Zip'), ('dump', 'Dump'), ('incremental', 'Incremental')],
+                                   'Backup Type', required=True, default='zip',
+                                   help='Incremental: a parallel directory-format dump plus the filestore, split into '
+                                        'deduplicated compressed chunks. Only new chunks are written and uploaded.')
+    dump_jobs = fields.Integer('Parallel jobs', default=4,
+                               help='Number of tables pg_dump dumps in parallel, and of files chunked in parallel, '
+                                    'for incremental backups.')
     autoremove = fields.Boolean('Auto. Remove Backups',
                                 help='If you check this option you can choose to automaticly remove the backup '
                                      'after xx days')
@@ -118,6 +126,9 @@ class DbBackup(models.Model):
     def schedule_backup(self):
         conf_ids = self.search([])
         for rec in conf_ids:
+            if rec.backup_type == 'incremental':
+                rec._backup_incremental()
+                continue
 
             try:
                 if not os.path.isdir(rec.folder):
@@ -127,12 +138,10 @@ class DbBackup(models.Model):
             # Create name for dumpfile.
             bkp_file = '%s_%s.%s' % (time.strftime('%Y_%m_%d_%H_%M_%S'), rec.name, rec.backup_type)
             file_path = os.path.join(rec.folder, bkp_file)
-            fp = open(file_path, 'wb')
             try:
                 # try to backup database and write it away
-                fp = open(file_path, 'wb')
-                self._take_dump(rec.name, fp, 'db.backup', rec.backup_type)
-                fp.close()
+                with open(file_path, 'wb') as fp:
+                    self._take_dump(rec.name, fp, 'db.backup', rec.backup_type)
             except Exception as error:
                 _logger.debug(
                     "Couldn't backup database %s. Bad database administrator password for server running at "
@@ -146,19 +155,13 @@ class DbBackup(models.Model):
                     # Store all values in variables
                     dir = rec.folder
                     path_to_write_to = rec.sftp_path
-                    ip_host = rec.sftp_host
-                    port_host = rec.sftp_port
-                    username_login = rec.sftp_user
-                    password_login = rec.sftp_password
                     _logger.debug('sftp remote path: %s', path_to_write_to)
 
                     try:
-                        s = paramiko.SSHClient()
-                        s.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                        s.connect(ip_host, port_host, username_login, password_login, timeout=20)
-                        sftp = s.open_sftp()
+                        s, sftp = rec._sftp_connect()
                     except Exception as error:
                         _logger.critical('Error connecting to remote server! Error: %s', str(error))
+                        raise
 
                     try:
                         sftp.chdir(path_to_write_to)
@@ -177,17 +180,18 @@ class DbBackup(models.Model):
                                 sftp.chdir(current_directory)
                                 pass
                     sftp.chdir(path_to_write_to)
+                    # One listing of the remote folder instead of a stat per file.
+                    remote_files = set(sftp.listdir(path_to_write_to))
                     # Loop over all files in the directory.
                     for f in os.listdir(dir):
                         if rec.name in f:
                             fullpath = os.path.join(dir, f)
                             if os.path.isfile(fullpath):
-                                try:
-                                    sftp.stat(os.path.join(path_to_write_to, f))
+                                if f in remote_files:
                                     _logger.debug(
                                         'File %s already exists on the remote FTP Server ------ skipped', fullpath)
                                 # This means the file does not exist (remote) yet!
-                                except IOError:
+                                else:
                                     try:
                                         sftp.put(fullpath, os.path.join(path_to_write_to, f))
                                         _logger.info('Copying File % s------ success', fullpath)
@@ -230,23 +234,7 @@ class DbBackup(models.Model):
                                   'instead: %s', str(e))
                     # At this point the SFTP backup failed. We will now check if the user wants
                     # an e-mail notification about this.
-                    if rec.send_mail_sftp_fail:
-                        try:
-                            ir_mail_server = self.env['ir.mail_server'].search([], order='sequence asc', limit=1)
-                            message = "Dear,\n\nThe backup for the server " + rec.host + " (IP: " + rec.sftp_host + \
-                                      ") failed. Please check the following details:\n\nIP address SFTP server: " + \
-                                      rec.sftp_host + "\nUsername: " + rec.sftp_user + \
-                                      "\n\nError details: " + tools.ustr(e) + \
-                                      "\n\nWith kind regards"
-                            catch_all_domain = self.env["ir.config_parameter"].sudo().get_param("mail.catchall.domain")
-                            response_mail = "auto_backup@%s" % catch_all_domain if catch_all_domain else self.env.user.partner_id.email
-                            msg = ir_mail_server.build_email(response_mail, [rec.email_to_notify],
-                                                             "Backup from " + rec.host + "(" + rec.sftp_host +
-                                                             ") failed",
-                                                             message)
-                            ir_mail_server.send_email(msg)
-                        except Exception:
-                            pass
+                    rec._send_sftp_fail_mail(e)
 
             # Remove all old files (on local server) in case this is configured..
             try:
@@ -271,6 +259,105 @@ class DbBackup(models.Model):
                                 _logger.info("Delete local out-of-date file: %s", fullpath)
                                 os.remove(fullpath)
 
+    def _send_sftp_fail_mail(self, e):
+        """E-mail the configured address when writing the backup to the SFTP server failed."""
+        if not self.send_mail_sftp_fail:
+            return
+        try:
+            ir_mail_server = self.env['ir.mail_server'].search([], order='sequence asc', limit=1)
+            message = "Dear,\n\nThe backup for the server " + self.host + " (IP: " + self.sftp_host + \
+                      ") failed. Please check the following details:\n\nIP address SFTP server: " + \
+                      self.sftp_host + "\nUsername: " + self.sftp_user + \
+                      "\n\nError details: " + tools.ustr(e) + \
+                      "\n\nWith kind regards"
+            catch_all_domain = self.env["ir.config_parameter"].sudo().get_param("mail.catchall.domain")
+            response_mail = "auto_backup@%s" % catch_all_domain if catch_all_domain else self.env.user.partner_id.email
+            msg = ir_mail_server.build_email(response_mail, [self.email_to_notify],
+                                             "Backup from " + self.host + "(" + self.sftp_host +
+                                             ") failed",
+                                             message)
+            ir_mail_server.send_email(msg)
+        except Exception:
+            pass
+
+    def _sftp_connect(self):
+        """Open an SSH connection and an SFTP session to the configured server."""
+        self.ensure_one()
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(self.sftp_host, self.sftp_port, self.sftp_user, self.sftp_password, timeout=20)
+        return client, client.open_sftp()
+
+    def _backup_incremental(self):
+        """
+        Incremental backup: a parallel directory-format dump and the filestore are
+        stored as deduplicated, compressed chunks under
+        ``<folder>/<database>_incremental``, with one JSON manifest per run. Only
+        the chunks the SFTP server does not have yet are uploaded.
+
+        To restore, rebuild the files of a manifest with
+        ``ChunkStore.restore_snapshot`` and run ``pg_restore --jobs`` on its
+        ``dump`` directory; ``filestore`` holds the filestore.
+        """
+        self.ensure_one()
+        store = ChunkStore(os.path.join(self.folder, '%s_incremental' % self.name))
+        snapshot_name = '%s_%s.json' % (time.strftime('%Y_%m_%d_%H_%M_%S'), self.name)
+        jobs = max(1, self.dump_jobs)
+        start = time.time()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dump_dir = os.path.join(tmp_dir, 'dump')
+            try:
+                self._take_directory_dump(self.name, dump_dir, jobs)
+                db = odoo.sql_db.db_connect(self.name)
+                with db.cursor() as cr:
+                    odoo_manifest = self._dump_db_manifest(cr)
+                manifest = store.create_snapshot(
+                    snapshot_name,
+                    {'dump': dump_dir, 'filestore': odoo.tools.config.filestore(self.name)},
+                    metadata={'odoo_manifest': odoo_manifest, 'db_name': self.name},
+                    workers=jobs,
+                )
+            except Exception as error:
+                _logger.error("Couldn't take the incremental backup of database %s: %s", self.name, error)
+                return
+        stats = manifest['stats']
+        _logger.info('Incremental backup %s: %s files (%s changed), %.1f MB read, %s chunks, %.1f MB stored, '
+                     '%.0f s', snapshot_name, stats['files'], stats['files_changed'], stats['bytes_read'] / 1e6,
+                     stats['chunks'], stats['stored_bytes'] / 1e6, time.time() - start)
+
+        if self.sftp_write:
+            try:
+                client, sftp = self._sftp_connect()
+                try:
+                    uploader = SftpUploader(sftp, self.sftp_path, workers=jobs, open_sftp=client.open_sftp)
+                    sent = uploader.upload_snapshot(store, snapshot_name, manifest)
+                    _logger.info('Incremental backup %s: %.1f MB uploaded to the SFTP server',
+                                 snapshot_name, sent / 1e6)
+                    uploader.remove_snapshots_older_than(self.days_to_keep_sftp)
+                finally:
+                    sftp.close()
+                    client.close()
+            except Exception as e:
+                _logger.error('Exception! We couldn\'t back up to the FTP server. Here is what we got back '
+                              'instead: %s', str(e))
+                self._send_sftp_fail_mail(e)
+
+        if self.autoremove:
+            store.remove_snapshots_older_than(self.days_to_keep)
+
+    def _check_dump_access(self):
+        cron_user_id = self.env.ref('auto_backup.backup_scheduler').user_id.id
+        if self._name != 'db.backup' or cron_user_id != self.env.user.id:
+            _logger.error('Unauthorized database operation. Backups should only be available from the cron job.')
+            raise AccessDenied()
+
+    def _take_directory_dump(self, db_name, dump_dir, jobs):
+        """Directory-format dump of `db_name` into `dump_dir`, dumping `jobs` tables in parallel."""
+        self._check_dump_access()
+        _logger.info('DUMP DB: %s format directory, %s jobs', db_name, jobs)
+        odoo.tools.exec_pg_command('pg_dump', '--no-owner', '--format=directory', '--jobs=%d' % jobs,
+                                   '--file=' + dump_dir, db_name)
+
     # This is more or less the same as the default Odoo function at
     # https://github.com/odoo/odoo/blob/e649200ab44718b8faefc11c2f8a9d11f2db7753/odoo/service/db.py#L209
     # The main difference is that we do not do have a wrapper for the function check_db_management_enabled here and
@@ -282,10 +369,7 @@ class DbBackup(models.Model):
         """Dump database `db` into file-like object `stream` if stream is None
         return a file object with the dump """
 
-        cron_user_id = self.env.ref('auto_backup.backup_scheduler').user_id.id
-        if self._name != 'db.backup' or cron_user_id != self.env.user.id:
-            _logger.error('Unauthorized database operation. Backups should only be available from the cron job.')
-            raise AccessDenied()
+        self._check_dump_access()
 
         _logger.info('DUMP DB: %s format %s', db_name, backup_format)
 
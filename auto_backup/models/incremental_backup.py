@@ -0,0 +1,386 @@
+"""Incremental, deduplicated backups.
+
+A snapshot is a JSON manifest listing every file of the backup (the
+directory-format pg_dump and the filestore) as a list of content-addressed
+chunks. Chunks are stored once, compressed, under ``chunks/<xx>/<sha256>``,
+so unchanged files and tables cost nothing on the next run.
+
+Nothing in this module uses the ORM: it works on plain paths and on any
+object with the subset of the paramiko ``SFTPClient`` API used by
+``SftpUploader``.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+_logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 4 * 1024 * 1024
+COMPRESSION_LEVEL = 6
+MANIFEST_SUFFIX = '.json'
+# pg_dump already compresses the table files of a directory-format dump
+PRECOMPRESSED_SUFFIXES = ('.dat.gz', '.gz', '.zip', '.jpg', '.jpeg', '.png', '.pdf', '.xlsx', '.docx')
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+# Blocks read back to check an upload when the server cannot hash files itself
+VERIFY_SAMPLES = 4
+VERIFY_SAMPLE_SIZE = 64 * 1024
+
+
+class ChunkStore(object):
+    """Content-addressed chunk storage rooted at ``root``."""
+
+    def __init__(self, root):
+        self.root = root
+        self.chunk_dir = os.path.join(root, 'chunks')
+        self.snapshot_dir = os.path.join(root, 'snapshots')
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    def chunk_path(self, chunk_hash):
+        return os.path.join(self.chunk_dir, chunk_hash[:2], chunk_hash)
+
+    def put(self, data, compress=True, known=None):
+        """
+        Store a chunk if it is new. Returns ``(hash, info)``; ``info`` describes
+        the stored bytes. Chunks are always zlib streams (level 0 for data that
+        is already compressed), so a chunk reads the same whoever stored it.
+        """
+        chunk_hash = hashlib.sha256(data).hexdigest()
+        path = self.chunk_path(chunk_hash)
+        if os.path.exists(path):
+            if known and chunk_hash in known:
+                return chunk_hash, known[chunk_hash]
+            with open(path, 'rb') as fh:
+                stored = fh.read()
+        else:
+            stored = zlib.compress(data, COMPRESSION_LEVEL if compress else 0)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = '%s.%s-%s.tmp' % (path, os.getpid(), threading.get_ident())
+            with open(tmp_path, 'wb') as fh:
+                fh.write(stored)
+            os.replace(tmp_path, path)
+        return chunk_hash, {'size': len(stored), 'sha256': hashlib.sha256(stored).hexdigest()}
+
+    def read(self, chunk_hash):
+        with open(self.chunk_path(chunk_hash), 'rb') as fh:
+            return zlib.decompress(fh.read())
+
+    def store_file(self, path, compress=True, known=None):
+        """Split ``path`` into chunks, storing the new ones. Returns ``(hashes, {hash: info})``."""
+        hashes, chunks = [], {}
+        with open(path, 'rb') as fh:
+            while True:
+                data = fh.read(CHUNK_SIZE)
+                if not data:
+                    break
+                chunk_hash, info = self.put(data, compress, known)
+                hashes.append(chunk_hash)
+                chunks[chunk_hash] = info
+        return hashes, chunks
+
+    # -------------------------------------------------------------------------
+    # Snapshots
+    # -------------------------------------------------------------------------
+
+    def list_snapshots(self):
+        return sorted(f for f in os.listdir(self.snapshot_dir) if f.endswith(MANIFEST_SUFFIX))
+
+    def load_snapshot(self, name):
+        with open(os.path.join(self.snapshot_dir, name)) as fh:
+            return json.load(fh)
+
+    def latest_snapshot(self):
+        snapshots = self.list_snapshots()
+        return self.load_snapshot(snapshots[-1]) if snapshots else None
+
+    def create_snapshot(self, name, sources, metadata=None, workers=4):
+        """
+        Store every file under ``sources`` ({prefix: directory}) and write the
+        manifest ``name``. Files whose size and mtime did not change since the
+        latest snapshot reuse its chunk list without being read again.
+        """
+        previous = self.latest_snapshot() or {'files': {}, 'chunks': {}}
+        tasks = []
+        for prefix, directory in sources.items():
+            if not directory or not os.path.isdir(directory):
+                continue
+            for dirpath, _dirnames, filenames in os.walk(directory):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    relative = posixpath.join(prefix, os.path.relpath(path, directory).replace(os.sep, '/'))
+                    tasks.append((relative, path))
+
+        def process(task):
+            relative, path = task
+            st = os.stat(path)
+            old = previous['files'].get(relative)
+            if old and old['size'] == st.st_size and old['mtime'] == st.st_mtime_ns and \
+                    all(self._has_chunk(h) for h in old['chunks']):
+                return relative, old, {h: previous['chunks'][h] for h in old['chunks']}, False
+            hashes, chunks = self.store_file(path, not path.endswith(PRECOMPRESSED_SUFFIXES), previous['chunks'])
+            return relative, {'size': st.st_size, 'mtime': st.st_mtime_ns, 'chunks': hashes}, chunks, True
+
+        manifest = dict(metadata or {}, files={}, chunks={})
+        stats = {'files': 0, 'files_changed': 0, 'bytes': 0, 'bytes_read': 0}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for relative, entry, chunks, changed in executor.map(process, tasks):
+                manifest['files'][relative] = entry
+                manifest['chunks'].update(chunks)
+                stats['files'] += 1
+                stats['bytes'] += entry['size']
+                if changed:
+                    stats['files_changed'] += 1
+                    stats['bytes_read'] += entry['size']
+        stats['chunks'] = len(manifest['chunks'])
+        stats['stored_bytes'] = sum(info['size'] for info in manifest['chunks'].values())
+        manifest['stats'] = stats
+
+        tmp_path = os.path.join(self.snapshot_dir, name + '.tmp')
+        with open(tmp_path, 'w') as fh:
+            json.dump(manifest, fh)
+        os.replace(tmp_path, os.path.join(self.snapshot_dir, name))
+        return manifest
+
+    def _has_chunk(self, chunk_hash):
+        return os.path.exists(self.chunk_path(chunk_hash))
+
+    def restore_snapshot(self, manifest, target_dir):
+        """Rebuild the files of ``manifest`` under ``target_dir``, checking every chunk hash."""
+        for relative, entry in manifest['files'].items():
+            path = os.path.join(target_dir, *relative.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as fh:
+                for chunk_hash in entry['chunks']:
+                    data = self.read(chunk_hash)
+                    if hashlib.sha256(data).hexdigest() != chunk_hash:
+                        raise ValueError('Corrupted chunk %s in %s' % (chunk_hash, relative))
+                    fh.write(data)
+
+    def remove_snapshots_older_than(self, days):
+        """Delete old manifests (always keeping the latest) and the chunks no manifest uses anymore."""
+        limit = datetime.datetime.now() - datetime.timedelta(days=days)
+        snapshots = self.list_snapshots()
+        for name in snapshots[:-1]:
+            path = os.path.join(self.snapshot_dir, name)
+            if datetime.datetime.fromtimestamp(os.stat(path).st_mtime) < limit:
+                _logger.info("Delete local out-of-date snapshot: %s", path)
+                os.remove(path)
+        self.collect_garbage()
+
+    def collect_garbage(self):
+        used = set()
+        for name in self.list_snapshots():
+            used.update(self.load_snapshot(name)['chunks'])
+        removed = 0
+        for prefix in os.listdir(self.chunk_dir):
+            prefix_dir = os.path.join(self.chunk_dir, prefix)
+            for chunk_hash in os.listdir(prefix_dir):
+                if chunk_hash not in used:
+                    os.remove(os.path.join(prefix_dir, chunk_hash))
+                    removed += 1
+        return removed
+
+
+class SftpUploader(object):
+    """
+    Uploads a chunk store to ``remote_root`` over an open SFTP client.
+
+    Chunks already present remotely are skipped (one ``listdir`` per chunk
+    prefix instead of one ``stat`` per file). Uploads go to a ``.part`` file
+    that is resumed from its current size on the next run, and are renamed
+    into place only after they have been verified. The manifest is uploaded
+    last, so a snapshot is visible only once all its chunks are.
+
+    With ``open_sftp`` (a callable returning a new SFTP client) and
+    ``workers`` > 1, chunks are uploaded in parallel, each worker thread on
+    its own SFTP session.
+    """
+
+    def __init__(self, sftp, remote_root, workers=1, open_sftp=None):
+        self.sftp = sftp
+        self.remote_root = remote_root.rstrip('/') or '/'
+        self.workers = max(1, workers)
+        self.open_sftp = open_sftp
+
+    def makedirs(self, path):
+        current = ''
+        for part in path.split('/'):
+            current = current + part + '/'
+            if part == '':
+                continue
+            try:
+                self.sftp.stat(current)
+            except IOError:
+                self.sftp.mkdir(current)
+
+    def remote_chunks(self):
+        chunk_root = posixpath.join(self.remote_root, 'chunks')
+        existing = set()
+        try:
+            prefixes = self.sftp.listdir(chunk_root)
+        except IOError:
+            return existing
+        for prefix in prefixes:
+            existing.update(name for name in self.sftp.listdir(posixpath.join(chunk_root, prefix))
+                            if not name.endswith('.part'))
+        return existing
+
+    def upload_snapshot(self, store, name, manifest):
+        """Upload the missing chunks of ``manifest`` and then the manifest itself. Returns the bytes sent."""
+        existing = self.remote_chunks()
+        missing = [(chunk_hash, info) for chunk_hash, info in manifest['chunks'].items()
+                   if chunk_hash not in existing]
+        for remote_dir in sorted({posixpath.join(self.remote_root, 'chunks', h[:2]) for h, _info in missing}):
+            self.makedirs(remote_dir)
+        sent = self._upload_chunks(store, missing)
+        snapshot_dir = posixpath.join(self.remote_root, 'snapshots')
+        self.makedirs(snapshot_dir)
+        manifest_path = os.path.join(store.snapshot_dir, name)
+        sent += self.upload_file(manifest_path, posixpath.join(snapshot_dir, name), file_sha256(manifest_path))
+        return sent
+
+    def _upload_chunks(self, store, chunks):
+        """Upload ``chunks`` ([(hash, info)]), in parallel when possible. Returns the bytes sent."""
+        if self.workers == 1 or self.open_sftp is None or len(chunks) < 2:
+            return sum(self._upload_chunk(store, chunk) for chunk in chunks)
+
+        local = threading.local()
+        clients = []
+        lock = threading.Lock()
+
+        def upload(chunk):
+            uploader = getattr(local, 'uploader', None)
+            if uploader is None:
+                sftp = self.open_sftp()
+                with lock:
+                    clients.append(sftp)
+                uploader = local.uploader = SftpUploader(sftp, self.remote_root)
+            return uploader._upload_chunk(store, chunk)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sftp') as executor:
+                return sum(executor.map(upload, chunks))
+        finally:
+            for sftp in clients:
+                sftp.close()
+
+    def _upload_chunk(self, store, chunk):
+        chunk_hash, info = chunk
+        remote_path = posixpath.join(self.remote_root, 'chunks', chunk_hash[:2], chunk_hash)
+        return self.upload_file(store.chunk_path(chunk_hash), remote_path, info['sha256'])
+
+    def upload_file(self, local_path, remote_path, sha256):
+        """Resumable, verified upload of one file. Returns the bytes sent."""
+        part_path = remote_path + '.part'
+        size = os.path.getsize(local_path)
+        try:
+            offset = self.sftp.stat(part_path).st_size
+        except IOError:
+            offset = 0
+        if offset > size:
+            self.sftp.remove(part_path)
+            offset = 0
+
+        sent = 0
+        if offset < size:
+            with open(local_path, 'rb') as local, self.sftp.open(part_path, 'ab' if offset else 'wb') as remote:
+                if hasattr(remote, 'set_pipelined'):
+                    # Do not wait for the acknowledgement of each write; errors are raised on close
+                    remote.set_pipelined(True)
+                local.seek(offset)
+                while True:
+                    data = local.read(UPLOAD_BLOCK_SIZE)
+                    if not data:
+                        break
+                    remote.write(data)
+                    sent += len(data)
+
+        if not self.verify_upload(local_path, part_path, sha256):
+            # Corrupted upload: start again on the next run
+            self.sftp.remove(part_path)
+            raise IOError('Checksum mismatch after uploading %s' % remote_path)
+        self._rename(part_path, remote_path)
+        return sent
+
+    def verify_upload(self, local_path, remote_path, sha256):
+        """
+        Check an uploaded file against ``local_path``: its size must match and,
+        when the server supports the ``check-file`` extension, its SHA-256 too.
+        Otherwise a few blocks spread over the file are read back and compared,
+        instead of downloading the whole file again.
+        """
+        size = os.path.getsize(local_path)
+        if self.sftp.stat(remote_path).st_size != size:
+            return False
+        with self.sftp.open(remote_path, 'rb') as remote:
+            try:
+                return remote.check('sha256').hex() == sha256
+            except (IOError, AttributeError, NotImplementedError):
+                pass
+            with open(local_path, 'rb') as local:
+                for offset in sample_offsets(size):
+                    local.seek(offset)
+                    remote.seek(offset)
+                    expected = local.read(VERIFY_SAMPLE_SIZE)
+                    if remote.read(len(expected)) != expected:
+                        return False
+        return True
+
+    def _rename(self, source, target):
+        if hasattr(self.sftp, 'posix_rename'):
+            try:
+                self.sftp.posix_rename(source, target)
+                return
+            except IOError:
+                pass
+        try:
+            self.sftp.remove(target)
+        except IOError:
+            pass
+        self.sftp.rename(source, target)
+
+    def remove_snapshots_older_than(self, days):
+        """Delete old remote manifests (keeping the latest) and the remote chunks no manifest uses."""
+        snapshot_dir = posixpath.join(self.remote_root, 'snapshots')
+        try:
+            names = sorted(n for n in self.sftp.listdir(snapshot_dir) if n.endswith(MANIFEST_SUFFIX))
+        except IOError:
+            return
+        limit = datetime.datetime.now() - datetime.timedelta(days=days)
+        for name in names[:-1]:
+            path = posixpath.join(snapshot_dir, name)
+            if datetime.datetime.fromtimestamp(self.sftp.stat(path).st_mtime) < limit:
+                _logger.info("Delete too old snapshot from SFTP server: %s", name)
+                self.sftp.remove(path)
+                names.remove(name)
+
+        used = set()
+        for name in names:
+            with self.sftp.open(posixpath.join(snapshot_dir, name), 'rb') as fh:
+                used.update(json.loads(fh.read().decode('utf-8'))['chunks'])
+        chunk_root = posixpath.join(self.remote_root, 'chunks')
+        for chunk_hash in self.remote_chunks() - used:
+            self.sftp.remove(posixpath.join(chunk_root, chunk_hash[:2], chunk_hash))
+
+
+def sample_offsets(size):
+    """Offsets of the blocks compared by ``SftpUploader.verify_upload``: the first, the last and some between."""
+    last = max(0, size - VERIFY_SAMPLE_SIZE)
+    if VERIFY_SAMPLES < 2:
+        return [0]
+    return sorted({last * i // (VERIFY_SAMPLES - 1) for i in range(VERIFY_SAMPLES)})
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for data in iter(lambda: fh.read(UPLOAD_BLOCK_SIZE), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
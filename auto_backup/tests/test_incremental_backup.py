@@ -0,0 +1,162 @@
+import os
+import shutil
+import tempfile
+
+from odoo.tests.common import TransactionCase
+
+from ..models.incremental_backup import VERIFY_SAMPLE_SIZE, ChunkStore, SftpUploader, file_sha256
+
+
+class LocalSftp(object):
+    """Minimal stand-in for a paramiko SFTP client, backed by a local directory."""
+
+    def __init__(self, root):
+        self.root = root
+        self.closed = False
+
+    def _path(self, path):
+        return os.path.join(self.root, path.lstrip('/'))
+
+    def stat(self, path):
+        return os.stat(self._path(path))
+
+    def mkdir(self, path):
+        os.mkdir(self._path(path))
+
+    def listdir(self, path):
+        return os.listdir(self._path(path))
+
+    def open(self, path, mode='r'):
+        return open(self._path(path), mode)
+
+    def remove(self, path):
+        os.remove(self._path(path))
+
+    def rename(self, source, target):
+        os.rename(self._path(source), self._path(target))
+
+    def posix_rename(self, source, target):
+        os.replace(self._path(source), self._path(target))
+
+    def close(self):
+        self.closed = True
+
+
+class TestIncrementalBackup(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.source = os.path.join(self.tmp_dir, 'source')
+        os.makedirs(os.path.join(self.source, 'ab'))
+        self._write('ab/attachment', os.urandom(1024))
+        self._write('table.dat', b'row\n' * 5000)
+        self.store = ChunkStore(os.path.join(self.tmp_dir, 'store'))
+
+    def _write(self, relative, data):
+        with open(os.path.join(self.source, relative), 'wb') as fh:
+            fh.write(data)
+
+    def test_unchanged_files_are_not_read_again(self):
+        first = self.store.create_snapshot('2024_01_01.json', {'filestore': self.source})
+        self.assertEqual(first['stats']['files_changed'], 2)
+
+        second = self.store.create_snapshot('2024_01_02.json', {'filestore': self.source})
+        self.assertEqual(second['stats']['files_changed'], 0)
+        self.assertEqual(second['stats']['bytes_read'], 0)
+        self.assertEqual(second['chunks'], first['chunks'])
+
+    def test_restore_snapshot(self):
+        manifest = self.store.create_snapshot('2024_01_01.json', {'filestore': self.source})
+        target = os.path.join(self.tmp_dir, 'restored')
+        self.store.restore_snapshot(manifest, target)
+        for relative in ('ab/attachment', 'table.dat'):
+            self.assertEqual(file_sha256(os.path.join(self.source, relative)),
+                             file_sha256(os.path.join(target, 'filestore', relative)))
+
+    def test_upload_only_missing_chunks(self):
+        remote_root = os.path.join(self.tmp_dir, 'remote')
+        os.makedirs(remote_root)
+        uploader = SftpUploader(LocalSftp(remote_root), '/backups')
+        manifest = self.store.create_snapshot('2024_01_01.json', {'filestore': self.source})
+        self.assertGreater(uploader.upload_snapshot(self.store, '2024_01_01.json', manifest), 0)
+        self.assertEqual(uploader.remote_chunks(), set(manifest['chunks']))
+
+        self._write('new_file', b'new content')
+        manifest = self.store.create_snapshot('2024_01_02.json', {'filestore': self.source})
+        sent = uploader.upload_snapshot(self.store, '2024_01_02.json', manifest)
+        manifest_size = os.path.getsize(os.path.join(self.store.snapshot_dir, '2024_01_02.json'))
+        new_chunk = manifest['files']['filestore/new_file']['chunks'][0]
+        self.assertEqual(sent, manifest_size + os.path.getsize(self.store.chunk_path(new_chunk)))
+
+    def test_resume_partial_upload(self):
+        remote_root = os.path.join(self.tmp_dir, 'remote')
+        os.makedirs(remote_root)
+        uploader = SftpUploader(LocalSftp(remote_root), '/')
+        local_path = os.path.join(self.source, 'table.dat')
+        with open(local_path, 'rb') as fh:
+            data = fh.read()
+        with open(os.path.join(remote_root, 'table.dat.part'), 'wb') as fh:
+            fh.write(data[:1000])
+
+        sent = uploader.upload_file(local_path, '/table.dat', file_sha256(local_path))
+        self.assertEqual(sent, len(data) - 1000)
+        self.assertEqual(file_sha256(os.path.join(remote_root, 'table.dat')), file_sha256(local_path))
+        self.assertFalse(os.path.exists(os.path.join(remote_root, 'table.dat.part')))
+
+    def test_checksum_mismatch_discards_upload(self):
+        remote_root = os.path.join(self.tmp_dir, 'remote')
+        os.makedirs(remote_root)
+        uploader = SftpUploader(LocalSftp(remote_root), '/')
+        local_path = os.path.join(self.source, 'table.dat')
+        with open(os.path.join(remote_root, 'table.dat.part'), 'wb') as fh:
+            fh.write(b'garbage')
+
+        with self.assertRaises(IOError):
+            uploader.upload_file(local_path, '/table.dat', file_sha256(local_path))
+        self.assertFalse(os.path.exists(os.path.join(remote_root, 'table.dat.part')))
+        self.assertFalse(os.path.exists(os.path.join(remote_root, 'table.dat')))
+
+    def test_parallel_upload(self):
+        remote_root = os.path.join(self.tmp_dir, 'remote')
+        os.makedirs(remote_root)
+        for i in range(6):
+            self._write('file_%s' % i, os.urandom(2048))
+        sessions = []
+
+        def open_sftp():
+            sessions.append(LocalSftp(remote_root))
+            return sessions[-1]
+
+        uploader = SftpUploader(LocalSftp(remote_root), '/backups', workers=3, open_sftp=open_sftp)
+        manifest = self.store.create_snapshot('2024_01_01.json', {'filestore': self.source})
+        uploader.upload_snapshot(self.store, '2024_01_01.json', manifest)
+        self.assertEqual(uploader.remote_chunks(), set(manifest['chunks']))
+        self.assertTrue(sessions)
+        self.assertLessEqual(len(sessions), 3)
+        self.assertTrue(all(sftp.closed for sftp in sessions))
+        for chunk_hash in manifest['chunks']:
+            remote_path = os.path.join(remote_root, 'backups', 'chunks', chunk_hash[:2], chunk_hash)
+            self.assertEqual(file_sha256(remote_path), file_sha256(self.store.chunk_path(chunk_hash)))
+
+    def test_verify_upload_by_samples(self):
+        remote_root = os.path.join(self.tmp_dir, 'remote')
+        os.makedirs(remote_root)
+        uploader = SftpUploader(LocalSftp(remote_root), '/')
+        data = os.urandom(VERIFY_SAMPLE_SIZE * 5 + 123)
+        self._write('table.dat', data)
+        local_path = os.path.join(self.source, 'table.dat')
+        remote_path = os.path.join(remote_root, 'table.dat')
+        with open(remote_path, 'wb') as fh:
+            fh.write(data)
+        self.assertTrue(uploader.verify_upload(local_path, '/table.dat', file_sha256(local_path)))
+
+        # Same size, but the last byte differs
+        with open(remote_path, 'wb') as fh:
+            fh.write(data[:-1] + bytes([data[-1] ^ 0xff]))
+        self.assertFalse(uploader.verify_upload(local_path, '/table.dat', file_sha256(local_path)))
+
+        with open(remote_path, 'wb') as fh:
+            fh.write(data[:-1])
+        self.assertFalse(uploader.verify_upload(local_path, '/table.dat', file_sha256(local_path)))
@@ -4,10 +4,13 @@
 
 import json
 import logging
+import os
 
 from werkzeug.urls import url_decode
+from werkzeug.wsgi import wrap_file
 
 from odoo.http import (
+    Response,
     content_disposition,
     request,
     route,
@@ -34,9 +37,11 @@ class ReportController(ReportController):
             if data.get("context"):
                 data["context"] = json.loads(data["context"])
                 context.update(data["context"])
-            xlsx = report.with_context(**context)._render_xlsx(
-                reportname, docids, data=data
-            )[0]
+            report = report.with_context(**context)
+            if report._is_xlsx_streaming(data):
+                file_path = report._render_xlsx_file(reportname, docids, data=data)[0]
+                return self._make_xlsx_file_response(file_path)
+            xlsx = report._render_xlsx(reportname, docids, data=data)[0]
             xlsxhttpheaders = [
                 (
                     "Content-Type",
@@ -48,6 +53,32 @@ class ReportController(ReportController):
             return request.make_response(xlsx, headers=xlsxhttpheaders)
         return super().report_routes(reportname, docids, converter, **data)
 
+    def _make_xlsx_file_response(self, file_path):
+        """Stream a report file from disk by chunks, and remove it once the
+        response is closed."""
+        xlsxhttpheaders = [
+            (
+                "Content-Type",
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            ),
+            ("Content-Length", os.path.getsize(file_path)),
+        ]
+        file_data = open(file_path, "rb")  # closed with the response
+        response = Response(
+            wrap_file(request.httprequest.environ, file_data),
+            headers=xlsxhttpheaders,
+            direct_passthrough=True,
+        )
+
+        def remove_file():
+            try:
+                os.unlink(file_path)
+            except OSError:
+                _logger.warning("Could not remove XLSX report file %s", file_path)
+
+        response.call_on_close(remove_file)
+        return response
+
     @route()
     def report_download(self, data, context=None, token=None):
         requestcontent = json.loads(data)
@@ -30,6 +30,30 @@ class ReportAction(models.Model):
             report_sudo.save_xlsx_report_attachment(docids, ret[0])
         return ret
 
+    @api.model
+    def _render_xlsx_file(self, report_ref, docids, data):
+        """Render the report to a temporary file, for reports in streaming
+        mode. The caller is responsible for removing the file."""
+        report_sudo = self._get_report(report_ref)
+        report_model_name = "report.%s" % report_sudo.report_name
+        report_model = self.env[report_model_name]
+        file_path, report_type = (
+            report_model.with_context(active_model=report_sudo.model)
+            .sudo(False)
+            .create_xlsx_report_file(docids, data)
+        )
+        if report_sudo.attachment:
+            with open(file_path, "rb") as file_data:
+                report_sudo.save_xlsx_report_attachment(docids, file_data.read())
+        return file_path, report_type
+
+    def _is_xlsx_streaming(self, data):
+        self.ensure_one()
+        report_model = self.env["report.%s" % self.report_name]
+        return report_model.with_context(
+            active_model=self.model
+        ).is_xlsx_streaming(data)
+
     @api.model
     def _get_report_from_name(self, report_name):
         res = super()._get_report_from_name(report_name)
@@ -2,7 +2,11 @@
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
 import logging
+import os
 import re
+import tempfile
+import uuid
+from contextlib import closing
 from io import BytesIO
 
 from odoo import models
@@ -99,6 +103,13 @@ class ReportXlsxAbstract(models.AbstractModel):
         return f"{f'{s_before}'}#,##0.{'0' * currency.decimal_places}{f'{s_after}'}"
 
     def create_xlsx_report(self, docids, data):
+        if self.is_xlsx_streaming(data):
+            file_path, report_type = self.create_xlsx_report_file(docids, data)
+            try:
+                with open(file_path, "rb") as file_data:
+                    return file_data.read(), report_type
+            finally:
+                os.unlink(file_path)
         objs = self._get_objs_for_report(docids, data)
         file_data = BytesIO()
         workbook = xlsxwriter.Workbook(file_data, self.get_workbook_options())
@@ -107,6 +118,40 @@ class ReportXlsxAbstract(models.AbstractModel):
         file_data.seek(0)
         return file_data.read(), "xlsx"
 
+    def create_xlsx_report_file(self, docids, data):
+        """
+        Generate the report in a temporary file, with xlsxwriter's
+        constant memory mode: each row is flushed to disk as soon as a new
+        one is started, so memory usage does not depend on the size of the
+        report. The caller is responsible for removing the file.
+        :return: A tuple (path of the file, report type)
+        """
+        objs = self._get_objs_for_report(docids, data)
+        fd, file_path = tempfile.mkstemp(prefix="report_xlsx_", suffix=".xlsx")
+        os.close(fd)
+        try:
+            workbook = xlsxwriter.Workbook(
+                file_path, self.get_streaming_workbook_options()
+            )
+            self.generate_xlsx_report(workbook, data, objs)
+            workbook.close()
+        except Exception:
+            os.unlink(file_path)
+            raise
+        return file_path, "xlsx"
+
+    def is_xlsx_streaming(self, data):
+        """
+        Override to return True for reports generating large files. Such
+        reports are written row by row to a temporary file and streamed
+        from disk by the controller.
+        As rows are flushed as soon as a new one is started, they must be
+        written in order: see
+        https://xlsxwriter.readthedocs.io/working_with_memory.html
+        :return: A boolean
+        """
+        return False
+
     def get_workbook_options(self):
         """
         See https://xlsxwriter.readthedocs.io/workbook.html constructor options
@@ -114,5 +159,38 @@ class ReportXlsxAbstract(models.AbstractModel):
         """
         return {}
 
+    def get_streaming_workbook_options(self):
+        """
+        Workbook options used in streaming mode
+        :return: A dictionary of options
+        """
+        options = dict(self.get_workbook_options())
+        options.update({"constant_memory": True, "tmpdir": tempfile.gettempdir()})
+        return options
+
+    def write_rows(self, sheet, rows, first_row=0, first_col=0, cell_format=None):
+        """
+        Write the rows of any iterable (list, generator, cursor...) one at a
+        time, without keeping them in memory.
+        :return: The index of the row following the last written one
+        """
+        row = first_row
+        for values in rows:
+            sheet.write_row(row, first_col, values, cell_format)
+            row += 1
+        return row
+
+    def iter_query_rows(self, query, params=None, itersize=2000):
+        """
+        Yield the rows of a query fetched by batches of `itersize` from a
+        server-side cursor, to be used with `write_rows`.
+        """
+        self.env.flush_all()
+        name = "report_xlsx_%s" % uuid.uuid4().hex
+        with closing(self.env.cr._cnx.cursor(name)) as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            yield from cursor
+
     def generate_xlsx_report(self, workbook, data, objs):
         raise NotImplementedError()
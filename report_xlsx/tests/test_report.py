@@ -2,6 +2,8 @@
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
 import logging
+import os
+from unittest import mock
 
 from odoo.tests import common
 
@@ -74,3 +76,44 @@ class TestReport(common.TransactionCase):
         self.assertEqual(
             self.xlsx_report._report_xlsx_currency_format(eur), "#,##0.00 €"
         )
+
+    def _patch_streaming(self):
+        partner_xlsx = self.env["report.report_xlsx.partner_xlsx"]
+        return mock.patch.object(
+            type(partner_xlsx), "is_xlsx_streaming", lambda self, data: True
+        )
+
+    def test_report_streaming(self):
+        with self._patch_streaming():
+            rep = self.report_object._render(self.report_name, self.docs.ids, {})
+        wb = open_workbook(file_contents=rep[0])
+        sheet = wb.sheet_by_index(0)
+        self.assertEqual(sheet.cell(0, 0).value, self.docs.name)
+
+    def test_report_streaming_file(self):
+        self.report.attachment = 'object.name + ".xlsx"'
+        with self._patch_streaming():
+            file_path, report_type = self.report_object._render_xlsx_file(
+                self.report_name, self.docs.ids, {}
+            )
+        self.addCleanup(os.unlink, file_path)
+        self.assertEqual(report_type, "xlsx")
+        wb = open_workbook(file_path)
+        self.assertEqual(wb.sheet_by_index(0).cell(0, 0).value, self.docs.name)
+        attachment = self.env["ir.attachment"].search(
+            [("res_id", "=", self.docs.id), ("res_model", "=", self.docs._name)]
+        )
+        self.assertEqual(len(attachment), 1)
+
+    def test_write_rows(self):
+        partner_xlsx = self.env["report.report_xlsx.partner_xlsx"]
+        rows = partner_xlsx.iter_query_rows(
+            "SELECT id, name FROM res_partner WHERE id IN %s ORDER BY id",
+            (tuple(self.docs.ids),),
+        )
+        sheet = mock.Mock()
+        next_row = partner_xlsx.write_rows(sheet, rows, first_row=2)
+        self.assertEqual(next_row, 2 + len(self.docs))
+        sheet.write_row.assert_called_with(
+            2, 0, (self.docs.id, self.docs.name), None
+        )
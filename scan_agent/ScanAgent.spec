@@ -4,7 +4,7 @@ agent_analysis = Analysis(
     pathex=[],
     binaries=[],
     datas=[('config_agente.json', '.'), ('scan', 'scan'), ('agent.ico', '.')],
-    hiddenimports=['win32api', 'win32com', 'win32con', 'win32gui', 'win32process', 'keyring.backends.Windows', 'requests', 'psutil'],
+    hiddenimports=['win32api', 'win32com', 'win32con', 'win32gui', 'win32process', 'keyring.backends.Windows', 'pythoncom', 'requests', 'psutil'],
     hookspath=['.'],
     hooksconfig={},
     runtime_hooks=['runtime_hook.py'],
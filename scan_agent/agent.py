@@ -11,6 +11,8 @@ KEYRING_SERVICE_NAME = "sgich-scan-agent"
 # --- Importación de los módulos del proyecto ---
 try:
     from scan.core.exportador import ExportadorOdoo
+    from scan.core.inventario_delta import EstadoInventario
+    from configurador import CONFIG_FILE
     from scan.core.recolector import GestorTI
     from scan.core.agent_listener import AgentListener
     from scan.core.offline_data_handler import recolectar_todo_y_crear_json_al_fallar_la_conexion_con_odoo
@@ -24,6 +26,7 @@ class AgenteScanner:
         self.intervalo_principal_seg = config.get("intervalo_principal_min", 30) * 60
         self.intervalo_reintento_seg = config.get("intervalo_reintento_min", 5) * 60
         self.listener_port = config.get("listener_port", 9191)
+        self.timeout_recolector_seg = config.get("timeout_recolector_seg", 120)
         
         self.inventory_number = config.get("inventory_number")
         if not self.inventory_number:
@@ -43,13 +46,20 @@ class AgenteScanner:
             raise ValueError(f"No se encontró una contraseña guardada para el usuario '{username}'. "
                             "Por favor, ejecute el agente con el argumento '--config' para configurarla.")
 
+        # Último inventario aceptado por Odoo, para enviar solo los cambios
+        estado = EstadoInventario(
+            CONFIG_FILE.parent / 'inventario_aceptado.json',
+            horas_snapshot=config.get("snapshot_completo_horas", 24)
+        )
+        
         logging.debug("Creando instancia de ExportadorOdoo.")
         self.exportador = ExportadorOdoo(
             url_base=self.odoo_config.get('url'),
             db=self.odoo_config.get('db'),
             username=username,
             password=password,
-            inventory_number=self.inventory_number
+            inventory_number=self.inventory_number,
+            estado=estado
         )
         
         # --- LÓGICA DE REINICIO ---
@@ -65,22 +75,29 @@ class AgenteScanner:
         Devuelve True si tiene éxito, False si falla la conexión o la exportación.
         """
         logging.info("Iniciando nuevo ciclo de escaneo...")
-        if not self.exportador.test_connection_with_odoo():
-            logging.error("La prueba de conexión inicial falló.")
-            return False
-        
-        self.exportador.check_installed_modules()
+        # La conexión y los módulos instalados solo se consultan aparte en el
+        # primer ciclo o tras un fallo; después llegan con la respuesta de la ingesta
+        if not self.exportador.modulos_verificados:
+            if not self.exportador.test_connection_with_odoo():
+                logging.error("La prueba de conexión inicial falló.")
+                return False
+            
+            self.exportador.check_installed_modules()
         
         try:
             logging.debug("Creando instancia de GestorTI.")
             gestor = GestorTI(
                 software_installed=self.exportador.software_module_installed,
-                network_installed=self.exportador.network_module_installed
+                network_installed=self.exportador.network_module_installed,
+                timeout_recolector=self.timeout_recolector_seg
             )
             logging.debug("Recolectando todos los datos...")
             datos_completos = gestor.recolectar_todo()
             logging.debug("Exportando activo completo a Odoo...")
-            self.exportador.exportar_activo_completo(datos_completos)
+            if not self.exportador.exportar_activo_completo(datos_completos):
+                self.exportador.modulos_verificados = False
+                logging.error("La exportación a Odoo falló.")
+                return False
             logging.info("Ciclo de escaneo y exportación completado exitosamente.")
             return True
         except Exception as e:
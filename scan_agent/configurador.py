@@ -159,6 +159,8 @@ def _run_text_wizard(initial_config=None):
 
     final_config = {
         "intervalo_principal_min": config_data.get("intervalo_principal_min", 60),
+        "snapshot_completo_horas": config_data.get("snapshot_completo_horas", 24),
+        "timeout_recolector_seg": config_data.get("timeout_recolector_seg", 120),
         "intervalo_reintento_min": config_data.get("intervalo_reintento_min", 5),
         "listener_port": config_data.get("listener_port", 9191),
         "inventory_number": inventory_number.strip(),
@@ -281,6 +283,8 @@ def setup_from_cli(args):
     
     final_config = {
         "intervalo_principal_min": config.get("intervalo_principal_min", 60),
+        "snapshot_completo_horas": config.get("snapshot_completo_horas", 24),
+        "timeout_recolector_seg": config.get("timeout_recolector_seg", 120),
         "intervalo_reintento_min": config.get("intervalo_reintento_min", 5),
         "listener_port": config.get("listener_port", 9191),
         "inventory_number": inventory_number,
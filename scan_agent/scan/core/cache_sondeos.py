@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Caché en memoria de los sondeos lentos que casi nunca cambian (serial de la
+placa madre, paquetes instalados...). El agente es un proceso de larga
+duración: los resultados se reutilizan entre ciclos mientras su firma (por
+ejemplo, la fecha de modificación de la base de datos de dpkg/rpm) no cambie.
+"""
+import copy
+import logging
+import os
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+_logger = logging.getLogger(__name__)
+
+
+def firma_rutas(*rutas: str) -> tuple:
+    """Firma de un conjunto de archivos o directorios: su fecha de modificación (None si no existen)."""
+    firma = []
+    for ruta in rutas:
+        try:
+            firma.append((ruta, os.stat(ruta).st_mtime_ns))
+        except OSError:
+            firma.append((ruta, None))
+    return tuple(firma)
+
+
+class CacheSondeos:
+    """Resultados de sondeos indexados por clave y validados por firma. Seguro entre hilos."""
+
+    def __init__(self):
+        self._entradas = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str, calcular: Callable[[], Any], firma: Hashable = None,
+                es_valido: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Devuelve el resultado guardado para `clave` si su firma coincide; si no,
+        lo calcula con `calcular()` y lo guarda (solo si `es_valido(resultado)`,
+        para no fijar en la caché un sondeo fallido).
+        Se devuelve una copia: quien la recibe puede modificarla.
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+        if entrada is not None and entrada[0] == firma:
+            _logger.debug(f"Caché de sondeos: usando el resultado guardado de '{clave}'.")
+            return copy.deepcopy(entrada[1])
+
+        valor = calcular()
+        if es_valido is None or es_valido(valor):
+            with self._lock:
+                self._entradas[clave] = (firma, copy.deepcopy(valor))
+        return valor
+
+    def invalidar(self, clave: Optional[str] = None):
+        """Olvida el resultado de `clave` o, si no se indica, todos."""
+        with self._lock:
+            if clave is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(clave, None)
+
+
+# Instancia compartida por todos los recolectores del agente
+cache_sondeos = CacheSondeos()
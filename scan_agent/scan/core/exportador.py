@@ -6,6 +6,7 @@ import logging
 import random
 from typing import Dict, Any, List, Optional
 from .mapper import ComponentMapper
+from . import inventario_delta
 
 _logger = logging.getLogger(__name__)
 
@@ -24,17 +25,26 @@ if not CREATE_SOFTWARE_RECORDS_FROM_AGENT:
     _logger.warning("Odoo se encargará de procesar la lista de software desde los datos en bruto (raw_data).")
     _logger.warning("Para activar esta función, cambie la variable 'CREATE_SOFTWARE_RECORDS_FROM_AGENT' a True en el archivo 'scan_agent/scan/core/exportador.py' (línea ~20).")
 
+# Ruta de sgichs_core2 que recibe el inventario completo en una sola llamada
+INGEST_ROUTE = '/sgichs/inventory/ingest'
+# Marca devuelta por _llamar_ruta cuando el servidor no tiene la ruta
+RUTA_NO_DISPONIBLE = object()
+
 class ExportadorOdoo:
-    def __init__(self, url_base: str, db: str, username: str, password: str, inventory_number: str):
+    def __init__(self, url_base: str, db: str, username: str, password: str, inventory_number: str,
+                 estado: Optional[inventario_delta.EstadoInventario] = None):
         self.url_base = url_base.rstrip('/')
         self.db = db
         self.username = username
         self.password = password
         self.inventory_number = inventory_number
+        # Último inventario aceptado por Odoo; sin él se envía siempre el inventario completo
+        self.estado = estado
         self.session = requests.Session()
         self.uid = None
         self.software_module_installed = False
         self.network_module_installed = False
+        self.modulos_verificados = False
         self.mapper = ComponentMapper() # Instanciamos el mapeador
         self.modelos = {
             'backlog': 'it.asset.backlog',
@@ -89,6 +99,7 @@ class ExportadorOdoo:
             module_names = {mod['name'] for mod in installed_modules}
             self.software_module_installed = 'sgichs_software' in module_names
             self.network_module_installed = 'sgichs_red' in module_names
+            self.modulos_verificados = True
         logging.info(f"Módulo Software: {'Instalado' if self.software_module_installed else 'No Instalado'}")
         logging.info(f"Módulo Red: {'Instalado' if self.network_module_installed else 'No Instalado'}")
 
@@ -111,34 +122,36 @@ class ExportadorOdoo:
         else:
             return self._llamar_api(modelo, 'create', [create_vals])
 
-    def exportar_activo_completo(self, datos: Dict[str, Any]):
-        
-        if not self.uid and not self._autenticar():
-            logging.error("Exportación abortada. Se requiere autenticación.")
-            return
-        
-        # Obtenemos el mapa de subtipos antes de empezar a procesar
-        self._fetch_and_load_subtypes()
-
-
-        # Codigo comentado: Pone el identificador unico tomando la placa mandre y numero de serie como base
-
-        # id_unico_hw = datos.get('placa_madre', {}).get('Número de Serie') or \
-        #               next((iface.get('mac') for iface in datos.get('red', []) if iface.get('mac')), None)
-        # if not id_unico_hw:
-        #     logging.error("No se pudo determinar un ID único para el hardware. Abortando.")
-        #     return
-        
-        
-        # El identificador unico ahora sera el numero de inventario
-        id_unico_hw = self.inventory_number
-        if not id_unico_hw:
-            logging.error("No se proporcionó un número de inventario en la configuración. Abortando.")
-            return
-        
+    def _llamar_ruta(self, ruta: str, params: Dict[str, Any]) -> Any:
+        """
+        Llama a una ruta JSON-RPC de Odoo. Si la sesión expiró se autentica de
+        nuevo y reintenta una vez. Devuelve RUTA_NO_DISPONIBLE si el servidor no
+        tiene la ruta (versión anterior de sgichs_core2) y None ante otros errores.
+        """
+        if not self.uid and not self._autenticar(): return None
+        url = f"{self.url_base}{ruta}"
+        payload = {"jsonrpc": "2.0", "method": "call", "params": params, "id": random.randint(1, 1000000)}
+        for intento in range(2):
+            try:
+                response = self.session.post(url, json=payload, timeout=120)
+                if response.status_code == 404:
+                    return RUTA_NO_DISPONIBLE
+                response_data = response.json()
+            except Exception as e:
+                logging.error(f"Error en llamada a {ruta}: {e}")
+                return None
+            error = response_data.get('error')
+            if not error:
+                return response_data.get('result')
+            if intento == 0 and error.get('code') == 100 and self._autenticar():
+                logging.info("Sesión de Odoo expirada. Reintentando tras autenticar.")
+                continue
+            logging.error(f"Error API Odoo en {ruta}: {error.get('data', {}).get('message') or error.get('message')}")
+            return None
 
-        # --- 1. PROCESAR Y CREAR COMPONENTES CON MAPEADOR ---
-        component_ids = []
+    def _preparar_componentes(self, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Valores de los componentes recolectados, con el subtipo por nombre."""
+        componentes = []
         todos_los_componentes = (datos.get('almacenamiento', []) + datos.get('ram', []) + 
                                 [datos.get('cpu', {})] + [datos.get('placa_madre', {})] + 
                                 datos.get('gpu', []) + datos.get('perifericos', []))
@@ -151,16 +164,16 @@ class ExportadorOdoo:
             if not serial_number:
                 continue
             
-            # Usamos el mapeador para obtener el subtype_id
-            subtype_id = self.mapper.get_subtype_id(comp_data)
-            if not subtype_id:
+            # Usamos el mapeador para obtener el nombre del subtipo; Odoo lo resuelve a su ID
+            subtype = self.mapper.get_subtype_name(comp_data)
+            if not subtype:
                 logging.warning(f"Omitiendo componente sin subtipo mapeado: {comp_data.get('Modelo') or comp_data.get('nombre')}")
                 continue
 
             comp_vals = {
                 'model': comp_data.get('Modelo') or comp_data.get('nombre', 'Desconocido'),
                 'serial_number': serial_number,
-                'subtype_id': subtype_id
+                'subtype': subtype
             }
             
             # Verificamos si el componente es un periférico basándonos en los datos del recolector.
@@ -184,37 +197,23 @@ class ExportadorOdoo:
                 }
                 recollected_type = comp_data.get('Tipo RAM', '').upper()
                 comp_vals['ram_type'] = ram_type_map.get(recollected_type, 'otro')
-                
-            comp_id = self._buscar_o_crear(
-                self.modelos['componente'],
-                [('serial_number', '=', comp_vals['serial_number'])],
-                comp_vals
-            )
-            if comp_id:
-                component_ids.append(comp_id)
 
-        # --- 2. PROCESAR IPs ---
-        ip_ids = []
-        if self.network_module_installed and 'red' in datos:
-            for iface in datos['red']:
-                for ip_addr in iface.get('ipv4', []):
-                    ip_vals = {'address': ip_addr, 'description': iface.get('nombre')}
-                    ip_id = self._buscar_o_crear(self.modelos['ip'], [('address', '=', ip_addr)], ip_vals)
-                    if ip_id:
-                        ip_ids.append(ip_id)
-        
-        # --- 3. PROCESAR SOFTWARE ---
-        software_ids = []
-        # Solo se ejecuta si la variable de control es True
-        if CREATE_SOFTWARE_RECORDS_FROM_AGENT and self.software_module_installed and 'programas' in datos:
-            _logger.info("Creando registros de software directamente desde el agente.")
-            for prog in datos['programas']:
-                sw_vals = {'name': prog.get('nombre', 'Desconocido'), 'version': prog.get('version', 'N/A')}
-                sw_id = self._buscar_o_crear(self.modelos['software'], [('name', '=', sw_vals['name']), ('version', '=', sw_vals['version'])], sw_vals)
-                if sw_id:
-                    software_ids.append(sw_id)
+            componentes.append(comp_vals)
+        return componentes
 
-        # --- 4. VINCULACIÓN FINAL EN BACKLOG ---
+    def _preparar_ips(self, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """IPs de las interfaces de red recolectadas."""
+        ips = []
+        for iface in datos.get('red', []):
+            if not isinstance(iface, dict): continue
+            # El recolector de red entrega una IP por interfaz en 'ip'
+            direcciones = iface.get('ipv4') or ([iface['ip']] if iface.get('ip') else [])
+            for ip_addr in direcciones:
+                ips.append({'address': ip_addr, 'description': iface.get('nombre') or iface.get('interfaz')})
+        return ips
+
+    def _preparar_backlog(self, datos: Dict[str, Any]) -> Dict[str, Any]:
+        """Valores del registro del backlog para este equipo."""
         os_info = datos.get('sistema_operativo', {})
         
         # --- Construcción del nombre descriptivo ---
@@ -230,12 +229,187 @@ class ExportadorOdoo:
             # Fallback al nombre anterior si algo falla
             description_text = f"{socket.gethostname()} - {os_info.get('sistema', 'OS Desc.')}"
 
-        
-        backlog_vals = {
-            'name': id_unico_hw,
+        return {
+            'name': self.inventory_number,
             'description': description_text,
             'type': 'hardware',
-            'raw_data': json.dumps(datos, indent=2, default=str),
+            'raw_data': datos,
+        }
+
+    def exportar_activo_completo(self, datos: Dict[str, Any]) -> bool:
+        """
+        Envía el inventario del equipo a Odoo en una sola llamada a la ruta de
+        ingesta por lotes: solo los cambios respecto al último inventario aceptado
+        o, periódicamente y cuando Odoo lo pide, el inventario completo. Si el
+        servidor no tiene la ruta, recurre a la exportación registro a registro.
+        Devuelve True si la exportación terminó.
+        """
+        if not self.uid and not self._autenticar():
+            logging.error("Exportación abortada. Se requiere autenticación.")
+            return False
+
+
+        # Codigo comentado: Pone el identificador unico tomando la placa mandre y numero de serie como base
+
+        # id_unico_hw = datos.get('placa_madre', {}).get('Número de Serie') or \
+        #               next((iface.get('mac') for iface in datos.get('red', []) if iface.get('mac')), None)
+        # if not id_unico_hw:
+        #     logging.error("No se pudo determinar un ID único para el hardware. Abortando.")
+        #     return
+        
+        
+        # El identificador unico ahora sera el numero de inventario
+        id_unico_hw = self.inventory_number
+        if not id_unico_hw:
+            logging.error("No se proporcionó un número de inventario en la configuración. Abortando.")
+            return False
+
+        datos = inventario_delta.normalizar(datos)
+        fingerprint = inventario_delta.huella(datos)
+
+        resultado = None
+        completo = self.estado is None or self.estado.requiere_completo()
+        if not completo:
+            resultado = self._enviar_inventario(self._preparar_delta(datos, fingerprint))
+            if resultado is RUTA_NO_DISPONIBLE:
+                completo = True
+            elif resultado and resultado.get('status') == 'resync':
+                # Odoo no tiene el inventario del que parte el delta (p. ej. el backlog se aprobó)
+                logging.info("Odoo pidió el inventario completo. Reenviando.")
+                completo = True
+
+        if completo:
+            payload = self._preparar_completo(datos, fingerprint)
+            resultado = self._enviar_inventario(payload)
+            if resultado is RUTA_NO_DISPONIBLE:
+                logging.warning("El servidor no tiene la ruta de ingesta por lotes. Exportando registro a registro.")
+                return self._exportar_por_registro(payload)
+
+        if not resultado or resultado is RUTA_NO_DISPONIBLE:
+            logging.error(f"La exportación de '{id_unico_hw}' falló.")
+            return False
+
+        if self.estado is not None:
+            self.estado.guardar(datos, fingerprint, completo)
+
+        # Odoo devuelve los módulos instalados: se usan en el siguiente ciclo sin consultarlos aparte
+        modulos = resultado.get('modules') or {}
+        self.software_module_installed = modulos.get('sgichs_software', self.software_module_installed)
+        self.network_module_installed = modulos.get('sgichs_red', self.network_module_installed)
+        self.modulos_verificados = True
+        logging.info(f"Proceso de exportación {'completa' if completo else 'incremental'} para '{id_unico_hw}' "
+                     f"completado (backlog ID {resultado.get('backlog_id')}).")
+        return True
+
+    def _enviar_inventario(self, payload: Dict[str, Any]) -> Any:
+        """Envía el payload comprimido a la ruta de ingesta."""
+        return self._llamar_ruta(INGEST_ROUTE, {'payload_gz': inventario_delta.comprimir(payload)})
+
+    def _preparar_completo(self, datos: Dict[str, Any], fingerprint: str) -> Dict[str, Any]:
+        """Payload con el inventario completo del equipo."""
+        payload = self._preparar_backlog(datos)
+        payload.update({
+            'mode': 'full',
+            'fingerprint': fingerprint,
+            'componentes': self._preparar_componentes(datos),
+        })
+        if self.network_module_installed and 'red' in datos:
+            payload['ips'] = self._preparar_ips(datos)
+        # Solo se envía si la variable de control es True
+        if CREATE_SOFTWARE_RECORDS_FROM_AGENT and self.software_module_installed and 'programas' in datos:
+            _logger.info("Enviando la lista de software para crear sus registros desde el agente.")
+            payload['programas'] = [
+                {'name': prog.get('nombre', 'Desconocido'), 'version': prog.get('version', 'N/A')}
+                for prog in datos['programas']
+            ]
+        return payload
+
+    def _preparar_delta(self, datos: Dict[str, Any], fingerprint: str) -> Dict[str, Any]:
+        """
+        Payload con los cambios respecto al último inventario aceptado: el delta
+        de los datos en bruto más los componentes e IPs añadidos y eliminados.
+        """
+        delta, agregados, quitados = inventario_delta.calcular_delta(self.estado.datos, datos)
+        payload = self._preparar_backlog(datos)
+        del payload['raw_data']
+        payload.update({
+            'mode': 'delta',
+            'base_fingerprint': self.estado.fingerprint,
+            'fingerprint': fingerprint,
+            'raw_delta': delta,
+        })
+        if not delta:
+            return payload
+
+        # Un elemento modificado llega como eliminado más añadido: se conserva el añadido
+        componentes = self._preparar_componentes(self._datos_de(agregados))
+        seriales = {comp['serial_number'] for comp in componentes}
+        payload['componentes'] = componentes
+        payload['componentes_removidos'] = sorted({
+            comp['serial_number'] for comp in self._preparar_componentes(self._datos_de(quitados))
+        } - seriales)
+
+        if self.network_module_installed:
+            ips = self._preparar_ips(self._datos_de(agregados))
+            direcciones = {ip['address'] for ip in ips}
+            payload['ips'] = ips
+            payload['ips_removidas'] = sorted({
+                ip['address'] for ip in self._preparar_ips(self._datos_de(quitados))
+            } - direcciones)
+        logging.info(f"Inventario incremental: {len(delta)} categoría(s) con cambios.")
+        return payload
+
+    @staticmethod
+    def _datos_de(elementos: Dict[str, list]) -> Dict[str, Any]:
+        """Inventario parcial con los elementos indicados, con la forma de recolectar_todo."""
+        datos = {}
+        for categoria, items in elementos.items():
+            if categoria in ('cpu', 'placa_madre', 'sistema_operativo'):
+                datos[categoria] = items[0] if items else {}
+            else:
+                datos[categoria] = items
+        return datos
+
+    def _exportar_por_registro(self, payload: Dict[str, Any]) -> bool:
+        """Exportación anterior, una llamada por registro, para servidores sin la ruta de ingesta."""
+        # Obtenemos el mapa de subtipos antes de empezar a procesar
+        self._fetch_and_load_subtypes()
+
+        # --- 1. CREAR COMPONENTES ---
+        component_ids = []
+        for comp in payload['componentes']:
+            comp_vals = dict(comp)
+            subtype_id = self.mapper.subtype_map.get(comp_vals.pop('subtype'))
+            if not subtype_id:
+                logging.warning(f"Omitiendo componente sin subtipo en Odoo: {comp_vals['model']}")
+                continue
+            comp_vals['subtype_id'] = subtype_id
+            comp_id = self._buscar_o_crear(
+                self.modelos['componente'],
+                [('serial_number', '=', comp_vals['serial_number'])],
+                comp_vals
+            )
+            if comp_id:
+                component_ids.append(comp_id)
+
+        # --- 2. PROCESAR IPs ---
+        ip_ids = []
+        for ip_vals in payload.get('ips', []):
+            ip_id = self._buscar_o_crear(self.modelos['ip'], [('address', '=', ip_vals['address'])], ip_vals)
+            if ip_id:
+                ip_ids.append(ip_id)
+        
+        # --- 3. PROCESAR SOFTWARE ---
+        software_ids = []
+        for sw_vals in payload.get('programas', []):
+            sw_id = self._buscar_o_crear(self.modelos['software'], [('name', '=', sw_vals['name']), ('version', '=', sw_vals['version'])], sw_vals)
+            if sw_id:
+                software_ids.append(sw_id)
+
+        # --- 4. VINCULACIÓN FINAL EN BACKLOG ---
+        backlog_vals = {
+            **{k: payload[k] for k in ('description', 'type')},
+            'raw_data': json.dumps(payload['raw_data'], indent=2, default=str),
             'components_ids': [(6, 0, list(set(component_ids)))],
             'software_ids': [(6, 0, software_ids)] if self.software_module_installed else False,
             'ip_ids': [(6, 0, ip_ids)] if self.network_module_installed else False,
@@ -243,13 +417,14 @@ class ExportadorOdoo:
 
         backlog_vals = {k: v for k, v in backlog_vals.items() if v is not False}
 
-        self._buscar_o_crear(
+        backlog_id = self._buscar_o_crear(
             self.modelos['backlog'],
-            [('name', '=', id_unico_hw)],
-            {'name': id_unico_hw, **backlog_vals},
+            [('name', '=', payload['name'])],
+            {'name': payload['name'], **backlog_vals},
             backlog_vals
         )
-        logging.info(f"Proceso de exportación para '{id_unico_hw}' completado.")
+        logging.info(f"Proceso de exportación para '{payload['name']}' completado.")
+        return bool(backlog_id)
 
     def test_connection_with_odoo(self) -> bool:
         if not self._autenticar(): return False
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Inventario incremental: el agente guarda el último inventario aceptado por Odoo
+y en cada ciclo envía solo los elementos añadidos o eliminados, comprimidos.
+Cada cierto tiempo (o cuando Odoo lo pide) se envía de nuevo el inventario completo.
+
+Los elementos de las listas (discos, RAM, programas...) se identifican por la
+huella de su contenido; Odoo calcula la misma huella para aplicar el delta.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+_logger = logging.getLogger(__name__)
+
+
+def normalizar(datos: Dict[str, Any]) -> Dict[str, Any]:
+    """Devuelve los datos tal y como quedan tras serializarlos a JSON, para que las huellas coincidan en Odoo."""
+    return json.loads(json.dumps(datos, default=str))
+
+
+def huella(valor: Any) -> str:
+    """Huella estable del contenido de un valor JSON."""
+    texto = json.dumps(valor, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+def calcular_delta(anterior: Dict[str, Any], actual: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, list], Dict[str, list]]:
+    """
+    Compara dos inventarios normalizados.
+
+    :return: tupla (delta, añadidos, eliminados). `delta` es lo que se envía a
+        Odoo: por cada categoría de lista {'added': [elementos], 'removed': [huellas]}
+        y por cada categoría simple que cambia {'value': nuevo valor}.
+        `añadidos` y `eliminados` son los elementos completos por categoría.
+    """
+    delta, agregados, quitados = {}, {}, {}
+    for categoria in sorted(set(anterior) | set(actual)):
+        viejo, nuevo = anterior.get(categoria), actual.get(categoria)
+        if isinstance(viejo, list) and isinstance(nuevo, list):
+            viejos = {huella(item): item for item in viejo}
+            nuevos = {huella(item): item for item in nuevo}
+            # Se cuentan las repeticiones: dos dispositivos idénticos son dos elementos
+            conteo_viejo = Counter(huella(item) for item in viejo)
+            conteo_nuevo = Counter(huella(item) for item in nuevo)
+            added = [nuevos[h] for h, n in (conteo_nuevo - conteo_viejo).items() for _ in range(n)]
+            removed = [h for h, n in (conteo_viejo - conteo_nuevo).items() for _ in range(n)]
+            if added or removed:
+                delta[categoria] = {'added': added, 'removed': removed}
+                agregados[categoria] = added
+                quitados[categoria] = [viejos[h] for h in removed]
+        elif huella(viejo) != huella(nuevo):
+            delta[categoria] = {'value': nuevo}
+            agregados[categoria] = [nuevo] if isinstance(nuevo, dict) else []
+            quitados[categoria] = [viejo] if isinstance(viejo, dict) else []
+    return delta, agregados, quitados
+
+
+def comprimir(payload: Dict[str, Any]) -> str:
+    """Payload en JSON comprimido con gzip y codificado en base64."""
+    texto = json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=str)
+    return base64.b64encode(gzip.compress(texto.encode('utf-8'))).decode('ascii')
+
+
+class EstadoInventario:
+    """Último inventario aceptado por Odoo, guardado en disco entre ciclos y reinicios."""
+
+    def __init__(self, ruta: Path, horas_snapshot: float = 24):
+        self.ruta = Path(ruta)
+        self.horas_snapshot = horas_snapshot
+        self.datos: Optional[Dict[str, Any]] = None
+        self.fingerprint: Optional[str] = None
+        self.ultimo_completo: Optional[datetime] = None
+        self._cargar()
+
+    def _cargar(self):
+        if not self.ruta.exists():
+            return
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+            self.datos = estado['datos']
+            self.fingerprint = estado['fingerprint']
+            self.ultimo_completo = datetime.fromisoformat(estado['ultimo_completo'])
+        except Exception as e:
+            _logger.warning(f"No se pudo leer el estado del inventario en {self.ruta}: {e}. Se enviará el inventario completo.")
+            self.descartar()
+
+    def requiere_completo(self) -> bool:
+        """Indica si el siguiente envío debe ser el inventario completo."""
+        if self.datos is None or self.ultimo_completo is None:
+            return True
+        return datetime.now() - self.ultimo_completo >= timedelta(hours=self.horas_snapshot)
+
+    def guardar(self, datos: Dict[str, Any], fingerprint: str, completo: bool):
+        """Registra el inventario que Odoo acaba de aceptar."""
+        self.datos = datos
+        self.fingerprint = fingerprint
+        if completo or self.ultimo_completo is None:
+            self.ultimo_completo = datetime.now()
+        try:
+            temporal = self.ruta.with_suffix('.tmp')
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'fingerprint': self.fingerprint,
+                    'ultimo_completo': self.ultimo_completo.isoformat(),
+                    'datos': self.datos,
+                }, f, ensure_ascii=False)
+            temporal.replace(self.ruta)
+        except Exception as e:
+            _logger.warning(f"No se pudo guardar el estado del inventario en {self.ruta}: {e}")
+
+    def descartar(self):
+        """Olvida el inventario aceptado: el siguiente envío será completo."""
+        self.datos = None
+        self.fingerprint = None
+        self.ultimo_completo = None
@@ -3,6 +3,7 @@ import subprocess
 import getpass
 import logging
 import sys
+import threading
 from tkinter import simpledialog, messagebox
 import tkinter as tk
 
@@ -25,6 +26,8 @@ class SudoPasswordManager:
             # Para evitar bucles infinitos si la contraseña es siempre incorrecta
             self._prompt_retries = 0
             self._max_retries = 3
+            # Los recolectores se ejecutan en paralelo: la contraseña se pide una sola vez
+            self._password_lock = threading.RLock()
 
     def set_gui_mode(self, is_gui):
         """Informa al gestor si debe usar la GUI para pedir la contraseña."""
@@ -63,10 +66,12 @@ class SudoPasswordManager:
         Ejecuta un comando con sudo, pidiendo la contraseña si es necesario.
         """
         if self.sudo_password is None:
-            self.sudo_password = self._prompt_password()
-            if not self.sudo_password:
-                _logger.error("No se proporcionó contraseña de sudo. El comando no se puede ejecutar.")
-                raise PermissionError("Contraseña de sudo no proporcionada.")
+            with self._password_lock:
+                if self.sudo_password is None:
+                    self.sudo_password = self._prompt_password()
+                if not self.sudo_password:
+                    _logger.error("No se proporcionó contraseña de sudo. El comando no se puede ejecutar.")
+                    raise PermissionError("Contraseña de sudo no proporcionada.")
 
         # Usamos `sudo -S` que lee la contraseña desde stdin
         full_command = f"sudo -S {command}"
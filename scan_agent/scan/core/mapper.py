@@ -34,36 +34,49 @@ class ComponentMapper:
         Determina el ID del subtipo para un componente dado, basándose en "pistas"
         en sus datos recolectados.
         """
-        # --- Pistas para identificar el tipo de componente ---
         # Periféricos (tienen un campo 'tipo' explícito)
         if 'tipo' in component_data:
             tipo = str(component_data['tipo']).upper().strip()
             if tipo in self.subtype_map:
                 return self.subtype_map[tipo]
 
+        subtype_name = self.get_subtype_name({k: v for k, v in component_data.items() if k != 'tipo'})
+        return self.subtype_map.get(subtype_name) if subtype_name else None
+
+    def get_subtype_name(self, component_data: Dict[str, Any]) -> Optional[str]:
+        """
+        Determina el nombre del subtipo (en mayúsculas, como en Odoo) para un
+        componente dado. No necesita los subtipos de Odoo: el servidor resuelve
+        el nombre a su ID durante la ingesta por lotes.
+        """
+        # --- Pistas para identificar el tipo de componente ---
+        # Periféricos (tienen un campo 'tipo' explícito)
+        if 'tipo' in component_data:
+            return str(component_data['tipo']).upper().strip()
+
         # Placa Madre
         if 'BIOS Fabricante' in component_data:
-            return self.subtype_map.get('PLACA MADRE')
+            return 'PLACA MADRE'
 
         # CPU
         if 'Núcleos físicos' in component_data:
-            return self.subtype_map.get('CPU')
+            return 'CPU'
 
         # RAM (identificado por tener 'Banco' o 'Slot')
         if 'Banco' in component_data or 'Slot' in component_data:
-            return self.subtype_map.get('RAM')
+            return 'RAM'
 
         # GPU
         if 'Driver versión' in component_data:
-            return self.subtype_map.get('GPU')
+            return 'GPU'
 
         # Discos de Almacenamiento
         if 'Tipo interfaz' in component_data:
             if 'SSD' in component_data.get('Tipo', '').upper():
-                return self.subtype_map.get('SSD')
+                return 'SSD'
             else:
-                return self.subtype_map.get('DISCO DURO')
+                return 'DISCO DURO'
 
         # Si no se encuentra ninguna pista, se devuelve None.
         logging.warning(f"No se pudo determinar el subtipo para el componente: {component_data.get('Modelo')}")
-        return None
\ No newline at end of file
+        return None
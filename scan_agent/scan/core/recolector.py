@@ -9,12 +9,16 @@ from ..hardware.red import RecolectorRed
 from ..hardware.perifericos import RecolectorPerifericos
 from ..hardware.placamadre import RecolectorPlacaMadre
 from .exportador import ExportadorOdoo
+from .cache_sondeos import cache_sondeos
 from ..sistema.os import RecolectorOS
 from ..sistema.programas import RecoltadorProgramas
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
 import platform
 import hashlib
 import logging
 import subprocess
+import threading
+import time
 import psutil
 
 if platform.system() == "Linux":
@@ -30,12 +34,28 @@ if platform.system() == "Windows":
 else:
     wmi = None
 
+# Tiempo máximo (segundos) que se espera a cada recolector en un ciclo
+TIMEOUT_RECOLECTOR_SEG = 120
+
+# Recolectores cuyo resultado no cambia mientras el agente está en marcha
+RECOLECTORES_ESTATICOS = ("placa_madre",)
+
+# Último resultado correcto de cada recolector, para no enviar un error como
+# si fuese un cambio de inventario cuando un recolector excede el tiempo
+_ultimos_resultados = {}
+_ultimos_resultados_lock = threading.Lock()
+
+# Ejecución en curso de cada recolector; puede seguir de un ciclo anterior
+_en_curso = {}
+_en_curso_lock = threading.Lock()
+
 class GestorTI:
-    def __init__(self, software_installed=False, network_installed=False):
+    def __init__(self, software_installed=False, network_installed=False, timeout_recolector=TIMEOUT_RECOLECTOR_SEG):
         """
         Inicializa el gestor y decide qué recolectores usar
         basado en los módulos instalados en Odoo.
         """
+        self.timeout_recolector = timeout_recolector
         self.recolectores = {
             # Los de hardware siempre se recolectan
             "placa_madre": RecolectorPlacaMadre(),
@@ -68,25 +88,38 @@ class GestorTI:
 
     # --- MÉTODO MODIFICADO PARA SER MULTIPLATAFORMA ---
     def recolectar_todo(self):
+        """
+        Ejecuta los recolectores en paralelo: la mayoría pasan su tiempo esperando
+        a procesos externos (dmidecode, dpkg-query, WMI...). Si un recolector excede
+        `timeout_recolector`, se usa su último resultado correcto (o un error) y
+        el ciclo continúa sin esperarlo (ver `_lanzar_recolector`).
+        """
         resultados = {}
         
-        # Obtenemos el serial de la placa madre una sola vez
+        # Obtenemos el serial de la placa madre una sola vez (la RAM lo necesita)
         motherboard_serial = self._get_motherboard_serial()
-        
-        for nombre, recolector in self.recolectores.items():
+        pc_identifier = f"{platform.node()}_{motherboard_serial}"
+
+        inicio = time.monotonic()
+        futuros = {
+            nombre: self._lanzar_recolector(nombre, recolector, pc_identifier)
+            for nombre, recolector in self.recolectores.items()
+        }
+        for nombre, futuro in futuros.items():
+            restante = max(0, self.timeout_recolector - (time.monotonic() - inicio))
             try:
-                if nombre == "perifericos":
-                    perifericos = recolector.obtener_info()
-                    resultados[nombre] = [self._generar_id_periferico(p) for p in perifericos]
-                elif nombre == "ram":
-                    # Usamos el serial ya obtenido
-                    pc_identifier = f"{platform.node()}_{motherboard_serial}"
-                    ram_info = recolector.obtener_info()
-                    resultados[nombre] = [self._generar_id_local_ram(p, pc_identifier) for p in ram_info]
-                else:
-                    resultados[nombre] = recolector.obtener_info()
+                resultados[nombre] = futuro.result(timeout=restante)
+                with _ultimos_resultados_lock:
+                    _ultimos_resultados[nombre] = resultados[nombre]
+            except FuturesTimeoutError:
+                with _ultimos_resultados_lock:
+                    anterior = _ultimos_resultados.get(nombre)
+                logging.warning(f"El recolector '{nombre}' excedió {self.timeout_recolector} s. "
+                                f"{'Se usa su último resultado.' if anterior is not None else 'Se omite en este ciclo.'}")
+                resultados[nombre] = anterior if anterior is not None else {"error": "Tiempo de espera excedido"}
             except Exception as e:
                 resultados[nombre] = {"error": str(e)}
+        logging.debug(f"Recolección completada en {time.monotonic() - inicio:.1f} s.")
         
         # --- CÁLCULO DE RAM TOTAL ---
         # Es más fiable obtener la RAM total directamente del sistema que sumar los módulos.
@@ -106,9 +139,71 @@ class GestorTI:
         
         return resultados
 
+    def _lanzar_recolector(self, nombre, recolector, pc_identifier):
+        """
+        Ejecuta el recolector en un hilo daemon y devuelve su futuro: un
+        recolector bloqueado no impide que el agente termine. Si la ejecución
+        de un ciclo anterior sigue en curso, se devuelve esa en lugar de lanzar
+        otra, para no acumular hilos bloqueados.
+        """
+        with _en_curso_lock:
+            futuro = _en_curso.get(nombre)
+            if futuro is not None and not futuro.done():
+                logging.debug(f"El recolector '{nombre}' sigue en curso desde un ciclo anterior.")
+                return futuro
+            futuro = _en_curso[nombre] = Future()
+
+        def ejecutar():
+            if not futuro.set_running_or_notify_cancel():
+                return
+            try:
+                futuro.set_result(self._ejecutar_recolector(nombre, recolector, pc_identifier))
+            except BaseException as e:
+                futuro.set_exception(e)
+
+        threading.Thread(target=ejecutar, name=f"recolector-{nombre}", daemon=True).start()
+        return futuro
+
+    def _ejecutar_recolector(self, nombre, recolector, pc_identifier):
+        """Ejecuta un recolector en su hilo y aplica el post-proceso de su categoría."""
+        com_inicializado = self._inicializar_com()
+        try:
+            if nombre in RECOLECTORES_ESTATICOS:
+                return cache_sondeos.obtener(f"recolector:{nombre}", recolector.obtener_info,
+                                             es_valido=lambda info: isinstance(info, dict) and 'error' not in info)
+            if nombre == "perifericos":
+                return [self._generar_id_periferico(p) for p in recolector.obtener_info()]
+            if nombre == "ram":
+                return [self._generar_id_local_ram(p, pc_identifier) for p in recolector.obtener_info()]
+            return recolector.obtener_info()
+        finally:
+            if com_inicializado:
+                import pythoncom
+                pythoncom.CoUninitialize()
+
+    @staticmethod
+    def _inicializar_com() -> bool:
+        """WMI usa COM, que debe inicializarse en cada hilo que lo utiliza (solo Windows)."""
+        if platform.system() != "Windows":
+            return False
+        try:
+            import pythoncom
+            pythoncom.CoInitialize()
+            return True
+        except ImportError:
+            return False
+
     # --- Método multiplataforma para el serial de la placa madre ---
     def _get_motherboard_serial(self) -> str:
-        """Obtiene el número de serie de la placa madre según el SO."""
+        """
+        Obtiene el número de serie de la placa madre según el SO. Se consulta una
+        sola vez mientras el agente esté en marcha.
+        """
+        return cache_sondeos.obtener('motherboard_serial', self._consultar_motherboard_serial,
+                                     es_valido=lambda serial: serial != "UNKNOWN")
+
+    def _consultar_motherboard_serial(self) -> str:
+        """Consulta el número de serie de la placa madre al sistema."""
         system = platform.system()
         serial = "UNKNOWN"
         try:
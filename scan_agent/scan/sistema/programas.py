@@ -5,15 +5,71 @@ import os
 import logging
 from datetime import datetime
 
+from ..core.cache_sondeos import cache_sondeos, firma_rutas
+
 # Se elimina la importación global de winreg de aquí
 
 _logger = logging.getLogger(__name__)
 
+# Bases de datos de paquetes de Linux: si ninguna cambia, la lista de programas tampoco
+RUTAS_BASES_PAQUETES_LINUX = [
+    "/var/lib/dpkg/status",
+    "/var/lib/rpm",
+    "/var/lib/rpm/rpmdb.sqlite",
+    "/var/lib/rpm/Packages",
+    "/var/lib/snapd/state.json",
+    "/var/lib/flatpak/app",
+]
+
+RUTAS_REGISTRO_PROGRAMAS = [
+    r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
+    r"SOFTWARE\Wow6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
+]
+
 class RecoltadorProgramas:
     def obtener_info(self):
-        """Obtiene información de programas instalados en el sistema."""
-        _logger.debug("Iniciando recolección de información de programas.")
+        """
+        Obtiene información de programas instalados en el sistema. El resultado
+        se reutiliza entre ciclos mientras la base de datos de paquetes (o las
+        claves de desinstalación del registro en Windows) no se modifique.
+        """
         so = platform.system()
+        firma = self._firma_bases_de_paquetes(so)
+        if firma is None:
+            return self._recolectar_programas(so)
+        return cache_sondeos.obtener('programas', lambda: self._recolectar_programas(so), firma,
+                                     es_valido=bool)
+
+    def _firma_bases_de_paquetes(self, so):
+        """Firma de las fuentes de programas del sistema, o None si no se puede calcular."""
+        if so == "Linux":
+            return firma_rutas(*RUTAS_BASES_PAQUETES_LINUX)
+        if so == "Windows":
+            try:
+                import winreg
+            except ImportError:
+                return None
+            firma = []
+            for ruta in RUTAS_REGISTRO_PROGRAMAS:
+                try:
+                    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, ruta) as key:
+                        # (subclaves, valores, última modificación): cambia al instalar o desinstalar
+                        num_subclaves, __, modificada = winreg.QueryInfoKey(key)
+                        firma.append((ruta, num_subclaves, modificada))
+                        # Una actualización en el sitio solo modifica los valores de la
+                        # subclave del programa: su fecha de modificación también cuenta
+                        for idx in range(num_subclaves):
+                            nombre = winreg.EnumKey(key, idx)
+                            with winreg.OpenKey(key, nombre) as subclave:
+                                firma.append((nombre, winreg.QueryInfoKey(subclave)[2]))
+                except OSError:
+                    firma.append((ruta, None))
+            return tuple(firma)
+        return None
+
+    def _recolectar_programas(self, so):
+        """Recolecta los programas instalados sin usar la caché."""
+        _logger.debug("Iniciando recolección de información de programas.")
         _logger.debug(f"Sistema operativo detectado: {so}")
         
         if so == "Windows":
@@ -37,12 +93,8 @@ class RecoltadorProgramas:
             return []
         
         programas = []
-        rutas_registro = [
-            r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
-            r"SOFTWARE\Wow6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
-        ]
         
-        for ruta in rutas_registro:
+        for ruta in RUTAS_REGISTRO_PROGRAMAS:
             _logger.debug(f"Buscando en ruta del registro: {ruta}")
             try:
                 with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, ruta) as key:
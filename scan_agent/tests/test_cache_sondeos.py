@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la caché de sondeos del agente.
+Se ejecutan desde el directorio scan_agent: python -m unittest discover -s tests
+"""
+import os
+import tempfile
+import unittest
+
+from scan.core.cache_sondeos import CacheSondeos, firma_rutas
+
+
+class ContadorSondeo:
+    """Sondeo de prueba que cuenta sus ejecuciones y devuelve `valor`."""
+
+    def __init__(self, valor):
+        self.valor = valor
+        self.llamadas = 0
+
+    def __call__(self):
+        self.llamadas += 1
+        return self.valor
+
+
+class TestCacheSondeos(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = CacheSondeos()
+
+    def test_reutiliza_mientras_no_cambia_la_firma(self):
+        sondeo = ContadorSondeo(['paquete 1.0'])
+        self.assertEqual(self.cache.obtener('programas', sondeo, firma=1), ['paquete 1.0'])
+        self.assertEqual(self.cache.obtener('programas', sondeo, firma=1), ['paquete 1.0'])
+        self.assertEqual(sondeo.llamadas, 1)
+
+        # Cambia la firma: el resultado guardado caduca
+        sondeo.valor = ['paquete 2.0']
+        self.assertEqual(self.cache.obtener('programas', sondeo, firma=2), ['paquete 2.0'])
+        self.assertEqual(sondeo.llamadas, 2)
+        self.assertEqual(self.cache.obtener('programas', sondeo, firma=2), ['paquete 2.0'])
+        self.assertEqual(sondeo.llamadas, 2)
+
+    def test_no_guarda_resultados_invalidos(self):
+        sondeo = ContadorSondeo("UNKNOWN")
+        es_valido = lambda serial: serial != "UNKNOWN"
+        self.cache.obtener('serial', sondeo, es_valido=es_valido)
+        self.cache.obtener('serial', sondeo, es_valido=es_valido)
+        self.assertEqual(sondeo.llamadas, 2)
+
+        sondeo.valor = "ABC123"
+        self.assertEqual(self.cache.obtener('serial', sondeo, es_valido=es_valido), "ABC123")
+        self.assertEqual(self.cache.obtener('serial', sondeo, es_valido=es_valido), "ABC123")
+        self.assertEqual(sondeo.llamadas, 3)
+
+    def test_devuelve_copias(self):
+        sondeo = ContadorSondeo({'discos': ['sda']})
+        resultado = self.cache.obtener('discos', sondeo)
+        resultado['discos'].append('sdb')
+        self.assertEqual(self.cache.obtener('discos', sondeo), {'discos': ['sda']})
+        self.assertEqual(sondeo.valor, {'discos': ['sda', 'sdb']})
+
+    def test_invalidar(self):
+        serial, programas = ContadorSondeo("ABC123"), ContadorSondeo([])
+        for _ in range(2):
+            self.cache.obtener('serial', serial)
+            self.cache.obtener('programas', programas)
+        self.cache.invalidar('serial')
+        self.cache.obtener('serial', serial)
+        self.cache.obtener('programas', programas)
+        self.assertEqual((serial.llamadas, programas.llamadas), (2, 1))
+
+        self.cache.invalidar()
+        self.cache.obtener('serial', serial)
+        self.cache.obtener('programas', programas)
+        self.assertEqual((serial.llamadas, programas.llamadas), (3, 2))
+
+    def test_firma_rutas(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'status')
+            inexistente = os.path.join(directorio, 'no_existe')
+            with open(ruta, 'w') as archivo:
+                archivo.write('paquetes')
+            os.utime(ruta, ns=(1_000_000_000, 1_000_000_000))
+            firma = firma_rutas(ruta, inexistente)
+            self.assertEqual(firma, ((ruta, 1_000_000_000), (inexistente, None)))
+            self.assertEqual(firma_rutas(ruta, inexistente), firma)
+
+            os.utime(ruta, ns=(2_000_000_000, 2_000_000_000))
+            self.assertNotEqual(firma_rutas(ruta, inexistente), firma)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del inventario incremental del agente.
+Se ejecutan desde el directorio scan_agent: python -m unittest discover -s tests
+"""
+import base64
+import gzip
+import json
+import tempfile
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from scan.core.inventario_delta import (
+    EstadoInventario, calcular_delta, comprimir, huella, normalizar,
+)
+
+
+def aplicar_delta(datos, delta):
+    """Aplica el delta como lo hace Odoo (apply_inventory_delta en sgichs_core2)."""
+    datos = json.loads(json.dumps(datos))
+    for categoria, cambio in delta.items():
+        if 'value' in cambio:
+            if cambio['value'] is None:
+                datos.pop(categoria, None)
+            else:
+                datos[categoria] = cambio['value']
+            continue
+        pendientes = Counter(cambio['removed'])
+        conservados = []
+        for item in datos.get(categoria, []):
+            if pendientes[huella(item)] > 0:
+                pendientes[huella(item)] -= 1
+            else:
+                conservados.append(item)
+        if +pendientes:
+            raise ValueError(f"elementos de '{categoria}' que no están en el inventario")
+        datos[categoria] = conservados + cambio['added']
+    return datos
+
+
+def ordenado(datos):
+    """Inventario con las listas ordenadas por huella, para comparar sin depender del orden."""
+    return {
+        categoria: sorted(valor, key=huella) if isinstance(valor, list) else valor
+        for categoria, valor in datos.items()
+    }
+
+
+class TestInventarioDelta(unittest.TestCase):
+
+    def setUp(self):
+        self.anterior = normalizar({
+            'sistema': {'nombre': 'PC-01', 'so': 'Windows 10'},
+            'discos': [{'modelo': 'SSD', 'tamano': 512}],
+            'ram': [{'capacidad': 8}, {'capacidad': 8}],
+            'programas': [{'nombre': 'Editor', 'version': '1.0'}, {'nombre': 'Juego', 'version': '2.0'}],
+            'red': [{'mac': 'AA:BB', 'ip': '10.0.0.2'}],
+        })
+
+    def test_huella_estable(self):
+        self.assertEqual(huella({'a': 1, 'b': [1, 2]}), huella({'b': [1, 2], 'a': 1}))
+        self.assertNotEqual(huella({'a': 1}), huella({'a': 2}))
+
+    def test_normalizar(self):
+        fecha = datetime(2024, 1, 1, 12, 0)
+        self.assertEqual(normalizar({'fecha': fecha, 'tupla': (1, 2)}), {'fecha': str(fecha), 'tupla': [1, 2]})
+
+    def test_sin_cambios(self):
+        delta, agregados, quitados = calcular_delta(self.anterior, json.loads(json.dumps(self.anterior)))
+        self.assertEqual((delta, agregados, quitados), ({}, {}, {}))
+
+    def test_delta(self):
+        actual = json.loads(json.dumps(self.anterior))
+        actual['sistema']['so'] = 'Windows 11'
+        actual['programas'][1] = {'nombre': 'Juego', 'version': '2.1'}
+        actual['ram'].pop()
+        del actual['red']
+        delta, agregados, quitados = calcular_delta(self.anterior, actual)
+
+        self.assertEqual(delta['sistema'], {'value': actual['sistema']})
+        self.assertEqual(delta['programas'], {
+            'added': [{'nombre': 'Juego', 'version': '2.1'}],
+            'removed': [huella({'nombre': 'Juego', 'version': '2.0'})],
+        })
+        # De dos módulos de RAM idénticos solo se elimina uno
+        self.assertEqual(delta['ram'], {'added': [], 'removed': [huella({'capacidad': 8})]})
+        self.assertEqual(delta['red'], {'value': None})
+        self.assertNotIn('discos', delta)
+        self.assertEqual(quitados['programas'], [{'nombre': 'Juego', 'version': '2.0'}])
+        self.assertEqual(agregados['sistema'], [actual['sistema']])
+
+    def test_ida_y_vuelta(self):
+        actual = json.loads(json.dumps(self.anterior))
+        actual['sistema']['so'] = 'Linux'
+        actual['discos'].append({'modelo': 'HDD', 'tamano': 1024})
+        actual['ram'].append({'capacidad': 8})
+        actual['programas'] = [{'nombre': 'Editor', 'version': '1.1'}]
+        actual['usb'] = [{'id': '1234:abcd'}]
+        del actual['red']
+        delta, _, _ = calcular_delta(self.anterior, actual)
+
+        # El delta viaja comprimido y en JSON: se aplica tal y como llega a Odoo
+        recibido = json.loads(gzip.decompress(base64.b64decode(comprimir(delta))))
+        self.assertEqual(ordenado(aplicar_delta(self.anterior, recibido)), ordenado(actual))
+        self.assertEqual(huella(ordenado(aplicar_delta(self.anterior, recibido))), huella(ordenado(actual)))
+
+    def test_comprimir(self):
+        payload = {'name': 'PC-01', 'raw_delta': {'ram': {'added': [], 'removed': ['x']}}}
+        self.assertEqual(json.loads(gzip.decompress(base64.b64decode(comprimir(payload)))), payload)
+
+
+class TestEstadoInventario(unittest.TestCase):
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = Path(directorio.name) / 'estado_inventario.json'
+
+    def test_sin_estado_requiere_completo(self):
+        self.assertTrue(EstadoInventario(self.ruta).requiere_completo())
+
+    def test_guardar_y_cargar(self):
+        datos = normalizar({'ram': [{'capacidad': 8}]})
+        EstadoInventario(self.ruta).guardar(datos, huella(datos), completo=True)
+
+        estado = EstadoInventario(self.ruta)
+        self.assertEqual(estado.datos, datos)
+        self.assertEqual(estado.fingerprint, huella(datos))
+        self.assertFalse(estado.requiere_completo())
+
+    def test_snapshot_periodico(self):
+        estado = EstadoInventario(self.ruta, horas_snapshot=24)
+        estado.guardar({'ram': []}, huella({'ram': []}), completo=True)
+        estado.ultimo_completo = datetime.now() - timedelta(hours=25)
+        self.assertTrue(estado.requiere_completo())
+
+    def test_estado_corrupto(self):
+        self.ruta.write_text('{no es json', encoding='utf-8')
+        estado = EstadoInventario(self.ruta)
+        self.assertIsNone(estado.datos)
+        self.assertTrue(estado.requiere_completo())
+
+
+if __name__ == '__main__':
+    unittest.main()
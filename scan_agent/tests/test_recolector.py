@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la recolección en paralelo del agente, con recolectores de prueba.
+Se ejecutan desde el directorio scan_agent: python -m unittest discover -s tests
+"""
+import threading
+import unittest
+from unittest.mock import patch
+
+from scan.core import recolector
+from scan.core.cache_sondeos import cache_sondeos
+from scan.core.recolector import GestorTI
+
+
+class RecolectorPrueba:
+    """Recolector que devuelve `info` (o la lanza si es una excepción) tras esperar a `liberar`."""
+
+    def __init__(self, info, liberar=None, barrera=None):
+        self.info = info
+        self.liberar = liberar
+        self.barrera = barrera
+        self.llamadas = 0
+
+    def obtener_info(self):
+        self.llamadas += 1
+        if self.barrera is not None:
+            self.barrera.wait(timeout=5)
+        if self.liberar is not None:
+            self.liberar.wait(timeout=10)
+        if isinstance(self.info, Exception):
+            raise self.info
+        return self.info
+
+
+class TestRecolector(unittest.TestCase):
+
+    def setUp(self):
+        recolector._ultimos_resultados.clear()
+        recolector._en_curso.clear()
+        cache_sondeos.invalidar()
+        self.addCleanup(cache_sondeos.invalidar)
+        patcher = patch.object(GestorTI, '_get_motherboard_serial', return_value='SERIAL')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _gestor(self, recolectores, timeout=5):
+        # Sin __init__: no se crean los recolectores reales del sistema
+        gestor = GestorTI.__new__(GestorTI)
+        gestor.timeout_recolector = timeout
+        gestor.recolectores = recolectores
+        gestor.exportador = None
+        return gestor
+
+    def _bloqueado(self, info):
+        """Recolector que no termina hasta el final de la prueba."""
+        liberar = threading.Event()
+        self.addCleanup(liberar.set)
+        return RecolectorPrueba(info, liberar=liberar)
+
+    def test_recolectores_en_paralelo(self):
+        # Solo terminan si los dos se ejecutan a la vez
+        barrera = threading.Barrier(2)
+        gestor = self._gestor({
+            'cpu': RecolectorPrueba({'nucleos': 4}, barrera=barrera),
+            'gpu': RecolectorPrueba({'modelo': 'GPU'}, barrera=barrera),
+        })
+        resultados = gestor.recolectar_todo()
+        self.assertEqual(resultados['cpu'], {'nucleos': 4})
+        self.assertEqual(resultados['gpu'], {'modelo': 'GPU'})
+        self.assertIn('ram_total_gb', resultados)
+
+    def test_error_de_un_recolector(self):
+        gestor = self._gestor({
+            'cpu': RecolectorPrueba(RuntimeError('sin acceso')),
+            'gpu': RecolectorPrueba({'modelo': 'GPU'}),
+        })
+        resultados = gestor.recolectar_todo()
+        self.assertEqual(resultados['cpu'], {'error': 'sin acceso'})
+        self.assertEqual(resultados['gpu'], {'modelo': 'GPU'})
+
+    def test_tiempo_excedido_sin_resultado_anterior(self):
+        gestor = self._gestor({
+            'programas': self._bloqueado([{'nombre': 'editor'}]),
+            'cpu': RecolectorPrueba({'nucleos': 4}),
+        }, timeout=0.2)
+        resultados = gestor.recolectar_todo()
+        self.assertEqual(resultados['programas'], {'error': 'Tiempo de espera excedido'})
+        self.assertEqual(resultados['cpu'], {'nucleos': 4})
+
+    def test_tiempo_excedido_usa_el_ultimo_resultado(self):
+        gestor = self._gestor({'programas': RecolectorPrueba([{'nombre': 'editor'}])}, timeout=0.2)
+        self.assertEqual(gestor.recolectar_todo()['programas'], [{'nombre': 'editor'}])
+
+        bloqueado = self._bloqueado([{'nombre': 'editor'}, {'nombre': 'juego'}])
+        gestor.recolectores['programas'] = bloqueado
+        self.assertEqual(gestor.recolectar_todo()['programas'], [{'nombre': 'editor'}])
+        # La ejecución bloqueada no se relanza en el ciclo siguiente
+        self.assertEqual(gestor.recolectar_todo()['programas'], [{'nombre': 'editor'}])
+        self.assertEqual(bloqueado.llamadas, 1)
+
+    def test_ejecucion_en_curso_termina_en_un_ciclo_posterior(self):
+        liberar = threading.Event()
+        self.addCleanup(liberar.set)
+        programas = RecolectorPrueba([{'nombre': 'editor'}], liberar=liberar)
+        gestor = self._gestor({'programas': programas}, timeout=0.2)
+        self.assertIn('error', gestor.recolectar_todo()['programas'])
+
+        # Terminada la ejecución anterior, el ciclo siguiente vuelve a recolectar
+        liberar.set()
+        recolector._en_curso['programas'].result(timeout=5)
+        self.assertEqual(gestor.recolectar_todo()['programas'], [{'nombre': 'editor'}])
+        self.assertEqual(programas.llamadas, 2)
+
+    def test_recolector_estatico_en_cache(self):
+        placa = RecolectorPrueba({'error': 'dmidecode no disponible'})
+        gestor = self._gestor({'placa_madre': placa})
+        gestor.recolectar_todo()
+        gestor.recolectar_todo()
+        # Los errores no se guardan en la caché
+        self.assertEqual(placa.llamadas, 2)
+
+        placa.info = {'fabricante': 'ACME'}
+        self.assertEqual(gestor.recolectar_todo()['placa_madre'], {'fabricante': 'ACME'})
+        self.assertEqual(gestor.recolectar_todo()['placa_madre'], {'fabricante': 'ACME'})
+        self.assertEqual(placa.llamadas, 3)
+
+    def test_identificadores_de_ram_y_perifericos(self):
+        gestor = self._gestor({
+            'ram': RecolectorPrueba([{'Número de Serie': 'ABCDEF12', 'Tamaño (GB)': 8}]),
+            'perifericos': RecolectorPrueba([{'tipo': 'usb', 'id_dispositivo': '1234', 'serial': 'X'}]),
+        })
+        resultados = gestor.recolectar_todo()
+        self.assertEqual(resultados['ram'][0]['id_unico'],
+                         gestor._generar_id_local_ram({'Número de Serie': 'ABCDEF12'},
+                                                      f"{recolector.platform.node()}_SERIAL")['id_unico'])
+        self.assertEqual(len(resultados['perifericos'][0]['id_unico']), 64)
+
+
+if __name__ == '__main__':
+    unittest.main()
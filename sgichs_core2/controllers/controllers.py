@@ -1,21 +1,14 @@
 # -*- coding: utf-8 -*-
-# from odoo import http
+from odoo import http
+from odoo.http import request
 
 
-# class SgichsCore(http.Controller):
-#     @http.route('/sgichs_core/sgichs_core', auth='public')
-#     def index(self, **kw):
-#         return "Hello, world"
+class SgichsInventoryController(http.Controller):
 
-#     @http.route('/sgichs_core/sgichs_core/objects', auth='public')
-#     def list(self, **kw):
-#         return http.request.render('sgichs_core.listing', {
-#             'root': '/sgichs_core/sgichs_core',
-#             'objects': http.request.env['sgichs_core.sgichs_core'].search([]),
-#         })
-
-#     @http.route('/sgichs_core/sgichs_core/objects/<model("sgichs_core.sgichs_core"):obj>', auth='public')
-#     def object(self, obj, **kw):
-#         return http.request.render('sgichs_core.object', {
-#             'object': obj
-#         })
+    @http.route('/sgichs/inventory/ingest', type='json', auth='user', methods=['POST'])
+    def ingest_inventory(self, payload=None, payload_gz=None, **kw):
+        """
+        Ingesta del inventario de un equipo (completo o incremental, opcionalmente
+        comprimido) en una sola llamada JSON-RPC. Ver it.asset.backlog.ingest_inventory.
+        """
+        return request.env['it.asset.backlog'].ingest_inventory(payload=payload, payload_gz=payload_gz)
@@ -66,8 +66,44 @@ class Incident(models.Model):
                 message
             )
 
+    def _send_summary_notification(self):
+        """Una sola notificación al usuario con el resumen de los incidentes creados"""
+        if not self:
+            return
+        severity_order = ['info', 'low', 'medium', 'high']
+        severity_to_type = {
+            'high': 'danger', 'medium': 'warning',
+            'low': 'info', 'info': 'info'
+        }
+        severity_names = dict(self._fields['severity']._description_selection(self.env))
+        counts = {}
+        for incident in self:
+            counts[incident.severity] = counts.get(incident.severity, 0) + 1
+        highest = max(counts, key=severity_order.index)
+        message = {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Se han generado %s nuevos incidentes de TI.', len(self)),
+                'message': ', '.join(
+                    f"{severity_names[severity]}: {counts[severity]}"
+                    for severity in reversed(severity_order) if severity in counts
+                ),
+                'type': severity_to_type[highest],
+                'sticky': False,
+            }
+        }
+        self.env['bus.bus']._sendone(
+            self.env.user.partner_id,
+            'mail.message.user.notification',
+            message
+        )
+
     @api.model_create_multi
     def create(self, vals_list):
         incidents = super().create(vals_list)
-        incidents._send_user_notification()
+        # Las creaciones masivas (p. ej. el motor de compliance) envían después
+        # un resumen con _send_summary_notification
+        if not self.env.context.get('incident_skip_notification'):
+            incidents._send_user_notification()
         return incidents
\ No newline at end of file
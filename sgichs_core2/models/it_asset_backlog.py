@@ -2,11 +2,87 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
+import base64
+import binascii
+import hashlib
 import json # Importante añadir json
 import logging
+import zlib
+from collections import Counter
 
 _logger = logging.getLogger(__name__)
 
+# Módulos opcionales que condicionan la recolección del agente de escaneo
+INVENTORY_MODULES = ['sgichs_software', 'sgichs_red']
+
+# Tamaño máximo en bytes del inventario descomprimido que se acepta del agente
+MAX_INVENTORY_PAYLOAD_SIZE = 32 * 1024 * 1024
+
+
+def inventory_hash(value):
+    """Huella del contenido de un elemento del inventario; la misma que calcula el agente."""
+    text = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def decompress_inventory(payload_gz, max_size=MAX_INVENTORY_PAYLOAD_SIZE):
+    """
+    Descomprime el payload gzip en base64 del agente sin generar más de
+    `max_size` bytes, para que un payload malicioso no agote la memoria.
+
+    :raises ValueError: si el payload no es gzip válido o supera `max_size`.
+    """
+    try:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # Un byte más del límite basta para saber si lo supera
+        data = decompressor.decompress(base64.b64decode(payload_gz), max_size + 1)
+    except (binascii.Error, zlib.error) as e:
+        raise ValueError(f"payload comprimido no válido: {e}")
+    if len(data) > max_size:
+        raise ValueError(f"el inventario descomprimido supera {max_size} bytes")
+    if not decompressor.eof:
+        raise ValueError("payload comprimido incompleto")
+    return data
+
+
+def apply_inventory_delta(raw_data, raw_delta):
+    """
+    Aplica a raw_data el delta enviado por el agente.
+
+    :return: tupla (raw_data actualizado, {categoría: añadidos}, {categoría: eliminados}).
+    :raises ValueError: si el delta elimina elementos que no están en raw_data.
+    """
+    added, removed = {}, {}
+    for category, change in raw_delta.items():
+        if 'value' in change:
+            old, new = raw_data.get(category), change['value']
+            removed[category] = [old] if isinstance(old, dict) else []
+            added[category] = [new] if isinstance(new, dict) else []
+            if new is None:
+                raw_data.pop(category, None)
+            else:
+                raw_data[category] = new
+            continue
+
+        items = raw_data.get(category)
+        items = items if isinstance(items, list) else []
+        pending = Counter(change.get('removed', []))
+        kept, gone = [], []
+        for item in items:
+            item_hash = inventory_hash(item)
+            if pending[item_hash] > 0:
+                pending[item_hash] -= 1
+                gone.append(item)
+            else:
+                kept.append(item)
+        if +pending:
+            raise ValueError(f"{sum(pending.values())} elemento(s) de '{category}' no están en el inventario guardado")
+        new_items = change.get('added', [])
+        raw_data[category] = kept + new_items
+        added[category] = new_items
+        removed[category] = gone
+    return raw_data, added, removed
+
 class ITAssetBacklog(models.Model):
     _name = 'it.asset.backlog'
     _description = 'Backlog de Activos de TI'
@@ -33,6 +109,10 @@ class ITAssetBacklog(models.Model):
         tracking=True
     )
     raw_data = fields.Text(string="Datos en Bruto (JSON)")
+    inventory_fingerprint = fields.Char(
+        string='Huella del Inventario', readonly=True, copy=False,
+        help="Huella del último inventario recibido del agente; los inventarios incrementales deben partir de ella."
+    )
     status = fields.Selection(
         [('pending', 'Pendiente de Aprobación'),
          ('processed', 'Procesado'),
@@ -59,17 +139,13 @@ class ITAssetBacklog(models.Model):
                 
                 # --- Procesar IPs si el módulo de red está instalado ---
                 if hasattr(self, 'ip_ids') and 'red' in data:
-                    ip_address_model = self.env['it.ip.address']
-                    ip_ids = []
-                    
-                    for net_interface in data.get('red', []):
-                        ip_str = net_interface.get('ip')
-                        if ip_str:
-                            # Buscar o crear la dirección IP
-                            ip_record = ip_address_model.search([('address', '=', ip_str)], limit=1)
-                            if not ip_record:
-                                ip_record = ip_address_model.create({'address': ip_str})
-                            ip_ids.append(ip_record.id)
+                    ip_vals_list = [
+                        {'address': net_interface.get('ip')}
+                        for net_interface in data.get('red', [])
+                        if isinstance(net_interface, dict) and net_interface.get('ip')
+                    ]
+                    # Buscar o crear todas las direcciones IP de una vez
+                    ip_ids = list(self._bulk_upsert('it.ip.address', ['address'], ip_vals_list, update=False).values())
                     
                     if ip_ids:
                         # Usamos (6, 0, ...) para reemplazar las IPs existentes por las nuevas
@@ -111,10 +187,184 @@ class ITAssetBacklog(models.Model):
         """
         Sobrescritura para procesar datos entrantes en las actualizaciones.
         """
-        # Procesar los datos para rellenar campos relacionales ANTES de escribir
-        vals = self._process_incoming_data(vals)
+        # Procesar los datos para rellenar campos relacionales ANTES de escribir.
+        # La ingesta incremental ya trae los comandos de los campos relacionales.
+        if not self.env.context.get('inventory_delta'):
+            vals = self._process_incoming_data(vals)
         return super(ITAssetBacklog, self).write(vals)
 
+    # --- INGESTA POR LOTES ---
+
+    @api.model
+    def ingest_inventory(self, payload=None, payload_gz=None):
+        """
+        Registra en una sola llamada el inventario de un equipo enviado por el
+        agente de escaneo: crea o actualiza por lotes sus componentes, IPs y
+        software y, por último, su registro en el backlog.
+
+        :param payload: dict con 'name' (identificador único), 'description',
+            'type', 'mode' ('full' o 'delta'), 'fingerprint' y:
+            - full: 'raw_data' y las listas que cada módulo sabe procesar
+              ('componentes', 'ips', 'programas').
+            - delta: 'base_fingerprint', 'raw_delta' y los componentes e IPs
+              añadidos y eliminados ('componentes_removidos', 'ips_removidas').
+        :param payload_gz: el mismo payload en JSON comprimido con gzip y en
+            base64. Se rechaza si descomprimido supera MAX_INVENTORY_PAYLOAD_SIZE.
+        :return: dict con el estado ('ok' o 'resync' si el delta no parte del
+            inventario guardado), el id del backlog y los módulos SGICH
+            instalados, para que el agente ajuste lo que recolecta.
+        """
+        if payload_gz:
+            try:
+                payload = json.loads(decompress_inventory(payload_gz).decode('utf-8'))
+            except ValueError as e:
+                # UnicodeDecodeError y JSONDecodeError también son ValueError
+                raise UserError(_("El inventario comprimido no se puede procesar: %s") % e)
+        payload = payload or {}
+        name = payload.get('name')
+        if not name:
+            raise UserError(_("El inventario recibido no tiene un identificador único."))
+
+        backlog = self.search([('name', '=', name)], limit=1)
+        if payload.get('mode') == 'delta':
+            return self._ingest_inventory_delta(backlog, payload)
+
+        raw_data = payload.get('raw_data')
+        if raw_data and not isinstance(raw_data, str):
+            raw_data = json.dumps(raw_data, indent=2, default=str)
+        vals = {
+            'name': name,
+            'description': payload.get('description'),
+            'type': payload.get('type') or 'hardware',
+            'raw_data': raw_data,
+            'inventory_fingerprint': payload.get('fingerprint'),
+        }
+        vals = self._prepare_inventory_vals(payload, vals)
+
+        if backlog:
+            backlog.write(vals)
+        else:
+            backlog = self.create(vals)
+        _logger.info(f"Backlog: inventario completo de '{name}' registrado en una sola llamada.")
+        return {'status': 'ok', 'backlog_id': backlog.id, 'modules': self._get_inventory_modules()}
+
+    def _ingest_inventory_delta(self, backlog, payload):
+        """
+        Aplica un inventario incremental sobre el último inventario guardado.
+        Si el backlog no existe o no parte de la misma huella, se pide al
+        agente el inventario completo sin escribir nada.
+        """
+        resync = {'status': 'resync', 'modules': self._get_inventory_modules()}
+        if not backlog or not backlog.inventory_fingerprint or \
+                backlog.inventory_fingerprint != payload.get('base_fingerprint'):
+            _logger.info(f"Backlog: el delta de '{payload.get('name')}' no parte del inventario guardado. Se pide el completo.")
+            return resync
+
+        raw_delta = payload.get('raw_delta') or {}
+        result = {'status': 'ok', 'backlog_id': backlog.id, 'modules': self._get_inventory_modules()}
+        if not raw_delta:
+            # Sin cambios: no se escribe nada
+            return result
+
+        try:
+            raw_data, added, removed = apply_inventory_delta(json.loads(backlog.raw_data or '{}'), raw_delta)
+        except (ValueError, KeyError) as e:
+            _logger.warning(f"Backlog: no se pudo aplicar el delta de '{backlog.name}': {e}. Se pide el completo.")
+            return resync
+
+        vals = {
+            'raw_data': json.dumps(raw_data, indent=2, default=str),
+            'inventory_fingerprint': payload.get('fingerprint'),
+        }
+        if payload.get('description') and payload['description'] != backlog.description:
+            vals['description'] = payload['description']
+        vals = self._prepare_inventory_delta_vals(payload, vals, added, removed)
+
+        # Los campos relacionales ya van en vals: no se vuelve a procesar todo raw_data
+        backlog.with_context(inventory_delta=True).write(vals)
+        _logger.info(f"Backlog: inventario incremental de '{backlog.name}' aplicado "
+                     f"({', '.join(sorted(raw_delta))}).")
+        return result
+
+    def _prepare_inventory_vals(self, payload, vals):
+        """
+        Punto de extensión de la ingesta: cada módulo (hardware, red, software)
+        procesa su parte del payload y añade sus campos relacionales a `vals`.
+        """
+        return vals
+
+    def _prepare_inventory_delta_vals(self, payload, vals, added, removed):
+        """
+        Punto de extensión de la ingesta incremental: cada módulo añade a `vals`
+        los comandos (4, id) / (3, id) de sus campos relacionales.
+
+        :param added: {categoría: [elementos añadidos]} de raw_data
+        :param removed: {categoría: [elementos eliminados]} de raw_data
+        """
+        return vals
+
+    @api.model
+    def _delta_link_commands(self, added_ids, removed_ids):
+        """
+        Comandos many2many para un delta: (3, id) para los registros eliminados
+        que no se vuelvan a añadir y (4, id) para los añadidos.
+        """
+        added_ids = set(added_ids)
+        return [(3, record_id) for record_id in sorted(set(removed_ids) - added_ids)] + \
+               [(4, record_id) for record_id in sorted(added_ids)]
+
+    @api.model
+    def _get_inventory_modules(self):
+        """Módulos SGICH opcionales instalados, que condicionan qué recolecta el agente."""
+        installed = self.env['ir.module.module'].sudo().search([
+            ('state', '=', 'installed'), ('name', 'in', INVENTORY_MODULES)
+        ]).mapped('name')
+        return {module: module in installed for module in INVENTORY_MODULES}
+
+    @api.model
+    def _bulk_upsert(self, model_name, key_fields, vals_list, update=True):
+        """
+        Busca o crea por lotes los registros identificados por `key_fields`:
+        una búsqueda para todas las claves, una creación para los nuevos y una
+        escritura solo para los existentes cuyos valores cambian.
+
+        :return: dict {clave: id}, con la clave como tupla de los valores de `key_fields`.
+        """
+        Model = self.env[model_name]
+
+        def key_of(values):
+            return tuple(values.get(field) for field in key_fields)
+
+        # Si una clave llega repetida, prevalecen los últimos valores
+        unique = {}
+        for values in vals_list:
+            key = key_of(values)
+            if all(key):
+                unique[key] = values
+        if not unique:
+            return {}
+
+        existing = {}
+        for record in Model.search([(key_fields[0], 'in', list({key[0] for key in unique}))]):
+            key = tuple(record[field] for field in key_fields)
+            if key in unique:
+                existing.setdefault(key, record)
+
+        result = {key: record.id for key, record in existing.items()}
+        if update:
+            for key, record in existing.items():
+                changed = {
+                    field: value for field, value in unique[key].items()
+                    if record._fields[field].convert_to_write(record[field], record) != value
+                }
+                if changed:
+                    record.write(changed)
+
+        to_create = [values for key, values in unique.items() if key not in existing]
+        for values, record in zip(to_create, Model.create(to_create)):
+            result[key_of(values)] = record.id
+        return result
+
     # --- MÉTODOS DE ACCIÓN ---
     def action_approve(self):
         raise NotImplementedError(_("La lógica de aprobación no está implementada en el core. Instale el módulo correspondiente (ej. sgichs_hardware)."))
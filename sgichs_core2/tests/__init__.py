@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+from . import test_ingest_inventory
+from . import test_inventory_payload
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+import json
+
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.sgichs_core2.models.it_asset_backlog import INVENTORY_MODULES, inventory_hash
+
+
+class TestIngestInventory(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Backlog = cls.env['it.asset.backlog']
+        cls.raw_data = {'sistema': {'so': 'Linux'}, 'ram': [{'capacidad': 8}]}
+
+    def _full_payload(self, **values):
+        payload = {
+            'name': 'INV-PRUEBA-001',
+            'description': 'PC de pruebas',
+            'type': 'hardware',
+            'mode': 'full',
+            'fingerprint': 'huella-1',
+            'raw_data': self.raw_data,
+        }
+        payload.update(values)
+        return payload
+
+    def _delta_payload(self, raw_delta, **values):
+        payload = {
+            'name': 'INV-PRUEBA-001',
+            'mode': 'delta',
+            'base_fingerprint': 'huella-1',
+            'fingerprint': 'huella-2',
+            'raw_delta': raw_delta,
+        }
+        payload.update(values)
+        return payload
+
+    def test_full_creates_backlog(self):
+        result = self.Backlog.ingest_inventory(payload=self._full_payload())
+        backlog = self.Backlog.browse(result['backlog_id'])
+        self.assertEqual(result['status'], 'ok')
+        self.assertEqual(set(result['modules']), set(INVENTORY_MODULES))
+        self.assertEqual(backlog.name, 'INV-PRUEBA-001')
+        self.assertEqual(backlog.type, 'hardware')
+        self.assertEqual(backlog.inventory_fingerprint, 'huella-1')
+        self.assertEqual(json.loads(backlog.raw_data), self.raw_data)
+
+    def test_full_updates_existing_backlog(self):
+        first = self.Backlog.ingest_inventory(payload=self._full_payload())
+        second = self.Backlog.ingest_inventory(payload=self._full_payload(
+            description='PC renombrado', fingerprint='huella-2'))
+        self.assertEqual(first['backlog_id'], second['backlog_id'])
+        backlog = self.Backlog.browse(second['backlog_id'])
+        self.assertEqual(backlog.description, 'PC renombrado')
+        self.assertEqual(backlog.inventory_fingerprint, 'huella-2')
+
+    def test_full_reingest_is_idempotent(self):
+        first = self.Backlog.ingest_inventory(payload=self._full_payload())
+        second = self.Backlog.ingest_inventory(payload=self._full_payload())
+        self.assertEqual(first['backlog_id'], second['backlog_id'])
+        self.assertEqual(self.Backlog.search_count([('name', '=', 'INV-PRUEBA-001')]), 1)
+        self.assertEqual(json.loads(self.Backlog.browse(second['backlog_id']).raw_data), self.raw_data)
+
+    def test_missing_name(self):
+        with self.assertRaises(UserError):
+            self.Backlog.ingest_inventory(payload=self._full_payload(name=False))
+
+    def test_delta_without_backlog_requests_full(self):
+        result = self.Backlog.ingest_inventory(payload=self._delta_payload({'sistema': {'value': {'so': 'Windows'}}}))
+        self.assertEqual(result['status'], 'resync')
+        self.assertFalse(self.Backlog.search([('name', '=', 'INV-PRUEBA-001')]))
+
+    def test_delta_from_other_fingerprint_requests_full(self):
+        self.Backlog.ingest_inventory(payload=self._full_payload())
+        result = self.Backlog.ingest_inventory(payload=self._delta_payload(
+            {'sistema': {'value': {'so': 'Windows'}}}, base_fingerprint='huella-0'))
+        self.assertEqual(result['status'], 'resync')
+        backlog = self.Backlog.search([('name', '=', 'INV-PRUEBA-001')])
+        self.assertEqual(backlog.inventory_fingerprint, 'huella-1')
+        self.assertEqual(json.loads(backlog.raw_data), self.raw_data)
+
+    def test_delta_applies_changes(self):
+        self.Backlog.ingest_inventory(payload=self._full_payload())
+        result = self.Backlog.ingest_inventory(payload=self._delta_payload({
+            'sistema': {'value': {'so': 'Windows'}},
+            'ram': {'added': [{'capacidad': 16}], 'removed': [inventory_hash({'capacidad': 8})]},
+        }))
+        self.assertEqual(result['status'], 'ok')
+        backlog = self.Backlog.browse(result['backlog_id'])
+        self.assertEqual(json.loads(backlog.raw_data), {'sistema': {'so': 'Windows'}, 'ram': [{'capacidad': 16}]})
+        self.assertEqual(backlog.inventory_fingerprint, 'huella-2')
+
+    def test_empty_delta_writes_nothing(self):
+        self.Backlog.ingest_inventory(payload=self._full_payload())
+        result = self.Backlog.ingest_inventory(payload=self._delta_payload({}))
+        self.assertEqual(result['status'], 'ok')
+        self.assertEqual(self.Backlog.browse(result['backlog_id']).inventory_fingerprint, 'huella-1')
+
+    def test_delta_with_unknown_item_requests_full(self):
+        self.Backlog.ingest_inventory(payload=self._full_payload())
+        result = self.Backlog.ingest_inventory(payload=self._delta_payload({
+            'ram': {'added': [], 'removed': [inventory_hash({'capacidad': 32})]},
+        }))
+        self.assertEqual(result['status'], 'resync')
+        backlog = self.Backlog.search([('name', '=', 'INV-PRUEBA-001')])
+        self.assertEqual(json.loads(backlog.raw_data), self.raw_data)
+
+
+class TestBulkUpsert(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Backlog = cls.env['it.asset.backlog']
+        cls.Partner = cls.env['res.partner']
+
+    def test_insert(self):
+        result = self.Backlog._bulk_upsert('res.partner', ['ref'], [
+            {'ref': 'UPS-1', 'name': 'Uno'},
+            {'ref': 'UPS-2', 'name': 'Dos'},
+        ])
+        self.assertEqual(set(result), {('UPS-1',), ('UPS-2',)})
+        self.assertEqual(self.Partner.browse(result[('UPS-1',)]).name, 'Uno')
+        self.assertEqual(self.Partner.browse(result[('UPS-2',)]).name, 'Dos')
+
+    def test_update_existing(self):
+        partner = self.Partner.create({'ref': 'UPS-1', 'name': 'Uno'})
+        result = self.Backlog._bulk_upsert('res.partner', ['ref'], [
+            {'ref': 'UPS-1', 'name': 'Uno bis'},
+            {'ref': 'UPS-2', 'name': 'Dos'},
+        ])
+        self.assertEqual(result[('UPS-1',)], partner.id)
+        self.assertEqual(partner.name, 'Uno bis')
+        self.assertEqual(self.Partner.search_count([('ref', 'in', ['UPS-1', 'UPS-2'])]), 2)
+
+    def test_without_update(self):
+        partner = self.Partner.create({'ref': 'UPS-1', 'name': 'Uno'})
+        result = self.Backlog._bulk_upsert('res.partner', ['ref'], [{'ref': 'UPS-1', 'name': 'Uno bis'}], update=False)
+        self.assertEqual(result, {('UPS-1',): partner.id})
+        self.assertEqual(partner.name, 'Uno')
+
+    def test_reupsert_is_idempotent(self):
+        vals_list = [{'ref': 'UPS-1', 'name': 'Uno'}, {'ref': 'UPS-2', 'name': 'Dos'}]
+        first = self.Backlog._bulk_upsert('res.partner', ['ref'], vals_list)
+        second = self.Backlog._bulk_upsert('res.partner', ['ref'], vals_list)
+        self.assertEqual(first, second)
+        self.assertEqual(self.Partner.search_count([('ref', 'in', ['UPS-1', 'UPS-2'])]), 2)
+
+    def test_composite_key_duplicates_and_empty_keys(self):
+        result = self.Backlog._bulk_upsert('res.partner', ['ref', 'name'], [
+            {'ref': 'UPS-1', 'name': 'Uno', 'function': 'primero'},
+            {'ref': 'UPS-1', 'name': 'Uno', 'function': 'último'},
+            {'ref': 'UPS-1', 'name': 'Otro'},
+            {'ref': False, 'name': 'Sin referencia'},
+        ])
+        self.assertEqual(set(result), {('UPS-1', 'Uno'), ('UPS-1', 'Otro')})
+        # Si una clave llega repetida, prevalecen los últimos valores
+        self.assertEqual(self.Partner.browse(result[('UPS-1', 'Uno')]).function, 'último')
+        self.assertFalse(self.Partner.search([('name', '=', 'Sin referencia')]))
+        self.assertEqual(self.Backlog._bulk_upsert('res.partner', ['ref'], []), {})
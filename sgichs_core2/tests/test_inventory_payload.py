@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import base64
+import gzip
+import json
+
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.sgichs_core2.models.it_asset_backlog import (
+    MAX_INVENTORY_PAYLOAD_SIZE, apply_inventory_delta, decompress_inventory, inventory_hash,
+)
+
+
+def comprimir(payload):
+    """Mismo formato que envía el agente (scan/core/inventario_delta.comprimir)."""
+    return base64.b64encode(gzip.compress(json.dumps(payload).encode('utf-8'))).decode('ascii')
+
+
+class TestInventoryPayload(TransactionCase):
+
+    def test_decompress_inventory(self):
+        payload = {'name': 'PC-01', 'mode': 'full'}
+        self.assertEqual(json.loads(decompress_inventory(comprimir(payload))), payload)
+
+    def test_decompress_inventory_rejects_oversized(self):
+        payload_gz = base64.b64encode(gzip.compress(b'x' * 2048))
+        self.assertEqual(len(decompress_inventory(payload_gz, max_size=2048)), 2048)
+        with self.assertRaises(ValueError):
+            decompress_inventory(payload_gz, max_size=2047)
+
+    def test_decompress_inventory_rejects_invalid(self):
+        with self.assertRaises(ValueError):
+            decompress_inventory(base64.b64encode(b'no es gzip'))
+        truncated = base64.b64encode(gzip.compress(b'x' * 2048)[:-12])
+        with self.assertRaises(ValueError):
+            decompress_inventory(truncated)
+
+    def test_ingest_inventory_rejects_oversized(self):
+        # Comprimido ocupa unas decenas de KB: el límite se comprueba sobre el tamaño descomprimido
+        payload_gz = comprimir({'name': 'PC-01', 'description': 'x' * MAX_INVENTORY_PAYLOAD_SIZE})
+        with self.assertRaises(UserError):
+            self.env['it.asset.backlog'].ingest_inventory(payload_gz=payload_gz)
+        self.assertFalse(self.env['it.asset.backlog'].search([('name', '=', 'PC-01')]))
+
+    def test_apply_inventory_delta(self):
+        disco = {'modelo': 'SSD', 'tamano': 512}
+        ram = {'capacidad': 8}
+        raw_data = {'discos': [disco], 'ram': [ram, ram], 'so': {'nombre': 'Linux'}}
+        nuevo_disco = {'modelo': 'HDD', 'tamano': 1024}
+        raw_delta = {
+            'discos': {'added': [nuevo_disco], 'removed': [inventory_hash(disco)]},
+            'ram': {'added': [], 'removed': [inventory_hash(ram)]},
+            'so': {'value': {'nombre': 'Windows'}},
+        }
+        raw_data, added, removed = apply_inventory_delta(raw_data, raw_delta)
+        self.assertEqual(raw_data, {'discos': [nuevo_disco], 'ram': [ram], 'so': {'nombre': 'Windows'}})
+        self.assertEqual(added['discos'], [nuevo_disco])
+        self.assertEqual(removed['ram'], [ram])
+        self.assertEqual(removed['so'], [{'nombre': 'Linux'}])
+
+    def test_apply_inventory_delta_unknown_item(self):
+        with self.assertRaises(ValueError):
+            apply_inventory_delta({'discos': []}, {'discos': {'added': [], 'removed': [inventory_hash({'x': 1})]}})
@@ -6,6 +6,9 @@ import logging
 
 _logger = logging.getLogger(__name__)
 
+# Campos de it.component que el agente de escaneo puede enviar en la ingesta
+COMPONENT_INVENTORY_FIELDS = ['model', 'serial_number', 'inventory_number', 'size_gb', 'ram_type']
+
 class ITAssetBacklog(models.Model):
     _inherit = 'it.asset.backlog'
 
@@ -24,6 +27,54 @@ class ITAssetBacklog(models.Model):
 
     # EL MÉTODO _process_software_from_raw_data SE ELIMINA DE AQUÍ
 
+    def _prepare_inventory_vals(self, payload, vals):
+        """
+        Crea o actualiza por lotes los componentes del inventario recibido,
+        identificados por su número de serie. El subtipo llega por nombre
+        ('CPU', 'RAM', 'MOUSE'...) o ya resuelto como subtype_id.
+        """
+        vals = super()._prepare_inventory_vals(payload, vals)
+        components = payload.get('componentes')
+        if components is None:
+            return vals
+
+        component_ids = self._upsert_inventory_components(components)
+        vals['components_ids'] = [(6, 0, list(set(component_ids.values())))]
+        return vals
+
+    def _prepare_inventory_delta_vals(self, payload, vals, added, removed):
+        """Vincula los componentes añadidos y desvincula los eliminados, por número de serie."""
+        vals = super()._prepare_inventory_delta_vals(payload, vals, added, removed)
+        components = payload.get('componentes') or []
+        removed_serials = payload.get('componentes_removidos') or []
+        if not components and not removed_serials:
+            return vals
+
+        added_ids = self._upsert_inventory_components(components).values()
+        removed_ids = self.env['it.component'].search([('serial_number', 'in', removed_serials)]).ids if removed_serials else []
+        vals['components_ids'] = self._delta_link_commands(added_ids, removed_ids)
+        return vals
+
+    def _upsert_inventory_components(self, components):
+        """Crea o actualiza por lotes los componentes recibidos. Devuelve {(serial,): id}."""
+        subtypes = {
+            subtype.name.upper().strip(): subtype.id
+            for subtype in self.env['it.component.subtype'].search([])
+        }
+        component_vals_list = []
+        for component in components:
+            subtype_id = component.get('subtype_id') or subtypes.get(str(component.get('subtype') or '').upper().strip())
+            if not subtype_id or not component.get('serial_number'):
+                _logger.warning(f"Omitiendo componente sin subtipo o sin número de serie: {component.get('model')}")
+                continue
+            component_vals = {
+                field: component[field] for field in COMPONENT_INVENTORY_FIELDS if field in component
+            }
+            component_vals['subtype_id'] = subtype_id
+            component_vals_list.append(component_vals)
+
+        return self._bulk_upsert('it.component', ['serial_number'], component_vals_list)
+
     @api.depends('name')
     def _compute_existing_hardware(self):
         """Busca si ya existe un hardware con el mismo identificador único (Nº Inventario)."""
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.sgichs_core2.models.it_asset_backlog import inventory_hash
+
+
+class TestIngestInventoryComponents(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Backlog = cls.env['it.asset.backlog']
+        cls.Component = cls.env['it.component']
+        cls.subtype = cls.env['it.component.subtype'].create({
+            'name': 'Disco Prueba', 'type': 'internal',
+        })
+        cls.disco = {'model': 'SSD 512', 'serial_number': 'SN-PRUEBA-1', 'subtype': 'disco prueba', 'size_gb': 512}
+        cls.ram = {'model': 'DDR4 8GB', 'serial_number': 'SN-PRUEBA-2', 'subtype_id': cls.subtype.id, 'ram_type': 'ddr4'}
+
+    def _ingest(self, componentes, **values):
+        payload = {
+            'name': 'INV-PRUEBA-HW',
+            'type': 'hardware',
+            'mode': 'full',
+            'fingerprint': 'huella-1',
+            'raw_data': {'sistema': {'so': 'Linux'}},
+            'componentes': componentes,
+        }
+        payload.update(values)
+        result = self.Backlog.ingest_inventory(payload=payload)
+        return self.Backlog.browse(result['backlog_id'])
+
+    def test_full_inserts_components(self):
+        backlog = self._ingest([self.disco, self.ram])
+        self.assertEqual(set(backlog.components_ids.mapped('serial_number')), {'SN-PRUEBA-1', 'SN-PRUEBA-2'})
+        disco = backlog.components_ids.filtered(lambda c: c.serial_number == 'SN-PRUEBA-1')
+        # El subtipo llega por nombre, sin distinguir mayúsculas
+        self.assertEqual(disco.subtype_id, self.subtype)
+        self.assertEqual(disco.size_gb, 512)
+
+    def test_full_updates_components(self):
+        component = self.Component.create({
+            'model': 'Antiguo', 'serial_number': 'SN-PRUEBA-1', 'subtype_id': self.subtype.id,
+        })
+        backlog = self._ingest([self.disco])
+        self.assertEqual(backlog.components_ids, component)
+        self.assertEqual(component.model, 'SSD 512')
+
+    def test_full_reingest_is_idempotent(self):
+        first = self._ingest([self.disco, self.ram])
+        components = first.components_ids
+        second = self._ingest([self.disco, self.ram])
+        self.assertEqual(first, second)
+        self.assertEqual(second.components_ids, components)
+        self.assertEqual(self.Component.search_count([('serial_number', 'in', ['SN-PRUEBA-1', 'SN-PRUEBA-2'])]), 2)
+
+    def test_full_skips_invalid_components(self):
+        backlog = self._ingest([
+            self.disco,
+            {'model': 'Sin serie', 'subtype': 'Disco Prueba'},
+            {'model': 'Sin subtipo', 'serial_number': 'SN-PRUEBA-3', 'subtype': 'No existe'},
+        ])
+        self.assertEqual(backlog.components_ids.mapped('serial_number'), ['SN-PRUEBA-1'])
+        self.assertFalse(self.Component.search([('serial_number', '=', 'SN-PRUEBA-3')]))
+
+    def test_delta_links_and_unlinks_components(self):
+        backlog = self._ingest([self.disco], raw_data={'discos': [self.disco]})
+        nuevo = dict(self.disco, serial_number='SN-PRUEBA-4', model='SSD 1TB')
+        result = self.Backlog.ingest_inventory(payload={
+            'name': 'INV-PRUEBA-HW',
+            'mode': 'delta',
+            'base_fingerprint': 'huella-1',
+            'fingerprint': 'huella-2',
+            'raw_delta': {'discos': {'added': [nuevo], 'removed': [inventory_hash(self.disco)]}},
+            'componentes': [nuevo],
+            'componentes_removidos': ['SN-PRUEBA-1'],
+        })
+        self.assertEqual(result['status'], 'ok')
+        self.assertEqual(backlog.components_ids.mapped('serial_number'), ['SN-PRUEBA-4'])
+        # El componente eliminado solo se desvincula
+        self.assertTrue(self.Component.search([('serial_number', '=', 'SN-PRUEBA-1')]))
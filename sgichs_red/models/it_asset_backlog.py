@@ -10,4 +10,35 @@ class ITAssetBacklog(models.Model):
         'backlog_id',
         'ip_id',
         string='IPs Detectadas'
-    )
\ No newline at end of file
+    )
+
+    def _prepare_inventory_vals(self, payload, vals):
+        """Crea o actualiza por lotes las IPs del inventario recibido, por dirección."""
+        vals = super()._prepare_inventory_vals(payload, vals)
+        ips = payload.get('ips')
+        if ips is None:
+            return vals
+
+        ip_vals_list = [
+            {'address': ip.get('address'), 'description': ip.get('description')}
+            for ip in ips if ip.get('address')
+        ]
+        ip_ids = self._bulk_upsert('it.ip.address', ['address'], ip_vals_list)
+        vals['ip_ids'] = [(6, 0, list(set(ip_ids.values())))]
+        return vals
+
+    def _prepare_inventory_delta_vals(self, payload, vals, added, removed):
+        """Vincula las IPs añadidas y desvincula las eliminadas, por dirección."""
+        vals = super()._prepare_inventory_delta_vals(payload, vals, added, removed)
+        ips = payload.get('ips') or []
+        removed_addresses = payload.get('ips_removidas') or []
+        if not ips and not removed_addresses:
+            return vals
+
+        ip_ids = self._bulk_upsert('it.ip.address', ['address'], [
+            {'address': ip.get('address'), 'description': ip.get('description')}
+            for ip in ips if ip.get('address')
+        ])
+        removed_ids = self.env['it.ip.address'].search([('address', 'in', removed_addresses)]).ids if removed_addresses else []
+        vals['ip_ids'] = self._delta_link_commands(ip_ids.values(), removed_ids)
+        return vals
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.sgichs_core2.models.it_asset_backlog import inventory_hash
+
+
+class TestIngestInventoryIps(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Backlog = cls.env['it.asset.backlog']
+        cls.IPAddress = cls.env['it.ip.address']
+
+    def _ingest(self, ips, **values):
+        payload = {
+            'name': 'INV-PRUEBA-RED',
+            'type': 'hardware',
+            'mode': 'full',
+            'fingerprint': 'huella-1',
+            'raw_data': {'sistema': {'so': 'Linux'}},
+            'ips': ips,
+        }
+        payload.update(values)
+        result = self.Backlog.ingest_inventory(payload=payload)
+        return self.Backlog.browse(result['backlog_id'])
+
+    def test_full_inserts_ips(self):
+        backlog = self._ingest([
+            {'address': '10.99.0.1', 'description': 'eth0'},
+            {'address': '10.99.0.2'},
+            {'description': 'Sin dirección'},
+        ])
+        self.assertEqual(set(backlog.ip_ids.mapped('address')), {'10.99.0.1', '10.99.0.2'})
+
+    def test_full_updates_ips(self):
+        ip = self.IPAddress.create({'address': '10.99.0.1', 'description': 'antigua'})
+        backlog = self._ingest([{'address': '10.99.0.1', 'description': 'eth0'}])
+        self.assertEqual(backlog.ip_ids, ip)
+        self.assertEqual(ip.description, 'eth0')
+
+    def test_full_reingest_is_idempotent(self):
+        ips = [{'address': '10.99.0.1', 'description': 'eth0'}]
+        first = self._ingest(ips)
+        second = self._ingest(ips)
+        self.assertEqual(first, second)
+        self.assertEqual(second.ip_ids.mapped('address'), ['10.99.0.1'])
+        self.assertEqual(self.IPAddress.search_count([('address', '=', '10.99.0.1')]), 1)
+
+    def test_delta_links_and_unlinks_ips(self):
+        interfaz = {'mac': 'AA:BB', 'ip': '10.99.0.1'}
+        backlog = self._ingest([{'address': '10.99.0.1'}], raw_data={'interfaces': [interfaz]})
+        nueva = {'mac': 'AA:BB', 'ip': '10.99.0.5'}
+        result = self.Backlog.ingest_inventory(payload={
+            'name': 'INV-PRUEBA-RED',
+            'mode': 'delta',
+            'base_fingerprint': 'huella-1',
+            'fingerprint': 'huella-2',
+            'raw_delta': {'interfaces': {'added': [nueva], 'removed': [inventory_hash(interfaz)]}},
+            'ips': [{'address': '10.99.0.5'}],
+            'ips_removidas': ['10.99.0.1'],
+        })
+        self.assertEqual(result['status'], 'ok')
+        self.assertEqual(backlog.ip_ids.mapped('address'), ['10.99.0.5'])
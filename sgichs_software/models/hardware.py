@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields
+from odoo import models, fields, api
 
 class Hardware(models.Model):
     _inherit = 'it.asset.hardware'
@@ -10,4 +10,19 @@ class Hardware(models.Model):
         'hardware_id',
         'software_id',
         string='Software Instalado'
-    )
\ No newline at end of file
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        installed = records.filtered('software_ids')
+        if installed and not self.env.context.get('skip_compliance_check'):
+            self.env['it.hw.list'].run_compliance_check(hardware_ids=installed.ids)
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        # Verificar solo el hardware cuyo software instalado cambió
+        if 'software_ids' in vals and not self.env.context.get('skip_compliance_check'):
+            self.env['it.hw.list'].run_compliance_check(hardware_ids=self.ids)
+        return res
@@ -44,33 +44,15 @@ class ITAssetBacklog(models.Model):
             if not isinstance(software_programs, list):
                 return vals
 
-            software_model = self.env['it.asset.software']
-            software_ids = []
-            
             _logger.info(f"Procesando {len(software_programs)} programas desde raw_data para backlog '{vals.get('name')}'.")
 
-            for program in software_programs:
-                name = program.get('nombre')
-                version = program.get('version', 'N/A') # Usamos 'N/A' si no viene versión.
-
-                if not name:
-                    continue
-
-                # 4. Lógica "Buscar o Crear" para cada software.
-                domain = [('name', '=', name), ('version', '=', version)]
-                existing_software = software_model.search(domain, limit=1)
-                
-                if existing_software:
-                    software_ids.append(existing_software.id)
-                else:
-                    # Si no existe, lo creamos.
-                    new_software = software_model.create({
-                        'name': name,
-                        'version': version,
-                        'description': f"Creado automáticamente desde el backlog del activo {vals.get('name')}.",
-                        'subtype': 'otros', # Por defecto 'otros', se puede categorizar manualmente después.
-                    })
-                    software_ids.append(new_software.id)
+            # 4. Lógica "Buscar o Crear" por lotes: una búsqueda para todos los
+            #    programas y una creación para los que no existen.
+            software_ids = list(self._bulk_upsert(
+                'it.asset.software', ['name', 'version'],
+                self._prepare_software_vals(software_programs, vals.get('name')),
+                update=False,
+            ).values())
             
             if software_ids:
                 # 5. Usamos el comando (6, 0, ...) para REEMPLAZAR la lista de software
@@ -80,4 +62,59 @@ class ITAssetBacklog(models.Model):
         except json.JSONDecodeError:
             _logger.warning(f"Backlog para '{vals.get('name')}': raw_data no es un JSON válido durante el procesamiento de software.")
         
-        return vals
\ No newline at end of file
+        return vals
+
+    def _prepare_software_vals(self, software_programs, backlog_name):
+        """Valores de creación de it.asset.software para la lista de programas recibida."""
+        software_vals_list = []
+        for program in software_programs:
+            name = program.get('nombre') or program.get('name')
+            if not name:
+                continue
+            software_vals_list.append({
+                'name': name,
+                'version': program.get('version') or 'N/A',  # Usamos 'N/A' si no viene versión.
+                'description': f"Creado automáticamente desde el backlog del activo {backlog_name}.",
+                'subtype': 'otros',  # Por defecto 'otros', se puede categorizar manualmente después.
+            })
+        return software_vals_list
+
+    def _prepare_inventory_vals(self, payload, vals):
+        """Crea por lotes el software enviado explícitamente por el agente, por (nombre, versión)."""
+        vals = super()._prepare_inventory_vals(payload, vals)
+        programs = payload.get('programas')
+        if programs is None:
+            return vals
+
+        software_ids = self._bulk_upsert(
+            'it.asset.software', ['name', 'version'],
+            self._prepare_software_vals(programs, vals.get('name')),
+            update=False,
+        )
+        vals['software_ids'] = [(6, 0, list(set(software_ids.values())))]
+        return vals
+
+    def _prepare_inventory_delta_vals(self, payload, vals, added, removed):
+        """Vincula los programas añadidos a raw_data y desvincula los eliminados, por (nombre, versión)."""
+        vals = super()._prepare_inventory_delta_vals(payload, vals, added, removed)
+        added_programs = added.get('programas') or []
+        removed_programs = removed.get('programas') or []
+        if not added_programs and not removed_programs:
+            return vals
+
+        backlog_name = payload.get('name')
+        added_ids = self._bulk_upsert(
+            'it.asset.software', ['name', 'version'],
+            self._prepare_software_vals(added_programs, backlog_name),
+            update=False,
+        ).values()
+        removed_keys = {
+            (software_vals['name'], software_vals['version'])
+            for software_vals in self._prepare_software_vals(removed_programs, backlog_name)
+        }
+        removed_ids = []
+        if removed_keys:
+            candidates = self.env['it.asset.software'].search([('name', 'in', list({key[0] for key in removed_keys}))])
+            removed_ids = [software.id for software in candidates if (software.name, software.version) in removed_keys]
+        vals['software_ids'] = self._delta_link_commands(added_ids, removed_ids)
+        return vals
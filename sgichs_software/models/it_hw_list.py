@@ -4,6 +4,9 @@ import datetime
 
 _logger = logging.getLogger(__name__)
 
+# Incidentes de compliance creados por cada llamada a create()
+COMPLIANCE_BATCH_SIZE = 1000
+
 class HWList(models.Model):
     _name = 'it.hw.list'
     _description = 'Lista de Control de Software'
@@ -62,7 +65,28 @@ class HWList(models.Model):
                     final_software_ids = self._calculate_final_software_ids(record, vals['software_ids'])
                     self._validate_activation_with_final_software(record, final_software_ids)
         
-        return super().write(vals)
+        check_compliance = not self.env.context.get('skip_compliance_check') and \
+            any(field in vals for field in ('software_ids', 'active', 'type'))
+        if check_compliance:
+            old_software = {record.id: (record.type, set(record.software_ids.ids)) for record in self}
+        
+        res = super().write(vals)
+        
+        # Reevaluar de forma incremental solo el software afectado por el cambio
+        if check_compliance:
+            self.run_compliance_check(software_ids=self._get_compliance_scope(vals, old_software))
+        return res
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        if not self.env.context.get('skip_compliance_check'):
+            active_lists = records.filtered('active')
+            if any(record.type == 'white' for record in active_lists):
+                self.run_compliance_check()
+            elif active_lists:
+                self.run_compliance_check(software_ids=active_lists.software_ids.ids)
+        return records
     
     def action_view_software(self):
         self.ensure_one()
@@ -316,18 +340,9 @@ class HWList(models.Model):
     # ... resto de métodos sin cambios ...
     
     def action_check_compliance(self):
-        """Botón para verificar compliance de todo el software existente (sin hardware)"""
+        """Botón para verificar compliance de todo el software instalado en todo el hardware"""
         try:
-            # Verificar compliance de todo el software
-            software_records = self.env['it.asset.software'].search([])
-            incidents_created = 0
-            
-            for software in software_records:
-                old_count = self.env['it.incident'].search_count([]) if 'it.incident' in self.env else 0
-                self.check_software_compliance(software.id, hardware_id=None)
-                if 'it.incident' in self.env:
-                    new_count = self.env['it.incident'].search_count([])
-                    incidents_created += (new_count - old_count)
+            incidents_created = self.run_compliance_check()
             
             # Mostrar notificación
             return {
@@ -453,83 +468,150 @@ class HWList(models.Model):
         Verifica si un software cumple con las políticas de listas activas
         y genera incidentes si es necesario.
         """
+        return self.run_compliance_check(
+            software_ids=[software_id],
+            hardware_ids=[hardware_id] if hardware_id else None,
+        )
+
+    # ------------------------------------------------------------------
+    # Motor de compliance por conjuntos
+    # ------------------------------------------------------------------
+
+    @api.model
+    def run_compliance_check(self, software_ids=None, hardware_ids=None):
+        """
+        Calcula en SQL las violaciones de las listas activas para cada par
+        (software, hardware) instalado y crea por lotes los incidentes que
+        falten. El software que no está instalado en ningún hardware se evalúa
+        sin hardware, como hasta ahora. El usuario recibe una sola notificación
+        con el resumen de los incidentes creados.
+
+        :param software_ids: limitar la verificación a estos software (todos si es None)
+        :param hardware_ids: limitar la verificación a estos hardware (todos si es None)
+        :return: número de incidentes creados
+        """
         # Verificar si el modelo de incidentes está instalado
         if 'it.incident' not in self.env:
             _logger.warning("Módulo de incidentes no instalado. No se crearán incidentes.")
-            return
-            
-        software = self.env['it.asset.software'].browse(software_id)
-        if not software.exists():
-            return
-            
-        # Obtener listas activas
-        active_black_lists = self.search([('type', '=', 'black'), ('active', '=', True)])
-        active_white_lists = self.search([('type', '=', 'white'), ('active', '=', True)])
-        
-        # Verificar listas negras (prioridad alta)
-        for black_list in active_black_lists:
-            if software in black_list.software_ids:
-                self._create_blacklist_incident(software, hardware_id, black_list)
-                return  # Si está en lista negra, no verificar más
-        
-        # Si hay listas blancas activas, verificar que el software esté permitido
-        if active_white_lists:
-            is_in_whitelist = any(software in white_list.software_ids for white_list in active_white_lists)
-            if not is_in_whitelist:
-                self._create_whitelist_incident(software, hardware_id, active_white_lists)
-    
-    def _create_blacklist_incident(self, software, hardware_id, black_list):
-        """Crea un incidente de alta severidad por software prohibido"""
-        hardware_ref = None
-        hardware_name = "No especificado"
-        
-        # Si se proporciona hardware_id y el modelo de hardware está instalado, usarlo
-        if hardware_id and 'it.asset.hardware' in self.env:
-            hardware = self.env['it.asset.hardware'].browse(hardware_id)
-            if hardware.exists():
-                hardware_ref = f"it.asset.hardware,{hardware_id}"
-                hardware_name = hardware.name
-        
-        title = f"Software Prohibido Detectado: {software.name}"
-        description = f"""
+            return 0
+        if software_ids is not None and not software_ids:
+            return 0
+
+        violations = self._get_compliance_violations(software_ids, hardware_ids)
+        if not violations:
+            return 0
+
+        vals_list = self._prepare_compliance_incidents(violations)
+        Incident = self.env['it.incident'].with_context(
+            tracking_disable=True, mail_create_nolog=True, incident_skip_notification=True,
+        )
+        incidents = Incident.browse()
+        for start in range(0, len(vals_list), COMPLIANCE_BATCH_SIZE):
+            incidents |= Incident.create(vals_list[start:start + COMPLIANCE_BATCH_SIZE])
+        # Un resumen en lugar de una notificación por incidente
+        incidents._send_summary_notification()
+        if vals_list:
+            _logger.warning(f"Compliance: se crearon {len(vals_list)} incidentes por software prohibido o no autorizado.")
+        return len(vals_list)
+
+    @api.model
+    def _get_compliance_violations(self, software_ids=None, hardware_ids=None):
+        """
+        Pares que incumplen las listas activas, en una sola consulta sobre las
+        tablas many2many de listas y de software instalado.
+
+        :return: lista de tuplas (tipo, software_id, hardware_id o None, list_id o None),
+            con tipo 'black' (en una lista negra activa) o 'white' (fuera de todas
+            las listas blancas activas, si hay alguna).
+        """
+        self.env['it.hw.list'].flush_model(['type', 'active', 'software_ids'])
+        self.env['it.asset.hardware'].flush_model(['software_ids'])
+        self.env.cr.execute("""
+            WITH black AS (
+                SELECT rel.software_id, MIN(l.id) AS list_id
+                  FROM hw_list_software_rel rel
+                  JOIN it_hw_list l ON l.id = rel.list_id
+                 WHERE l.active AND l.type = 'black'
+              GROUP BY rel.software_id
+            ), white AS (
+                SELECT DISTINCT rel.software_id
+                  FROM hw_list_software_rel rel
+                  JOIN it_hw_list l ON l.id = rel.list_id
+                 WHERE l.active AND l.type = 'white'
+            ), has_white AS (
+                SELECT EXISTS (SELECT 1 FROM it_hw_list WHERE active AND type = 'white') AS value
+            )
+            SELECT CASE WHEN b.software_id IS NOT NULL THEN 'black' ELSE 'white' END,
+                   s.id, hs.hardware_id, b.list_id
+              FROM it_asset_software s
+         LEFT JOIN hardware_software_rel hs ON hs.software_id = s.id
+         LEFT JOIN black b ON b.software_id = s.id
+             WHERE (b.software_id IS NOT NULL
+                    OR ((SELECT value FROM has_white)
+                        AND NOT EXISTS (SELECT 1 FROM white w WHERE w.software_id = s.id)))
+               AND (%(all_software)s OR s.id = ANY(%(software_ids)s))
+               AND (%(all_hardware)s OR hs.hardware_id = ANY(%(hardware_ids)s))
+        """, {
+            'all_software': software_ids is None,
+            'software_ids': list(software_ids or []),
+            'all_hardware': hardware_ids is None,
+            'hardware_ids': list(hardware_ids or []),
+        })
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _prepare_compliance_incidents(self, violations):
+        """
+        Valores de los incidentes de las violaciones indicadas, omitiendo las que
+        ya tienen un incidente igual en las últimas 24 horas.
+        """
+        software_by_id = {
+            software.id: software
+            for software in self.env['it.asset.software'].browse({v[1] for v in violations})
+        }
+        hardware_ids = {v[2] for v in violations if v[2]}
+        hardware_names = {}
+        if hardware_ids and 'it.asset.hardware' in self.env:
+            hardware_names = {
+                hardware['id']: hardware['name']
+                for hardware in self.env['it.asset.hardware'].browse(hardware_ids).read(['name'])
+            }
+        list_names = {
+            hw_list['id']: hw_list['name']
+            for hw_list in self.with_context(active_test=False).browse({v[3] for v in violations if v[3]}).read(['name'])
+        }
+        white_list_names = ', '.join(self.search([('type', '=', 'white'), ('active', '=', True)]).mapped('name'))
+
+        candidates = []
+        for kind, software_id, hardware_id, list_id in violations:
+            software = software_by_id[software_id]
+            if kind == 'black':
+                title = f"Software Prohibido Detectado: {software.name}"
+            else:
+                title = f"Software No Autorizado: {software.name}"
+            candidates.append((title, kind, software, hardware_id, list_id))
+
+        existing = self._get_recent_compliance_incidents({candidate[0] for candidate in candidates})
+
+        vals_list = []
+        for title, kind, software, hardware_id, list_id in candidates:
+            key = (title, hardware_id or False)
+            if key in existing:
+                continue
+            existing.add(key)
+            hardware_name = hardware_names.get(hardware_id, "No especificado")
+            if kind == 'black':
+                description = f"""
 Se ha detectado software prohibido en el sistema:
 
 Software: {software.name} (v{software.version})
-Lista Negra: {black_list.name}
+Lista Negra: {list_names.get(list_id, '')}
 Hardware: {hardware_name}
 
 ACCIÓN REQUERIDA: Remover inmediatamente este software del sistema.
         """
-        
-        # Verificar si ya existe un incidente similar reciente (últimas 24 horas)
-        existing_incident = self.env['it.incident'].search([
-            ('title', '=', title),
-            ('detection_date', '>=', fields.Datetime.now() - datetime.timedelta(hours=24))
-        ], limit=1)
-        
-        if not existing_incident:
-            self.env['it.incident'].create({
-                'title': title,
-                'description': description,
-                'severity': 'high',
-                'asset_ref': hardware_ref,
-            })
-            _logger.warning(f"Incidente creado: Software prohibido {software.name} detectado")
-    
-    def _create_whitelist_incident(self, software, hardware_id, white_lists):
-        """Crea un incidente de severidad media por software no autorizado"""
-        hardware_ref = None
-        hardware_name = "No especificado"
-        
-        if hardware_id and 'it.asset.hardware' in self.env:
-            hardware = self.env['it.asset.hardware'].browse(hardware_id)
-            if hardware.exists():
-                hardware_ref = f"it.asset.hardware,{hardware_id}"
-                hardware_name = hardware.name
-        
-        white_list_names = ', '.join(white_lists.mapped('name'))
-        title = f"Software No Autorizado: {software.name}"
-        description = f"""
+            else:
+                description = f"""
 Se ha detectado software que no está en las listas blancas activas:
 
 Software: {software.name} (v{software.version})
@@ -538,22 +620,50 @@ Hardware: {hardware_name}
 
 ACCIÓN RECOMENDADA: Verificar si este software debe ser autorizado o removido.
         """
-        
-        # Verificar si ya existe un incidente similar reciente (últimas 24 horas)
-        existing_incident = self.env['it.incident'].search([
-            ('title', '=', title),
-            ('detection_date', '>=', fields.Datetime.now() - datetime.timedelta(hours=24))
-        ], limit=1)
-        
-        if not existing_incident:
-            self.env['it.incident'].create({
+            vals = {
                 'title': title,
                 'description': description,
-                'severity': 'medium',
-                'asset_ref': hardware_ref,
-            })
-            _logger.info(f"Incidente creado: Software no autorizado {software.name} detectado")
-    
+                'severity': 'high' if kind == 'black' else 'medium',
+            }
+            if hardware_id in hardware_names:
+                vals['asset_model'] = 'it.asset.hardware'
+                vals['asset_ref_id'] = hardware_id
+            vals_list.append(vals)
+        return vals_list
+
+    @api.model
+    def _get_recent_compliance_incidents(self, titles):
+        """Pares (título, id de hardware o False) con incidente en las últimas 24 horas."""
+        if not titles:
+            return set()
+        self.env['it.incident'].flush_model(['title', 'detection_date', 'asset_model', 'asset_ref_id'])
+        self.env.cr.execute("""
+            SELECT title,
+                   CASE WHEN asset_model = 'it.asset.hardware' THEN asset_ref_id END
+              FROM it_incident
+             WHERE title = ANY(%s)
+               AND detection_date >= %s
+        """, (list(titles), fields.Datetime.now() - datetime.timedelta(hours=24)))
+        return {(title, hardware_id or False) for title, hardware_id in self.env.cr.fetchall()}
+
+    def _get_compliance_scope(self, vals, old_software):
+        """
+        Software a reevaluar tras modificar listas: None (todo) si cambia una
+        lista blanca activa de forma que puede dejar software fuera de ellas;
+        si no, el software de las listas afectadas antes y después del cambio.
+        """
+        if 'active' in vals or 'type' in vals:
+            if any(record.type == 'white' or old_software[record.id][0] == 'white' for record in self):
+                return None
+        affected = set()
+        for record in self:
+            old_type, old_ids = old_software[record.id]
+            if 'software_ids' in vals and 'active' not in vals and 'type' not in vals:
+                affected |= old_ids ^ set(record.software_ids.ids)
+            else:
+                affected |= old_ids | set(record.software_ids.ids)
+        return list(affected)
+
     @api.model
     def get_software_status(self, software_id):
         """
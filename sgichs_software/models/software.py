@@ -152,14 +152,11 @@ class Software(models.Model):
                 software_ids = self.ids
             
             if software_ids:
-                # Añadir software a la lista
-                for software_id in software_ids:
-                    if software_id not in blacklist.software_ids.ids:
-                        blacklist.software_ids = [(4, software_id)]
-                
-                # Verificar compliance inmediatamente
-                for software_id in software_ids:
-                    self.env['it.hw.list'].check_software_compliance(software_id, hardware_id=None)
+                # Añadir software a la lista en una sola escritura; la lista
+                # verifica el compliance del software añadido al guardarse
+                missing_ids = [software_id for software_id in software_ids if software_id not in blacklist.software_ids.ids]
+                if missing_ids:
+                    blacklist.software_ids = [(4, software_id) for software_id in missing_ids]
                 
                 # Obtener nombres del software
                 software_names = self.env['it.asset.software'].browse(software_ids).mapped('name')
@@ -234,10 +231,10 @@ class Software(models.Model):
                 software_ids = self.ids
             
             if software_ids:
-                # Añadir software a la lista
-                for software_id in software_ids:
-                    if software_id not in whitelist.software_ids.ids:
-                        whitelist.software_ids = [(4, software_id)]
+                # Añadir software a la lista en una sola escritura
+                missing_ids = [software_id for software_id in software_ids if software_id not in whitelist.software_ids.ids]
+                if missing_ids:
+                    whitelist.software_ids = [(4, software_id) for software_id in missing_ids]
                 
                 # Obtener nombres del software
                 software_names = self.env['it.asset.software'].browse(software_ids).mapped('name')
@@ -304,10 +301,10 @@ class Software(models.Model):
                 removed_count = 0
                 
                 for hw_list in all_lists:
-                    for software_id in software_ids:
-                        if software_id in hw_list.software_ids.ids:
-                            hw_list.software_ids = [(3, software_id)]  # Remover de la lista
-                            removed_count += 1
+                    listed_ids = [software_id for software_id in software_ids if software_id in hw_list.software_ids.ids]
+                    if listed_ids:
+                        hw_list.software_ids = [(3, software_id) for software_id in listed_ids]  # Remover de la lista
+                        removed_count += len(listed_ids)
                 
                 # Obtener nombres del software
                 software_names = self.env['it.asset.software'].browse(software_ids).mapped('name')
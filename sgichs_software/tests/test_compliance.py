@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+
+class TestCompliance(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env = cls.env(context=dict(cls.env.context, skip_compliance_check=True))
+        HWList = cls.env['it.hw.list']
+        # Las listas de los datos del módulo no deben influir en los resultados
+        HWList.search([]).write({'active': False})
+
+        Software = cls.env['it.asset.software']
+        cls.prohibited = Software.create({'name': 'Juego', 'version': '1.0'})
+        cls.authorized = Software.create({'name': 'Editor', 'version': '2.0'})
+        cls.unlisted = Software.create({'name': 'Utilidad', 'version': '3.0'})
+        cls.software_ids = [cls.prohibited.id, cls.authorized.id, cls.unlisted.id]
+        cls.hardware = cls.env['it.asset.hardware'].create({
+            'name': 'PC-01',
+            'subtype': 'pc',
+            'software_ids': [(6, 0, [cls.prohibited.id, cls.authorized.id])],
+        })
+        cls.black_list = HWList.create({
+            'name': 'Prohibidos (prueba)', 'type': 'black',
+            'software_ids': [(6, 0, cls.prohibited.ids)],
+        })
+        cls.white_list = HWList.create({
+            'name': 'Permitidos (prueba)', 'type': 'white',
+            'software_ids': [(6, 0, cls.authorized.ids)],
+        })
+
+    def test_violations(self):
+        violations = self.env['it.hw.list']._get_compliance_violations(software_ids=self.software_ids)
+        self.assertCountEqual(violations, [
+            ('black', self.prohibited.id, self.hardware.id, self.black_list.id),
+            # Sin instalar, fuera de las listas blancas: se evalúa sin hardware
+            ('white', self.unlisted.id, None, None),
+        ])
+
+    def test_violations_by_hardware(self):
+        violations = self.env['it.hw.list']._get_compliance_violations(
+            software_ids=self.software_ids, hardware_ids=self.hardware.ids)
+        self.assertEqual(violations, [('black', self.prohibited.id, self.hardware.id, self.black_list.id)])
+
+    def test_violations_without_white_list(self):
+        self.white_list.active = False
+        violations = self.env['it.hw.list']._get_compliance_violations(software_ids=self.software_ids)
+        self.assertEqual(violations, [('black', self.prohibited.id, self.hardware.id, self.black_list.id)])
+
+    def test_scope(self):
+        HWList = self.env['it.hw.list']
+        old = {self.black_list.id: ('black', {self.prohibited.id})}
+        # Software añadido a una lista: solo la diferencia
+        self.black_list.software_ids = [(4, self.unlisted.id)]
+        self.assertEqual(self.black_list._get_compliance_scope({'software_ids': []}, old), [self.unlisted.id])
+        # Lista negra desactivada: todo su software
+        self.assertCountEqual(
+            self.black_list._get_compliance_scope({'active': False}, old),
+            [self.prohibited.id, self.unlisted.id])
+        # Una lista blanca que cambia de estado afecta a todo el software
+        old = {self.white_list.id: ('white', {self.authorized.id})}
+        self.assertIsNone(self.white_list._get_compliance_scope({'active': False}, old))
+        self.assertFalse(HWList.browse()._get_compliance_scope({'active': False}, {}))
+
+    def test_run_compliance_check(self):
+        Bus = type(self.env['bus.bus'])
+        with patch.object(Bus, '_sendone', autospec=True) as sendone:
+            created = self.env['it.hw.list'].run_compliance_check(software_ids=self.software_ids)
+        self.assertEqual(created, 2)
+        # Un solo resumen en lugar de una notificación por incidente
+        self.assertEqual(sendone.call_count, 1)
+        message = sendone.call_args.args[3]
+        self.assertEqual(message['params']['type'], 'danger')
+        incident = self.env['it.incident'].search([('title', '=', 'Software Prohibido Detectado: Juego')])
+        self.assertEqual((incident.asset_model, incident.asset_ref_id), ('it.asset.hardware', self.hardware.id))
+
+        # Sin incidentes nuevos en las siguientes 24 horas
+        with patch.object(Bus, '_sendone', autospec=True) as sendone:
+            created = self.env['it.hw.list'].run_compliance_check(software_ids=self.software_ids)
+        self.assertEqual(created, 0)
+        sendone.assert_not_called()
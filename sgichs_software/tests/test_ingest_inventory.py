@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.sgichs_core2.models.it_asset_backlog import inventory_hash
+
+
+class TestIngestInventorySoftware(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Backlog = cls.env['it.asset.backlog']
+        cls.Software = cls.env['it.asset.software']
+        cls.editor = {'nombre': 'Editor Prueba', 'version': '1.0'}
+        cls.juego = {'nombre': 'Juego Prueba', 'version': '2.0'}
+
+    def _ingest(self, programas, **values):
+        payload = {
+            'name': 'INV-PRUEBA-SW',
+            'type': 'hardware',
+            'mode': 'full',
+            'fingerprint': 'huella-1',
+            'raw_data': {'sistema': {'so': 'Linux'}},
+            'programas': [{'name': p['nombre'], 'version': p.get('version')} for p in programas],
+        }
+        payload.update(values)
+        result = self.Backlog.ingest_inventory(payload=payload)
+        return self.Backlog.browse(result['backlog_id'])
+
+    def _software(self, programa):
+        return self.Software.search([('name', '=', programa['nombre']), ('version', '=', programa['version'])])
+
+    def test_full_inserts_software(self):
+        backlog = self._ingest([self.editor, self.juego, {'nombre': 'Sin versión'}])
+        self.assertEqual(
+            set(backlog.software_ids.mapped(lambda s: (s.name, s.version))),
+            {('Editor Prueba', '1.0'), ('Juego Prueba', '2.0'), ('Sin versión', 'N/A')},
+        )
+
+    def test_full_keeps_existing_software(self):
+        software = self.Software.create({'name': 'Editor Prueba', 'version': '1.0', 'description': 'Manual'})
+        backlog = self._ingest([self.editor])
+        self.assertEqual(backlog.software_ids, software)
+        # El software existente no se modifica
+        self.assertEqual(software.description, 'Manual')
+
+    def test_full_reingest_is_idempotent(self):
+        first = self._ingest([self.editor, self.juego])
+        software = first.software_ids
+        second = self._ingest([self.editor, self.juego])
+        self.assertEqual(first, second)
+        self.assertEqual(second.software_ids, software)
+        self.assertEqual(len(self._software(self.editor)), 1)
+
+    def test_delta_links_and_unlinks_software(self):
+        backlog = self._ingest([self.editor, self.juego], raw_data={'programas': [self.editor, self.juego]})
+        juego_nuevo = dict(self.juego, version='2.1')
+        result = self.Backlog.ingest_inventory(payload={
+            'name': 'INV-PRUEBA-SW',
+            'mode': 'delta',
+            'base_fingerprint': 'huella-1',
+            'fingerprint': 'huella-2',
+            'raw_delta': {'programas': {'added': [juego_nuevo], 'removed': [inventory_hash(self.juego)]}},
+        })
+        self.assertEqual(result['status'], 'ok')
+        self.assertEqual(backlog.software_ids, self._software(self.editor) | self._software(juego_nuevo))
+        # El programa eliminado solo se desvincula
+        self.assertTrue(self._software(self.juego))
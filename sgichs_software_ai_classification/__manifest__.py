@@ -4,7 +4,7 @@
     'author': 'ALejandro Céspedes Pérez',
     'website': 'https://www.asisurl.cu',
     'category': 'IT/Software',
-    'version': '16.0.1.0.0',
+    'version': '16.0.1.1.0',
     'depends': ['asi_ia', 'sgichs_software'],
     'data': [
         'security/ir.model.access.csv',
@@ -1,2 +1,3 @@
 from . import res_config_settings
+from . import software_category_cache
 from . import software_ai_classification
\ No newline at end of file
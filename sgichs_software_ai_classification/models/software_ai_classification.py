@@ -1,17 +1,69 @@
 import json
 import logging
-from odoo import models, api
-from odoo.exceptions import UserError
+import re
+import time
+from collections import defaultdict
+from odoo import models, api, fields
+
+from .software_category_cache import normalize_software_name
 
 _logger = logging.getLogger(__name__)
 
+CATEGORIES = {
+    'gestor_bd': 'Gestor de Bases de Datos',
+    'sistema_operativo': 'Sistema Operativo',
+    'navegador': 'Navegador de Internet',
+    'gestion_empresarial': 'Gestión Empresarial',
+    'ofimatica': 'Ofimática',
+    'comunicacion': 'Software de Comunicación',
+    'desarrollo': 'Software de Desarrollo',
+    'multimedia': 'Multimedia',
+    'seguridad': 'Herramienta de Seguridad',
+    'redes': 'Gestión de Redes',
+    'antivirus': 'Antivirus',
+    'respaldo': 'Respaldo y Recuperación',
+    'herramientas': 'Útiles y Herramientas',
+    'arquitectura_redes': 'Arquitectura de Redes',
+    'diseno': 'Análisis/Diseño',
+    'servidor_app': 'Servidor de Aplicaciones',
+    'virtualizacion': 'Virtualización',
+}
+
+# Reglas para los nombres de software más comunes, evaluadas en orden antes de usar la IA
+CATEGORY_RULES = [(re.compile(pattern), category) for pattern, category in [
+    (r'\b(kaspersky|avast|avg|clamav|eset|nod32|norton|mcafee|bitdefender|segurmatica|windows defender)\b', 'antivirus'),
+    (r'\b(postgresql|postgres|mysql|mariadb|mongodb|sqlite3?|redis|oracle database|sql server|firebird)\b', 'gestor_bd'),
+    (r'\b(firefox|chromium|google chrome|opera|brave|microsoft edge|vivaldi|yandex browser)\b', 'navegador'),
+    (r'\b(libreoffice|openoffice|onlyoffice|wps office|microsoft office|microsoft (word|excel|powerpoint|outlook)|office 365)\b', 'ofimatica'),
+    (r'\b(thunderbird|telegram|whatsapp|zoom|skype|microsoft teams|pidgin|slack|jitsi|zimbra)\b', 'comunicacion'),
+    (r'\b(virtualbox|vmware|qemu|kvm|libvirt|docker|podman|hyper-v|proxmox)\b', 'virtualizacion'),
+    (r'\b(apache2?|httpd|nginx|tomcat|jboss|wildfly|iis|gunicorn|odoo)\b', 'servidor_app'),
+    (r'\b(bacula|veeam|timeshift|duplicity|rsync|cobian|acronis|backup)\b', 'respaldo'),
+    (r'\b(wireshark|putty|winbox|winscp|filezilla|nmap|net-tools|iproute2?|network-manager|openvpn|wireguard)\b', 'redes'),
+    (r'\b(openssh|openssl|gnupg|gpg|keepass|ufw|firewalld|fail2ban|veracrypt)\b', 'seguridad'),
+    (r'\b(visual studio|vscode|pycharm|eclipse|netbeans|intellij|git|gcc|g\+\+|cmake|make|python3?|nodejs|node\.js|openjdk|java|jdk|php|golang|rustc)\b', 'desarrollo'),
+    (r'\b(vlc|ffmpeg|gimp|audacity|obs studio|mpv|gstreamer|k-lite|kdenlive|handbrake|winamp)\b', 'multimedia'),
+    (r'\b(autocad|freecad|blender|inkscape|sketchup|enterprise architect|staruml|archicad|revit)\b', 'diseno'),
+    (r'\b(linux-image|linux-headers|linux-firmware|grub2?|systemd|windows 1[01]|windows server|ubuntu-desktop)\b', 'sistema_operativo'),
+    (r'\b(7-zip|winrar|p7zip|unzip|curl|wget|htop|ccleaner|notepad\+\+|adobe acrobat reader|foxit)\b', 'herramientas'),
+]]
+
+# La IA puede rodear el JSON con texto o bloques de código: se extrae el primer objeto
+JSON_OBJECT_PATTERN = re.compile(r'\{.*\}', re.DOTALL)
+
 class SoftwareAIClassification(models.AbstractModel):
     _name = 'sgichs.software.ai.classification'
     _description = 'Clasificación de Software con IA'
 
     @api.model
     def classify_software_with_ai(self):
-        """Método principal para clasificar software usando IA"""
+        """
+        Método principal para clasificar software usando IA. El software sin
+        clasificar se agrupa por nombre y cada nombre se resuelve, en orden, con:
+        la caché persistente, el software ya clasificado con el mismo nombre, las
+        reglas por nombre y, solo para los desconocidos, la IA (por lotes en paralelo).
+        Los resultados se escriben agrupados por categoría.
+        """
         # Verificar si está habilitado
         ICP = self.env['ir.config_parameter'].sudo()
         enabled = ICP.get_param('sgichs_software_ai_classification.enable', 'False') == 'True'
@@ -19,59 +71,158 @@ class SoftwareAIClassification(models.AbstractModel):
             _logger.info("Clasificación IA de software está deshabilitada")
             return
 
-        # Buscar software no clasificado (subtype == 'otros')
-        software_records = self.env['it.asset.software'].search([
-            ('subtype', '=', 'otros')
-        ], limit=100)
+        start = time.monotonic()
+        stats = defaultdict(int)
 
-        if not software_records:
+        # Software no clasificado (subtype == 'otros'), agrupado por nombre normalizado
+        ids_by_name = self._get_unclassified_software()
+        if not ids_by_name:
             _logger.info("No hay software no clasificado para procesar")
             return
+        stats['names'] = len(ids_by_name)
+        stats['software'] = sum(len(ids) for ids in ids_by_name.values())
 
-        # Generar prompt
-        prompt = self._generate_classification_prompt(software_records)
+        Cache = self.env['sgichs.software.category.cache']
+        classifications = {}
 
-        # Enviar a IA
-        ai_service = self.env['asi_ia.service']
-        try:
-            response = ai_service.get_ai_response(prompt)
-            _logger.info(f"Respuesta IA: {response}")
-        except Exception as e:
-            _logger.error(f"Error al obtener respuesta de IA: {str(e)}")
-            return
+        # 1. Caché persistente (incluye nombres que la IA ya dejó en 'otros')
+        cached = Cache.lookup(ids_by_name)
+        classifications.update(cached)
+        stats['cache_hits'] = len(cached)
+
+        # 2. Software ya clasificado (por un usuario o en ejecuciones anteriores) con el mismo nombre
+        unknown = [name for name in ids_by_name if name not in classifications]
+        known = self._get_known_categories(unknown)
+        if known:
+            Cache.store(known, source='inventory')
+        classifications.update(known)
+        stats['inventory_hits'] = len(known)
+
+        # 3. Reglas por nombre
+        for name in ids_by_name:
+            if name not in classifications:
+                category = self._classify_by_rules(name)
+                if category:
+                    classifications[name] = category
+                    stats['rule_hits'] += 1
+
+        # 4. IA para los nombres desconocidos, hasta el máximo por ejecución
+        unknown = [name for name in ids_by_name if name not in classifications]
+        max_names = int(ICP.get_param('sgichs_software_ai_classification.max_ai_names', 2000))
+        to_ask = unknown[:max_names]
+        if to_ask:
+            ai_start = time.monotonic()
+            ai_classifications = self._classify_with_ai(to_ask, stats)
+            stats['ai_seconds'] = round(time.monotonic() - ai_start, 2)
+            # Los nombres que la IA no supo clasificar se guardan como 'otros' para no repetirlos
+            # hasta que caduquen (ver sgichs.software.category.cache); los lotes fallidos no se
+            # guardan: se reintentarán en la próxima ejecución
+            Cache.store(ai_classifications)
+            classifications.update(ai_classifications)
+        stats['ai_pending'] = len(unknown) - len(to_ask)
+
+        # 5. Escritura por lotes agrupada por categoría
+        stats['updated'] = self._write_classifications(ids_by_name, classifications)
+
+        elapsed = time.monotonic() - start
+        stats['seconds'] = round(elapsed, 2)
+        stats['names_per_second'] = round(stats['names'] / elapsed, 1) if elapsed else 0.0
+        stats['date'] = fields.Datetime.to_string(fields.Datetime.now())
+        ICP.set_param('sgichs_software_ai_classification.last_run_stats', json.dumps(stats))
+        _logger.info(
+            "Clasificación de software: %(names)s nombres (%(software)s registros) en %(seconds)ss "
+            "(%(names_per_second)s nombres/s). Caché: %(cache_hits)s, inventario: %(inventory_hits)s, "
+            "reglas: %(rule_hits)s, IA: %(ai_classified)s de %(ai_sent)s en %(ai_chunks)s lotes "
+            "(%(ai_failed_chunks)s fallidos), pendientes: %(ai_pending)s. Registros actualizados: %(updated)s.",
+            stats)
+        return dict(stats)
 
-        # Parsear y actualizar
-        self._parse_and_update_software(response, software_records)
+    def _get_unclassified_software(self):
+        """{nombre normalizado: [ids]} del software con subtype 'otros', en una sola consulta."""
+        self.env['it.asset.software'].flush_model(['name', 'subtype'])
+        self.env.cr.execute("""
+            SELECT name, array_agg(id)
+              FROM it_asset_software
+             WHERE subtype = 'otros'
+          GROUP BY name
+        """)
+        ids_by_name = defaultdict(list)
+        for name, ids in self.env.cr.fetchall():
+            ids_by_name[normalize_software_name(name)].extend(ids)
+        ids_by_name.pop('', None)
+        return ids_by_name
 
-    def _generate_classification_prompt(self, software_records):
+    def _get_known_categories(self, names):
+        """
+        Categoría del software ya clasificado con el mismo nombre normalizado.
+        La consulta normaliza el nombre igual que normalize_software_name (sin
+        espacios repetidos y en minúsculas) y el resultado se vuelve a comprobar
+        en Python, por si la base de datos difiere en algún carácter.
+        """
+        if not names:
+            return {}
+        names = set(names)
+        self.env['it.asset.software'].flush_model(['name', 'subtype'])
+        self.env.cr.execute(r"""
+            SELECT name, subtype
+              FROM it_asset_software
+             WHERE subtype != 'otros'
+               AND trim(regexp_replace(lower(name), '\s+', ' ', 'g')) = ANY(%s)
+          ORDER BY id
+        """, (list(names),))
+        known = {}
+        for name, category in self.env.cr.fetchall():
+            name = normalize_software_name(name)
+            if name in names and category in CATEGORIES:
+                known.setdefault(name, category)
+        return known
+
+    @api.model
+    def _classify_by_rules(self, name):
+        for pattern, category in CATEGORY_RULES:
+            if pattern.search(name):
+                return category
+        return None
+
+    def _classify_with_ai(self, names, stats):
+        """
+        Envía los nombres a la IA en lotes de tamaño configurable, consultados en
+        paralelo por asi_ia.service. Devuelve {nombre: categoría} de los clasificados.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        chunk_size = max(1, int(ICP.get_param('sgichs_software_ai_classification.chunk_size', 50)))
+        chunks = [names[i:i + chunk_size] for i in range(0, len(names), chunk_size)]
+        stats['ai_sent'] = len(names)
+        stats['ai_chunks'] = len(chunks)
+
+        results = self.env['asi_ia.service'].get_ai_responses(
+            [self._generate_classification_prompt(chunk) for chunk in chunks])
+
+        classifications = {}
+        for chunk, (response, error) in zip(chunks, results):
+            if error:
+                _logger.error(f"Error al obtener respuesta de IA: {error}")
+                stats['ai_failed_chunks'] += 1
+                stats['ai_failed_names'] += len(chunk)
+                continue
+            parsed = self._parse_classification_response(response, chunk)
+            if parsed is None:
+                stats['ai_failed_chunks'] += 1
+                stats['ai_failed_names'] += len(chunk)
+                continue
+            classifications.update(parsed)
+        stats['ai_classified'] = sum(1 for category in classifications.values() if category != 'otros')
+        return classifications
+
+    def _generate_classification_prompt(self, names):
         """Genera el prompt para la IA"""
-        categories = {
-            'gestor_bd': 'Gestor de Bases de Datos',
-            'sistema_operativo': 'Sistema Operativo',
-            'navegador': 'Navegador de Internet',
-            'gestion_empresarial': 'Gestión Empresarial',
-            'ofimatica': 'Ofimática',
-            'comunicacion': 'Software de Comunicación',
-            'desarrollo': 'Software de Desarrollo',
-            'multimedia': 'Multimedia',
-            'seguridad': 'Herramienta de Seguridad',
-            'redes': 'Gestión de Redes',
-            'antivirus': 'Antivirus',
-            'respaldo': 'Respaldo y Recuperación',
-            'herramientas': 'Útiles y Herramientas',
-            'arquitectura_redes': 'Arquitectura de Redes',
-            'diseno': 'Análisis/Diseño',
-            'servidor_app': 'Servidor de Aplicaciones',
-            'virtualizacion': 'Virtualización',
-        }
-
-        software_list = "\n".join([f"{rec.id}: {rec.name}" for rec in software_records])
+        software_list = "\n".join([f"{index}: {name}" for index, name in enumerate(names, 1)])
 
         prompt = f"""
-Clasifica los siguientes software en las categorías disponibles. Responde SOLO con un JSON válido donde las claves sean los IDs de software y los valores las claves de categoría.
+Clasifica los siguientes software en las categorías disponibles. Responde SOLO con un JSON válido donde las claves sean los números de software y los valores las claves de categoría.
 
 Categorías disponibles:
-{json.dumps(categories, indent=2)}
+{json.dumps(CATEGORIES, indent=2)}
 
 Software a clasificar:
 {software_list}
@@ -80,28 +231,49 @@ Ejemplo de respuesta: {{"1": "gestor_bd", "2": "sistema_operativo"}}
 """
         return prompt
 
-    def _parse_and_update_software(self, response, software_records):
-        """Parsea la respuesta JSON y actualiza el software"""
+    def _parse_classification_response(self, response, names):
+        """
+        Parsea la respuesta JSON de un lote. Devuelve {nombre: categoría} (las
+        categorías desconocidas quedan como 'otros') o None si no es un JSON válido.
+        """
+        match = JSON_OBJECT_PATTERN.search(response or '')
         try:
-            classifications = json.loads(response)
+            classifications = json.loads(match.group(0) if match else response)
             if not isinstance(classifications, dict):
                 raise ValueError("La respuesta no es un diccionario")
-
-            for sw_id_str, category in classifications.items():
-                try:
-                    sw_id = int(sw_id_str)
-                    software = self.env['it.asset.software'].browse(sw_id)
-                    if software.exists() and software.subtype == 'otros':
-                        valid_categories = dict(software._fields['subtype'].selection).keys()
-                        if category in valid_categories:
-                            software.write({'subtype': category})
-                            _logger.info(f"Software {software.name} clasificado como {category}")
-                        else:
-                            _logger.warning(f"Categoría inválida {category} para software {sw_id}")
-                except (ValueError, KeyError) as e:
-                    _logger.error(f"Error procesando clasificación para ID {sw_id_str}: {str(e)}")
-
-        except json.JSONDecodeError as e:
+        except (ValueError, TypeError) as e:
             _logger.error(f"Error parseando respuesta JSON: {str(e)}")
-        except Exception as e:
-            _logger.error(f"Error general en parseo: {str(e)}")
\ No newline at end of file
+            return None
+
+        result = {}
+        for index_str, category in classifications.items():
+            try:
+                name = names[int(index_str) - 1]
+            except (ValueError, IndexError):
+                _logger.warning(f"Clave inválida {index_str} en la respuesta de la IA")
+                continue
+            if category not in CATEGORIES:
+                _logger.warning(f"Categoría inválida {category} para software {name}")
+                category = 'otros'
+            result[name] = category
+        # Los nombres que la IA omitió quedan sin clasificar
+        for name in names:
+            result.setdefault(name, 'otros')
+        return result
+
+    def _write_classifications(self, ids_by_name, classifications, batch_size=1000):
+        """Escribe las categorías con una escritura por categoría (en lotes). Devuelve los registros actualizados."""
+        ids_by_category = defaultdict(list)
+        for name, category in classifications.items():
+            if category in CATEGORIES and name in ids_by_name:
+                ids_by_category[category].extend(ids_by_name[name])
+
+        Software = self.env['it.asset.software']
+        updated = 0
+        for category, ids in ids_by_category.items():
+            for start in range(0, len(ids), batch_size):
+                records = Software.browse(ids[start:start + batch_size])
+                records.write({'subtype': category})
+                updated += len(records)
+            _logger.info(f"{len(ids)} software clasificados como {category}")
+        return updated
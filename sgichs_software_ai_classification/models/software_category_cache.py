@@ -0,0 +1,76 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+# Días que se reutiliza un nombre que la IA dejó en 'otros' antes de volver a preguntar
+OTROS_TTL_DAYS = 30
+
+
+def normalize_software_name(name):
+    """Nombre normalizado para la caché: sin espacios repetidos y en minúsculas."""
+    return ' '.join((name or '').split()).lower()
+
+
+class SoftwareCategoryCache(models.Model):
+    """
+    Caché persistente nombre de software -> categoría. Evita volver a preguntar
+    a la IA por un nombre ya clasificado. Los que la IA dejó en 'otros' caducan
+    a los días indicados en el parámetro
+    sgichs_software_ai_classification.otros_ttl_days (0: no se reutilizan),
+    para volver a preguntar por ellos cuando la IA pueda conocerlos.
+    """
+    _name = 'sgichs.software.category.cache'
+    _description = 'Caché de categorías de software'
+    _order = 'name'
+
+    name = fields.Char(string='Nombre normalizado', required=True, index=True)
+    category = fields.Char(string='Categoría', required=True)
+    source = fields.Selection([
+        ('inventory', 'Inventario'),
+        ('ai', 'IA'),
+    ], string='Origen', required=True, default='ai')
+
+    _sql_constraints = [
+        ('name_unique', 'UNIQUE(name)', 'Ya existe una categoría para este nombre de software.'),
+    ]
+
+    @api.model
+    def lookup(self, names):
+        """Devuelve {nombre normalizado: categoría} para los nombres que están en la caché y no han caducado."""
+        if not names:
+            return {}
+        deadline = self._get_otros_deadline()
+        return {
+            entry.name: entry.category
+            for entry in self.search([('name', 'in', list(names))])
+            if entry.category != 'otros' or entry.write_date > deadline
+        }
+
+    @api.model
+    def store(self, classifications, source='ai'):
+        """
+        Guarda por lotes {nombre normalizado: categoría}, sin duplicar los que ya
+        existen. Las entradas 'otros' existentes se actualizan con la nueva
+        categoría, lo que también renueva su caducidad.
+        """
+        if not classifications:
+            return
+        existing = {entry.name: entry for entry in self.search([('name', 'in', list(classifications))])}
+        to_update = defaultdict(lambda: self.browse())
+        to_create = []
+        for name, category in classifications.items():
+            entry = existing.get(name)
+            if entry is None:
+                to_create.append({'name': name, 'category': category, 'source': source})
+            elif entry.category == 'otros':
+                to_update[category] |= entry
+        for category, entries in to_update.items():
+            entries.write({'category': category, 'source': source})
+        self.create(to_create)
+
+    @api.model
+    def _get_otros_deadline(self):
+        days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'sgichs_software_ai_classification.otros_ttl_days', OTROS_TTL_DAYS))
+        return fields.Datetime.now() - timedelta(days=max(days, 0))
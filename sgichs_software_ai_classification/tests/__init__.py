@@ -0,0 +1 @@
+from . import test_software_ai_classification
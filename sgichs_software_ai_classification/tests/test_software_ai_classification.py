@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import json
+import re
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+PROMPT_LINE_PATTERN = re.compile(r'^(\d+): (.+)$', re.MULTILINE)
+
+
+class TestSoftwareAIClassification(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Classification = cls.env['sgichs.software.ai.classification']
+        cls.Cache = cls.env['sgichs.software.category.cache']
+        cls.Software = cls.env['it.asset.software']
+        cls.env['ir.config_parameter'].sudo().set_param('sgichs_software_ai_classification.enable', 'True')
+
+    def _set_age(self, entries, days):
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE sgichs_software_category_cache SET write_date = write_date - %s * interval '1 day' "
+            "WHERE id IN %s", (days, tuple(entries.ids)))
+        entries.invalidate_recordset(['write_date'])
+
+    def _run(self, answers):
+        """Clasifica con una IA que responde según `answers` ({nombre: categoría}, 'otros' si no está)."""
+        asked = []
+
+        def get_ai_responses(service, prompts):
+            responses = []
+            for prompt in prompts:
+                result = {}
+                for index, name in PROMPT_LINE_PATTERN.findall(prompt):
+                    asked.append(name)
+                    result[index] = answers.get(name, 'otros')
+                responses.append((json.dumps(result), None))
+            return responses
+
+        with patch.object(type(self.env['asi_ia.service']), 'get_ai_responses', get_ai_responses):
+            self.Classification.classify_software_with_ai()
+        return asked
+
+    def test_known_categories_normalized(self):
+        self.Software.create({'name': '  Motor  De\tDatos X ', 'version': '1.0', 'subtype': 'gestor_bd'})
+        self.Software.create({'name': 'Motor de datos Y', 'version': '1.0', 'subtype': 'otros'})
+        known = self.Classification._get_known_categories(['motor de datos x', 'motor de datos y'])
+        self.assertEqual(known, {'motor de datos x': 'gestor_bd'})
+
+    def test_otros_expire(self):
+        self.Cache.store({'utilidad rara': 'otros', 'reproductor raro': 'multimedia'})
+        entries = self.Cache.search([('name', 'in', ['utilidad rara', 'reproductor raro'])])
+        self.assertEqual(self.Cache.lookup(['utilidad rara', 'reproductor raro']),
+                         {'utilidad rara': 'otros', 'reproductor raro': 'multimedia'})
+
+        self._set_age(entries, 31)
+        # Solo caducan los nombres que la IA dejó en 'otros'
+        self.assertEqual(self.Cache.lookup(['utilidad rara', 'reproductor raro']),
+                         {'reproductor raro': 'multimedia'})
+
+        # La nueva respuesta actualiza la entrada caducada, no la duplica
+        self.Cache.store({'utilidad rara': 'herramientas', 'reproductor raro': 'otros'})
+        self.assertEqual(self.Cache.search_count([('name', '=', 'utilidad rara')]), 1)
+        self.assertEqual(self.Cache.lookup(['utilidad rara', 'reproductor raro']),
+                         {'utilidad rara': 'herramientas', 'reproductor raro': 'multimedia'})
+
+    def test_otros_not_reused_without_ttl(self):
+        self.env['ir.config_parameter'].sudo().set_param('sgichs_software_ai_classification.otros_ttl_days', 0)
+        self.Cache.store({'utilidad rara': 'otros'})
+        self.assertEqual(self.Cache.lookup(['utilidad rara']), {})
+
+    def test_classify_software(self):
+        known = self.Software.create({'name': 'Gestor Interno', 'version': '1.0', 'subtype': 'gestion_empresarial'})
+        same_name = self.Software.create({'name': 'gestor  interno', 'version': '2.0'})
+        by_rule = self.Software.create({'name': 'VLC media player', 'version': '3.0'})
+        by_ai = self.Software.create({'name': 'Visor Raro', 'version': '1.0'})
+        unknown = self.Software.create({'name': 'Programa Desconocido', 'version': '1.0'})
+
+        asked = self._run({'visor raro': 'multimedia'})
+        self.assertIn('visor raro', asked)
+        self.assertNotIn('gestor interno', asked)
+        self.assertNotIn('vlc media player', asked)
+        self.assertEqual(known.subtype, 'gestion_empresarial')
+        self.assertEqual(same_name.subtype, 'gestion_empresarial')
+        self.assertEqual(by_rule.subtype, 'multimedia')
+        self.assertEqual(by_ai.subtype, 'multimedia')
+        self.assertEqual(unknown.subtype, 'otros')
+
+        # 'otros' se reutiliza mientras no caduca
+        self.assertNotIn('programa desconocido', self._run({}))
+        self._set_age(self.Cache.search([('name', '=', 'programa desconocido')]), 31)
+        asked = self._run({'programa desconocido': 'herramientas'})
+        self.assertIn('programa desconocido', asked)
+        self.assertEqual(unknown.subtype, 'herramientas')
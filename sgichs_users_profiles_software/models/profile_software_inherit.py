@@ -67,16 +67,9 @@ class ITUserProfile(models.Model):
                 }
             }
 
-        incidents_before = self.env['it.incident'].search_count([])
-        
-        # Iterar sobre el software del perfil y verificar cada uno
-        for software in softwares_to_check:
-            # Llamamos a la lógica que ya existe en el modelo it.hw.list
-            # Pasamos el ID del software y dejamos hardware_id como None, ya que es una verificación a nivel de perfil.
-            hw_list_model.check_software_compliance(software.id, hardware_id=None)
-            
-        incidents_after = self.env['it.incident'].search_count([])
-        new_incidents_count = incidents_after - incidents_before
+        # Verificamos todo el software del perfil de una vez con el motor de
+        # compliance del modelo it.hw.list
+        new_incidents_count = hw_list_model.run_compliance_check(software_ids=softwares_to_check.ids)
         
         # Notificar al usuario sobre el resultado
         return {
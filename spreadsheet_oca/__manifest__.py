@@ -5,7 +5,7 @@
     "name": "Spreadsheet Oca",
     "summary": """
         Allow to edit spreadsheets""",
-    "version": "16.0.1.2.1",
+    "version": "16.0.1.3.0",
     "license": "AGPL-3",
     "author": "CreuBlanca,Odoo Community Association (OCA)",
     "website": "https://github.com/OCA/spreadsheet",
@@ -15,6 +15,7 @@
         "security/ir.model.access.csv",
         "views/spreadsheet_spreadsheet.xml",
         "data/spreadsheet_spreadsheet_import_mode.xml",
+        "data/ir_cron.xml",
         "wizards/spreadsheet_spreadsheet_import.xml",
     ],
     "demo": ["demo/spreadsheet_spreadsheet.xml"],
@@ -3,9 +3,17 @@
 
 import json
 
-from odoo import fields, models
+from odoo import api, fields, models
 from odoo.exceptions import AccessError
 
+# Revision id of a spreadsheet that was never snapshotted (o-spreadsheet default)
+START_REVISION_ID = "START_REVISION"
+# Revisions returned per call of get_spreadsheet_revisions
+REVISION_PAGE_SIZE = 500
+# Default number of pending revisions after which the next editor that opens
+# the spreadsheet folds them into a new snapshot
+DEFAULT_SNAPSHOT_THRESHOLD = 100
+
 
 class SpreadsheetAbstract(models.AbstractModel):
     _name = "spreadsheet.abstract"
@@ -20,6 +28,13 @@ class SpreadsheetAbstract(models.AbstractModel):
     )
 
     def get_spreadsheet_data(self):
+        """
+        Snapshot of the spreadsheet and the first page of the revisions made
+        since then. When ``has_more_revisions`` is set, the client fetches the
+        rest with ``get_spreadsheet_revisions``. ``snapshot_requested`` asks an
+        editor to fold the revisions into a new snapshot (see SNAPSHOT messages
+        in ``send_spreadsheet_message``), which keeps the next loads short.
+        """
         self.ensure_one()
         mode = "normal"
         try:
@@ -27,22 +42,118 @@ class SpreadsheetAbstract(models.AbstractModel):
             self.check_access_rule("write")
         except AccessError:
             mode = "readonly"
+        page = self.get_spreadsheet_revisions()
+        revision_count = self.env["spreadsheet.oca.revision"].search_count(
+            self._get_revision_domain()
+        )
         return {
             "name": self.name,
             "spreadsheet_raw": self.spreadsheet_raw,
+            "revisions": page["revisions"],
+            "has_more_revisions": page["has_more"],
+            "last_revision_id": page["last_id"],
+            "snapshot_revision_id": page["snapshot_revision_id"],
+            "snapshot_requested": mode == "normal"
+            and revision_count >= self._get_snapshot_threshold(),
+            "mode": mode,
+        }
+
+    def get_spreadsheet_revisions(self, after_id=0, limit=REVISION_PAGE_SIZE):
+        """
+        Page of revisions, in order, with a database id greater than
+        ``after_id``. Pass the returned ``last_id`` to get the next page.
+        A snapshot saved meanwhile replaces the revisions being paged: when the
+        returned ``snapshot_revision_id`` differs from the one loaded first,
+        the client has to load the spreadsheet again.
+        """
+        self.ensure_one()
+        self.check_access_rights("read")
+        self.check_access_rule("read")
+        domain = self._get_revision_domain()
+        if after_id:
+            domain.append(("id", ">", after_id))
+        rows = (
+            self.env["spreadsheet.oca.revision"]
+            .search_read(
+                domain,
+                [
+                    "type",
+                    "client_id",
+                    "next_revision_id",
+                    "server_revision_id",
+                    "commands",
+                ],
+                order="id",
+                limit=limit + 1,
+            )
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
             "revisions": [
                 {
-                    "type": revision.type,
-                    "clientId": revision.client_id,
-                    "nextRevisionId": revision.next_revision_id,
-                    "serverRevisionId": revision.server_revision_id,
-                    "commands": json.loads(revision.commands),
+                    "type": row["type"],
+                    "clientId": row["client_id"],
+                    "nextRevisionId": row["next_revision_id"],
+                    "serverRevisionId": row["server_revision_id"],
+                    "commands": json.loads(row["commands"]),
                 }
-                for revision in self.spreadsheet_revision_ids
+                for row in rows
             ],
-            "mode": mode,
+            "last_id": rows[-1]["id"] if rows else after_id,
+            "has_more": has_more,
+            "snapshot_revision_id": self._get_snapshot_revision_id(),
         }
 
+    def _get_revision_domain(self):
+        return [("model", "=", self._name), ("res_id", "=", self.id)]
+
+    @api.model
+    def _get_snapshot_threshold(self):
+        return int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param(
+                "spreadsheet_oca.snapshot_threshold", DEFAULT_SNAPSHOT_THRESHOLD
+            )
+        )
+
+    def _get_snapshot_revision_id(self):
+        """Id of the revision the stored snapshot ends at."""
+        return (self.spreadsheet_raw or {}).get("revisionId", START_REVISION_ID)
+
+    def _get_head_revision_id(self):
+        """Id of the last revision known by the server."""
+        last_revision = self.env["spreadsheet.oca.revision"].search(
+            self._get_revision_domain(), order="id desc", limit=1
+        )
+        if last_revision:
+            return last_revision.next_revision_id
+        return self._get_snapshot_revision_id()
+
+    def _lock_spreadsheet(self):
+        """
+        Serialize the messages of one spreadsheet: concurrent transactions that
+        touch the same row fail and are retried, so a snapshot never drops a
+        revision stored while it was being saved.
+        """
+        self.env.cr.execute(
+            "UPDATE %s SET write_date = write_date WHERE id = %%s" % self._table,
+            (self.id,),
+        )
+
+    def _save_snapshot(self, message):
+        """
+        Store the snapshot sent by a client in place of the revisions it folds.
+        Ignored when other revisions arrived since the client built it.
+        """
+        self._lock_spreadsheet()
+        if message["serverRevisionId"] != self._get_head_revision_id():
+            return False
+        data = dict(message["data"], revisionId=message["nextRevisionId"])
+        self.write({"spreadsheet_raw": data})
+        return True
+
     def open_spreadsheet(self):
         self.ensure_one()
         return {
@@ -55,7 +166,22 @@ class SpreadsheetAbstract(models.AbstractModel):
         self.ensure_one()
         channel = (self.env.cr.dbname, "spreadsheet_oca", self._name, self.id)
         message.update({"res_model": self._name, "res_id": self.id})
-        if message["type"] in ["REVISION_UNDONE", "REMOTE_REVISION", "REVISION_REDONE"]:
+        if message["type"] == "SNAPSHOT":
+            if not self._save_snapshot(message):
+                return False
+            message = {
+                "type": "SNAPSHOT_CREATED",
+                "serverRevisionId": message["serverRevisionId"],
+                "nextRevisionId": message["nextRevisionId"],
+                "res_model": self._name,
+                "res_id": self.id,
+            }
+        elif message["type"] in [
+            "REVISION_UNDONE",
+            "REMOTE_REVISION",
+            "REVISION_REDONE",
+        ]:
+            self._lock_spreadsheet()
             self.env["spreadsheet.oca.revision"].create(
                 {
                     "model": self._name,
@@ -74,3 +200,9 @@ class SpreadsheetAbstract(models.AbstractModel):
         if "spreadsheet_raw" in vals:
             self.spreadsheet_revision_ids.unlink()
         return super().write(vals)
+
+    def unlink(self):
+        self.env["spreadsheet.oca.revision"].sudo().search(
+            [("model", "=", self._name), ("res_id", "in", self.ids)]
+        ).unlink()
+        return super().unlink()
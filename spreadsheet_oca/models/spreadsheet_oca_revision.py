@@ -1,7 +1,11 @@
 # Copyright 2022 CreuBlanca
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
 
-from odoo import fields, models
+import logging
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
 
 
 class SpreadsheetOcaRevision(models.Model):
@@ -9,10 +13,37 @@ class SpreadsheetOcaRevision(models.Model):
     _name = "spreadsheet.oca.revision"
     _description = "Spreadsheet Oca Revision"  # TODO
 
-    model = fields.Char(required=True)
+    model = fields.Char(required=True, index=True)
     res_id = fields.Integer(required=True, index=True)
     type = fields.Char()
     client_id = fields.Char()
     server_revision_id = fields.Char()
     next_revision_id = fields.Char()
     commands = fields.Char()
+
+    @api.model
+    def _cron_compact_revisions(self):
+        """
+        Drop the revisions of deleted records, which nobody will load again.
+        Revisions folded into a snapshot are already removed when it is saved,
+        and folding pending revisions needs the spreadsheet engine, so it is
+        done by the first editor that opens the spreadsheet (see
+        ``snapshot_requested`` in ``spreadsheet.abstract.get_spreadsheet_data``).
+        """
+        self.flush_model()
+        self.env.cr.execute(
+            "SELECT model, array_agg(DISTINCT res_id) FROM spreadsheet_oca_revision "
+            "GROUP BY model"
+        )
+        to_unlink = self.browse()
+        for model_name, res_ids in self.env.cr.fetchall():
+            if model_name not in self.env:
+                to_unlink |= self.search([("model", "=", model_name)])
+                continue
+            records = self.env[model_name].browse(res_ids).exists()
+            to_unlink |= self.search(
+                [("model", "=", model_name), ("res_id", "not in", records.ids)]
+            )
+        if to_unlink:
+            _logger.info("Removing %s obsolete spreadsheet revisions", len(to_unlink))
+            to_unlink.unlink()
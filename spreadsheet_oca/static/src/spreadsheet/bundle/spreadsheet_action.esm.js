@@ -27,19 +27,42 @@ export class ActionSpreadsheetOca extends Component {
             });
         });
         onWillStart(async () => {
-            this.record =
-                (await this.orm.call(
-                    this.model,
-                    "get_spreadsheet_data",
-                    [[this.spreadsheetId]],
-                    {context: {bin_size: false}}
-                )) || {};
+            this.record = await this.fetchSpreadsheetData();
+            await this.loadPendingRevisions();
         });
         useSubEnv({
             saveRecord: this.saveRecord.bind(this),
             importData: this.importData.bind(this),
         });
     }
+    async fetchSpreadsheetData() {
+        return (
+            (await this.orm.call(
+                this.model,
+                "get_spreadsheet_data",
+                [[this.spreadsheetId]],
+                {context: {bin_size: false}}
+            )) || {}
+        );
+    }
+    async loadPendingRevisions() {
+        // Revisions come by pages: a long history does not make a huge RPC
+        while (this.record.has_more_revisions) {
+            const page = await this.orm.call(
+                this.model,
+                "get_spreadsheet_revisions",
+                [[this.spreadsheetId], this.record.last_revision_id]
+            );
+            if (page.snapshot_revision_id !== this.record.snapshot_revision_id) {
+                // A snapshot replaced the revisions being loaded: start over from it
+                this.record = await this.fetchSpreadsheetData();
+                continue;
+            }
+            this.record.revisions.push(...page.revisions);
+            this.record.last_revision_id = page.last_id;
+            this.record.has_more_revisions = page.has_more;
+        }
+    }
     async saveRecord(data) {
         if (this.record.mode === "readonly") {
             return;
@@ -65,16 +65,17 @@ export class SpreadsheetRenderer extends Component {
             dialogContent: undefined,
         });
         this.confirmDialog = this.closeDialog;
+        this.transportService = new SpreadsheetTransportService(
+            this.orm,
+            this.bus_service,
+            this.props.model,
+            this.props.res_id
+        );
         this.spreadsheet_model = new Model(
             migrate(this.props.record.spreadsheet_raw),
             {
                 evalContext: {env: this.env, orm: this.orm},
-                transportService: new SpreadsheetTransportService(
-                    this.orm,
-                    this.bus_service,
-                    this.props.model,
-                    this.props.res_id
-                ),
+                transportService: this.transportService,
                 client: {
                     id: uuidGenerator.uuidv4(),
                     name: this.user.name,
@@ -89,6 +90,9 @@ export class SpreadsheetRenderer extends Component {
             editText: this.editText.bind(this),
         });
         onWillStart(async () => {
+            if (this.props.record.snapshot_requested) {
+                this.snapshot();
+            }
             await loadSpreadsheetDependencies();
             await dataSources.waitForAllLoaded();
             await this.env.importData(this.spreadsheet_model);
@@ -101,6 +105,18 @@ export class SpreadsheetRenderer extends Component {
             this.spreadsheet_model.dispatch("EVALUATE_CELLS", {sheetId});
         });
     }
+    snapshot() {
+        // Fold the revisions replayed on load into a new snapshot, before any
+        // local change exists. The server ignores it if other revisions arrived.
+        const data = this.spreadsheet_model.exportData();
+        const nextRevisionId = uuidGenerator.uuidv4();
+        this.transportService.sendMessage({
+            type: "SNAPSHOT",
+            serverRevisionId: data.revisionId,
+            nextRevisionId,
+            data: {...data, revisionId: nextRevisionId},
+        });
+    }
     closeDialog() {
         this.state.dialogDisplayed = false;
         this.state.dialogTitle = "Spreadsheet";
@@ -0,0 +1,104 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+from odoo.tests.common import TransactionCase
+
+from ..models.spreadsheet_abstract import START_REVISION_ID
+
+
+class TestSpreadsheetRevisions(TransactionCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.spreadsheet = cls.env["spreadsheet.spreadsheet"].create(
+            {"name": "Revisions"}
+        )
+
+    def _add_revisions(self, count):
+        head = self.spreadsheet._get_head_revision_id()
+        for index in range(count):
+            next_revision_id = "%s-%s" % (head, index)
+            self.spreadsheet.send_spreadsheet_message(
+                {
+                    "type": "REMOTE_REVISION",
+                    "clientId": "client",
+                    "serverRevisionId": head,
+                    "nextRevisionId": next_revision_id,
+                    "commands": [{"type": "UPDATE_CELL", "index": index}],
+                }
+            )
+            head = next_revision_id
+        return head
+
+    def _snapshot(self, server_revision_id, next_revision_id="snapshot"):
+        return self.spreadsheet.send_spreadsheet_message(
+            {
+                "type": "SNAPSHOT",
+                "serverRevisionId": server_revision_id,
+                "nextRevisionId": next_revision_id,
+                "data": {"sheets": []},
+            }
+        )
+
+    def test_paging(self):
+        self._add_revisions(5)
+        first = self.spreadsheet.get_spreadsheet_revisions(limit=2)
+        self.assertTrue(first["has_more"])
+        self.assertEqual(first["snapshot_revision_id"], START_REVISION_ID)
+        self.assertEqual(
+            [rev["commands"][0]["index"] for rev in first["revisions"]], [0, 1]
+        )
+        second = self.spreadsheet.get_spreadsheet_revisions(
+            first["last_id"], limit=2
+        )
+        third = self.spreadsheet.get_spreadsheet_revisions(
+            second["last_id"], limit=2
+        )
+        self.assertEqual(
+            [rev["commands"][0]["index"] for rev in second["revisions"]], [2, 3]
+        )
+        self.assertEqual(
+            [rev["commands"][0]["index"] for rev in third["revisions"]], [4]
+        )
+        self.assertFalse(third["has_more"])
+
+    def test_paging_after_snapshot(self):
+        head = self._add_revisions(3)
+        first = self.spreadsheet.get_spreadsheet_revisions(limit=2)
+        # Another editor folds the revisions while the first page is loaded
+        self.assertTrue(self._snapshot(head))
+        second = self.spreadsheet.get_spreadsheet_revisions(first["last_id"], limit=2)
+        self.assertNotEqual(
+            second["snapshot_revision_id"], first["snapshot_revision_id"]
+        )
+        data = self.spreadsheet.get_spreadsheet_data()
+        self.assertEqual(data["snapshot_revision_id"], "snapshot")
+        self.assertFalse(data["revisions"])
+
+    def test_snapshot_head_mismatch(self):
+        head = self._add_revisions(2)
+        stale = self.spreadsheet.spreadsheet_revision_ids[0].next_revision_id
+        self.assertNotEqual(stale, head)
+        self.assertFalse(self._snapshot(stale))
+        self.assertEqual(len(self.spreadsheet.spreadsheet_revision_ids), 2)
+        self.assertEqual(self.spreadsheet._get_snapshot_revision_id(), START_REVISION_ID)
+
+        self.assertTrue(self._snapshot(head))
+        self.assertFalse(self.spreadsheet.spreadsheet_revision_ids)
+        self.assertEqual(self.spreadsheet._get_head_revision_id(), "snapshot")
+
+    def test_cron_compact_revisions(self):
+        self._add_revisions(2)
+        Revision = self.env["spreadsheet.oca.revision"]
+        orphans = Revision.create(
+            [
+                {
+                    "model": "spreadsheet.spreadsheet",
+                    "res_id": self.spreadsheet.id + 1000,
+                    "commands": "[]",
+                },
+                {"model": "no.such.model", "res_id": 1, "commands": "[]"},
+            ]
+        )
+        Revision._cron_compact_revisions()
+        self.assertFalse(orphans.exists())
+        self.assertEqual(len(self.spreadsheet.spreadsheet_revision_ids), 2)